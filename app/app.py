@@ -2,51 +2,16 @@
 # app.py
 
 import streamlit as st
-import toml
-import time
-from sqlalchemy.exc import SQLAlchemyError
-from modules.utils.db.db_utils_mysql import (
-    get_existing_users,
-    get_user_data_from_mysql,
-    push_user_data_mysql,
-    delete_user_data_mysql
-)
-from modules.utils.db.db_utils_neo4j import (
-    ingest_user_data_to_neo4j,
-    delete_user_data_neo4j,
-    driver as neo4j_driver
-)
-from modules.utils.db.db_chat_mysql import (
-    get_sessions,
-    create_session,
-    rename_session,
-    delete_session,
-    get_chat_history,
-    push_chat_message
-)
-from modules.utils.cleaner.cleaner import (
-    load_csv_from_zip,
-    clean_food_intake,
-    clean_sleep_hours,
-    clean_step_count,
-    clean_water_intake
-)
-from modules.utils.retrieval.graphrag import get_graphrag_agent
+from backend.client import get_client
 from components.home import render_home
 from components.input_data import render_input_data
 from components.dashboard import render_dashboard
 from components.ai_assistant import render_ai_assistant
 
-from urllib.parse import quote_plus
-
 # ─── CONFIGURATION ────────────────────────────────────────────────────────────
-cfg = toml.load('secrets.toml')
-DB_MYSQL = cfg['mysql']
-PASSWORD = quote_plus(DB_MYSQL['password'])
-DB_URL = (
-    f"mysql+pymysql://{DB_MYSQL['user']}:{PASSWORD}"
-    f"@{DB_MYSQL['host']}:{DB_MYSQL['port']}/{DB_MYSQL['database']}"
-)
+# All data and assistant work happens in the backend service (backend/api.py)
+api = get_client()
+SESSIONS_PAGE = 20   # chat sessions rendered before "Show more"
 st.set_page_config(page_title="Samsung Health GraphRAG", layout="wide")
 
 # ─── SESSION STATE DEFAULTS ───────────────────────────────────────────────────
@@ -57,9 +22,10 @@ def init_session_state():
         'user_id': None,
         'username': None,
         'session_id': None,
-        'agent_executor': None,
         'history_loaded_for': None,
-        'chat_history': []
+        'chat_history': [],
+        'user_page': 0,
+        'sessions_shown': SESSIONS_PAGE
     }
     for key, default in defaults.items():
         if key not in st.session_state:
@@ -79,6 +45,18 @@ def to_dashboard():
 def to_ai():
     st.session_state.main_page = 'ai_assistant'
 
+def reset_user_page():
+    st.session_state.user_page = 0
+
+def shift_user_page(delta: int):
+    st.session_state.user_page = max(0, st.session_state.user_page + delta)
+
+def session_label(s: dict) -> str:
+    return f"{s['name']} · {str(s['created_at'])[:16].replace('T', ' ')}"
+
+def show_more_sessions():
+    st.session_state.sessions_shown += SESSIONS_PAGE
+
 # ─── SIDEBAR ─────────────────────────────────────────────────────────────────
 
 def render_sidebar():
@@ -108,12 +86,27 @@ def render_sidebar():
     # Only show user selection when Dashboard or AI Assistant is chosen
     if st.session_state.main_page in ['user_dashboard', 'ai_assistant']:
         try:
-            users = get_existing_users(DB_URL)
-            user_map = {row['username']: row['user_id'] for _, row in users.iterrows()}
+            query = st.sidebar.text_input(
+                "Search Users", key="user_search",
+                placeholder="Username starts with...", on_change=reset_user_page
+            )
+            result = api.search_users(query, st.session_state.user_page)
+            st.session_state.user_page = result['page']
+            user_map = {u['username']: u['user_id'] for u in result['users']}
+            # Keep the selected user selectable while browsing other pages
+            if st.session_state.username and st.session_state.username not in user_map:
+                user_map = {st.session_state.username: st.session_state.user_id, **user_map}
             user_options = ['-- Select --'] + list(user_map.keys())
             choice = st.sidebar.selectbox(
                 "Select User", user_options, key="user_select"
             )
+            if result['pages'] > 1:
+                prev_col, info_col, next_col = st.sidebar.columns([1, 2, 1])
+                prev_col.button("◀", key="user_page_prev", disabled=result['page'] == 0,
+                                on_click=shift_user_page, args=(-1,))
+                info_col.caption(f"Page {result['page'] + 1}/{result['pages']} · {result['total']} users")
+                next_col.button("▶", key="user_page_next", disabled=result['page'] >= result['pages'] - 1,
+                                on_click=shift_user_page, args=(1,))
             if choice != '-- Select --':
                 st.session_state.user_id = user_map[choice]
                 st.session_state.username = choice
@@ -121,8 +114,7 @@ def render_sidebar():
                 if st.session_state.user_id:
                     with st.sidebar.expander("Delete User?", expanded=False):
                         if st.button("Delete This User", key="delete_user_btn"):
-                            delete_user_data_mysql(st.session_state.user_id, DB_URL)
-                            delete_user_data_neo4j(st.session_state.user_id)
+                            api.delete_user(st.session_state.user_id)
                             st.success(f"User '{st.session_state.username}' and related data have been deleted.")
                             st.session_state.user_id = None
                             st.session_state.username = None
@@ -143,34 +135,44 @@ def render_sidebar():
         # Manage existing sessions expander
         with st.sidebar.expander("⚙️ Manage Sessions", expanded=False):
             if st.button("➕ Start New Session", key="new_chat_btn"):
-                sid = create_session(st.session_state.user_id)
+                sid = api.create_session(st.session_state.user_id)
                 st.session_state.session_id = sid
-
-            sessions = get_sessions(st.session_state.user_id)
-            sess_map = {row['name']: row['session_id'] for _, row in sessions.iterrows()}
-            names = list(sess_map.keys())
-            if names:
-                # default index to current session
-                default_idx = 0
-                if st.session_state.session_id in sess_map.values():
-                    current_name = next(k for k, v in sess_map.items() if v == st.session_state.session_id)
-                    default_idx = names.index(current_name)
+                st.session_state.sess_manage_select = sid
+
+            # Served from the backend's write-through cache; only the newest
+            # sessions are rendered until the user asks for more
+            sessions = api.list_sessions(st.session_state.user_id)
+            shown = sessions[:st.session_state.sessions_shown]
+            labels = {s['session_id']: session_label(s) for s in shown}
+            current = st.session_state.session_id
+            if current is not None and current not in labels:
+                match = next((s for s in sessions if s['session_id'] == current), None)
+                if match is not None:
+                    labels[current] = session_label(match)
+            if labels:
+                options = list(labels)
+                if st.session_state.get("sess_manage_select") not in labels:
+                    st.session_state.sess_manage_select = current if current in labels else options[0]
                 selected = st.selectbox(
-                    "Select Session", names,
-                    index=default_idx, key="sess_manage_select"
+                    "Select Session", options,
+                    format_func=labels.get, key="sess_manage_select"
                 )
-                st.session_state.session_id = sess_map[selected]
+                st.session_state.session_id = selected
+                if len(sessions) > len(shown):
+                    st.button(f"Show more ({len(sessions) - len(shown)} older)",
+                              key="more_sessions_btn", on_click=show_more_sessions)
                 # Rename functionality
                 new_name = st.text_input(
                     "Rename Session:", key="rename_session_input"
                 )
                 if st.button("Rename", key="rename_session_btn") and new_name:
-                    rename_session(st.session_state.session_id, new_name)
+                    api.rename_session(st.session_state.session_id, new_name)
                     st.rerun()
                 # Delete functionality
                 if st.button("Delete", key="delete_session_btn"):
-                    delete_session(st.session_state.session_id)
+                    api.delete_session(st.session_state.session_id)
                     st.session_state.session_id = None
+                    st.session_state.pop("sess_manage_select", None)
                     st.session_state.history_loaded_for = None
                     st.session_state.chat_history = []
                     st.rerun()
@@ -185,19 +187,17 @@ def main():
     if page == 'home':
         render_home()
     elif page == 'input_user_data':
-        render_input_data(DB_URL)
+        render_input_data(api)
     elif page == 'user_dashboard':
         if not st.session_state.user_id:
             st.warning("Select a user first.")
         else:
-            render_dashboard(DB_URL)
+            render_dashboard(api)
     elif page == 'ai_assistant':
         if not st.session_state.user_id or not st.session_state.session_id:
             st.warning("User and session required.")
         else:
-            if not st.session_state.agent_executor:
-                st.session_state.agent_executor = get_graphrag_agent()
-            render_ai_assistant()
+            render_ai_assistant(api)
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,190 @@
+# backend/api.py
+"""
+Headless HTTP backend: ingestion, dashboard aggregates, chat sessions and the
+assistant, with the Streamlit app as a thin client (backend/client.py).
+
+The process holds no per-user state beyond caches that are safe to lose, so
+several workers can run behind a load balancer. Run from the app/ directory:
+
+    uvicorn backend.api:app --host 0.0.0.0 --port 8000 --workers 4
+    python -m backend.local          # SQLite + in-memory graph + scripted LLM
+
+Blocking work (MySQL, Neo4j, LLM calls) runs in plain `def` handlers, which
+FastAPI executes on its thread pool; /assistant/stream sends newline-delimited
+JSON events as they are produced. Uploads posted to /ingest/jobs are ingested
+by background workers (backend/jobs.py) started with the app.
+"""
+import json
+from contextlib import asynccontextmanager
+from datetime import date
+from typing import Optional
+
+from fastapi import FastAPI, File, Form, HTTPException, Query, UploadFile
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+
+from backend import jobs, service
+from modules.utils.db import db_export
+from modules.utils.observability import metrics
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    jobs.start_workers()
+    yield
+    jobs.stop_workers()
+
+
+app = FastAPI(title="Samsung Health GraphRAG API", lifespan=lifespan)
+
+
+class SessionIn(BaseModel):
+    name: str = "New chat"
+
+
+class MessageIn(BaseModel):
+    role: str
+    message: str
+
+
+class Question(BaseModel):
+    user_id: int
+    question: str
+    session_id: Optional[int] = None
+
+
+def _call(fn, *args, **kwargs):
+    # Service errors -> HTTP status codes
+    try:
+        return fn(*args, **kwargs)
+    except service.NotFound as exc:
+        raise HTTPException(status_code=404, detail=str(exc))
+    except jobs.Busy as exc:
+        raise HTTPException(status_code=429, detail=str(exc), headers={"Retry-After": "10"})
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+
+@app.get("/health")
+def health():
+    return {"status": "ok"}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_text():
+    # Prometheus scrape target (this worker process only)
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+# ─── USERS & INGESTION ────────────────────────────────────────────────────────
+
+@app.get("/users")
+def list_users(prefix: str = "", page: int = Query(0, ge=0), page_size: Optional[int] = Query(None, ge=1, le=500)):
+    return service.list_users(prefix, page, page_size)
+
+
+@app.delete("/users/{user_id}", status_code=204)
+def delete_user(user_id: int):
+    _call(service.delete_user, user_id)
+
+
+@app.post("/ingest/preview")
+def preview_upload(file: UploadFile = File(...)):
+    return _call(service.preview_zip, file.file.read())
+
+
+@app.post("/ingest", status_code=201)
+def ingest_upload(username: str = Form(...), file: UploadFile = File(...)):
+    return _call(service.ingest_zip, username, file.file.read())
+
+
+@app.post("/ingest/jobs", status_code=202)
+def submit_ingest(username: str = Form(...), file: UploadFile = File(...)):
+    return _call(jobs.submit, username, file.file.read())
+
+
+@app.get("/ingest/jobs")
+def list_ingest_jobs(limit: int = Query(20, ge=1, le=200)):
+    return jobs.list_jobs(limit)
+
+
+@app.get("/ingest/jobs/{job_id}")
+def ingest_job(job_id: int):
+    return _call(jobs.get_job, job_id)
+
+
+@app.post("/ingest/jobs/{job_id}/retry", status_code=202)
+def retry_ingest_job(job_id: int):
+    return _call(jobs.retry_job, job_id)
+
+
+@app.get("/users/{user_id}/dashboard")
+def dashboard(user_id: int):
+    return _call(service.dashboard, user_id)
+
+
+@app.get("/users/{user_id}/trends")
+def trends(user_id: int):
+    return _call(service.trends, user_id)
+
+
+@app.get("/users/{user_id}/export/{table}")
+def export_table(user_id: int, table: str, format: str = "parquet",
+                 start: Optional[date] = None, end: Optional[date] = None):
+    chunks = _call(service.export_table, user_id, table, format, start, end)
+    ext = db_export.FORMATS[format]
+    media = "application/vnd.apache.parquet" if format == "parquet" else "application/vnd.apache.arrow.stream"
+    return StreamingResponse(chunks, media_type=media,
+                             headers={"Content-Disposition": f'attachment; filename="{table}-{user_id}{ext}"'})
+
+
+# ─── CHAT SESSIONS ────────────────────────────────────────────────────────────
+
+@app.get("/users/{user_id}/sessions")
+def list_sessions(user_id: int):
+    return service.list_sessions(user_id)
+
+
+@app.post("/users/{user_id}/sessions", status_code=201)
+def create_session(user_id: int, body: SessionIn):
+    return _call(service.create_session, user_id, body.name)
+
+
+@app.patch("/sessions/{session_id}", status_code=204)
+def rename_session(session_id: int, body: SessionIn):
+    service.rename_session(session_id, body.name)
+
+
+@app.delete("/sessions/{session_id}", status_code=204)
+def delete_session(session_id: int):
+    service.delete_session(session_id)
+
+
+@app.get("/sessions/{session_id}/messages")
+def get_history(session_id: int):
+    return service.get_history(session_id)
+
+
+@app.post("/sessions/{session_id}/messages", status_code=201)
+def add_message(session_id: int, body: MessageIn):
+    if body.role not in ("user", "assistant"):
+        raise HTTPException(status_code=400, detail="role must be 'user' or 'assistant'")
+    service.add_message(session_id, body.role, body.message)
+
+
+# ─── ASSISTANT ────────────────────────────────────────────────────────────────
+
+@app.post("/assistant/ask")
+def ask(body: Question):
+    return {"answer": _call(service.ask, body.user_id, body.question, body.session_id)}
+
+
+@app.post("/assistant/stream")
+def stream(body: Question):
+    _call(service.get_username, body.user_id)
+    events = service.stream_answer(body.user_id, body.question, body.session_id)
+    # A client disconnect closes the generator, which cancels the agent run
+    return StreamingResponse(
+        (json.dumps(ev) + "\n" for ev in events),
+        media_type="application/x-ndjson",
+    )
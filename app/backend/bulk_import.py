@@ -0,0 +1,296 @@
+# backend/bulk_import.py
+"""
+Unattended bulk import of a directory of Samsung Health exports.
+
+Each ZIP goes through the same steps as an upload (service.read_zip and
+clean_frames, push_user_data_mysql, the graph_store ingest). Cleaning is
+CPU-bound and runs on a process pool; the database stages run on threads,
+at most --mysql-concurrency pushes and --graph-concurrency graph ingests at
+a time. Failed stages are retried with exponential backoff.
+
+Progress is appended to a state file (one JSON line per finished stage,
+keyed by file name and content hash), so re-running the same command skips
+finished exports and redoes only what is missing. The MySQL push replaces
+the user's rows for the days an export covers, so retrying it, or redoing it
+after a crash before its stage was logged, does not duplicate rows. An
+export whose graph stage did not finish gets its user's graph rebuilt from
+MySQL, as in backend/jobs.py. Exports that fail are listed and left for the next run;
+their MySQL rows are kept.
+
+Usernames come from --mapping (CSV with `file,username` columns or a JSON
+object {file: username}); only mapped files are imported. Without a mapping,
+each file's stem is the username. Run from the app/ directory:
+
+    python -m backend.bulk_import exports/ --mapping cohort.csv
+    python -m backend.bulk_import exports/ --mysql-concurrency 8 --json import.json
+    python -m backend.bulk_import exports/ --local .cache/local-backend   # SQLite + in-memory graph
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+import pandas as pd
+
+from backend import service
+from modules.utils.db.db_utils_mysql import push_user_data_mysql
+from modules.utils.observability import metrics
+
+
+class Export(NamedTuple):
+    path: Path
+    username: str
+    sha256: str
+
+
+class Result(NamedTuple):
+    file: str
+    username: str
+    status: str                 # 'imported' | 'skipped' | 'failed'
+    user_id: Optional[int]
+    rows: Dict[str, int]
+    seconds: Dict[str, float]   # per stage
+    error: Optional[str]
+
+
+def _sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def load_mapping(path: str) -> Dict[str, str]:
+    """
+    {file name: username} from a `file,username` CSV or a JSON object.
+    """
+    if path.endswith('.json'):
+        with open(path, encoding='utf-8') as f:
+            mapping = json.load(f)
+    else:
+        df = pd.read_csv(path, dtype=str)
+        mapping = dict(zip(df['file'], df['username']))
+    return {Path(k).name: v.strip() for k, v in mapping.items() if v and v.strip()}
+
+
+def find_exports(directory: Path, mapping: Optional[Dict[str, str]]) -> List[Export]:
+    paths = sorted(directory.glob('*.zip'))
+    if mapping is not None:
+        missing = set(mapping) - {p.name for p in paths}
+        for name in sorted(missing):
+            print(f"  mapped file not found: {name}")
+        paths = [p for p in paths if p.name in mapping]
+    return [Export(p, mapping[p.name] if mapping else p.stem, _sha256(p)) for p in paths]
+
+
+class StateFile:
+    """
+    Append-only log of finished stages: {"file", "sha256", "stage", ...}.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.done: Dict[tuple, dict] = defaultdict(dict)
+        if path.exists():
+            for line in path.read_text(encoding='utf-8').splitlines():
+                if line.strip():
+                    rec = json.loads(line)
+                    self.done[(rec['file'], rec['sha256'])][rec['stage']] = rec
+
+    def stages(self, export: Export) -> Dict[str, dict]:
+        return self.done.get((export.path.name, export.sha256), {})
+
+    def record(self, export: Export, stage: str, **fields):
+        rec = {'file': export.path.name, 'sha256': export.sha256, 'stage': stage, **fields}
+        with self._lock:
+            self.done[(export.path.name, export.sha256)][stage] = rec
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(rec) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+
+
+def _clean_file(path: str) -> Dict[str, pd.DataFrame]:
+    # Runs in a worker process
+    return service.clean_zip(Path(path).read_bytes())
+
+
+def _retry(operation: str, fn, retries: int, backoff_s: float):
+    for attempt in range(retries + 1):
+        try:
+            return fn()
+        except Exception:
+            if attempt == retries:
+                raise
+            metrics.RETRIES.inc(operation=f"bulk_import.{operation}")
+            time.sleep(min(60.0, backoff_s * 2 ** attempt) * random.uniform(0.5, 1.0))
+
+
+class Importer:
+    def __init__(self, state: StateFile, cleaners, mysql_concurrency: int, graph_concurrency: int,
+                 retries: int = 2, backoff_s: float = 1.0):
+        self.state = state
+        self.cleaners = cleaners
+        self.mysql_slots = threading.BoundedSemaphore(mysql_concurrency)
+        self.graph_slots = threading.BoundedSemaphore(graph_concurrency)
+        self.retries, self.backoff_s = retries, backoff_s
+
+    def _clean(self, export: Export) -> Dict[str, pd.DataFrame]:
+        if self.cleaners is None:
+            return _clean_file(str(export.path))
+        return self.cleaners.submit(_clean_file, str(export.path)).result()
+
+    def run(self, export: Export) -> Result:
+        done = self.state.stages(export)
+        if 'graph' in done:
+            rec = done['graph']
+            return Result(export.path.name, rec.get('username', export.username), 'skipped', rec['user_id'],
+                          rec.get('rows', {}), {}, None)
+        seconds, rows, stage = {}, {}, 'clean'
+        user_id = done.get('mysql', {}).get('user_id')
+        try:
+            ingest_graph, delete_graph = service.graph_store()
+            if user_id is None:
+                t0 = time.perf_counter()
+                f = self._clean(export)
+                seconds['clean'] = time.perf_counter() - t0
+                rows = {name: len(df) for name, df in f.items()}
+
+                stage = 'mysql'
+                with self.mysql_slots:
+                    t0 = time.perf_counter()
+                    user_id = _retry('mysql', lambda: push_user_data_mysql(
+                        export.username, f['food'], f['water'], f['sleep'], f['steps'], service.db_url()
+                    ), self.retries, self.backoff_s)
+                    seconds['mysql'] = time.perf_counter() - t0
+                self.state.record(export, 'mysql', username=export.username, user_id=user_id, rows=rows)
+            else:
+                # MySQL finished in an earlier run: rebuild this user's graph from it
+                rows = done['mysql'].get('rows', {})
+                stage = 'graph'
+                with self.graph_slots:
+                    _retry('graph', lambda: delete_graph(user_id), self.retries, self.backoff_s)
+                f = service.graph_frames(user_id)
+
+            stage = 'graph'
+            attempts = []
+
+            def graph_once():
+                # Graph writes are not idempotent: a retry rebuilds the user from MySQL
+                g = f
+                if attempts:
+                    delete_graph(user_id)
+                    g = service.graph_frames(user_id)
+                attempts.append(1)
+                ingest_graph(user_id, export.username, g['food'], g['water'], g['steps'], g['sleep'])
+
+            with self.graph_slots:
+                t0 = time.perf_counter()
+                _retry('graph', graph_once, self.retries, self.backoff_s)
+                seconds['graph'] = time.perf_counter() - t0
+            self.state.record(export, 'graph', username=export.username, user_id=user_id, rows=rows)
+            return Result(export.path.name, export.username, 'imported', user_id, rows, seconds, None)
+        except Exception as exc:
+            return Result(export.path.name, export.username, 'failed', user_id, rows, seconds,
+                          f"{stage}: {type(exc).__name__}: {exc}")
+
+
+def summarize(results: List[Result], wall_s: float) -> dict:
+    imported = [r for r in results if r.status == 'imported']
+    rows = defaultdict(int)
+    for r in imported:
+        for name, n in r.rows.items():
+            rows[name] += n
+    stages = {}
+    for stage in ('clean', 'mysql', 'graph'):
+        times = pd.Series([r.seconds[stage] for r in imported if stage in r.seconds], dtype=float)
+        if not times.empty:
+            stages[stage] = {'total_s': round(times.sum(), 3), 'p50_s': round(times.median(), 3),
+                             'p95_s': round(times.quantile(0.95), 3)}
+    total_rows = sum(rows.values())
+    return {
+        'files': len(results),
+        'imported': len(imported),
+        'skipped': sum(r.status == 'skipped' for r in results),
+        'failed': sum(r.status == 'failed' for r in results),
+        'rows': dict(rows),
+        'wall_s': round(wall_s, 3),
+        'files_per_s': round(len(imported) / wall_s, 3) if wall_s else 0.0,
+        'rows_per_s': round(total_rows / wall_s, 1) if wall_s else 0.0,
+        'stages': stages,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", help="directory of Samsung Health export ZIPs")
+    parser.add_argument("--mapping", help="file -> username CSV (file,username) or JSON")
+    parser.add_argument("--state", help="progress file (default: <directory>/.bulk_import_state.jsonl)")
+    parser.add_argument("--clean-processes", type=int, default=os.cpu_count() or 2,
+                        help="processes cleaning exports (0 = clean on the import threads)")
+    parser.add_argument("--mysql-concurrency", type=int, default=4)
+    parser.add_argument("--graph-concurrency", type=int, default=2)
+    parser.add_argument("--retries", type=int, default=2, help="retries of a failed database stage")
+    parser.add_argument("--local", metavar="DIR", help="import into backend.local's SQLite + in-memory graph")
+    parser.add_argument("--json", help="write the report and per-file results to this file")
+    parser.add_argument("--metrics-port", type=int, help="serve Prometheus metrics on this port during the run")
+    args = parser.parse_args(argv)
+
+    directory = Path(args.directory)
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
+    if args.local:
+        from backend import local
+        local.configure(Path(args.local))
+    if service.db_url() is None:
+        print("no database configured: add [mysql] to secrets.toml or use --local")
+        return 1
+
+    exports = find_exports(directory, load_mapping(args.mapping) if args.mapping else None)
+    state = StateFile(Path(args.state) if args.state else directory / ".bulk_import_state.jsonl")
+    # Enough threads that the per-database limits are the only bound
+    threads = max(1, args.mysql_concurrency + args.graph_concurrency + max(1, args.clean_processes))
+    print(f"importing {len(exports)} exports (mysql x{args.mysql_concurrency}, "
+          f"graph x{args.graph_concurrency}, clean x{args.clean_processes or 'threads'})")
+
+    results: List[Result] = []
+    cleaners = ProcessPoolExecutor(args.clean_processes) if args.clean_processes > 0 else None
+    try:
+        importer = Importer(state, cleaners, args.mysql_concurrency, args.graph_concurrency, args.retries)
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(threads, thread_name_prefix="import") as pool:
+            futures = [pool.submit(importer.run, e) for e in exports]
+            for i, fut in enumerate(as_completed(futures), 1):
+                r = fut.result()
+                results.append(r)
+                note = f" — {r.error}" if r.error else ""
+                print(f"  [{i}/{len(exports)}] {r.status:8} {r.file} -> {r.username} (user_id={r.user_id}){note}")
+        wall = time.perf_counter() - t0
+    finally:
+        if cleaners is not None:
+            cleaners.shutdown()
+
+    report = summarize(results, wall)
+    print(f"\n{report['imported']} imported, {report['skipped']} skipped, {report['failed']} failed "
+          f"in {report['wall_s']:.1f}s ({report['files_per_s']:.2f} files/s, {report['rows_per_s']:,.0f} rows/s)")
+    print(f"rows: {report['rows']}")
+    for stage, t in report['stages'].items():
+        print(f"  {stage:6} total {t['total_s']:.1f}s  p50 {t['p50_s']:.2f}s  p95 {t['p95_s']:.2f}s")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({**report, 'results': [r._asdict() for r in results]}, f, indent=2, default=str)
+    return 1 if report['failed'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+# backend/client.py
+"""
+HTTP client for backend.api, used by the Streamlit pages.
+
+One pooled keep-alive connection set per process; the base URL comes from
+[backend] url in secrets.toml.
+"""
+import json
+import threading
+from typing import Iterator, Optional, Tuple
+
+import httpx
+
+from modules.utils.settings import get_section
+
+cfg = get_section(
+    'backend',
+    url='http://localhost:8000',
+    timeout_s=60.0,
+    ingest_timeout_s=600.0,     # large exports take a while to clean and store
+)
+
+
+class BackendError(RuntimeError):
+    """The backend answered with an error status."""
+
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class BackendClient:
+    def __init__(self, base_url: str, timeout_s: float = 60.0):
+        self._http = httpx.Client(
+            base_url=base_url.rstrip('/'),
+            timeout=httpx.Timeout(timeout_s, connect=5.0),
+            limits=httpx.Limits(max_connections=16, max_keepalive_connections=8),
+        )
+
+    def _request(self, method: str, path: str, **kwargs):
+        resp = self._http.request(method, path, **kwargs)
+        _check(resp)
+        return resp.json() if resp.content else None
+
+    # Users & ingestion
+    def search_users(self, prefix: str = "", page: int = 0, page_size: Optional[int] = None) -> dict:
+        params = {"prefix": prefix, "page": page}
+        if page_size:
+            params["page_size"] = page_size
+        return self._request("GET", "/users", params=params)
+
+    def delete_user(self, user_id: int):
+        self._request("DELETE", f"/users/{user_id}")
+
+    def preview_zip(self, data: bytes) -> dict:
+        return self._request("POST", "/ingest/preview", files={"file": ("export.zip", data, "application/zip")},
+                             timeout=float(cfg['ingest_timeout_s']))
+
+    def ingest_zip(self, username: str, data: bytes) -> dict:
+        return self._request("POST", "/ingest", data={"username": username},
+                             files={"file": ("export.zip", data, "application/zip")},
+                             timeout=float(cfg['ingest_timeout_s']))
+
+    def submit_ingest(self, username: str, data: bytes) -> dict:
+        """
+        Queue an export for background ingestion; poll ingest_job() for progress.
+        """
+        return self._request("POST", "/ingest/jobs", data={"username": username},
+                             files={"file": ("export.zip", data, "application/zip")},
+                             timeout=float(cfg['ingest_timeout_s']))
+
+    def ingest_job(self, job_id: int) -> dict:
+        return self._request("GET", f"/ingest/jobs/{job_id}")
+
+    def retry_ingest_job(self, job_id: int) -> dict:
+        return self._request("POST", f"/ingest/jobs/{job_id}/retry")
+
+    def dashboard(self, user_id: int) -> dict:
+        return self._request("GET", f"/users/{user_id}/dashboard")
+
+    def trends(self, user_id: int) -> dict:
+        return self._request("GET", f"/users/{user_id}/trends")
+
+    # Chat sessions
+    def list_sessions(self, user_id: int) -> list:
+        return self._request("GET", f"/users/{user_id}/sessions")
+
+    def create_session(self, user_id: int, name: str = "New chat") -> int:
+        return self._request("POST", f"/users/{user_id}/sessions", json={"name": name})["session_id"]
+
+    def rename_session(self, session_id: int, name: str):
+        self._request("PATCH", f"/sessions/{session_id}", json={"name": name})
+
+    def delete_session(self, session_id: int):
+        self._request("DELETE", f"/sessions/{session_id}")
+
+    def get_history(self, session_id: int) -> list:
+        return self._request("GET", f"/sessions/{session_id}/messages")
+
+    # Assistant
+    def ask(self, user_id: int, question: str, session_id: Optional[int] = None) -> str:
+        body = {"user_id": user_id, "question": question, "session_id": session_id}
+        return self._request("POST", "/assistant/ask", json=body)["answer"]
+
+    def stream_answer(self, user_id: int, question: str, session_id: Optional[int] = None) -> Iterator[Tuple[str, str]]:
+        """
+        Yield (event, data) pairs as the backend produces them; the last one
+        is ("final", answer), or ("error", message) when the run failed or was
+        cancelled. The backend saves the question and a final answer to the session.
+        """
+        body = {"user_id": user_id, "question": question, "session_id": session_id}
+        with self._http.stream("POST", "/assistant/stream", json=body) as resp:
+            if resp.is_error:
+                resp.read()
+            _check(resp)
+            for line in resp.iter_lines():
+                if line:
+                    ev = json.loads(line)
+                    yield ev["event"], ev["data"]
+
+
+def _check(resp: httpx.Response):
+    if resp.is_error:
+        try:
+            detail = resp.json().get("detail")
+        except ValueError:
+            detail = resp.text
+        raise BackendError(f"{resp.status_code} {resp.request.method} {resp.request.url.path}: {detail}",
+                           resp.status_code)
+
+
+_client: Optional[BackendClient] = None
+_lock = threading.Lock()
+
+
+def get_client() -> BackendClient:
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = BackendClient(cfg['url'], float(cfg['timeout_s']))
+    return _client
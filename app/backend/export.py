@@ -0,0 +1,66 @@
+# backend/export.py
+"""
+Export health tables and chat history to Parquet or Arrow IPC files with
+bounded memory (see modules/utils/db/db_export.py), for backups, analytics
+hand-offs and migrations. Writes <out>/<table>.parquet per table plus a
+manifest.json. Run from the app/ directory:
+
+    python -m backend.export backups/2025-06-01                       # every user
+    python -m backend.export out/alice --user alice --start 2025-01-01 --end 2025-03-31
+    python -m backend.export out/chats --tables chat_sessions,chat_history --format arrow
+"""
+import argparse
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+from backend import service
+from modules.utils.db import db_export
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("out", help="output directory")
+    parser.add_argument("--user", help="username to export (default: all users)")
+    parser.add_argument("--start", type=date.fromisoformat, help="first day, YYYY-MM-DD")
+    parser.add_argument("--end", type=date.fromisoformat, help="last day, YYYY-MM-DD")
+    parser.add_argument("--tables", help=f"comma-separated subset of {','.join(db_export.TABLES)}")
+    parser.add_argument("--format", choices=list(db_export.FORMATS), default='parquet')
+    parser.add_argument("--batch-rows", type=int, help="rows per cursor fetch and row group")
+    parser.add_argument("--local", metavar="DIR", help="export from backend.local's SQLite store")
+    args = parser.parse_args(argv)
+
+    if args.local:
+        from backend import local
+        local.configure(Path(args.local))
+    if service.db_url() is None:
+        print("no database configured: add [mysql] to secrets.toml or use --local")
+        return 1
+    if args.batch_rows:
+        db_export.cfg['batch_rows'] = args.batch_rows
+
+    user_id = None
+    if args.user:
+        users = service.list_users(args.user, page_size=500)['users']
+        match = [u['user_id'] for u in users if u['username'] == args.user]
+        if not match:
+            print(f"unknown user {args.user!r}")
+            return 1
+        user_id = match[0]
+    tables = [t.strip() for t in args.tables.split(",")] if args.tables else None
+    if tables and not set(tables) <= set(db_export.TABLES):
+        parser.error(f"--tables must be among {','.join(db_export.TABLES)}")
+
+    t0 = time.perf_counter()
+    counts = db_export.export_tables(service.db_url(), Path(args.out), tables, user_id, args.start, args.end, args.format)
+    wall = time.perf_counter() - t0
+    for table, n in counts.items():
+        print(f"  {table:14} {n:>10,} rows")
+    total = sum(counts.values())
+    print(f"{total:,} rows in {wall:.1f}s ({total / wall if wall else 0:,.0f} rows/s) -> {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
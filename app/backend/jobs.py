@@ -0,0 +1,379 @@
+# backend/jobs.py
+"""
+Background ingestion jobs.
+
+Submitting an export stores the ZIP under the spool directory, adds a row to
+`ingest_jobs` and returns straight away. Worker threads in each backend
+process claim queued jobs and run them stage by stage:
+
+    parse  -> raw CSV frames read from the ZIP
+    clean  -> cleaned frames
+    mysql  -> rows stored; the checkpoint commits in the same transaction
+    graph  -> Neo4j (or the graph_store stand-in)
+
+Every finished stage is checkpointed (its output under spool_dir/<job_id>/,
+its name in the row), so a job is resumed after its last finished stage when
+it fails transiently or when its worker dies and the heartbeat lease runs out.
+A graph stage that was cut off is redone from the user's MySQL rows, since
+graph writes are not idempotent. At most `workers` jobs run per process and
+`max_pending` may be queued or running in total; further submissions raise
+Busy (HTTP 429).
+
+After max_attempts a job is marked failed and left as it is: the MySQL
+stage commits atomically with its checkpoint, so stored rows are complete
+and are never deleted (the user may have older history). retry_job requeues
+a failed job from its last checkpoint, e.g. to redo the graph stage.
+
+The spool directory is local to the host unless `shared_spool` says it is on
+storage every backend host mounts, so by default a job is only claimed by
+workers on the host it was submitted to.
+"""
+import json
+import os
+import shutil
+import socket
+import threading
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+from sqlalchemy import inspect, text
+
+from backend import service
+from modules.utils.db.db_utils_mysql import get_engine, push_user_data_mysql
+from modules.utils.observability.metrics import RETRIES, counter
+from modules.utils.settings import CACHE_DIR, get_section
+
+cfg = get_section(
+    'ingest_jobs',
+    workers=2,              # concurrent jobs per backend process
+    max_pending=20,         # queued + running jobs before submissions are refused
+    max_attempts=3,         # runs per job before it is marked failed
+    lease_seconds=120,      # a running job without a heartbeat this long is reclaimed
+    poll_seconds=2.0,
+    spool_dir=str(CACHE_DIR / "ingest_jobs"),
+    shared_spool=False,     # spool_dir is shared by all hosts: any host may run any job
+)
+
+STAGES = ('parse', 'clean', 'mysql', 'graph')
+
+COLUMNS = ("job_id, username, status, stage, checkpoint, user_id, row_counts, error, "
+           "attempts, host, created_at, updated_at, heartbeat_at")
+
+
+JOBS = counter("ingest_jobs_total", "Ingest jobs by outcome", ("outcome",))
+
+
+class Busy(RuntimeError):
+    """Too many ingest jobs are already queued or running."""
+
+
+def _now() -> datetime:
+    # Naive UTC, set from Python so MySQL and SQLite compare leases alike
+    return datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+
+
+def _engine():
+    return get_engine(service.db_url())
+
+
+def _host() -> str:
+    return socket.gethostname()
+
+
+def ensure_schema(db_url: str):
+    """
+    Add ingest_jobs.host to databases created before jobs were pinned to hosts.
+    """
+    engine = get_engine(db_url)
+    if 'host' not in {c['name'] for c in inspect(engine).get_columns('ingest_jobs')}:
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE ingest_jobs ADD COLUMN host VARCHAR(128)"))
+
+
+def _spool(job_id: int) -> Path:
+    return Path(cfg['spool_dir']) / str(job_id)
+
+
+def _to_dict(row) -> dict:
+    job = dict(row._mapping)
+    done = STAGES.index(job['checkpoint']) + 1 if job['checkpoint'] else 0
+    job['progress'] = 1.0 if job['status'] == 'done' else round(done / len(STAGES), 2)
+    job['rows'] = json.loads(job.pop('row_counts') or 'null')
+    for key in ('created_at', 'updated_at', 'heartbeat_at'):
+        if job[key] is not None:
+            job[key] = str(job[key])
+    return job
+
+
+def _update(job_id: int, conn=None, **fields):
+    fields['updated_at'] = _now()
+    sql = text(f"UPDATE ingest_jobs SET {', '.join(f'{k} = :{k}' for k in fields)} WHERE job_id = :job_id")
+    if conn is not None:
+        conn.execute(sql, {**fields, 'job_id': job_id})
+    else:
+        with _engine().begin() as conn:
+            conn.execute(sql, {**fields, 'job_id': job_id})
+
+
+# ─── QUEUE ────────────────────────────────────────────────────────────────────
+
+def submit(username: str, data: bytes) -> dict:
+    """
+    Queue an export for ingestion and return the new job.
+    """
+    username = username.strip()
+    if not username:
+        raise ValueError("username is required")
+    service.read_zip(data)      # reject non-ZIP uploads before queueing
+    now = _now()
+    with _engine().begin() as conn:
+        pending = conn.execute(
+            text("SELECT COUNT(*) FROM ingest_jobs WHERE status IN ('queued', 'running')")
+        ).scalar_one()
+        if pending >= int(cfg['max_pending']):
+            JOBS.inc(outcome="rejected")
+            raise Busy(f"{pending} ingest jobs are already waiting; try again shortly")
+        job_id = conn.execute(
+            text("INSERT INTO ingest_jobs (username, status, attempts, host, created_at, updated_at) "
+                 "VALUES (:u, 'queued', 0, :host, :now, :now)"),
+            {"u": username, "host": _host(), "now": now}
+        ).lastrowid
+        # Written before the row commits, so a worker never sees a job without its upload
+        spool = _spool(job_id)
+        spool.mkdir(parents=True, exist_ok=True)
+        (spool / "upload.zip").write_bytes(data)
+    JOBS.inc(outcome="submitted")
+    _pool.wake()
+    return get_job(job_id)
+
+
+def get_job(job_id: int) -> dict:
+    with _engine().connect() as conn:
+        row = conn.execute(text(f"SELECT {COLUMNS} FROM ingest_jobs WHERE job_id = :id"), {"id": job_id}).first()
+    if row is None:
+        raise service.NotFound(f"ingest job {job_id} not found")
+    return _to_dict(row)
+
+
+def list_jobs(limit: int = 20) -> List[dict]:
+    with _engine().connect() as conn:
+        rows = conn.execute(
+            text(f"SELECT {COLUMNS} FROM ingest_jobs ORDER BY job_id DESC LIMIT :n"), {"n": limit}
+        ).all()
+    return [_to_dict(r) for r in rows]
+
+
+def retry_job(job_id: int) -> dict:
+    """
+    Requeue a failed job with fresh attempts; it resumes after its last
+    checkpoint.
+    """
+    with _engine().begin() as conn:
+        job = conn.execute(text("SELECT status FROM ingest_jobs WHERE job_id = :id"), {"id": job_id}).first()
+        if job is None:
+            raise service.NotFound(f"ingest job {job_id} not found")
+        if job.status != 'failed':
+            raise ValueError(f"ingest job {job_id} is {job.status}; only failed jobs can be retried")
+        pending = conn.execute(
+            text("SELECT COUNT(*) FROM ingest_jobs WHERE status IN ('queued', 'running')")
+        ).scalar_one()
+        if pending >= int(cfg['max_pending']):
+            raise Busy(f"{pending} ingest jobs are already waiting; try again shortly")
+        _update(job_id, conn, status='queued', attempts=0)
+    JOBS.inc(outcome="retried")
+    _pool.wake()
+    return get_job(job_id)
+
+
+def _claim(worker: str) -> Optional[dict]:
+    """
+    Take the oldest queued job, or a running one whose lease expired, among
+    those this host can run (all of them with a shared spool).
+    The attempts counter makes the claim a compare-and-swap across processes.
+    """
+    now = _now()
+    stale = now - timedelta(seconds=float(cfg['lease_seconds']))
+    pinned = "" if cfg['shared_spool'] else "AND (host = :host OR host IS NULL) "
+    with _engine().begin() as conn:
+        candidates = conn.execute(
+            text("SELECT job_id, attempts FROM ingest_jobs "
+                 "WHERE (status = 'queued' OR (status = 'running' AND heartbeat_at < :stale)) "
+                 f"{pinned}ORDER BY job_id LIMIT 5"),
+            {"stale": stale, "host": _host()}
+        ).all()
+        for job_id, attempts in candidates:
+            claimed = conn.execute(
+                text("UPDATE ingest_jobs SET status = 'running', worker = :w, attempts = attempts + 1, "
+                     "heartbeat_at = :now, updated_at = :now "
+                     "WHERE job_id = :id AND attempts = :a "
+                     "AND (status = 'queued' OR (status = 'running' AND heartbeat_at < :stale))"),
+                {"w": worker, "now": now, "id": job_id, "a": attempts, "stale": stale}
+            ).rowcount
+            if claimed:
+                row = conn.execute(text(f"SELECT {COLUMNS} FROM ingest_jobs WHERE job_id = :id"), {"id": job_id}).first()
+                return _to_dict(row)
+    return None
+
+
+# ─── STAGES ───────────────────────────────────────────────────────────────────
+
+def _save(job_id: int, prefix: str, frames: Dict[str, Optional[pd.DataFrame]]):
+    for name, df in frames.items():
+        if df is not None:
+            df.to_pickle(_spool(job_id) / f"{prefix}_{name}.pkl")
+
+
+def _load(job_id: int, prefix: str) -> Dict[str, Optional[pd.DataFrame]]:
+    paths = {name: _spool(job_id) / f"{prefix}_{name}.pkl" for name in service.SOURCES}
+    return {name: pd.read_pickle(p) if p.exists() else None for name, p in paths.items()}
+
+
+def _parse(job: dict):
+    _save(job['job_id'], "raw", service.read_zip((_spool(job['job_id']) / "upload.zip").read_bytes()))
+    _update(job['job_id'], checkpoint='parse')
+
+
+def _clean(job: dict):
+    frames = service.clean_frames(_load(job['job_id'], "raw"))
+    _save(job['job_id'], "clean", frames)
+    rows = json.dumps({name: len(df) for name, df in frames.items()})
+    _update(job['job_id'], checkpoint='clean', row_counts=rows)
+
+
+def _mysql(job: dict):
+    f = _load(job['job_id'], "clean")
+
+    def checkpoint(conn, user_id):
+        _update(job['job_id'], conn, checkpoint='mysql', user_id=user_id)
+
+    job['user_id'] = push_user_data_mysql(
+        job['username'], f['food'], f['water'], f['sleep'], f['steps'], service.db_url(), checkpoint
+    )
+
+
+def _graph(job: dict):
+    ingest_graph, delete_graph = service.graph_store()
+    if job['stage'] == 'graph':
+        # Cut off mid-way last time: rebuild this user's graph from MySQL
+        delete_graph(job['user_id'])
+        f = service.graph_frames(job['user_id'])
+    else:
+        f = _load(job['job_id'], "clean")
+    _update(job['job_id'], stage='graph')
+    job['stage'] = 'graph'
+    ingest_graph(job['user_id'], job['username'], f['food'], f['water'], f['steps'], f['sleep'])
+    _update(job['job_id'], checkpoint='graph')
+
+
+RUNNERS = {'parse': _parse, 'clean': _clean, 'mysql': _mysql, 'graph': _graph}
+
+
+def run_job(job: dict):
+    """
+    Run the stages after the job's checkpoint. On error the job is requeued
+    or, after max_attempts, failed; committed stages and the spool are kept
+    for retry_job.
+    """
+    job_id = job['job_id']
+    done = STAGES.index(job['checkpoint']) + 1 if job['checkpoint'] else 0
+    current = None
+    try:
+        for current in STAGES[done:]:
+            if current != 'graph':
+                _update(job_id, stage=current)
+            RUNNERS[current](job)
+    except Exception as exc:
+        error = f"{current}: {type(exc).__name__}: {exc}"
+        if job['attempts'] < int(cfg['max_attempts']):
+            RETRIES.inc(operation=f"ingest_job.{current}")
+            _update(job_id, status='queued', error=error)
+            return
+        _update(job_id, status='failed', error=error)
+        JOBS.inc(outcome="failed")
+    else:
+        _update(job_id, status='done', stage=None, error=None)
+        JOBS.inc(outcome="done")
+        shutil.rmtree(_spool(job_id), ignore_errors=True)
+
+
+# ─── WORKERS ──────────────────────────────────────────────────────────────────
+
+class WorkerPool:
+    """
+    Worker threads claiming jobs, plus a heartbeat that keeps their leases.
+    """
+
+    def __init__(self):
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._running: Dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    def start(self, workers: Optional[int] = None):
+        if self._threads:
+            return
+        self._stop.clear()
+        prefix = f"{socket.gethostname()}:{os.getpid()}"
+        for i in range(int(workers or cfg['workers'])):
+            t = threading.Thread(target=self._work, args=(f"{prefix}:{i}",), name=f"ingest-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        t = threading.Thread(target=self._heartbeat, name="ingest-heartbeat", daemon=True)
+        t.start()
+        self._threads.append(t)
+
+    def stop(self, timeout: float = 5.0):
+        # Jobs still running are picked up again once their lease expires
+        self._stop.set()
+        self._wake.set()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    def wake(self):
+        self._wake.set()
+
+    def _work(self, name: str):
+        while not self._stop.is_set():
+            try:
+                job = _claim(name)
+            except Exception as exc:
+                print(f"[Jobs] claim failed: {exc}")
+                job = None
+            if job is None:
+                self._wake.wait(float(cfg['poll_seconds']))
+                self._wake.clear()
+                continue
+            with self._lock:
+                self._running[job['job_id']] = name
+            try:
+                run_job(job)
+            except Exception as exc:
+                print(f"[Jobs] job {job['job_id']} could not be finalized: {exc}")
+            finally:
+                with self._lock:
+                    self._running.pop(job['job_id'], None)
+
+    def _heartbeat(self):
+        while not self._stop.wait(float(cfg['lease_seconds']) / 3):
+            with self._lock:
+                running = list(self._running)
+            for job_id in running:
+                try:
+                    _update(job_id, heartbeat_at=_now())
+                except Exception as exc:
+                    print(f"[Jobs] heartbeat for job {job_id} failed: {exc}")
+
+
+_pool = WorkerPool()
+
+
+def start_workers(workers: Optional[int] = None):
+    _pool.start(workers)
+
+
+def stop_workers():
+    _pool.stop()
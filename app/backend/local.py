@@ -0,0 +1,214 @@
+# backend/local.py
+"""
+Run the backend with no external services: SQLite instead of MySQL, the
+in-memory graph instead of Neo4j, the scripted chat model instead of OpenAI
+and the hashing embedder (see benchmarks/fakes.py). Optionally seeds
+synthetic users so the dashboard and assistant have data.
+
+Run from the app/ directory, then point [backend] url at it:
+
+    python -m backend.local --seed-users 5 --port 8000
+"""
+import argparse
+from datetime import date
+from pathlib import Path
+
+from sqlalchemy import create_engine
+
+from backend import jobs, service
+from benchmarks.fakes import InMemoryHealthGraph, ScriptedChatModel
+from benchmarks.synthetic import SyntheticUser, make_user, make_users, to_graph_tables
+from modules.utils.cache import answer_cache, translation_cache
+from modules.utils.cache.answer_cache import bump_data_version
+from modules.utils.db import db_chat_mysql, retention
+from modules.utils.db.db_utils_mysql import get_existing_users, push_user_data_mysql
+from modules.utils.retrieval import embeddings, resources, vector_index
+from modules.utils.settings import CACHE_DIR
+
+# setup/database_setup.py in SQLite dialect
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+  user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+  username VARCHAR(50) NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS food_intake (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  user_id INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+  event_time DATETIME, food_name VARCHAR(255), amount FLOAT, calories FLOAT,
+  items INTEGER NOT NULL DEFAULT 1,
+  compacted INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_user_time ON food_intake (user_id, event_time);
+CREATE TABLE IF NOT EXISTS water_intake (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  user_id INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+  event_time DATETIME, amount FLOAT
+);
+CREATE INDEX IF NOT EXISTS idx_water_user_time ON water_intake (user_id, event_time);
+CREATE TABLE IF NOT EXISTS sleep_hours (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  user_id INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+  date DATE, total_sleep_h FLOAT
+);
+CREATE INDEX IF NOT EXISTS idx_sleep_user_date ON sleep_hours (user_id, date);
+CREATE TABLE IF NOT EXISTS step_count (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  user_id INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+  date DATE, total_steps INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_step_user_date ON step_count (user_id, date);
+CREATE TABLE IF NOT EXISTS chat_sessions (
+  session_id INTEGER PRIMARY KEY AUTOINCREMENT,
+  user_id INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+  name VARCHAR(255) NOT NULL DEFAULT 'New chat',
+  created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS chat_history (
+  history_id INTEGER PRIMARY KEY AUTOINCREMENT,
+  session_id INTEGER NOT NULL REFERENCES chat_sessions(session_id) ON DELETE CASCADE,
+  role VARCHAR(16) NOT NULL,
+  message TEXT NOT NULL,
+  created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS ingest_jobs (
+  job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+  username VARCHAR(50) NOT NULL,
+  status VARCHAR(16) NOT NULL,
+  stage VARCHAR(16),
+  checkpoint VARCHAR(16),
+  user_id INTEGER,
+  row_counts TEXT,
+  error TEXT,
+  attempts INTEGER NOT NULL DEFAULT 0,
+  host VARCHAR(128),
+  worker VARCHAR(128),
+  created_at DATETIME NOT NULL,
+  updated_at DATETIME NOT NULL,
+  heartbeat_at DATETIME
+);
+CREATE INDEX IF NOT EXISTS idx_status_job ON ingest_jobs (status, job_id);
+CREATE TABLE IF NOT EXISTS food_compaction (
+  user_id INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+  day DATE NOT NULL,
+  raw_rows INTEGER NOT NULL,
+  kept_rows INTEGER NOT NULL,
+  graph_done INTEGER NOT NULL DEFAULT 0,
+  compacted_at DATETIME NOT NULL,
+  PRIMARY KEY (user_id, day)
+);
+CREATE TABLE IF NOT EXISTS daily_metrics (
+  user_id INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+  day DATE NOT NULL,
+  metric VARCHAR(16) NOT NULL,
+  value DOUBLE NOT NULL,
+  mean_short DOUBLE,
+  mean_long DOUBLE,
+  zscore DOUBLE,
+  PRIMARY KEY (user_id, metric, day)
+);
+CREATE TABLE IF NOT EXISTS trend_facts (
+  user_id INTEGER NOT NULL PRIMARY KEY REFERENCES users(user_id) ON DELETE CASCADE,
+  through DATE,
+  computed_at DATETIME NOT NULL,
+  facts TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cache_versions (
+  scope VARCHAR(64) NOT NULL PRIMARY KEY,
+  version INTEGER NOT NULL
+);
+"""
+
+
+def configure(workdir: Path, llm_latency_ms: float = 0.0) -> InMemoryHealthGraph:
+    """
+    Point the backend's stores at `workdir` and install the stand-ins.
+    """
+    workdir.mkdir(parents=True, exist_ok=True)
+    url = f"sqlite:///{workdir / 'graphrag.sqlite3'}"
+    engine = create_engine(url)
+    with engine.begin() as conn:
+        for statement in filter(str.strip, SQLITE_SCHEMA.split(";")):
+            conn.exec_driver_sql(statement)
+    engine.dispose()
+    db_chat_mysql.DB_URL = url
+    retention.ensure_schema(url)    # stores created before retention existed
+    jobs.ensure_schema(url)         # ... or before jobs were pinned to hosts
+
+    answer_cache.cfg['path'] = str(workdir / "answers.sqlite3")
+    translation_cache.cfg['path'] = str(workdir / "translations.sqlite3")
+    embeddings.cfg.update(embedder='hashing', embedding_cache=str(workdir / "embeddings.sqlite3"))
+    vector_index.cfg.update(backend='local', index_dir=str(workdir / "vector_index"))
+    jobs.cfg['spool_dir'] = str(workdir / "ingest_jobs")
+
+    empty = to_graph_tables([make_user(0, 1, date.today())])
+    graph = InMemoryHealthGraph({label: df.iloc[0:0] for label, df in empty.items()})
+
+    def llm_factory(model_name, temperature, streaming, tags):
+        return ScriptedChatModel(latency_s=llm_latency_ms / 1000, streaming=streaming,
+                                 model_name=model_name, tags=list(tags) or None)
+
+    def ingest_graph(user_id, username, df_food, df_water, df_steps, df_sleep):
+        graph.replace_user_days(SyntheticUser(user_id, username, df_food, df_sleep, df_steps, df_water))
+        vector_index.index_user_data(user_id, username, df_food, df_water, df_steps, df_sleep)
+        bump_data_version(user_id)
+
+    def delete_graph(user_id):
+        graph.delete_user(user_id)
+        vector_index.delete_user_vectors(user_id)
+        bump_data_version(user_id)
+
+    def compact_graph(user_id, days, df_food):
+        graph.replace_food_days(user_id, list(days), df_food)
+        bump_data_version(user_id)
+
+    resources.reset_resources()
+    resources.install("graph", graph)
+    resources.install("llm_factory", llm_factory)
+    resources.install("graph_store", (ingest_graph, delete_graph))
+    resources.install("graph_compactor", compact_graph)
+    _restore(graph, url)
+    return graph
+
+
+def _restore(graph: InMemoryHealthGraph, url: str):
+    # The graph lives in memory: rebuild it from the SQLite rows of earlier runs
+    for u in get_existing_users(url).itertuples():
+        frames = service.graph_frames(int(u.user_id))
+        graph.add_user(SyntheticUser(
+            int(u.user_id), u.username, frames['food'], frames['sleep'], frames['steps'], frames['water']
+        ))
+
+
+def seed(n_users: int, days: int):
+    ingest_graph, _ = service.graph_store()
+    existing = set(get_existing_users(service.db_url())['username'])
+    for u in make_users(n_users, days):
+        if u.username in existing:
+            continue
+        user_id = push_user_data_mysql(u.username, u.food, u.water, u.sleep, u.steps, service.db_url())
+        ingest_graph(user_id, u.username, u.food, u.water, u.steps, u.sleep)
+
+
+def main(argv=None):
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", default=str(CACHE_DIR / "local-backend"), help="where the SQLite files live")
+    parser.add_argument("--seed-users", type=int, default=0)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args(argv)
+
+    configure(Path(args.dir), args.llm_latency_ms)
+    if args.seed_users:
+        seed(args.seed_users, args.days)
+
+    from backend.api import app
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+# backend/retention.py
+"""
+Retention job: compact raw food rows older than [retention] keep_months
+into per-day aggregates (top_k foods by calories plus one "(other foods)"
+row, see modules/utils/db/retention.py), in MySQL and then in the graph.
+
+Each batch of `days_per_tx` days is one MySQL transaction followed by one
+graph transaction (service.graph_compactor, which backend.local swaps for
+the in-memory graph). A batch whose graph write fails stays marked in
+food_compaction and is redone from the MySQL aggregates on the next run, so
+the job can be stopped and re-run at any time; schedule it daily (cron,
+Kubernetes CronJob). Run from the app/ directory:
+
+    python -m backend.retention --dry-run                  # what would change
+    python -m backend.retention                            # every user
+    python -m backend.retention --user alice --keep-months 3 --top-k 10
+    python -m backend.retention --local .cache/local-backend
+"""
+import argparse
+import sys
+import time
+from datetime import date
+from pathlib import Path
+from typing import List, NamedTuple, Optional
+
+from backend import service
+from modules.utils.cache.answer_cache import bump_data_version
+from modules.utils.db import retention
+from modules.utils.db.db_utils_mysql import get_existing_users
+from modules.utils.observability.metrics import counter
+
+COMPACTED = counter("food_compaction_rows_total", "Food rows before and after retention compaction", ("phase",))
+
+
+class Report(NamedTuple):
+    user_id: int
+    username: str
+    days: int
+    rows_before: int
+    rows_after: int
+    graph_days: int         # days whose graph copy was replaced (incl. earlier failures)
+    error: Optional[str]
+
+
+def _chunks(days: List[date], size: int) -> List[List[date]]:
+    size = max(1, int(size))
+    return [days[i:i + size] for i in range(0, len(days), size)]
+
+
+def _replace_graph(user_id: int, days: List[date], df_food):
+    compact_graph = service.graph_compactor()
+    compact_graph(user_id, [d.isoformat() for d in days], df_food)
+    retention.mark_graph_done(service.db_url(), user_id, days)
+
+
+def compact_user(user_id: int, username: str, before: date, top_k: int,
+                 days_per_tx: int, dry_run: bool = False) -> Report:
+    """
+    Compact one user's food days before `before`, after finishing the graph
+    copy of days left over from an earlier run.
+    """
+    url = service.db_url()
+    pending = retention.pending_days(url, user_id, before)
+    rows_before = sum(d.rows for d in pending)
+    if dry_run:
+        return Report(user_id, username, len(pending), rows_before,
+                      sum(retention.kept_rows(d, top_k) for d in pending), 0, None)
+
+    graph_days, rows_after, days_done = 0, 0, 0
+    try:
+        for days in _chunks(retention.graph_pending(url, user_id), days_per_tx):
+            _replace_graph(user_id, days, retention.compacted_rows(url, user_id, days))
+            graph_days += len(days)
+        for chunk in _chunks(pending, days_per_tx):
+            days = [d.day for d in chunk]
+            compacted = retention.compact_days(url, user_id, days, top_k)
+            days_done += len(days)
+            rows_after += len(compacted)
+            COMPACTED.inc(sum(d.rows for d in chunk), phase="before")
+            COMPACTED.inc(len(compacted), phase="after")
+            _replace_graph(user_id, days, compacted)
+            graph_days += len(days)
+        error = None
+    except Exception as exc:
+        error = f"{type(exc).__name__}: {exc}"
+    if days_done or graph_days:
+        bump_data_version(user_id)
+    done = pending[:days_done]
+    return Report(user_id, username, days_done, sum(d.rows for d in done), rows_after, graph_days, error)
+
+
+def run(users=None, keep_months: Optional[int] = None, top_k: Optional[int] = None,
+        dry_run: bool = False) -> List[Report]:
+    """
+    Apply the retention policy to `users` (usernames; default every user).
+    """
+    cfg = retention.cfg
+    url = service.db_url()
+    retention.ensure_schema(url)
+    before = retention.cutoff(cfg['keep_months'] if keep_months is None else keep_months)
+    top_k = int(cfg['top_k'] if top_k is None else top_k)
+    existing = get_existing_users(url)
+    if users:
+        unknown = set(users) - set(existing['username'])
+        if unknown:
+            raise ValueError(f"unknown user(s): {', '.join(sorted(unknown))}")
+        existing = existing[existing['username'].isin(users)]
+    return [compact_user(int(u.user_id), u.username, before, top_k, cfg['days_per_tx'], dry_run)
+            for u in existing.itertuples()]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user", action="append", help="username to compact (repeatable; default: all users)")
+    parser.add_argument("--keep-months", type=int, help="keep raw rows this many months (default: [retention] keep_months)")
+    parser.add_argument("--top-k", type=int, help="foods kept by name per day (default: [retention] top_k)")
+    parser.add_argument("--days-per-tx", type=int, help="days per transaction")
+    parser.add_argument("--dry-run", action="store_true", help="report what would be compacted")
+    parser.add_argument("--local", metavar="DIR", help="compact backend.local's SQLite store")
+    args = parser.parse_args(argv)
+
+    if args.local:
+        from backend import local
+        local.configure(Path(args.local))
+    if service.db_url() is None:
+        print("no database configured: add [mysql] to secrets.toml or use --local")
+        return 1
+    if args.days_per_tx:
+        retention.cfg['days_per_tx'] = args.days_per_tx
+
+    t0 = time.perf_counter()
+    try:
+        reports = run(args.user, args.keep_months, args.top_k, args.dry_run)
+    except ValueError as exc:
+        print(exc)
+        return 1
+    wall = time.perf_counter() - t0
+    for r in reports:
+        if r.days or r.graph_days or r.error:
+            note = f" — {r.error}" if r.error else ""
+            print(f"  {r.username:20} {r.days:>5} days  {r.rows_before:>8,} -> {r.rows_after:>7,} rows"
+                  f"  graph {r.graph_days} days{note}")
+    before, after = sum(r.rows_before for r in reports), sum(r.rows_after for r in reports)
+    verb = "would compact" if args.dry_run else "compacted"
+    print(f"{verb} {sum(r.days for r in reports):,} days of {len(reports)} users: "
+          f"{before:,} -> {after:,} food rows in {wall:.1f}s")
+    return 1 if any(r.error for r in reports) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,305 @@
+# backend/service.py
+"""
+Use cases served by the backend API, composed from the existing modules
+(cleaner, db_utils_mysql, db_chat_mysql, user_directory, pipeline).
+
+Everything here is plain synchronous Python returning JSON-ready values, so
+it can be called from the FastAPI handlers, the local dev server or a script.
+The graph writer is looked up through the resources registry
+(resources.install("graph_store", (ingest_fn, delete_fn))), which is how
+backend.local swaps Neo4j for the in-memory benchmark graph.
+"""
+import io
+import json
+import zipfile
+from datetime import date
+from typing import Dict, Iterator, Optional
+
+import pandas as pd
+
+from modules.utils.analytics import trends as trend_facts
+from modules.utils.cleaner.cleaner import (
+    load_csv_from_zip, clean_food_intake,
+    clean_sleep_hours, clean_step_count, clean_water_intake
+)
+from modules.utils.db import db_chat_mysql, db_export
+from modules.utils.db.db_utils_mysql import (
+    delete_user_data_mysql, get_engine, get_user_data_from_mysql, push_user_data_mysql
+)
+from modules.utils.db.user_directory import get_directory, search_users
+from modules.utils.observability.metrics import profiled
+from modules.utils.retrieval import pipeline
+from modules.utils.retrieval.resources import shared
+
+# Samsung Health export file -> (cleaner, columns of the cleaned frame);
+# cleaners are timed when [metrics] profile_cleaners is on
+SOURCES = {
+    'food':  ('com.samsung.health.food_intake', profiled('food', clean_food_intake), ['date', 'food_name', 'amount', 'calories']),
+    'sleep': ('com.samsung.shealth.sleep', profiled('sleep', clean_sleep_hours), ['date', 'total_sleep_h']),
+    'steps': ('com.samsung.shealth.step_daily_trend', profiled('steps', clean_step_count), ['date', 'total_steps']),
+    'water': ('com.samsung.health.water_intake', profiled('water', clean_water_intake), ['date', 'total_water_ml']),
+}
+
+NO_ANSWER = "I’m sorry, I don’t have the information to answer that."
+
+
+class NotFound(LookupError):
+    """Requested user or session does not exist."""
+
+
+def db_url() -> str:
+    # Single source of the MySQL URL (overridable for local SQLite runs)
+    return db_chat_mysql.DB_URL
+
+
+def graph_store():
+    """
+    (ingest_graph, delete_graph) for the graph database: Neo4j, or the
+    stand-in installed as the "graph_store" resource (backend.local).
+    """
+    def _neo4j():
+        from modules.utils.db.db_utils_neo4j import delete_user_data_neo4j, ingest_user_data_to_neo4j
+        return ingest_user_data_to_neo4j, delete_user_data_neo4j
+    return shared("graph_store", _neo4j)
+
+
+def graph_compactor():
+    # (user_id, days, df_food) -> replaces those days' Food nodes (backend/retention.py)
+    def _neo4j():
+        from modules.utils.db.db_utils_neo4j import replace_food_days
+        return replace_food_days
+    return shared("graph_compactor", _neo4j)
+
+
+def _records(df: pd.DataFrame) -> list:
+    # Dates as 'YYYY-MM-DD' (timestamps as 'YYYY-MM-DD HH:MM:SS'), numpy -> JSON
+    df = df.copy()
+    for col in df.columns:
+        if col == 'date' or pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = df[col].astype(str)
+    return json.loads(df.to_json(orient='records'))
+
+
+# ─── USERS ────────────────────────────────────────────────────────────────────
+
+def list_users(prefix: str = "", page: int = 0, page_size: Optional[int] = None) -> dict:
+    result = search_users(db_url(), prefix, page, page_size)
+    return {
+        "users": [{"user_id": uid, "username": name} for uid, name in result.users],
+        "total": result.total, "page": result.page, "pages": result.pages,
+    }
+
+
+def get_username(user_id: int) -> str:
+    name = get_directory(db_url()).username(user_id)
+    if name is None:
+        raise NotFound(f"user {user_id} not found")
+    return name
+
+
+def delete_user(user_id: int):
+    get_username(user_id)
+    _, delete_graph = graph_store()
+    delete_user_data_mysql(user_id, db_url())
+    delete_graph(user_id)
+    db_chat_mysql.invalidate_sessions(user_id)
+
+
+# ─── INGESTION ────────────────────────────────────────────────────────────────
+
+def read_zip(data: bytes) -> Dict[str, Optional[pd.DataFrame]]:
+    """
+    Raw Samsung Health CSVs for every category (None when a file is missing).
+    """
+    if not zipfile.is_zipfile(io.BytesIO(data)):
+        raise ValueError("upload is not a ZIP file")
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        return {name: load_csv_from_zip(zf, pattern) for name, (pattern, _, _) in SOURCES.items()}
+
+
+def clean_frames(raw: Dict[str, Optional[pd.DataFrame]]) -> Dict[str, pd.DataFrame]:
+    """
+    Cleaned frames for every category; missing files give empty frames
+    with the expected columns.
+    """
+    frames = {}
+    for name, (_, clean, columns) in SOURCES.items():
+        df = raw.get(name)
+        frames[name] = clean(df) if df is not None and not df.empty else pd.DataFrame(columns=columns)
+    return frames
+
+
+def clean_zip(data: bytes) -> Dict[str, pd.DataFrame]:
+    return clean_frames(read_zip(data))
+
+
+def preview_zip(data: bytes) -> dict:
+    return {name: _records(df) for name, df in clean_zip(data).items()}
+
+
+def ingest_zip(username: str, data: bytes) -> dict:
+    """
+    Clean an export and store it in MySQL, then the graph. A failed graph
+    ingest raises and keeps the MySQL rows: deleting the user would take their
+    earlier history too. Background jobs (backend/jobs.py) retry the graph.
+    """
+    username = username.strip()
+    if not username:
+        raise ValueError("username is required")
+    frames = clean_zip(data)
+    ingest_graph, _ = graph_store()
+    user_id = push_user_data_mysql(
+        username, frames['food'], frames['water'], frames['sleep'], frames['steps'], db_url()
+    )
+    ingest_graph(user_id, username, frames['food'], frames['water'], frames['steps'], frames['sleep'])
+    return {"user_id": user_id, "username": username, "rows": {k: len(v) for k, v in frames.items()}}
+
+
+def graph_frames(user_id: int) -> Dict[str, pd.DataFrame]:
+    """
+    A user's stored MySQL rows in the shape the graph ingest expects, for
+    rebuilding their graph data.
+    """
+    data = get_user_data_from_mysql(user_id, db_url())
+    food, water = data['food_intake'], data['water_intake']
+    # `items` > 1 marks rows compacted by retention
+    food_cols = ['date', 'food_name', 'amount', 'calories'] + (['items'] if 'items' in food else [])
+    return {
+        'food': food.assign(date=pd.to_datetime(food['event_time']).dt.date)[food_cols],
+        'water': water.assign(date=pd.to_datetime(water['event_time']).dt.date)
+                      .rename(columns={'amount': 'total_water_ml'})[['date', 'total_water_ml']],
+        'steps': data['step_count'][['date', 'total_steps']],
+        'sleep': data['sleep_hours'][['date', 'total_sleep_h']],
+    }
+
+
+def export_table(user_id: int, table: str, fmt: str = 'parquet',
+                 start: Optional[date] = None, end: Optional[date] = None) -> Iterator[bytes]:
+    """
+    One user's rows of `table` as a Parquet / Arrow IPC byte stream.
+    """
+    get_username(user_id)
+    if table not in db_export.TABLES or fmt not in db_export.FORMATS:
+        raise ValueError(f"table must be one of {', '.join(db_export.TABLES)} and format one of "
+                         f"{', '.join(db_export.FORMATS)}")
+    return db_export.stream_table(db_url(), table, user_id, start, end, fmt)
+
+
+# ─── DASHBOARD ────────────────────────────────────────────────────────────────
+
+def dashboard(user_id: int) -> dict:
+    """
+    Summary metrics and chart series for the dashboard page.
+    """
+    get_username(user_id)
+    data = get_user_data_from_mysql(user_id, db_url())
+    food, sleep = data['food_intake'], data['sleep_hours']
+    steps, water = data['step_count'], data['water_intake']
+    for df, col in ((food, 'event_time'), (sleep, 'date'), (steps, 'date'), (water, 'event_time')):
+        if not df.empty:
+            df['date'] = pd.to_datetime(df[col]).dt.date
+
+    def _weekly(df, col, how):
+        week = pd.to_datetime(df['date']).dt.to_period("W").astype(str)
+        return df.groupby(week)[col].agg(how).rename_axis('week').reset_index()
+
+    out = {
+        "summary": {
+            "total_calories": int(food['calories'].sum()) if not food.empty else 0,
+            "avg_sleep_h": round(float(sleep['total_sleep_h'].mean()), 2) if not sleep.empty else 0,
+            "total_water_ml": int(water['amount'].sum()) if not water.empty else 0,
+            "avg_steps": int(steps['total_steps'].mean()) if not steps.empty else 0,
+        },
+        "calories_daily": [], "top_foods": [], "sleep_daily": [],
+        "steps_daily": [], "steps_weekly": [], "water_daily": [], "water_weekly": [],
+    }
+    if not food.empty:
+        out["calories_daily"] = _records(food.groupby('date')['calories'].sum().reset_index())
+        top = food.groupby('food_name')['calories'].sum().nlargest(5).reset_index()
+        out["top_foods"] = _records(top)
+    if not sleep.empty:
+        out["sleep_daily"] = _records(sleep[['date', 'total_sleep_h']])
+    if not steps.empty:
+        out["steps_daily"] = _records(steps[['date', 'total_steps']])
+        out["steps_weekly"] = _records(_weekly(steps, 'total_steps', 'mean'))
+    if not water.empty:
+        out["water_daily"] = _records(water.groupby('date')['amount'].sum().reset_index())
+        out["water_weekly"] = _records(_weekly(water, 'amount', 'sum'))
+    return out
+
+
+def trends(user_id: int) -> dict:
+    """
+    Precomputed trend facts (see analytics/trends.py), as the assistant's
+    trends tool sees them.
+    """
+    get_username(user_id)
+    facts = trend_facts.load_facts(get_engine(db_url()), user_id)
+    return facts or trend_facts.compute_facts(pd.DataFrame())
+
+
+# ─── CHAT SESSIONS ────────────────────────────────────────────────────────────
+
+def list_sessions(user_id: int) -> list:
+    return [s._asdict() for s in db_chat_mysql.list_sessions(user_id)]
+
+
+def create_session(user_id: int, name: str = "New chat") -> dict:
+    get_username(user_id)
+    session_id = db_chat_mysql.create_session(user_id, name)
+    return {"session_id": session_id, "name": name}
+
+
+def rename_session(session_id: int, name: str):
+    db_chat_mysql.rename_session(session_id, name)
+
+
+def delete_session(session_id: int):
+    db_chat_mysql.delete_session(session_id)
+
+
+def get_history(session_id: int) -> list:
+    return _records(db_chat_mysql.get_chat_history(session_id))
+
+
+def add_message(session_id: int, role: str, message: str):
+    db_chat_mysql.push_chat_message(session_id, role, message)
+
+
+# ─── ASSISTANT ────────────────────────────────────────────────────────────────
+
+def stream_answer(user_id: int, question: str, session_id: Optional[int] = None) -> Iterator[dict]:
+    """
+    Assistant events as dicts ({"event": "status"|"token"|"final"|"error", "data": ...}).
+    The last one is "final", or "error" when the run failed or was cancelled
+    by a newer question. With a `session_id`, the question and a final answer
+    are saved to it; a run without one adds no assistant message.
+    """
+    username = get_username(user_id)
+    if session_id is not None:
+        add_message(session_id, "user", question)
+    answer = None
+    try:
+        for kind, payload in pipeline.stream_answer(user_id, username, question, session_key=session_id):
+            if kind == "final":
+                answer = payload
+            else:
+                yield {"event": kind, "data": payload}
+    except Exception as exc:
+        yield {"event": "error", "data": f"{type(exc).__name__}: {exc}"}
+        return
+    if answer is None:
+        yield {"event": "error", "data": "cancelled: a newer question replaced this run"}
+        return
+    answer = answer.strip() or NO_ANSWER
+    if session_id is not None:
+        add_message(session_id, "assistant", answer)
+    yield {"event": "final", "data": answer}
+
+
+def ask(user_id: int, question: str, session_id: Optional[int] = None) -> str:
+    answer = NO_ANSWER
+    for ev in stream_answer(user_id, question, session_id):
+        if ev["event"] == "final":
+            answer = ev["data"]
+    return answer
@@ -0,0 +1,58 @@
+# backend/trends.py
+"""
+Recompute the precomputed trends (modules/utils/analytics/trends.py) from
+each user's full history. Uploads keep them current on their own; run this
+once for data stored before trends existed, or after changing [trends].
+Run from the app/ directory:
+
+    python -m backend.trends                       # every user
+    python -m backend.trends --user alice --show   # one user, print the facts
+    python -m backend.trends --local .cache/local-backend
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from backend import service
+from modules.utils.analytics import trends
+from modules.utils.db.db_utils_mysql import get_engine, get_existing_users
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user", action="append", help="username to rebuild (repeatable; default: all users)")
+    parser.add_argument("--show", action="store_true", help="print each user's facts as the assistant sees them")
+    parser.add_argument("--local", metavar="DIR", help="use backend.local's SQLite store")
+    args = parser.parse_args(argv)
+
+    if args.local:
+        from backend import local
+        local.configure(Path(args.local))
+    if service.db_url() is None:
+        print("no database configured: add [mysql] to secrets.toml or use --local")
+        return 1
+
+    engine = get_engine(service.db_url())
+    trends.ensure_schema(engine)
+    users = get_existing_users(service.db_url())
+    if args.user:
+        unknown = set(args.user) - set(users['username'])
+        if unknown:
+            print(f"unknown user(s): {', '.join(sorted(unknown))}")
+            return 1
+        users = users[users['username'].isin(args.user)]
+
+    t0 = time.perf_counter()
+    for u in users.itertuples():
+        facts = trends.refresh(engine, int(u.user_id))
+        print(f"  {u.username:20} through {facts['through']}  {len(facts['anomalies'])} anomalies, "
+              f"{len(facts['correlations'])} correlations")
+        if args.show:
+            print(trends.describe(facts) + "\n")
+    print(f"rebuilt trends for {len(users)} users in {time.perf_counter() - t0:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
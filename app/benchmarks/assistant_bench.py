@@ -0,0 +1,213 @@
+# benchmarks/assistant_bench.py
+"""
+Offline end-to-end benchmark for the AI Assistant pipeline.
+
+Drives pipeline.stream_answer (answer cache, intent router, GraphRAG agent or
+parallel retrieval) against a scripted chat model and an in-memory graph
+seeded with synthetic users, so orchestration overhead can be measured and
+regression-tested without OpenAI, Neo4j or MySQL.
+
+Run from the app/ directory:
+
+    python -m benchmarks.assistant_bench --users 20 --days 120 --concurrency 8
+    python -m benchmarks.assistant_bench --mode parallel --llm-latency-ms 300 --json bench.json
+    python -m benchmarks.assistant_bench --max-p95-ms 1500     # non-zero exit on regression
+"""
+import argparse
+import json
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, NamedTuple
+
+import numpy as np
+
+from benchmarks.fakes import InMemoryHealthGraph, ScriptedChatModel
+from benchmarks.synthetic import make_users, to_graph_tables
+from modules.utils.cache import answer_cache, translation_cache
+from modules.utils.observability import tracing
+from modules.utils.retrieval import embeddings, graphrag, pipeline, resources, vector_index
+
+# (kind, question); kind only labels the report, routing is up to the pipeline
+QUESTIONS = [
+    ("router", "How many steps did I walk last week?"),
+    ("router", "What is my average sleep in the last 30 days?"),
+    ("router", "How much water did I drink this month?"),
+    ("router", "What were my top 5 foods last month?"),
+    ("router", "What did I eat yesterday?"),
+    ("cypher", "Why was my calorie intake so high last week?"),
+    ("cypher", "Compare my sleep this week versus last week"),
+    ("cypher", "Which foods did I eat the most in the last 90 days?"),
+    ("cypher", "What did I eat in the last 60 days?"),
+    ("vector", "Describe my typical eating habits"),
+    ("vector", "What is my usual sleep pattern?"),
+]
+
+
+class Sample(NamedTuple):
+    round: int
+    kind: str
+    latency_ms: float
+    ttft_ms: float
+    ok: bool
+    error: str
+
+
+def setup(args, workdir: Path):
+    """
+    Point every local store at `workdir` and swap in the stand-ins.
+    """
+    answer_cache.cfg['path'] = str(workdir / "answers.sqlite3")
+    translation_cache.cfg['path'] = str(workdir / "translations.sqlite3")
+    embeddings.cfg.update(embedder='hashing', embedding_cache=str(workdir / "embeddings.sqlite3"))
+    vector_index.cfg.update(backend='local', index_dir=str(workdir / "vector_index"))
+    tracing.cfg['path'] = str(workdir / "traces.jsonl")
+    pipeline.cfg['retrieval_mode'] = args.mode
+
+    users = make_users(args.users, args.days, seed=args.seed)
+    graph = InMemoryHealthGraph(to_graph_tables(users), latency_s=args.graph_latency_ms / 1000)
+    stats = Counter()
+
+    def llm_factory(model_name, temperature, streaming, tags):
+        return ScriptedChatModel(
+            latency_s=args.llm_latency_ms / 1000,
+            token_latency_s=args.token_latency_ms / 1000,
+            streaming=streaming,
+            model_name=model_name,
+            tags=list(tags) or None,
+            stats=stats,
+        )
+
+    resources.reset_resources()
+    resources.install("graph", graph)
+    resources.install("llm_factory", llm_factory)
+    graphrag.get_graphrag_agent().verbose = False
+
+    t0 = time.perf_counter()
+    for u in users:
+        vector_index.index_user_data(u.user_id, u.username, u.food, u.water, u.steps, u.sleep)
+    print(f"seeded {len(users)} users x {args.days} days in {time.perf_counter() - t0:.1f}s")
+    return users, graph, stats
+
+
+def ask(round_no: int, user, kind: str, question: str) -> Sample:
+    t0 = time.perf_counter()
+    ttft = None
+    try:
+        for event, _ in pipeline.stream_answer(user.user_id, user.username, question):
+            if ttft is None and event in ("token", "final"):
+                ttft = time.perf_counter() - t0
+        ok, error = True, ""
+    except Exception as exc:
+        ok, error = False, f"{type(exc).__name__}: {exc}"
+    latency = time.perf_counter() - t0
+    return Sample(round_no, kind, latency * 1000, (ttft or latency) * 1000, ok, error)
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    arr = np.asarray(values)
+    return {
+        "p50": float(np.percentile(arr, 50)), "p90": float(np.percentile(arr, 90)),
+        "p95": float(np.percentile(arr, 95)), "p99": float(np.percentile(arr, 99)),
+        "max": float(arr.max()), "mean": float(arr.mean()),
+    }
+
+
+def summarize(samples: List[Sample], wall_s: float) -> dict:
+    ok = [s for s in samples if s.ok]
+    report = {
+        "questions": len(samples),
+        "errors": len(samples) - len(ok),
+        "wall_s": round(wall_s, 3),
+        "throughput_qps": round(len(samples) / wall_s, 2) if wall_s else 0.0,
+        "latency_ms": percentiles([s.latency_ms for s in ok]),
+        "ttft_ms": percentiles([s.ttft_ms for s in ok]),
+        "by_kind": {},
+        "by_round": {},
+    }
+    for kind in sorted({s.kind for s in samples}):
+        report["by_kind"][kind] = percentiles([s.latency_ms for s in ok if s.kind == kind])
+    for rnd in sorted({s.round for s in samples}):
+        report["by_round"][rnd] = percentiles([s.latency_ms for s in ok if s.round == rnd])
+    return report
+
+
+def print_report(report: dict, stats: Counter, graph: InMemoryHealthGraph, errors: List[str]):
+    def _row(name, p):
+        if not p:
+            return f"  {name:<10} -"
+        return (f"  {name:<10} p50 {p['p50']:8.1f}  p90 {p['p90']:8.1f}  p95 {p['p95']:8.1f}"
+                f"  p99 {p['p99']:8.1f}  max {p['max']:8.1f}")
+
+    print(f"\n{report['questions']} questions, {report['errors']} errors, "
+          f"{report['wall_s']:.2f}s wall, {report['throughput_qps']:.2f} q/s")
+    print("latency (ms)")
+    print(_row("all", report["latency_ms"]))
+    print(_row("ttft", report["ttft_ms"]))
+    for kind, p in report["by_kind"].items():
+        print(_row(kind, p))
+    for rnd, p in report["by_round"].items():
+        print(_row(f"round {rnd}", p))
+    print(f"model calls: {dict(sorted((k, v) for k, v in stats.items() if k.startswith('calls.')))}")
+    print(f"models: {dict(sorted((k[6:], v) for k, v in stats.items() if k.startswith('model.')))}")
+    print(f"tokens: prompt {stats['prompt_tokens']}, completion {stats['completion_tokens']}")
+    print(f"graph queries: {sum(graph.queries.values())}")
+    for err in errors[:5]:
+        print(f"  error: {err}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--rounds", type=int, default=2, help="repeat the corpus (later rounds hit the caches)")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--mode", choices=["agent", "parallel"], default="agent")
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0)
+    parser.add_argument("--token-latency-ms", type=float, default=2.0)
+    parser.add_argument("--graph-latency-ms", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write the report to this file")
+    parser.add_argument("--max-p95-ms", type=float, help="exit 1 if overall p95 latency exceeds this")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="assistant-bench-") as tmp:
+        users, graph, stats = setup(args, Path(tmp))
+        samples: List[Sample] = []
+        wall = 0.0
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            for rnd in range(1, args.rounds + 1):
+                jobs = [(rnd, u, kind, q) for u in users for kind, q in QUESTIONS]
+                t0 = time.perf_counter()
+                samples += list(pool.map(lambda job: ask(*job), jobs))
+                wall += time.perf_counter() - t0
+
+        report = summarize(samples, wall)
+        report["config"] = {k: v for k, v in vars(args).items() if k != "json"}
+        report["model"] = dict(stats)
+        print_report(report, stats, graph, [s.error for s in samples if not s.ok])
+
+        tracing.flush()
+        stages = tracing.summarize()
+        if not stages.empty:
+            print("\nper-stage spans (ms)")
+            print(stages[['count', 'p50_ms', 'p95_ms', 'max_ms']].to_string())
+            report["stages"] = stages.reset_index().to_dict('records')
+        resources.reset_resources()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, default=str)
+    if args.max_p95_ms is not None and report["latency_ms"].get("p95", 0.0) > args.max_p95_ms:
+        print(f"\nFAIL: p95 {report['latency_ms']['p95']:.1f} ms > {args.max_p95_ms:.1f} ms")
+        return 1
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,485 @@
+# benchmarks/evaluate.py
+"""
+Batch accuracy evaluation of the AI Assistant against MySQL ground truth.
+
+Every labeled question in eval_questions.jsonl is asked for every selected
+user through pipeline.stream_answer (cache, intent router, agent), on a bounded
+asyncio pool. A rate-limited call (HTTP 429) pauses all workers for the
+Retry-After time, or an exponential backoff with jitter, and is retried. The
+expected answer is computed with plain SQL on the MySQL tables, so the graph,
+the Cypher and the LLM are all under test.
+
+Each line of the question file is {"type", "question"} plus an optional
+"truth" ({"intent": "metric"|"foods_on_date"|"top_foods", "metric", "agg",
+"top_n", "order_by", and "period" or "start"/"end"}); without one, the truth
+is the question's intent_router shape.
+
+Run from the app/ directory (needs secrets.toml, MySQL, Neo4j and OpenAI):
+
+    python -m benchmarks.evaluate                                  # all users
+    python -m benchmarks.evaluate --users alice,bob --concurrency 16 --json eval.json
+    python -m benchmarks.evaluate --min-accuracy 0.8               # non-zero exit on regression
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import quote_plus
+from uuid import UUID
+
+import openai
+import pandas as pd
+from langchain_core.callbacks import BaseCallbackHandler
+from sqlalchemy import create_engine, text
+
+from modules.utils.cache import answer_cache, translation_cache
+from modules.utils.db.db_utils_mysql import get_existing_users
+from modules.utils.observability.tracing import token_usage
+from modules.utils.retrieval import executor, hybrid, pipeline
+from modules.utils.retrieval.dates import resolve_date_range
+from modules.utils.retrieval.intent_router import ALL_TIME, METRICS, Intent, extract_intent
+from modules.utils.retrieval.resources import get_secrets
+from modules.utils.settings import get_section
+
+logger = logging.getLogger(__name__)
+
+cfg = get_section(
+    'evaluation',
+    questions=str(Path(__file__).with_name("eval_questions.jsonl")),
+    concurrency=8,
+    max_retries=5,              # retries of a rate-limited question
+    backoff_base_s=2.0,
+    backoff_max_s=60.0,
+    rel_tol=0.02,               # metric answers within 2% ...
+    abs_tol={'kcal': 1.0, 'hours': 0.05, 'steps': 1.0, 'ml': 1.0},   # ... or this many units
+    min_recall=0.8,             # share of expected foods the answer must name
+    prices={                    # USD per 1M (prompt, completion) tokens
+        'gpt-4o-mini': [0.15, 0.60],
+        'gpt-4o': [2.50, 10.00],
+        'gpt-4': [30.00, 60.00],
+    },
+)
+
+# ─── GROUND TRUTH (MySQL) ─────────────────────────────────────────────────────
+
+# metric -> (table, day expression, value column); same daily grain as the graph
+SQL_METRICS = {
+    'calories': ('food_intake', 'DATE(event_time)', 'calories'),
+    'sleep':    ('sleep_hours', 'date', 'total_sleep_h'),
+    'steps':    ('step_count', 'date', 'total_steps'),
+    'water':    ('water_intake', 'DATE(event_time)', 'amount'),
+}
+
+METRIC_SQL = """
+SELECT COUNT(*) AS days, SUM(daily) AS total, AVG(daily) AS average FROM (
+  SELECT {day} AS day, SUM({col}) AS daily FROM {table}
+  WHERE user_id = :uid AND {day} BETWEEN :start AND :end
+  GROUP BY day
+) AS per_day
+"""
+
+FOODS_SQL = """
+SELECT DISTINCT food_name FROM food_intake
+WHERE user_id = :uid AND DATE(event_time) BETWEEN :start AND :end
+"""
+
+TOP_FOODS_SQL = """
+SELECT food_name, SUM(items) AS times, SUM(calories) AS calories FROM food_intake
+WHERE user_id = :uid AND DATE(event_time) BETWEEN :start AND :end AND food_name <> '(other foods)'
+GROUP BY food_name
+ORDER BY {order} DESC, food_name
+LIMIT :n
+"""
+
+
+class Truth(NamedTuple):
+    value: Optional[float]    # metric total or average
+    names: List[str]          # foods the answer should mention
+    empty: bool               # no records: the answer should say so
+
+
+class Item(NamedTuple):
+    qtype: str
+    question: str
+    intent: Intent
+    user_id: int
+    username: str
+
+
+def parse_truth(spec: dict) -> Intent:
+    if 'period' in spec:
+        rng = resolve_date_range(spec['period'])
+        if rng is None:
+            raise ValueError(f"unrecognized period: {spec['period']!r}")
+    elif 'start' in spec:
+        rng = (date.fromisoformat(spec['start']), date.fromisoformat(spec.get('end', spec['start'])))
+    else:
+        rng = None
+    return Intent(
+        spec['intent'], rng,
+        metric=spec.get('metric'),
+        agg=spec.get('agg', 'total'),
+        top_n=int(spec.get('top_n', 5)),
+        order_by=spec.get('order_by', 'times'),
+    )
+
+
+def load_items(path: str, users: pd.DataFrame) -> List[Item]:
+    """
+    The labeled questions crossed with `users`. Relative periods resolve
+    against today, as they do in the pipeline.
+    """
+    items = []
+    with open(path, encoding="utf-8") as f:
+        for lineno, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            rec = json.loads(line)
+            intent = parse_truth(rec['truth']) if rec.get('truth') else extract_intent(rec['question'])
+            if intent is None:
+                raise ValueError(f"{path}:{lineno}: no 'truth' and the question matches no intent shape")
+            for u in users.itertuples():
+                items.append(Item(rec.get('type', intent.name), rec['question'], intent, int(u.user_id), u.username))
+    return items
+
+
+def ground_truth(engine, user_id: int, intent: Intent) -> Truth:
+    start, end = intent.date_range or ALL_TIME
+    params = {"uid": user_id, "start": start.isoformat(), "end": end.isoformat()}
+    with engine.connect() as conn:
+        if intent.name == 'metric':
+            table, day, col = SQL_METRICS[intent.metric]
+            row = conn.execute(text(METRIC_SQL.format(table=table, day=day, col=col)), params).mappings().one()
+            if not row['days']:
+                return Truth(None, [], True)
+            return Truth(float(row['average' if intent.agg == 'average' else 'total']), [], False)
+        if intent.name == 'foods_on_date':
+            names = [r[0] for r in conn.execute(text(FOODS_SQL), params)]
+            return Truth(None, names, not names)
+        if intent.name == 'top_foods':
+            params["n"] = intent.top_n
+            sql = TOP_FOODS_SQL.format(order='calories' if intent.order_by == 'calories' else 'times')
+            names = [r[0] for r in conn.execute(text(sql), params)]
+            return Truth(None, names, not names)
+    raise ValueError(f"Unknown intent: {intent.name}")
+
+
+# ─── SCORING ──────────────────────────────────────────────────────────────────
+
+ISO_DATE_RE = re.compile(r"\b\d{4}-\d{2}-\d{2}\b")
+NUMBER_RE = re.compile(r"\d[\d,]*(?:\.\d+)?")
+NO_DATA_RE = re.compile(
+    r"\bno\b[^.]*\b(?:records?|data|entries|logs?)\b"
+    r"|\b(?:couldn't|could not|didn't|did not|can't|cannot)\b[^.]*\bfind\b|\bnot found\b",
+    re.IGNORECASE
+)
+
+
+def _numbers(answer: str) -> List[float]:
+    return [float(n.replace(',', '')) for n in NUMBER_RE.findall(ISO_DATE_RE.sub(' ', answer))]
+
+
+def score(intent: Intent, truth: Truth, answer: str) -> Tuple[bool, str]:
+    """
+    (correct, note) for `answer` given the ground truth.
+    """
+    if truth.empty:
+        return bool(NO_DATA_RE.search(answer)), "expected a no-data answer"
+    if intent.name == 'metric':
+        unit = METRICS[intent.metric][3]
+        tol = max(abs(truth.value) * float(cfg['rel_tol']), float(cfg['abs_tol'].get(unit, 1.0)))
+        ok = any(abs(n - truth.value) <= tol for n in _numbers(answer))
+        return ok, f"expected {truth.value:,.2f} {unit} ({intent.agg})"
+    lowered = answer.lower()
+    found = [n for n in truth.names if n.lower() in lowered]
+    return (len(found) / len(truth.names) >= float(cfg['min_recall']),
+            f"{len(found)}/{len(truth.names)} expected foods named")
+
+
+# ─── TOKENS & COST ────────────────────────────────────────────────────────────
+
+def price(model: str) -> Tuple[float, float]:
+    # Dated snapshots (gpt-4o-mini-2024-07-18) use their family's price
+    for name in sorted(cfg['prices'], key=len, reverse=True):
+        if model.startswith(name):
+            return tuple(cfg['prices'][name])
+    return (0.0, 0.0)
+
+
+class UsageMeter(BaseCallbackHandler):
+    """
+    Token usage of one question, per model, across retries and branches.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._models: Dict[UUID, str] = {}
+        self.calls = 0
+        self.tokens: Dict[str, List[int]] = defaultdict(lambda: [0, 0])
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs) -> None:
+        model = ((kwargs.get("invocation_params") or {}).get("model_name")
+                 or (kwargs.get("metadata") or {}).get("ls_model_name"))
+        with self._lock:
+            self._models[run_id] = model
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs) -> None:
+        usage = token_usage(response)
+        with self._lock:
+            model = (self._models.pop(run_id, None)
+                     or (response.llm_output or {}).get("model_name") or "unknown")
+            self.calls += 1
+            self.tokens[model][0] += int(usage.get("prompt_tokens") or 0)
+            self.tokens[model][1] += int(usage.get("completion_tokens") or 0)
+
+    @property
+    def prompt_tokens(self) -> int:
+        return sum(t[0] for t in self.tokens.values())
+
+    @property
+    def completion_tokens(self) -> int:
+        return sum(t[1] for t in self.tokens.values())
+
+    def cost(self) -> float:
+        total = 0.0
+        for model, (prompt, completion) in self.tokens.items():
+            p_in, p_out = price(model)
+            total += (prompt * p_in + completion * p_out) / 1e6
+        return total
+
+
+# ─── RATE-LIMITED POOL ────────────────────────────────────────────────────────
+
+def is_rate_limited(exc: BaseException) -> bool:
+    return isinstance(exc, openai.RateLimitError) or getattr(exc, "status_code", None) == 429
+
+
+def retry_after(exc: BaseException) -> Optional[float]:
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class Throttle:
+    """
+    Shared pause: one rate-limited call holds back every worker, so the pool
+    backs off as a whole instead of each worker hammering the API in turn.
+    """
+
+    def __init__(self):
+        self.resume_at = 0.0
+        self.hits = 0
+
+    async def wait(self):
+        delay = self.resume_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def backoff(self, attempt: int, hinted: Optional[float]) -> float:
+        self.hits += 1
+        if hinted is None:
+            cap = min(float(cfg['backoff_max_s']), float(cfg['backoff_base_s']) * 2 ** attempt)
+            hinted = random.uniform(cap / 2, cap)
+        self.resume_at = max(self.resume_at, time.monotonic() + hinted)
+        return hinted
+
+
+class Record(NamedTuple):
+    qtype: str
+    username: str
+    question: str
+    answer: str
+    correct: bool
+    note: str
+    timed_out: bool
+    latency_ms: Optional[float]
+    ttft_ms: Optional[float]
+    attempts: int
+    llm_calls: int
+    prompt_tokens: int
+    completion_tokens: int
+    cost_usd: float
+    error: str
+
+
+def ask(item: Item, meter: UsageMeter) -> Tuple[str, float, float]:
+    t0 = time.perf_counter()
+    ttft, answer = None, ""
+    for event, payload in pipeline.stream_answer(item.user_id, item.username, item.question, callbacks=[meter]):
+        if ttft is None and event in ("token", "final"):
+            ttft = time.perf_counter() - t0
+        if event == "final":
+            answer = payload
+    latency = time.perf_counter() - t0
+    return answer, latency * 1000, (ttft or latency) * 1000
+
+
+async def evaluate(items: List[Item], engine, concurrency: int, progress_every: int = 25) -> Tuple[List[Record], int]:
+    """
+    Ask every item with at most `concurrency` questions in flight.
+    Returns the records (in item order) and the number of rate-limit hits.
+    """
+    loop = asyncio.get_running_loop()
+    sem = asyncio.Semaphore(concurrency)
+    throttle = Throttle()
+    done = 0
+
+    async def one(item: Item) -> Record:
+        nonlocal done
+        async with sem:
+            meter = UsageMeter()
+            answer, latency, ttft, error, attempts = "", None, None, "", 0
+            try:
+                truth = await loop.run_in_executor(pool, ground_truth, engine, item.user_id, item.intent)
+            except Exception as exc:
+                truth, error = None, f"ground truth: {type(exc).__name__}: {exc}"
+            while truth is not None:
+                attempts += 1
+                await throttle.wait()
+                try:
+                    answer, latency, ttft = await loop.run_in_executor(pool, ask, item, meter)
+                    break
+                except Exception as exc:
+                    if not is_rate_limited(exc) or attempts > int(cfg['max_retries']):
+                        error = f"{type(exc).__name__}: {exc}"
+                        break
+                    delay = throttle.backoff(attempts - 1, retry_after(exc))
+                    logger.warning("rate limited, pausing %.1fs (attempt %d)", delay, attempts)
+
+            correct, note = (False, "")
+            if truth is not None and not error:
+                correct, note = score(item.intent, truth, answer)
+            done += 1
+            if done % progress_every == 0 or done == len(items):
+                print(f"  {done}/{len(items)} answered")
+            return Record(
+                item.qtype, item.username, item.question, answer, correct, note,
+                answer.startswith(pipeline.TIMEOUT_FALLBACK) or "(The answer was cut short" in answer,
+                latency, ttft, attempts, meter.calls, meter.prompt_tokens, meter.completion_tokens,
+                round(meter.cost(), 6), error,
+            )
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="eval") as pool:
+        records = await asyncio.gather(*(one(i) for i in items))
+    return list(records), throttle.hits
+
+
+# ─── REPORT ───────────────────────────────────────────────────────────────────
+
+def summarize(records: List[Record]) -> pd.DataFrame:
+    """
+    Accuracy, latency and token cost per question type, plus an "ALL" row.
+    """
+    df = pd.DataFrame(records, columns=Record._fields)
+    df['errored'] = df['error'] != ""
+
+    def _agg(g: pd.DataFrame) -> pd.Series:
+        ok = g[~g['errored']]
+        return pd.Series({
+            'n': len(g),
+            'accuracy': ok['correct'].mean() if len(ok) else 0.0,
+            'errors': int(g['errored'].sum()),
+            'timeouts': int(g['timed_out'].sum()),
+            'p50_ms': ok['latency_ms'].median(),
+            'p95_ms': ok['latency_ms'].quantile(0.95),
+            'llm_calls': g['llm_calls'].mean(),
+            'tokens': (g['prompt_tokens'] + g['completion_tokens']).mean(),
+            'cost_usd': g['cost_usd'].sum(),
+        })
+
+    table = pd.DataFrame({qtype: _agg(g) for qtype, g in df.groupby('qtype')}).T
+    table.loc['ALL'] = _agg(df)
+    return table
+
+
+def mysql_url() -> str:
+    db = get_secrets()['mysql']
+    return (
+        f"mysql+pymysql://{db['user']}:{quote_plus(db['password'])}"
+        f"@{db['host']}:{db['port']}/{db['database']}"
+    )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", default=cfg['questions'])
+    parser.add_argument("--users", help="comma-separated usernames (default: every user in MySQL)")
+    parser.add_argument("--max-users", type=int)
+    parser.add_argument("--concurrency", type=int, default=int(cfg['concurrency']))
+    parser.add_argument("--warm-caches", action="store_true",
+                        help="use the app's answer/translation caches instead of empty ones")
+    parser.add_argument("--json", help="write the summary and every answer to this file")
+    parser.add_argument("--csv", help="write one row per question to this file")
+    parser.add_argument("--min-accuracy", type=float, help="exit 1 if overall accuracy is below this")
+    args = parser.parse_args(argv)
+
+    db_url = mysql_url()
+    users = get_existing_users(db_url)
+    if args.users:
+        users = users[users['username'].isin([u.strip() for u in args.users.split(",")])]
+    if args.max_users:
+        users = users.head(args.max_users)
+    if users.empty:
+        print("no users to evaluate")
+        return 1
+    items = load_items(args.questions, users)
+
+    # Enough pipeline workers that the eval concurrency is the only bound
+    executor.cfg['workers'] = max(int(executor.cfg['workers']), args.concurrency)
+    hybrid.cfg['workers'] = max(int(hybrid.cfg['workers']), 2 * args.concurrency)
+    engine = create_engine(db_url, pool_size=args.concurrency, max_overflow=0, pool_pre_ping=True)
+
+    with tempfile.TemporaryDirectory(prefix="assistant-eval-") as tmp:
+        if not args.warm_caches:
+            answer_cache.cfg['path'] = str(Path(tmp) / "answers.sqlite3")
+            translation_cache.cfg['path'] = str(Path(tmp) / "translations.sqlite3")
+        print(f"evaluating {len(items)} questions ({len(users)} users) with concurrency {args.concurrency}")
+        t0 = time.perf_counter()
+        records, rate_limited = asyncio.run(evaluate(items, engine, args.concurrency))
+        wall = time.perf_counter() - t0
+    engine.dispose()
+
+    table = summarize(records)
+    overall = table.loc['ALL']
+    print(f"\n{len(records)} questions in {wall:.1f}s ({len(records) / wall:.2f} q/s), "
+          f"{rate_limited} rate-limit pauses")
+    print(table.to_string(float_format=lambda v: f"{v:,.3f}"))
+    for r in [r for r in records if r.error][:5]:
+        print(f"  error [{r.qtype}] {r.username}: {r.error}")
+    for r in [r for r in records if not r.correct and not r.error][:10]:
+        print(f"  wrong [{r.qtype}] {r.username}: {r.question!r} — {r.note}; got {r.answer[:160]!r}")
+
+    if args.json:
+        report = {
+            "config": {k: v for k, v in vars(args).items() if k not in ("json", "csv")},
+            "wall_s": round(wall, 3),
+            "rate_limited": rate_limited,
+            "summary": table.reset_index(names="type").to_dict("records"),
+            "records": [r._asdict() for r in records],
+        }
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, default=str)
+    if args.csv:
+        pd.DataFrame(records, columns=Record._fields).to_csv(args.csv, index=False)
+
+    if args.min_accuracy is not None and overall['accuracy'] < args.min_accuracy:
+        print(f"\nFAIL: accuracy {overall['accuracy']:.3f} < {args.min_accuracy:.3f}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,521 @@
+# benchmarks/fakes.py
+"""
+Offline stand-ins for the assistant's external services.
+
+- InMemoryHealthGraph: a Neo4jGraph look-alike over pandas frames. It executes
+  the single-hop Cypher this schema needs (User -[:HAS_*]-> node, WHERE
+  filters, WITH/RETURN projections with implicit grouping, ORDER BY, LIMIT),
+  which covers the intent router templates and the scripted model's queries.
+- ScriptedChatModel: a deterministic chat model with configurable latency. It
+  plans tool calls, writes Cypher or SQL for known question shapes and
+  answers from the supplied context, streaming tokens like the real client.
+"""
+import json
+import re
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Iterator, List, Optional
+
+import pandas as pd
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, FunctionMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import Field
+
+from benchmarks.synthetic import SyntheticUser, food_nodes, to_graph_tables
+from modules.utils.analytics.trends import TREND_RE
+from modules.utils.retrieval.dates import resolve_date_range
+from modules.utils.retrieval.intent_router import AVG_RE, FOOD_RE, METRIC_PATTERNS, METRICS, TOP_RE, TOTAL_RE
+
+REL_LABEL = {'HAS_ATE': 'Food', 'HAS_SLEPT': 'Sleep', 'HAS_WALKED': 'Step', 'HAS_DRUNK': 'Water'}
+
+NODE_PROPS = {
+    'User': [('user_id', 'INTEGER'), ('username', 'STRING')],
+    'Food': [('name', 'STRING'), ('amount', 'INTEGER'), ('calories', 'FLOAT'), ('recordedOn', 'DATE'),
+             ('items', 'INTEGER')],
+    'Water': [('name', 'STRING'), ('amount_ml', 'INTEGER'), ('recordedOn', 'DATE')],
+    'Step': [('name', 'STRING'), ('count', 'INTEGER'), ('recordedOn', 'DATE')],
+    'Sleep': [('name', 'STRING'), ('duration_h', 'FLOAT'), ('recordedOn', 'DATE')],
+}
+
+
+class UnsupportedQuery(ValueError):
+    """The in-memory graph cannot execute this Cypher."""
+
+
+# ─── IN-MEMORY GRAPH ──────────────────────────────────────────────────────────
+
+STRING_RE = re.compile(r"'((?:[^'\\]|\\.)*)'|\"((?:[^\"\\]|\\.)*)\"")
+CLAUSE_RE = re.compile(r"\b(MATCH|WHERE|WITH|RETURN|ORDER\s+BY|SKIP|LIMIT)\b", re.IGNORECASE)
+PATH_RE = re.compile(
+    r"^\(\s*(\w+)\s*:\s*User\s*(\{[^}]*\})?\s*\)\s*-\[\s*\w*\s*:\s*(\w+)\s*\]->\s*\(\s*(\w+)\s*:\s*(\w+)(?::\w+)*\s*\)$"
+)
+NODE_RE = re.compile(r"^\(\s*(\w+)\s*:\s*(\w+)(?::\w+)*\s*(\{[^}]*\})?\s*\)$")
+PROPS_RE = re.compile(r"(\w+)\s*:\s*([^,}]+)")
+CALL_RE = re.compile(r"^(\w+)\s*\((.*)\)$", re.DOTALL)
+COND_RE = re.compile(r"^(.+?)\s*(<>|<=|>=|=|<|>|\bCONTAINS\b|\bSTARTS\s+WITH\b)\s*(.+)$", re.IGNORECASE)
+AGGREGATES = {'count', 'sum', 'avg', 'min', 'max', 'collect'}
+
+
+def _split_top(text: str, sep: str = ',') -> List[str]:
+    """Split on `sep` outside parentheses/brackets."""
+    parts, depth, cur = [], 0, []
+    for ch in text:
+        if ch in '([{':
+            depth += 1
+        elif ch in ')]}':
+            depth -= 1
+        if ch == sep and depth == 0:
+            parts.append(''.join(cur).strip())
+            cur = []
+        else:
+            cur.append(ch)
+    if ''.join(cur).strip():
+        parts.append(''.join(cur).strip())
+    return parts
+
+
+class InMemoryHealthGraph:
+    """
+    Drop-in for Neo4jGraph (query/schema API) backed by frames from
+    benchmarks.synthetic.to_graph_tables(). `latency_s` is added per query.
+    """
+
+    def __init__(self, tables: Dict[str, pd.DataFrame], latency_s: float = 0.0):
+        self.tables = tables
+        self.latency_s = latency_s
+        self.timeout = None
+        self._enhanced_schema = False
+        self.queries = Counter()
+        self._lock = threading.Lock()
+        self._local = threading.local()   # per-query string table
+
+    # Neo4jGraph / GraphStore surface
+    @property
+    def get_structured_schema(self) -> Dict[str, Any]:
+        return {
+            'node_props': {label: [{'property': p, 'type': t} for p, t in props] for label, props in NODE_PROPS.items()},
+            'rel_props': {},
+            'relationships': [{'start': 'User', 'type': rel, 'end': label} for rel, label in REL_LABEL.items()],
+            'metadata': {'constraint': [], 'index': []},
+        }
+
+    @property
+    def get_schema(self) -> str:
+        return str(self.get_structured_schema)
+
+    def refresh_schema(self) -> None:
+        pass
+
+    def add_graph_documents(self, graph_documents, include_source: bool = False) -> None:
+        raise NotImplementedError
+
+    # Writes, for the local backend (ingest / delete a user)
+    def add_user(self, user: SyntheticUser) -> None:
+        self.delete_user(user.user_id)
+        new = to_graph_tables([user])
+        with self._lock:
+            self.tables = {label: pd.concat([self.tables[label], df], ignore_index=True) if label in self.tables else df
+                           for label, df in new.items()}
+
+    def replace_user_days(self, user: SyntheticUser) -> None:
+        # Like a Neo4j ingest: the user's nodes on the days each frame spans
+        # are replaced, older and newer days are kept
+        new = to_graph_tables([user])
+        with self._lock:
+            tables = dict(self.tables)
+            for label, df in new.items():
+                old = tables.get(label)
+                if old is None:
+                    tables[label] = df
+                    continue
+                keep = old['user_id'] != user.user_id
+                if label != 'User' and not df.empty:
+                    days, old_days = df['recordedOn'].str[:10], old['recordedOn'].str[:10]
+                    keep |= (old_days < days.min()) | (old_days > days.max())
+                tables[label] = pd.concat([old[keep], df], ignore_index=True)
+            self.tables = tables
+
+    def delete_user(self, user_id: int) -> None:
+        with self._lock:
+            self.tables = {label: df[df['user_id'] != user_id].reset_index(drop=True)
+                           for label, df in self.tables.items()}
+
+    def replace_food_days(self, user_id: int, days: List[str], food: pd.DataFrame) -> None:
+        # Retention compaction: swap a user's Food rows on `days` for the aggregates
+        new = food_nodes(user_id, food)
+        with self._lock:
+            old = self.tables['Food']
+            keep = ~((old['user_id'] == user_id) & old['recordedOn'].isin(days))
+            self.tables = {**self.tables, 'Food': pd.concat([old[keep], new], ignore_index=True)}
+
+    def query(self, query: str, params: dict = {}, session_params: dict = {}) -> List[Dict[str, Any]]:
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        with self._lock:
+            self.queries[' '.join(query.split())[:60]] += 1
+        frame = self._execute(query, params or {})
+        frame = frame.astype(object).where(pd.notna(frame), None)
+        return frame.to_dict('records')
+
+    # Interpreter
+    def _execute(self, query: str, params: dict) -> pd.DataFrame:
+        strings: List[str] = []
+
+        def _stash(m):
+            strings.append(m.group(1) if m.group(1) is not None else m.group(2))
+            return f"__s{len(strings) - 1}__"
+
+        text = query.strip().rstrip(';')
+        for key in sorted(params, key=len, reverse=True):
+            value = params[key]
+            text = text.replace(f"${key}", f"'{value}'" if isinstance(value, str) else str(value))
+        text = STRING_RE.sub(_stash, text)
+        self._local.strings = strings
+
+        pieces = CLAUSE_RE.split(text)
+        clauses = [(pieces[i].upper().split()[0], pieces[i + 1].strip()) for i in range(1, len(pieces), 2)]
+        if not clauses or clauses[0][0] != 'MATCH':
+            raise UnsupportedQuery(query)
+
+        frame = self._match(clauses[0][1])
+        for kw, body in clauses[1:]:
+            if kw == 'WHERE':
+                frame = frame[self._where(frame, body)]
+            elif kw in ('WITH', 'RETURN'):
+                frame = self._project(frame, body)
+            elif kw == 'ORDER':
+                frame = self._order(frame, body)
+            elif kw == 'SKIP':
+                frame = frame.iloc[int(self._literal(body)):]
+            elif kw == 'LIMIT':
+                frame = frame.iloc[: int(self._literal(body))]
+            else:
+                raise UnsupportedQuery(query)
+        return frame.reset_index(drop=True)
+
+    def _literal(self, token: str):
+        token = token.strip()
+        m = re.fullmatch(r"__s(\d+)__", token)
+        if m:
+            return self._local.strings[int(m.group(1))]
+        m = CALL_RE.match(token)
+        if m and m.group(1).lower() in ('date', 'tolower', 'toupper', 'tostring'):
+            value = str(self._literal(m.group(2)))
+            return {'tolower': value.lower(), 'toupper': value.upper()}.get(m.group(1).lower(), value)
+        try:
+            return int(token)
+        except ValueError:
+            try:
+                return float(token)
+            except ValueError:
+                if token.lower() in ('true', 'false'):
+                    return token.lower() == 'true'
+                raise UnsupportedQuery(token)
+
+    def _node_frame(self, var: str, label: str, props: Optional[str]) -> pd.DataFrame:
+        if label not in self.tables:
+            raise UnsupportedQuery(label)
+        df = self.tables[label]
+        for key, raw in PROPS_RE.findall(props or ''):
+            df = df[df[key] == self._literal(raw)]
+        cols = [c for c in df.columns if label == 'User' or c != 'user_id']
+        out = df[cols].add_prefix(f"{var}.")
+        if label != 'User':
+            out['__uid'] = df['user_id'].values
+        return out
+
+    def _match(self, pattern: str) -> pd.DataFrame:
+        pattern = pattern.strip()
+        m = PATH_RE.match(pattern)
+        if m:
+            uvar, uprops, rel, nvar, label = m.groups()
+            if REL_LABEL.get(rel) != label:
+                return pd.DataFrame()
+            users = self._node_frame(uvar, 'User', uprops)
+            nodes = self._node_frame(nvar, label, None)
+            joined = nodes.merge(users, left_on='__uid', right_on=f"{uvar}.user_id")
+            return joined.drop(columns='__uid')
+        m = NODE_RE.match(pattern)
+        if m:
+            var, label, props = m.groups()
+            return self._node_frame(var, label, props).drop(columns='__uid', errors='ignore')
+        raise UnsupportedQuery(pattern)
+
+    def _eval(self, frame: pd.DataFrame, expr: str) -> pd.Series:
+        expr = expr.strip()
+        if expr in frame.columns:
+            return frame[expr]
+        m = CALL_RE.match(expr)
+        if m:
+            fn, arg = m.group(1).lower(), m.group(2)
+            if fn in ('tostring', 'date'):
+                return self._eval(frame, arg).astype(str)
+            if fn in ('tolower', 'toupper'):
+                s = self._eval(frame, arg).astype(str)
+                return s.str.lower() if fn == 'tolower' else s.str.upper()
+            if fn in ('tointeger', 'tofloat'):
+                return pd.to_numeric(self._eval(frame, arg), errors='coerce')
+            if fn == 'coalesce':
+                out = None
+                for a in _split_top(arg):
+                    try:
+                        s = self._eval(frame, a)
+                    except UnsupportedQuery:
+                        continue    # missing property: null
+                    out = s if out is None else out.where(out.notna(), s)
+                if out is not None:
+                    return out
+            if fn == 'round':
+                args = _split_top(arg)
+                digits = int(self._literal(args[1])) if len(args) > 1 else 0
+                return pd.to_numeric(self._eval(frame, args[0]), errors='coerce').round(digits)
+        try:
+            return pd.Series(self._literal(expr), index=frame.index)
+        except UnsupportedQuery:
+            raise UnsupportedQuery(expr)
+
+    def _where(self, frame: pd.DataFrame, body: str) -> pd.Series:
+        mask = pd.Series(True, index=frame.index)
+        for cond in re.split(r"\s+AND\s+", body, flags=re.IGNORECASE):
+            cond = cond.strip()
+            if cond.startswith('(') and cond.endswith(')'):
+                cond = cond[1:-1]
+            m = COND_RE.match(cond)
+            if not m:
+                raise UnsupportedQuery(cond)
+            lhs, op, rhs = m.group(1), ' '.join(m.group(2).upper().split()), m.group(3)
+            left, right = self._eval(frame, lhs), self._literal(rhs)
+            if op == 'CONTAINS':
+                mask &= left.astype(str).str.contains(str(right), regex=False)
+            elif op == 'STARTS WITH':
+                mask &= left.astype(str).str.startswith(str(right))
+            else:
+                mask &= {'=': left == right, '<>': left != right, '<': left < right,
+                         '<=': left <= right, '>': left > right, '>=': left >= right}[op]
+        return mask
+
+    def _project(self, frame: pd.DataFrame, body: str) -> pd.DataFrame:
+        distinct = bool(re.match(r"DISTINCT\b", body, re.IGNORECASE))
+        if distinct:
+            body = body[len('DISTINCT'):].strip()
+        items = []
+        for item in _split_top(body):
+            m = re.match(r"^(.*?)\s+AS\s+(\w+)$", item, re.IGNORECASE | re.DOTALL)
+            expr, alias = (m.group(1), m.group(2)) if m else (item, item)
+            call = CALL_RE.match(expr.strip())
+            agg = call.group(1).lower() if call and call.group(1).lower() in AGGREGATES else None
+            items.append((expr.strip(), alias, agg, call.group(2).strip() if agg else None))
+
+        keys = [(expr, alias) for expr, alias, agg, _ in items if agg is None]
+        aggs = []
+        for _, alias, agg, arg in items:
+            if agg is not None:
+                arg_distinct = bool(re.match(r"DISTINCT\b", arg, re.IGNORECASE))
+                aggs.append((alias, agg, arg[len('DISTINCT'):].strip() if arg_distinct else arg, arg_distinct))
+        base = pd.DataFrame({alias: self._eval(frame, expr) for expr, alias in keys}, index=frame.index)
+        if not aggs:
+            out = base
+        else:
+            for alias, agg, arg, _ in aggs:
+                base[f"__{alias}"] = 1 if arg == '*' else self._eval(frame, arg)
+            if keys:
+                grouped = base.groupby([alias for _, alias in keys], sort=False, dropna=False)
+            else:
+                grouped = base.assign(__all=0).groupby('__all')
+            cols = {}
+            for alias, agg, _, distinct_arg in aggs:
+                col = grouped[f"__{alias}"]
+                if agg == 'count':
+                    cols[alias] = col.nunique() if distinct_arg else col.count()
+                elif agg == 'collect':
+                    cols[alias] = col.agg(lambda s: list(dict.fromkeys(s)) if distinct_arg else list(s))
+                else:
+                    cols[alias] = getattr(col, {'avg': 'mean'}.get(agg, agg))()
+            out = pd.DataFrame(cols)
+            out = out.reset_index(drop=not keys)
+            if not keys and frame.empty:
+                # Cypher returns one row for a global aggregate over no input
+                out = pd.DataFrame([{alias: (0 if agg == 'count' else [] if agg == 'collect' else None)
+                                     for alias, agg, _, _ in aggs}])
+            out = out[[alias for _, alias, _, _ in items]]
+        if distinct:
+            out = out.drop_duplicates()
+        return out
+
+    def _order(self, frame: pd.DataFrame, body: str) -> pd.DataFrame:
+        cols, ascending = [], []
+        for item in _split_top(body):
+            parts = item.rsplit(None, 1)
+            if len(parts) == 2 and parts[1].upper() in ('ASC', 'DESC', 'ASCENDING', 'DESCENDING'):
+                name, direction = parts[0].strip(), parts[1].upper()
+            else:
+                name, direction = item.strip(), 'ASC'
+            if name not in frame.columns:
+                raise UnsupportedQuery(f"ORDER BY {name}")
+            cols.append(name)
+            ascending.append(direction.startswith('ASC'))
+        return frame.sort_values(cols, ascending=ascending, kind='stable')
+
+
+# ─── SCRIPTED CHAT MODEL ──────────────────────────────────────────────────────
+
+QUESTION_RE = re.compile(r"The question is:\s*(.+)", re.DOTALL)
+USER_RE = re.compile(r"\bfor user (\w+)", re.IGNORECASE)
+VECTOR_HINT_RE = re.compile(r"\b(describe|habits?|patterns?|usual\w*|typical\w*|routine|similar|like)\b", re.IGNORECASE)
+
+
+def scripted_cypher(question: str) -> str:
+    """
+    Cypher a competent model would write for `question`, with literal user
+    names and dates (so the translation cache can templatize it).
+    """
+    m = USER_RE.search(question)
+    user = m.group(1) if m else ''
+    q = question.lower()
+    where = ""
+    rng = resolve_date_range(q)
+    if rng:
+        where = f"WHERE {{v}}.recordedOn >= date('{rng[0].isoformat()}') AND {{v}}.recordedOn <= date('{rng[1].isoformat()}')\n"
+
+    metric = next((name for name, pat in METRIC_PATTERNS.items() if re.search(pat, q)), None)
+    if (metric and metric != 'calories') or (metric is None and not FOOD_RE.search(q)):
+        rel, label, prop, _ = METRICS[metric or 'steps']
+        match = f"MATCH (u:User {{username: '{user}'}})-[:{rel}]->(n:{label})\n" + where.format(v='n')
+        agg = 'avg' if AVG_RE.search(q) else 'sum' if TOTAL_RE.search(q) else None
+        if agg:
+            return match + f"RETURN count(*) AS days, {agg}(n.{prop}) AS {agg}_{prop}"
+        return match + f"RETURN toString(n.recordedOn) AS day, n.{prop} AS value\nORDER BY day"
+    if TOP_RE.search(q):
+        return (f"MATCH (u:User {{username: '{user}'}})-[:HAS_ATE]->(f:Food)\n"
+                + where.format(v='f')
+                + "RETURN f.name AS food, count(*) AS times, sum(f.calories) AS calories\n"
+                  "ORDER BY times DESC\nLIMIT 5")
+    return (f"MATCH (u:User {{username: '{user}'}})-[:HAS_ATE]->(f:Food)\n"
+            + where.format(v='f')
+            + "RETURN toString(f.recordedOn) AS day, f.name AS food, f.calories AS calories\nORDER BY day")
+
+
+# metric -> (view, value column, per-day rows: summed per day before averaging)
+SQL_VIEWS = {
+    'calories': ('food_log', 'calories', True),
+    'water':    ('water_log', 'amount_ml', True),
+    'sleep':    ('sleep_log', 'hours', False),
+    'steps':    ('step_log', 'steps', False),
+}
+
+
+def scripted_sql(question: str) -> str:
+    """
+    SQL a competent model would write for `question` over sql_guard's views.
+    """
+    q = question.lower()
+    where = ""
+    rng = resolve_date_range(q)
+    if rng:
+        where = f"WHERE day >= '{rng[0].isoformat()}' AND day <= '{rng[1].isoformat()}'"
+    metric = next((name for name, pat in METRIC_PATTERNS.items() if re.search(pat, q)), None)
+    if metric is None and FOOD_RE.search(q):
+        if TOP_RE.search(q):
+            cond = f"{where} AND" if where else "WHERE"
+            return (f"SELECT food_name AS food, SUM(items) AS times, SUM(calories) AS calories FROM food_log "
+                    f"{cond} food_name <> '(other foods)' GROUP BY food_name ORDER BY times DESC LIMIT 5")
+        metric = 'calories'
+    view, col, summed = SQL_VIEWS[metric or 'steps']
+    per_day = f"SUM({col}) / COUNT(DISTINCT day)" if summed else f"AVG({col})"
+    return (f"SELECT COUNT(DISTINCT day) AS days, SUM({col}) AS total_{col}, {per_day} AS avg_per_day "
+            f"FROM {view} {where}").strip()
+
+
+def scripted_answer(prompt: str) -> str:
+    """
+    A short, deterministic answer that echoes the start of the given context.
+    """
+    body = prompt
+    for marker in ("Information:", "context to answer the question at the end."):
+        if marker in body:
+            body = body.split(marker, 1)[1]
+    body = body.split("Question:", 1)[0]
+    words = body.split()
+    if not words or body.strip() in ("[]", ""):
+        return "I don't know the answer."
+    return "Based on your records, " + " ".join(words[:40])
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Deterministic chat model with per-call and per-token latency.
+    `stats` counts calls and tokens across every instance sharing it.
+    """
+    latency_s: float = 0.0
+    token_latency_s: float = 0.0
+    streaming: bool = False
+    model_name: str = "scripted"
+    stats: Any = Field(default_factory=Counter)   # shared by reference, not validated
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-chat"
+
+    def _respond(self, messages: List[BaseMessage], functions=None) -> AIMessage:
+        prompt = "\n".join(str(m.content) for m in messages)
+        human = next((str(m.content) for m in reversed(messages) if isinstance(m, HumanMessage)), prompt)
+        if functions and not any(isinstance(m, FunctionMessage) for m in messages):
+            names = {f['name'] for f in functions}
+            if TREND_RE.search(human) and 'health-trends-tool' in names:
+                tool = 'health-trends-tool'
+            elif VECTOR_HINT_RE.search(human) and 'health-vector-tool' in names:
+                tool = 'health-vector-tool'
+            else:
+                tool = sorted(names)[0]
+            call = {'name': tool, 'arguments': json.dumps({'query': human})}
+            kind, msg = 'plan', AIMessage(content='', additional_kwargs={'function_call': call})
+        elif "Write one read-only SQL query" in prompt:
+            m = QUESTION_RE.search(prompt)
+            kind, msg = 'sql', AIMessage(content=scripted_sql(m.group(1).strip() if m else human))
+        elif "Generate Cypher statement" in prompt:
+            m = QUESTION_RE.search(prompt)
+            kind, msg = 'cypher', AIMessage(content=scripted_cypher(m.group(1).strip() if m else human))
+        else:
+            kind, msg = 'answer', AIMessage(content=scripted_answer(prompt))
+        prompt_tokens = len(prompt) // 4 + 1
+        completion_tokens = len(str(msg.content)) // 4 + 1
+        self.stats[f'calls.{kind}'] += 1
+        self.stats[f'model.{self.model_name}'] += 1
+        self.stats['prompt_tokens'] += prompt_tokens
+        self.stats['completion_tokens'] += completion_tokens
+        msg.usage_metadata = {'input_tokens': prompt_tokens, 'output_tokens': completion_tokens,
+                              'total_tokens': prompt_tokens + completion_tokens}
+        return msg
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        msg = self._respond(messages, kwargs.get('functions'))
+        time.sleep(self.latency_s + self.token_latency_s * len(str(msg.content).split()))
+        usage = msg.usage_metadata
+        return ChatResult(
+            generations=[ChatGeneration(message=msg)],
+            llm_output={'token_usage': {'prompt_tokens': usage['input_tokens'],
+                                        'completion_tokens': usage['output_tokens']}},
+        )
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        msg = self._respond(messages, kwargs.get('functions'))
+        time.sleep(self.latency_s)
+        words = str(msg.content).split(' ') if msg.content else []
+        if not words:
+            yield ChatGenerationChunk(message=AIMessageChunk(
+                content='', additional_kwargs=msg.additional_kwargs, usage_metadata=msg.usage_metadata))
+            return
+        for i, word in enumerate(words):
+            if self.token_latency_s:
+                time.sleep(self.token_latency_s)
+            token = word if i == 0 else ' ' + word
+            chunk = ChatGenerationChunk(message=AIMessageChunk(
+                content=token, usage_metadata=msg.usage_metadata if i == len(words) - 1 else None))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
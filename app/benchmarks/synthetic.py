@@ -0,0 +1,91 @@
+# benchmarks/synthetic.py
+"""
+Deterministic synthetic Samsung Health data for the offline benchmark.
+
+Frames have the same columns the cleaners produce (see cleaner.py), so they can
+be fed to the same indexing code as real uploads.
+"""
+from datetime import date
+from typing import Dict, List, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+FOODS = [
+    ("nasi goreng", 350), ("fried chicken", 420), ("rice", 200), ("egg", 78),
+    ("tofu", 94), ("tempeh", 160), ("apple", 95), ("banana", 105),
+    ("oatmeal", 150), ("salmon", 280), ("noodles", 380), ("salad", 120),
+    ("coffee", 5), ("milk tea", 230), ("yogurt", 110), ("satay", 310),
+]
+
+
+class SyntheticUser(NamedTuple):
+    user_id: int
+    username: str
+    food: pd.DataFrame     # date, food_name, amount, calories
+    sleep: pd.DataFrame    # date, total_sleep_h
+    steps: pd.DataFrame    # date, total_steps
+    water: pd.DataFrame    # date, total_water_ml
+
+
+def make_user(user_id: int, days: int, end: date, seed: int = 0) -> SyntheticUser:
+    """
+    `days` days of data ending on `end` for one user; same inputs, same data.
+    """
+    rng = np.random.default_rng(seed * 100003 + user_id)
+    dates = pd.date_range(end=end, periods=days, freq='D').date
+
+    # 2-5 meals a day, each user with their own food preferences
+    prefs = rng.dirichlet(np.ones(len(FOODS)) * 0.5)
+    meals = rng.integers(2, 6, size=days)
+    picks = rng.choice(len(FOODS), size=int(meals.sum()), p=prefs)
+    amounts = rng.choice([0.5, 1.0, 1.0, 1.5, 2.0], size=len(picks))
+    food = pd.DataFrame({
+        'date': np.repeat(dates, meals),
+        'food_name': [FOODS[i][0] for i in picks],
+        'amount': amounts,
+        'calories': np.round([FOODS[i][1] for i in picks] * amounts, 1),
+    })
+    sleep = pd.DataFrame({'date': dates, 'total_sleep_h': np.round(rng.normal(7.0, 1.0, days).clip(3, 11), 2)})
+    steps = pd.DataFrame({'date': dates, 'total_steps': rng.normal(7500, 2500, days).clip(500, 25000).astype(int)})
+    water = pd.DataFrame({'date': dates, 'total_water_ml': (rng.normal(1800, 400, days).clip(300, 4000) // 50 * 50).astype(int)})
+    return SyntheticUser(user_id, f"user{user_id:03d}", food, sleep, steps, water)
+
+
+def make_users(n: int, days: int, end: date = None, seed: int = 0) -> List[SyntheticUser]:
+    end = end or date.today()
+    return [make_user(uid, days, end, seed) for uid in range(1, n + 1)]
+
+
+def food_nodes(user_id: int, food: pd.DataFrame) -> pd.DataFrame:
+    """
+    Food node properties for one user's food frame. `items` is the number of
+    logged items a row stands for (more than 1 once compacted by retention).
+    """
+    out = food.assign(user_id=user_id).rename(columns={'date': 'recordedOn', 'food_name': 'name'})
+    out['recordedOn'] = out['recordedOn'].astype(str)
+    out['items'] = out['items'].fillna(1).astype(int) if 'items' in out else 1
+    return out
+
+
+def to_graph_tables(users: List[SyntheticUser]) -> Dict[str, pd.DataFrame]:
+    """
+    Long-format tables shaped like the Neo4j graph: one frame per node label,
+    keyed by user_id, with the node properties written by db_utils_neo4j.
+    """
+    def _stack(frames, rename):
+        out = pd.concat(frames, ignore_index=True).rename(columns=rename)
+        out['recordedOn'] = out['recordedOn'].astype(str)
+        return out
+
+    return {
+        'User': pd.DataFrame({'user_id': [u.user_id for u in users], 'username': [u.username for u in users]}),
+        'Food': pd.concat([food_nodes(u.user_id, u.food) for u in users], ignore_index=True),
+        'Sleep': _stack([u.sleep.assign(user_id=u.user_id, name=u.sleep['total_sleep_h'].astype(str)) for u in users],
+                        {'date': 'recordedOn', 'total_sleep_h': 'duration_h'}),
+        'Step': _stack([u.steps.assign(user_id=u.user_id, name=u.steps['total_steps'].astype(str)) for u in users],
+                       {'date': 'recordedOn', 'total_steps': 'count'}),
+        'Water': _stack([u.water.assign(user_id=u.user_id, name=u.water['total_water_ml'].astype(str)) for u in users],
+                        {'date': 'recordedOn', 'total_water_ml': 'amount_ml'}),
+    }
+
@@ -1,12 +1,8 @@
 # components/ai_assistant.py
 import streamlit as st
-import time
-from modules.utils.db.db_chat_mysql import (
-    get_chat_history, push_chat_message
-)
-from modules.utils.retrieval.graphrag import get_graphrag_agent
+from modules.utils.observability.tracing import span
 
-def render_ai_assistant():
+def render_ai_assistant(api):
     # Stylish header
     st.markdown(
         "<h1 style='text-align:center; color:#4B79A1;'>🤖 Your Health AI Assistant</h1>"
@@ -25,17 +21,12 @@ def render_ai_assistant():
         st.stop()
 
     sid   = st.session_state.session_id
-    uname = st.session_state.username
-
-    if st.session_state.agent_executor is None:
-        st.session_state.agent_executor = get_graphrag_agent()
-    agent = st.session_state.agent_executor
+    uid   = st.session_state.user_id
 
     if st.session_state.history_loaded_for != sid:
-        hist = get_chat_history(sid)
         st.session_state.chat_history = [
-            {"role": row.role, "content": row.message}
-            for row in hist.itertuples()
+            {"role": row['role'], "content": row['message']}
+            for row in api.get_history(sid)
         ]
         st.session_state.history_loaded_for = sid
 
@@ -76,23 +67,18 @@ def render_ai_assistant():
         if msg["role"] == "user":
             st.markdown(f"<div class='chat-container'><div class='user-msg'>{msg['content']}</div></div>", unsafe_allow_html=True)
         else:
-            st.markdown(f"<div class='chat-container'><div class='ai-msg'>{msg['content']}</div></div>", unsafe_allow_html=True)
+            content = msg['content'].replace("\n", "<br>")
+            st.markdown(f"<div class='chat-container'><div class='ai-msg'>{content}</div></div>", unsafe_allow_html=True)
 
     # New Input
     user_q = st.chat_input("Ask a question about your health data:")
     if user_q:
         # Render user's message
         st.markdown(f"<div class='chat-container'><div class='user-msg'>{user_q}</div></div>", unsafe_allow_html=True)
-        push_chat_message(sid, "user", user_q)
         st.session_state.chat_history.append({"role": "user", "content": user_q})
 
-        # Simulate AI Thinking...
-        thinking_container = st.empty()
-        thinking_container.markdown(
-            """
-            <div class='chat-container'><div class='ai-msg'>
-                <em>🤖 AI is thinking<span class='dotting'>.</span></em>
-            </div></div>
+        # Thinking indicator (replaced by tool progress, then by streamed tokens)
+        thinking_style = """
             <style>
                 .dotting::after {
                     content: '';
@@ -105,31 +91,45 @@ def render_ai_assistant():
                     80%, 100% { content: '...'; }
                 }
             </style>
-            """, unsafe_allow_html=True
+        """
+        thinking_container = st.empty()
+        thinking_container.markdown(
+            "<div class='chat-container'><div class='ai-msg'>"
+            "<em>🤖 AI is thinking<span class='dotting'>.</span></em>"
+            "</div></div>" + thinking_style, unsafe_allow_html=True
         )
-
-        # Call agent
-        prompt = f"For user {uname}, {user_q}"
-        try:
-            res = agent.invoke({"input": prompt})
-            ans = res.get("output", "").strip() if res else ""
-        except Exception:
-            ans = "I’m sorry, I don’t have the information to answer that."
-
-        # Replace thinking with animated typing
-        reply_text = ""
         typing_container = st.empty()
-        time.sleep(0.5)  # short delay to feel natural
-        thinking_container.empty()
 
-        for token in ans.split():
-            reply_text += token + " "
+        def _render_reply(text):
             typing_container.markdown(
-                f"<div class='chat-container'><div class='ai-msg'>{reply_text.strip()}</div></div>",
+                f"<div class='chat-container'><div class='ai-msg'>{text.replace(chr(10), '<br>')}</div></div>",
                 unsafe_allow_html=True
             )
-            time.sleep(0.03)
 
-        # Save assistant reply
-        push_chat_message(sid, "assistant", reply_text.strip())
-        st.session_state.chat_history.append({"role": "assistant", "content": reply_text.strip()})
+        # Stream the answer (cache / fast path / agent) as the backend produces
+        # it; the backend also saves the question and the reply to the session
+        with span("ui.stream_reply", session_id=sid) as ui_span:
+            reply_text = ""
+            try:
+                for kind, payload in api.stream_answer(uid, user_q, session_id=sid):
+                    if kind == "status":
+                        thinking_container.markdown(
+                            f"<div class='chat-container'><div class='ai-msg'>"
+                            f"<em>🤖 {payload}<span class='dotting'></span></em>"
+                            f"</div></div>" + thinking_style, unsafe_allow_html=True
+                        )
+                    elif kind == "token":
+                        if not reply_text:
+                            thinking_container.empty()
+                        reply_text += payload
+                        _render_reply(reply_text)
+                        ui_span.add("rendered_tokens", 1)
+                    elif kind == "final":
+                        reply_text = payload
+            except Exception:
+                reply_text = ""
+        reply_text = reply_text.strip() or "I’m sorry, I don’t have the information to answer that."
+        thinking_container.empty()
+        _render_reply(reply_text)
+
+        st.session_state.chat_history.append({"role": "assistant", "content": reply_text})
@@ -2,9 +2,8 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from modules.utils.db.db_utils_mysql import get_user_data_from_mysql
 
-def render_dashboard(db_url: str):
+def render_dashboard(api):
     st.markdown(
         "<h1 style='text-align:center; color:#4B79A1;'>📊 User Health Dashboard</h1>",
         unsafe_allow_html=True
@@ -19,36 +18,32 @@ def render_dashboard(db_url: str):
     st.markdown(f"<h4 style='text-align:center;'>Welcome, <b>{uname}</b>!</h4>", unsafe_allow_html=True)
     st.markdown("---")
 
-    # Load data
-    data     = get_user_data_from_mysql(uid, db_url)
-    df_food  = data['food_intake']
-    df_sleep = data['sleep_hours']
-    df_steps = data['step_count']
-    df_water = data['water_intake']
-
-    # Convert event_time/date to datetime.date
-    for df_, col in zip([df_food, df_sleep, df_steps, df_water], ['event_time', 'date', 'date', 'event_time']):
-        if not df_.empty:
-            df_['date'] = pd.to_datetime(df_[col]).dt.date
+    # Aggregates are computed by the backend
+    agg = api.dashboard(uid)
+    summary = agg['summary']
+    cal_line     = pd.DataFrame(agg['calories_daily'])
+    top_foods    = pd.DataFrame(agg['top_foods'])
+    df_sleep     = pd.DataFrame(agg['sleep_daily'])
+    df_steps     = pd.DataFrame(agg['steps_daily'])
+    steps_weekly = pd.DataFrame(agg['steps_weekly'])
+    df_water     = pd.DataFrame(agg['water_daily'])
+    water_weekly = pd.DataFrame(agg['water_weekly'])
 
     # Metric Summary
     st.markdown("### Summary Metrics")
     c1, c2, c3, c4 = st.columns(4)
-    c1.metric("Total Calories", int(df_food['calories'].sum()) if not df_food.empty else 0)
-    c2.metric("Avg Sleep (hrs)", round(df_sleep['total_sleep_h'].mean(), 2) if not df_sleep.empty else 0)
-    c3.metric("Water Intake (ml)", int(df_water['amount'].sum()) if not df_water.empty else 0)
-    c4.metric("Avg Steps/Day", int(df_steps['total_steps'].mean()) if not df_steps.empty else 0)
+    c1.metric("Total Calories", summary['total_calories'])
+    c2.metric("Avg Sleep (hrs)", summary['avg_sleep_h'])
+    c3.metric("Water Intake (ml)", summary['total_water_ml'])
+    c4.metric("Avg Steps/Day", summary['avg_steps'])
     st.markdown("---")
 
     # Tabs
     tab_food, tab_sleep, tab_steps, tab_water = st.tabs(["Food Intake", "Sleep", "Steps", "Water"])
 
     with tab_food:
-        if not df_food.empty:
+        if not cal_line.empty:
             st.subheader("Food Intake Insights")
-            cal_line = df_food.groupby('date')['calories'].sum().reset_index()
-            top_foods = df_food.groupby('food_name')['calories'].sum().reset_index()
-            top_foods = top_foods.sort_values('calories', ascending=False).head(5)
 
             col1, col2 = st.columns(2)
             with col1:
@@ -87,8 +82,6 @@ def render_dashboard(db_url: str):
     with tab_steps:
         if not df_steps.empty:
             st.subheader("Step Activity")
-            df_steps['week'] = pd.to_datetime(df_steps['date']).dt.to_period("W").astype(str)
-            steps_weekly = df_steps.groupby('week')['total_steps'].mean().reset_index()
 
             col1, col2 = st.columns(2)
             with col1:
@@ -109,8 +102,6 @@ def render_dashboard(db_url: str):
     with tab_water:
         if not df_water.empty:
             st.subheader("Water Consumption")
-            df_water['week'] = pd.to_datetime(df_water['date']).dt.to_period("W").astype(str)
-            water_weekly = df_water.groupby('week')['amount'].sum().reset_index()
 
             col1, col2 = st.columns(2)
             with col1:
@@ -1,15 +1,53 @@
 # components/input_data.py
 import streamlit as st
-import zipfile
 import pandas as pd
-from modules.utils.cleaner.cleaner import (
-    load_csv_from_zip, clean_food_intake,
-    clean_sleep_hours, clean_step_count, clean_water_intake
-)
-from modules.utils.db.db_utils_mysql import push_user_data_mysql
-from modules.utils.db.db_utils_neo4j import ingest_user_data_to_neo4j
-
-def render_input_data(DB_URL):
+
+from backend.client import BackendError
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def _preview(_api, data: bytes) -> dict:
+    # Cleaned by the backend once per uploaded file, not on every rerun
+    return _api.preview_zip(data)
+
+
+def _show_job(job: dict, api=None):
+    label = f"Ingest #{job['job_id']} · {job['username']}"
+    if job['status'] == 'done':
+        st.success(f"{label}: stored for user_id={job['user_id']}")
+    elif job['status'] == 'failed':
+        st.error(f"{label}: failed ({job['error']})")
+        # Resumes after the last finished stage; rows already stored are kept
+        if api is not None and st.button("Retry", key=f"retry_job_{job['job_id']}"):
+            try:
+                st.session_state.ingest_results[job['job_id']] = api.retry_ingest_job(job['job_id'])
+            except BackendError as e:
+                st.error(f"Could not retry: {e}")
+            else:
+                st.rerun()
+    else:
+        stage = job['stage'] or "waiting for a worker"
+        retry = f" (retry {job['attempts'] - 1})" if job['attempts'] > 1 else ""
+        st.progress(job['progress'], text=f"{label}: {stage}{retry}")
+
+
+@st.fragment(run_every=2)
+def _poll_jobs(api):
+    # Only this fragment reruns while jobs are active; a full rerun once they
+    # all finish refreshes the sidebar's user list
+    active = False
+    for job_id in st.session_state.ingest_jobs:
+        job = st.session_state.ingest_results.get(job_id)
+        if job is None or job['status'] in ('queued', 'running'):
+            job = api.ingest_job(job_id)
+            st.session_state.ingest_results[job_id] = job
+        active |= job['status'] in ('queued', 'running')
+        _show_job(job)
+    if not active:
+        st.rerun()
+
+
+def render_input_data(api):
     st.markdown(
         "<h1 style='text-align:center; color:#4B79A1;'>📂 Upload & Process Health Data</h1>"
         "<p style='text-align:center; color:gray;'>This will store your Samsung Health data into MySQL & Neo4j.</p>",
@@ -17,21 +55,32 @@ def render_input_data(DB_URL):
     )
     st.markdown("---")
 
+    # Background ingest jobs submitted from this browser session
+    st.session_state.setdefault('ingest_jobs', [])
+    st.session_state.setdefault('ingest_results', {})
+    results = st.session_state.ingest_results
+    if any(results.get(j, {}).get('status', 'queued') in ('queued', 'running') for j in st.session_state.ingest_jobs):
+        _poll_jobs(api)
+    else:
+        for job_id in st.session_state.ingest_jobs:
+            _show_job(results[job_id], api)
+
     uploaded_zip = st.file_uploader("Upload Samsung Health ZIP file", type="zip", help="Exported ZIP from Samsung Health App")
     if not uploaded_zip:
         st.info("Please upload a Samsung Health ZIP file to proceed.")
         st.stop()
 
-    with zipfile.ZipFile(uploaded_zip) as zip_file:
-        df_food_raw   = load_csv_from_zip(zip_file, 'com.samsung.health.food_intake')
-        df_sleep_raw  = load_csv_from_zip(zip_file, 'com.samsung.shealth.sleep')
-        df_steps_raw  = load_csv_from_zip(zip_file, 'com.samsung.shealth.step_daily_trend')
-        df_water_raw  = load_csv_from_zip(zip_file, 'com.samsung.health.water_intake')
-
-    df_food_clean   = clean_food_intake(df_food_raw)   if not df_food_raw.empty  else pd.DataFrame()
-    df_sleep_clean  = clean_sleep_hours(df_sleep_raw)  if not df_sleep_raw.empty else pd.DataFrame()
-    df_steps_clean  = clean_step_count(df_steps_raw)   if not df_steps_raw.empty else pd.DataFrame()
-    df_water_clean  = clean_water_intake(df_water_raw) if not df_water_raw.empty else pd.DataFrame()
+    data = uploaded_zip.getvalue()
+    try:
+        with st.spinner("Cleaning export..."):
+            cleaned = _preview(api, data)
+    except Exception as e:
+        st.error(f"Could not read this export: {e}")
+        st.stop()
+    df_food_clean  = pd.DataFrame(cleaned['food'])
+    df_sleep_clean = pd.DataFrame(cleaned['sleep'])
+    df_steps_clean = pd.DataFrame(cleaned['steps'])
+    df_water_clean = pd.DataFrame(cleaned['water'])
 
     st.markdown("### User Info")
     new_username = st.text_input(
@@ -46,39 +95,21 @@ def render_input_data(DB_URL):
         if not new_username.strip():
             st.error("❗ Username is required.")
         else:
-            user_id = None
+            job = None
             try:
-                with st.spinner("Pushing to MySQL..."):
-                    user_id = push_user_data_mysql(
-                        new_username,
-                        df_food_clean,
-                        df_water_clean,
-                        df_sleep_clean,
-                        df_steps_clean,
-                        DB_URL
-                    )
-                    st.success(f"MySQL: Data successfully pushed (user_id={user_id})")
-
-                with st.spinner("Ingesting to Neo4j..."):
-                    try:
-                        ingest_user_data_to_neo4j(
-                            user_id,
-                            new_username,
-                            df_food_clean,
-                            df_water_clean,
-                            df_steps_clean,
-                            df_sleep_clean
-                        )
-                        st.success(f"Neo4j: Data ingested for user_id={user_id}")
-                    except Exception as neo4j_err:
-                        # Rollback MySQL if Neo4j fails
-                        from modules.utils.db.db_utils_mysql import delete_user_data_mysql
-                        delete_user_data_mysql(user_id)
-                        st.error(f"Neo4j ingestion failed. MySQL rollback performed. Error: {neo4j_err}")
-            except Exception as mysql_err:
-                st.error(f"MySQL push failed: {mysql_err}")
-
-
+                # Ingested by a backend worker; progress is polled above
+                job = api.submit_ingest(new_username, data)
+            except BackendError as e:
+                if e.status_code == 429:
+                    st.warning("Too many uploads are being processed right now. Please try again in a moment.")
+                else:
+                    st.error(f"Push failed: {e}")
+            except Exception as e:
+                st.error(f"Push failed: {e}")
+            if job is not None:
+                st.session_state.ingest_jobs.append(job['job_id'])
+                st.session_state.ingest_results[job['job_id']] = job
+                st.rerun()
 
     st.markdown("---")
     st.subheader("Cleaned Data Preview")
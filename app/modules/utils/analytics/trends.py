@@ -0,0 +1,310 @@
+# modules/utils/analytics/trends.py
+"""
+Precomputed trends and anomalies per user, for questions like "did my sleep
+get worse after I started walking more?" that Cypher answers badly.
+
+Daily totals of calories, water, steps and sleep are laid out as one
+calendar-day frame per user (missing days stay NaN, not 0) and every
+statistic is computed column-wise over it:
+
+- daily_metrics: per day and metric the value, 7- and 28-day rolling means
+  and a z-score against the 28 days before it
+- trend_facts: one JSON document per user with last-7-days vs previous-week
+  changes, 28-day averages, the 90-day slope, same-day and next-day
+  correlations between metrics, and the most unusual recent days
+
+refresh() runs after every MySQL push and only recomputes daily_metrics from
+the first day the upload touched (plus the rolling look-back), then rebuilds
+the facts from the stored series. describe() turns the facts into the text
+the assistant's health-trends-tool returns.
+"""
+import json
+import re
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from modules.utils.observability.tracing import traced
+from modules.utils.settings import get_section
+
+cfg = get_section(
+    'trends',
+    short_window=7,         # days in the short rolling mean and week-over-week change
+    long_window=28,         # days in the long rolling mean and the z-score baseline
+    min_days=14,            # observed days needed for a 28-day stat, slope or correlation
+    trend_days=90,          # window of the slope and of reported anomalies
+    z_threshold=2.5,
+    max_anomalies=10,
+    min_abs_r=0.2,          # weaker correlations are not reported
+)
+
+# metric -> (table, time column, day expression, value column)
+SOURCES = {
+    'calories': ('food_intake', 'event_time', 'DATE(event_time)', 'calories'),
+    'water_ml': ('water_intake', 'event_time', 'DATE(event_time)', 'amount'),
+    'steps':    ('step_count', 'date', 'date', 'total_steps'),
+    'sleep_h':  ('sleep_hours', 'date', 'date', 'total_sleep_h'),
+}
+
+LABELS = {'calories': 'calories (kcal)', 'water_ml': 'water (ml)', 'steps': 'steps', 'sleep_h': 'sleep (hours)'}
+
+DDL = [
+    "CREATE TABLE IF NOT EXISTS daily_metrics ("
+    " user_id INT NOT NULL, day DATE NOT NULL, metric VARCHAR(16) NOT NULL,"
+    " value DOUBLE NOT NULL, mean_short DOUBLE, mean_long DOUBLE, zscore DOUBLE,"
+    " PRIMARY KEY (user_id, metric, day))",
+    "CREATE TABLE IF NOT EXISTS trend_facts ("
+    " user_id INT NOT NULL PRIMARY KEY, through DATE, computed_at DATETIME NOT NULL, facts TEXT NOT NULL)",
+]
+
+
+def ensure_schema(engine):
+    with engine.begin() as conn:
+        for statement in DDL:
+            conn.execute(text(statement))
+
+
+# ─── DAILY SERIES ─────────────────────────────────────────────────────────────
+
+def daily_values(conn, user_id: int, start: Optional[date] = None) -> pd.DataFrame:
+    """
+    Daily totals per metric from `start` on, one row per calendar day.
+    """
+    series = {}
+    for metric, (table, time_col, day, col) in SOURCES.items():
+        where = "user_id = :uid" + (f" AND {time_col} >= :start" if start else "")
+        rows = conn.execute(
+            text(f"SELECT {day} AS day, SUM({col}) FROM {table} WHERE {where} GROUP BY {day}"),
+            {"uid": user_id, "start": start}
+        ).all()
+        s = pd.Series({pd.Timestamp(d): v for d, v in rows if d is not None and v is not None}, dtype=float)
+        series[metric] = s
+    wide = pd.DataFrame(series, columns=list(SOURCES))
+    if wide.empty:
+        return wide
+    return wide.reindex(pd.date_range(wide.index.min(), wide.index.max(), freq='D'))
+
+
+def daily_stats(wide: pd.DataFrame) -> pd.DataFrame:
+    """
+    Rolling means and z-scores of every metric at once; long format
+    (day, metric, value, mean_short, mean_long, zscore), observed days only.
+    """
+    short, long, min_days = int(cfg['short_window']), int(cfg['long_window']), int(cfg['min_days'])
+    baseline = wide.shift(1).rolling(long, min_periods=min_days)
+    mean, std = baseline.mean(), baseline.std()
+    frames = {
+        'value': wide,
+        'mean_short': wide.rolling(short, min_periods=(short + 1) // 2).mean(),
+        'mean_long': wide.rolling(long, min_periods=min_days).mean(),
+        'zscore': ((wide - mean) / std).where(std > 0),
+    }
+    out = pd.concat({name: df.rename_axis(index='day', columns='metric').melt(ignore_index=False, value_name=name)
+                                .set_index('metric', append=True)[name]
+                     for name, df in frames.items()}, axis=1)
+    return out.reset_index().dropna(subset=['value'])
+
+
+# ─── FACTS ────────────────────────────────────────────────────────────────────
+
+def _window_means(wide: pd.DataFrame, end: pd.Timestamp, days: int) -> pd.Series:
+    return wide.loc[end - pd.Timedelta(days=days - 1):end].mean()
+
+
+def _slopes(wide: pd.DataFrame) -> pd.Series:
+    # Least-squares slope per column (units per day), ignoring missing days
+    t = pd.Series(np.arange(len(wide), dtype=float), index=wide.index)
+    ts = wide.notna().mul(t, axis=0).where(wide.notna())
+    dt, dx = ts - ts.mean(), wide - wide.mean()
+    slope = (dt * dx).sum() / (dt ** 2).sum()
+    return slope.where(wide.notna().sum() >= int(cfg['min_days']))
+
+
+def _correlations(wide: pd.DataFrame, lag: int) -> list:
+    # r between metric x on day t and metric y on day t + lag, for every pair
+    later = wide.shift(-lag)
+    both = pd.concat([wide.add_prefix('x:'), later.add_prefix('y:')], axis=1)
+    r = both.corr(min_periods=int(cfg['min_days']))
+    seen = wide.notna().astype(int)
+    n = seen.T.dot(later.notna().astype(int))
+    out = []
+    for i, x in enumerate(wide.columns):
+        for j, y in enumerate(wide.columns):
+            if (lag == 0 and j <= i) or (lag and x == y):
+                continue
+            value = r.loc[f'x:{x}', f'y:{y}']
+            if pd.notna(value) and abs(value) >= float(cfg['min_abs_r']):
+                out.append({'x': x, 'y': y, 'lag_days': lag, 'r': round(float(value), 3), 'n': int(n.loc[x, y])})
+    return out
+
+
+def _num(value, digits: int = 1):
+    return None if value is None or pd.isna(value) else round(float(value), digits)
+
+
+def compute_facts(stats: pd.DataFrame) -> dict:
+    """
+    Trend facts from the stored daily stats of one user.
+    """
+    if stats.empty:
+        return {'through': None, 'metrics': {}, 'correlations': [], 'anomalies': []}
+    stats = stats.assign(day=pd.to_datetime(stats['day']))
+    wide = stats.pivot(index='day', columns='metric', values='value')
+    wide = wide.reindex(index=pd.date_range(wide.index.min(), wide.index.max(), freq='D'),
+                        columns=[m for m in SOURCES if m in wide.columns])
+    end = wide.index.max()
+    short, long, trend_days = int(cfg['short_window']), int(cfg['long_window']), int(cfg['trend_days'])
+
+    last_short = _window_means(wide, end, short)
+    prev_short = _window_means(wide, end - pd.Timedelta(days=short), short)
+    last_long = _window_means(wide, end, long)
+    prev_long = _window_means(wide, end - pd.Timedelta(days=long), long)
+    slope = _slopes(wide.loc[end - pd.Timedelta(days=trend_days - 1):])
+    metrics = {}
+    for m in wide.columns:
+        change = (last_short[m] - prev_short[m]) / prev_short[m] * 100 if prev_short[m] else np.nan
+        metrics[m] = {
+            'days': int(wide[m].notna().sum()),
+            'short_avg': _num(last_short[m], 2), 'prev_short_avg': _num(prev_short[m], 2),
+            'short_change_pct': _num(change),
+            'long_avg': _num(last_long[m], 2), 'prev_long_avg': _num(prev_long[m], 2),
+            'slope_per_week': _num(slope[m] * 7, 2),
+        }
+
+    recent = stats[(stats['day'] > end - pd.Timedelta(days=trend_days))
+                   & (stats['zscore'].abs() >= float(cfg['z_threshold']))]
+    recent = recent.reindex(recent['zscore'].abs().sort_values(ascending=False).index).head(int(cfg['max_anomalies']))
+    anomalies = [{'day': r.day.date().isoformat(), 'metric': r.metric, 'value': _num(r.value, 2),
+                  'baseline': _num(r.mean_long, 2), 'z': _num(r.zscore, 2)} for r in recent.itertuples()]
+
+    correlations = sorted(_correlations(wide, 0) + _correlations(wide, 1), key=lambda c: -abs(c['r']))
+    return {'through': end.date().isoformat(), 'metrics': metrics,
+            'correlations': correlations, 'anomalies': anomalies}
+
+
+# ─── STORE ────────────────────────────────────────────────────────────────────
+
+def _load_stats(conn, user_id: int) -> pd.DataFrame:
+    rows = conn.execute(text(
+        "SELECT day, metric, value, mean_short, mean_long, zscore FROM daily_metrics WHERE user_id = :uid"
+    ), {"uid": user_id}).all()
+    stats = pd.DataFrame(rows, columns=['day', 'metric', 'value', 'mean_short', 'mean_long', 'zscore'])
+    # NULL stats (fewer than min_days of history) come back as None; keep the columns numeric
+    numeric = ['value', 'mean_short', 'mean_long', 'zscore']
+    return stats.astype(dict.fromkeys(numeric, float))
+
+
+@traced("trends.refresh")
+def refresh(engine, user_id: int, since: Optional[date] = None) -> dict:
+    """
+    Recompute a user's daily stats from `since` (None: all history) and
+    their trend facts. Returns the facts.
+    """
+    # Stats on `since` depend on the long window before it
+    start = since - timedelta(days=int(cfg['long_window'])) if since else None
+    with engine.begin() as conn:
+        stats = daily_stats(daily_values(conn, user_id, start))
+        if since:
+            stats = stats[stats['day'] >= pd.Timestamp(since)]
+            conn.execute(text("DELETE FROM daily_metrics WHERE user_id = :uid AND day >= :since"),
+                         {"uid": user_id, "since": since})
+        else:
+            conn.execute(text("DELETE FROM daily_metrics WHERE user_id = :uid"), {"uid": user_id})
+        if not stats.empty:
+            conn.execute(
+                text("INSERT INTO daily_metrics (user_id, day, metric, value, mean_short, mean_long, zscore) "
+                     "VALUES (:uid, :day, :metric, :value, :ms, :ml, :z)"),
+                [{"uid": user_id, "day": r.day.date(), "metric": r.metric, "value": float(r.value),
+                  "ms": _num(r.mean_short, 4), "ml": _num(r.mean_long, 4), "z": _num(r.zscore, 4)}
+                 for r in stats.itertuples()]
+            )
+        facts = compute_facts(_load_stats(conn, user_id))
+        conn.execute(text("DELETE FROM trend_facts WHERE user_id = :uid"), {"uid": user_id})
+        conn.execute(
+            text("INSERT INTO trend_facts (user_id, through, computed_at, facts) VALUES (:uid, :t, :now, :f)"),
+            {"uid": user_id, "t": facts['through'],
+             "now": datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0), "f": json.dumps(facts)}
+        )
+    return facts
+
+
+def first_day(*frames: pd.DataFrame) -> Optional[date]:
+    """
+    Earliest 'date' in the given cleaned frames (the start of a refresh).
+    """
+    days = [pd.to_datetime(df['date']).min() for df in frames if df is not None and not df.empty and 'date' in df]
+    days = [d for d in days if pd.notna(d)]
+    return min(days).date() if days else None
+
+
+def load_facts(engine, user_id: int) -> Optional[dict]:
+    with engine.connect() as conn:
+        row = conn.execute(text("SELECT facts FROM trend_facts WHERE user_id = :uid"), {"uid": user_id}).first()
+    return json.loads(row[0]) if row else None
+
+
+# ─── TEXT FOR THE ASSISTANT ───────────────────────────────────────────────────
+
+# Questions the precomputed facts can answer (hybrid mode adds them to the context)
+TREND_RE = re.compile(
+    r"\btrend\w*|\bcorrelat\w*|\bbetter\b|\bworse\b|\bimprov\w*|\bchang\w*|\bcompar\w*"
+    r"|\banomal\w*|\bunusual\b|\bspikes?\b|\bafter\b|\bweek over week\b|\bincreas\w*|\bdecreas\w*",
+    re.IGNORECASE,
+)
+
+def _fmt(value, unit: str = "") -> str:
+    if value is None:
+        return "n/a"
+    return f"{value:,.0f}{unit}" if abs(value) >= 100 else f"{value:,.2f}{unit}"
+
+
+def _strength(r: float) -> str:
+    size = "strong" if abs(r) >= 0.6 else "moderate" if abs(r) >= 0.4 else "weak"
+    return f"{size} {'positive' if r > 0 else 'negative'}"
+
+
+def describe(facts: Optional[dict]) -> str:
+    """
+    The facts as short plain-text lines for the LLM.
+    """
+    if not facts or not facts.get('through'):
+        return "No trend data is available for this user yet."
+    short, long, trend_days = int(cfg['short_window']), int(cfg['long_window']), int(cfg['trend_days'])
+    lines = [f"Precomputed trends (daily data through {facts['through']}):"]
+    for m, f in facts['metrics'].items():
+        change = f" ({f['short_change_pct']:+.0f}%)" if f['short_change_pct'] is not None else ""
+        slope = (f"; {trend_days}-day trend {f['slope_per_week']:+,.2f} per week"
+                 if f['slope_per_week'] is not None else "")
+        lines.append(f"- {LABELS[m]}: last {short} days avg {_fmt(f['short_avg'])} vs {_fmt(f['prev_short_avg'])} "
+                     f"the {short} days before{change}; last {long} days avg {_fmt(f['long_avg'])} vs "
+                     f"{_fmt(f['prev_long_avg'])} the {long} days before{slope}; {f['days']} days recorded")
+    if facts['correlations']:
+        lines.append("Correlations between daily values (Pearson r; 'next day' compares with the following day):")
+        for c in facts['correlations'][:8]:
+            when = "next day's " if c['lag_days'] else "same day "
+            lines.append(f"- {LABELS[c['x']]} vs {when}{LABELS[c['y']]}: r={c['r']:+.2f} "
+                         f"({_strength(c['r'])}, {c['n']} days)")
+    else:
+        lines.append("No notable correlations between metrics.")
+    if facts['anomalies']:
+        lines.append(f"Unusual days in the last {trend_days} days (z-score against the previous {long} days):")
+        for a in facts['anomalies']:
+            lines.append(f"- {a['day']}: {LABELS[a['metric']]} {_fmt(a['value'])}, {long}-day avg "
+                         f"{_fmt(a['baseline'])} (z={a['z']:+.1f})")
+    return "\n".join(lines)
+
+
+def describe_user(user_id: int) -> str:
+    """
+    describe() of a user's stored facts, read from the configured database.
+    """
+    # Imported here: db_utils_mysql refreshes the facts after every push
+    from modules.utils.db import db_chat_mysql
+    from modules.utils.db.db_utils_mysql import get_engine
+
+    if db_chat_mysql.DB_URL is None:
+        return describe(None)
+    return describe(load_facts(get_engine(db_chat_mysql.DB_URL), user_id))
@@ -0,0 +1,180 @@
+# modules/utils/cache/answer_cache.py
+"""
+Assistant answer cache.
+
+Answers are keyed by (user, normalized question, resolved date range, user
+data version) and kept in a local SQLite store with a TTL and a size cap.
+Every ingest or delete for a user bumps that user's data version, so cached
+answers computed from older data can never be served again. Callers read the
+version once before answering and pass it to both lookup and store; an
+answer whose version was bumped while it was being computed is not stored.
+
+Data versions live in the shared database (cache_versions `data:<user_id>`)
+when one is configured, so a bump by any backend worker or host retires the
+answers cached by all of them. Without one (tests, scripts) they are kept in
+the local store.
+"""
+import hashlib
+import re
+import time
+from datetime import date
+from typing import Optional
+
+from modules.utils.settings import CACHE_DIR, get_section
+from modules.utils.cache.store import connect
+from modules.utils.db import cache_versions, db_chat_mysql
+from modules.utils.retrieval.dates import resolve_date_range, format_range
+
+cfg = get_section(
+    'cache',
+    path=str(CACHE_DIR / "answers.sqlite3"),
+    ttl_seconds=6 * 3600,
+    max_entries=5000,
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS answers (
+    cache_key  TEXT PRIMARY KEY,
+    user_id    INTEGER NOT NULL,
+    answer     TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_hit   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_answers_user ON answers (user_id);
+CREATE INDEX IF NOT EXISTS idx_answers_hit ON answers (last_hit);
+CREATE TABLE IF NOT EXISTS data_versions (
+    user_id INTEGER PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+"""
+
+
+def _connect():
+    return connect(cfg['path'], SCHEMA)
+
+
+def normalize_question(question: str) -> str:
+    """
+    Lowercase, drop punctuation and collapse whitespace.
+    """
+    q = re.sub(r"[^\w\s-]", " ", question.lower())
+    return re.sub(r"\s+", " ", q).strip()
+
+
+# 1) Per-user data versions
+def _shared_db() -> Optional[str]:
+    return db_chat_mysql.DB_URL
+
+
+def _scope(user_id: int) -> str:
+    return f"data:{int(user_id)}"
+
+
+def get_data_version(user_id: int) -> int:
+    if _shared_db():
+        return cache_versions.read(_scope(user_id), db_url=_shared_db())
+    conn = _connect()
+    try:
+        row = conn.execute(
+            "SELECT version FROM data_versions WHERE user_id = ?", (user_id,)
+        ).fetchone()
+    finally:
+        conn.close()
+    return row[0] if row else 0
+
+
+def bump_data_version(user_id: int) -> None:
+    """
+    Mark a user's data as changed: invalidates every cached answer for them.
+    Call after ingesting or deleting any of the user's data.
+    """
+    if _shared_db():
+        cache_versions.bump(_scope(user_id), db_url=_shared_db())
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        if not _shared_db():
+            conn.execute(
+                "INSERT INTO data_versions (user_id, version) VALUES (?, 1) "
+                "ON CONFLICT(user_id) DO UPDATE SET version = version + 1",
+                (user_id,)
+            )
+        # Other hosts' copies are unreachable under the new version and age out
+        conn.execute("DELETE FROM answers WHERE user_id = ?", (user_id,))
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+
+
+# 2) Answer lookup / store
+def cache_key(user_id: int, question: str, today: Optional[date] = None,
+              version: Optional[int] = None) -> str:
+    norm = normalize_question(question)
+    rng = format_range(resolve_date_range(question, today))
+    if version is None:
+        version = get_data_version(user_id)
+    raw = f"{user_id}|{version}|{rng}|{norm}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def get_cached_answer(user_id: int, question: str, today: Optional[date] = None,
+                      version: Optional[int] = None) -> Optional[str]:
+    key = cache_key(user_id, question, today, version)
+    now = time.time()
+    conn = _connect()
+    try:
+        row = conn.execute(
+            "SELECT answer, created_at FROM answers WHERE cache_key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        if now - row[1] > cfg['ttl_seconds']:
+            conn.execute("DELETE FROM answers WHERE cache_key = ?", (key,))
+            return None
+        conn.execute("UPDATE answers SET last_hit = ? WHERE cache_key = ?", (now, key))
+    finally:
+        conn.close()
+    return row[0]
+
+
+def put_cached_answer(user_id: int, question: str, answer: str, today: Optional[date] = None,
+                      version: Optional[int] = None) -> bool:
+    """
+    Store `answer`, computed from the user's data at `version` (the version
+    read before answering). Returns False, storing nothing, when the data
+    changed since then.
+    """
+    now = time.time()
+    # A shared version bumped after this read leaves the entry under the old
+    # key, where it can no longer be found
+    shared = get_data_version(user_id) if _shared_db() else None
+    conn = _connect()
+    try:
+        # Same write lock as bump_data_version: no local bump can slip in between
+        conn.execute("BEGIN IMMEDIATE")
+        if shared is not None:
+            current = shared
+        else:
+            row = conn.execute("SELECT version FROM data_versions WHERE user_id = ?", (user_id,)).fetchone()
+            current = row[0] if row else 0
+        if version is not None and version != current:
+            conn.execute("ROLLBACK")
+            return False
+        key = cache_key(user_id, question, today, current)
+        conn.execute(
+            "INSERT OR REPLACE INTO answers (cache_key, user_id, answer, created_at, last_hit) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (key, user_id, answer, now, now)
+        )
+        # Enforce TTL and size cap (least recently hit entries go first)
+        conn.execute("DELETE FROM answers WHERE created_at < ?", (now - cfg['ttl_seconds'],))
+        conn.execute(
+            "DELETE FROM answers WHERE cache_key IN ("
+            "  SELECT cache_key FROM answers ORDER BY last_hit DESC LIMIT -1 OFFSET ?"
+            ")",
+            (int(cfg['max_entries']),)
+        )
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+    return True
@@ -0,0 +1,30 @@
+# modules/utils/cache/store.py
+"""
+Tiny helper for the local SQLite stores under app/.cache.
+
+Each call opens a short-lived autocommit connection, so stores can be shared
+by Streamlit threads and separate processes on the same host.
+"""
+import sqlite3
+import threading
+from pathlib import Path
+
+_init_lock = threading.Lock()
+_initialized = set()
+
+
+def connect(path: str, schema: str) -> sqlite3.Connection:
+    """
+    Open a connection to the store at `path`, running `schema` (idempotent
+    CREATE ... IF NOT EXISTS statements) the first time per process.
+    """
+    if path not in _initialized:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=10, isolation_level=None)
+    if path not in _initialized:
+        with _init_lock:
+            if path not in _initialized:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(schema)
+                _initialized.add(path)
+    return conn
@@ -0,0 +1,240 @@
+# modules/utils/cache/translation_cache.py
+"""
+Parameterized NL -> Cypher translation cache.
+
+Questions that differ only in user name, dates or food names share one
+"shape" (e.g. "what did <user> eat on <date_1>"). The first time a shape is
+seen, the Cypher the LLM generated is turned into a template by replacing the
+entity literals with $parameters; later questions of the same shape reuse the
+template with their own values and skip Cypher generation entirely.
+
+Relative periods ("last week", "this month") stay in the shape, and their
+resolved first/last days become range_start/range_end parameters. A template
+that still holds a date literal, or a number the shape does not pin down
+("top 3" pins 3), is never stored: it would replay yesterday's literals.
+"""
+import calendar
+import hashlib
+import json
+import re
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+from modules.utils.settings import CACHE_DIR, get_section
+from modules.utils.cache.store import connect
+from modules.utils.retrieval.dates import resolve_date_range
+
+cfg = get_section(
+    'translation_cache',
+    path=str(CACHE_DIR / "translations.sqlite3"),
+    max_entries=2000,
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cypher_templates (
+    shape_key  TEXT PRIMARY KEY,
+    shape      TEXT NOT NULL,
+    cypher     TEXT NOT NULL,
+    param_spec TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_hit   REAL NOT NULL,
+    hits       INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+ISO_DATE_RE = re.compile(r"\b\d{4}-\d{2}-\d{2}\b")
+# Month + year expands to the first/last day literals the LLM tends to write
+MONTH_YEAR_RE = re.compile(
+    r"\b(january|february|march|april|may|june|july|august|september|october|november|december)\s+(\d{4})\b",
+    re.IGNORECASE
+)
+QUOTED_RE = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+NUMBER_RE = re.compile(r"(?<![\w$.])\d+(?:\.\d+)?(?![\w.])")
+# Numbers a template may keep without the shape pinning them
+STRUCTURAL_NUMBER_RE = re.compile(r"\b(?:LIMIT|SKIP)\s+\d+\b", re.IGNORECASE)
+OPTIONAL_ENTITIES = {'range_start', 'range_end'}
+TRANSFORMS = {
+    'exact': lambda v: v,
+    'lower': lambda v: v.lower(),
+    'upper': lambda v: v.upper(),
+}
+
+Entities = Dict[str, str]
+
+
+def _connect():
+    return connect(cfg['path'], SCHEMA)
+
+
+def _find_names(text: str, names: Iterable[str]) -> list:
+    """
+    Longest-first, case-insensitive whole-phrase matches of known names.
+    """
+    found, taken = [], []
+    lowered = text.lower()
+    for name in sorted({n for n in names if n}, key=len, reverse=True):
+        for m in re.finditer(r"(?<!\w)" + re.escape(name.lower()) + r"(?!\w)", lowered):
+            if any(m.start() < e and s < m.end() for s, e in taken):
+                continue
+            taken.append((m.start(), m.end()))
+            found.append((m.start(), m.end(), name))
+    return sorted(found)
+
+
+def parameterize_question(question: str, usernames: Iterable[str] = (), foods: Iterable[str] = ()) -> Tuple[str, Entities]:
+    """
+    Replace entities in `question` with placeholders.
+    Returns (shape, {placeholder: literal value}).
+    """
+    spans = []  # (start, end, kind, value)
+    for s, e, name in _find_names(question, usernames):
+        spans.append((s, e, 'user', name))
+    for m in ISO_DATE_RE.finditer(question):
+        spans.append((m.start(), m.end(), 'date', m.group(0)))
+    for m in MONTH_YEAR_RE.finditer(question):
+        month = list(calendar.month_name).index(m.group(1).capitalize())
+        year = int(m.group(2))
+        last = calendar.monthrange(year, month)[1]
+        spans.append((m.start(), m.end(), 'month', f"{year:04d}-{month:02d}-01|{year:04d}-{month:02d}-{last:02d}"))
+    for s, e, name in _find_names(question, foods):
+        spans.append((s, e, 'food', name))
+
+    # Drop overlaps (first come, first served in the priority order above)
+    kept = []
+    for span in spans:
+        if not any(span[0] < k[1] and k[0] < span[1] for k in kept):
+            kept.append(span)
+    kept.sort()
+
+    entities: Entities = {}
+    counters: Dict[str, int] = {}
+    pieces, pos = [], 0
+    for s, e, kind, value in kept:
+        counters[kind] = counters.get(kind, 0) + 1
+        if kind == 'month':
+            start, end = value.split('|')
+            base = f"month_{counters[kind]}"
+            entities[f"{base}_start"] = start
+            entities[f"{base}_end"] = end
+            placeholder = f"<{base}>"
+        else:
+            name = f"{kind}_{counters[kind]}"
+            entities[name] = value
+            placeholder = f"<{name}>"
+        pieces.append(question[pos:s])
+        pieces.append(placeholder)
+        pos = e
+    pieces.append(question[pos:])
+
+    shape = re.sub(r"[^\w\s<>-]", " ", "".join(pieces).lower())
+    shape = re.sub(r"\s+", " ", shape).strip()
+    if not any(kind in ('date', 'month') for _, _, kind, _ in kept):
+        rng = resolve_date_range(question)
+        if rng:
+            entities['range_start'], entities['range_end'] = rng[0].isoformat(), rng[1].isoformat()
+    return shape, entities
+
+
+def residual_literals(template: str, shape: str) -> list:
+    """
+    Literals left in `template` that would be replayed for other questions of
+    `shape`: dates, and numbers that neither appear in the shape nor are a
+    LIMIT/SKIP.
+    """
+    found = [m.group(0) for m in QUOTED_RE.finditer(template) if ISO_DATE_RE.search(m.group(0))]
+    unquoted = STRUCTURAL_NUMBER_RE.sub(" ", QUOTED_RE.sub("''", template))
+    pinned = set(NUMBER_RE.findall(shape))
+    found += [n for n in NUMBER_RE.findall(unquoted) if n not in pinned and n not in ('0', '1')]
+    return found
+
+
+def templatize(cypher: str, entities: Entities, shape: str = "") -> Optional[Tuple[str, Dict[str, str]]]:
+    """
+    Swap every entity literal in `cypher` for a $parameter.
+    Returns (template, {placeholder: transform}) or None when an entity is
+    not found as a quoted literal, or literals are left that the shape does
+    not determine (the template would silently hard-code them). The resolved
+    relative period may be missing (the query computes its own dates).
+    """
+    template = cypher
+    spec = {}
+    for name, value in sorted(entities.items(), key=lambda kv: len(kv[1]), reverse=True):
+        for transform, fn in TRANSFORMS.items():
+            literal = fn(value)
+            pattern = re.compile(r"(['\"])" + re.escape(literal) + r"\1")
+            if pattern.search(template):
+                template = pattern.sub("$" + name, template)
+                spec[name] = transform
+                break
+        else:
+            if name not in OPTIONAL_ENTITIES:
+                return None
+    if residual_literals(template, shape):
+        return None
+    return template, spec
+
+
+def _shape_key(shape: str, schema_hash: str) -> str:
+    return hashlib.sha256(f"{schema_hash}|{shape}".encode('utf-8')).hexdigest()
+
+
+def lookup(shape: str, entities: Entities, schema_hash: str = "") -> Optional[Tuple[str, dict]]:
+    """
+    Return (cypher_template, params) for a cached shape, or None.
+    """
+    key = _shape_key(shape, schema_hash)
+    conn = _connect()
+    try:
+        row = conn.execute(
+            "SELECT cypher, param_spec FROM cypher_templates WHERE shape_key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        spec = json.loads(row[1])
+        if set(spec) - set(entities) or set(entities) - set(spec) - OPTIONAL_ENTITIES:
+            return None
+        conn.execute(
+            "UPDATE cypher_templates SET hits = hits + 1, last_hit = ? WHERE shape_key = ?",
+            (time.time(), key)
+        )
+    finally:
+        conn.close()
+    params = {name: TRANSFORMS[t](entities[name]) for name, t in spec.items()}
+    return row[0], params
+
+
+def store(shape: str, template: str, spec: Dict[str, str], schema_hash: str = "") -> None:
+    """
+    Save a validated template for `shape` (call only after it executed cleanly).
+    """
+    key = _shape_key(shape, schema_hash)
+    now = time.time()
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute(
+            "INSERT OR REPLACE INTO cypher_templates "
+            "(shape_key, shape, cypher, param_spec, created_at, last_hit, hits) "
+            "VALUES (?, ?, ?, ?, ?, ?, 0)",
+            (key, shape, template, json.dumps(spec), now, now)
+        )
+        conn.execute(
+            "DELETE FROM cypher_templates WHERE shape_key IN ("
+            "  SELECT shape_key FROM cypher_templates ORDER BY last_hit DESC LIMIT -1 OFFSET ?"
+            ")",
+            (int(cfg['max_entries']),)
+        )
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+
+
+def invalidate(shape: str, schema_hash: str = "") -> None:
+    """
+    Forget a template (e.g. when it fails against a changed graph).
+    """
+    conn = _connect()
+    try:
+        conn.execute("DELETE FROM cypher_templates WHERE shape_key = ?", (_shape_key(shape, schema_hash),))
+    finally:
+        conn.close()
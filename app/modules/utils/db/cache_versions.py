@@ -0,0 +1,51 @@
+# modules/utils/db/cache_versions.py
+"""
+Version counters in the shared database for the per-process caches.
+
+Each backend worker keeps its own user directory, chat-session lists and
+answer cache. Writers bump a counter in the `cache_versions` table:
+- `users` when a user is created or deleted
+- `sessions:<user_id>` when one of the user's chat sessions changes
+- `data:<user_id>` when the user's health data changes
+
+Readers compare the counter with the version their copy was built from (one
+primary-key lookup) and reload when they differ. A write made in one worker
+is therefore seen by every other worker on its next read, not after a TTL.
+"""
+from typing import Optional
+
+from sqlalchemy import text
+
+
+def _engine(db_url: Optional[str]):
+    # Lazy imports: db_utils_mysql imports the caches that use this module
+    from modules.utils.db import db_chat_mysql
+    from modules.utils.db.db_utils_mysql import get_engine
+    return get_engine(db_url or db_chat_mysql.DB_URL)
+
+
+def read(scope: str, conn=None, db_url: Optional[str] = None) -> int:
+    """
+    The current version of `scope` (0 before its first bump).
+    """
+    if conn is None:
+        with _engine(db_url).connect() as conn:
+            return read(scope, conn)
+    value = conn.execute(text("SELECT version FROM cache_versions WHERE scope = :s"), {"s": scope}).scalar()
+    return int(value or 0)
+
+
+def bump(scope: str, conn=None, db_url: Optional[str] = None) -> int:
+    """
+    Increment `scope` and return its new version. Pass `conn` to bump inside
+    the caller's transaction, so the change and the bump commit together.
+    """
+    if conn is None:
+        with _engine(db_url).begin() as conn:
+            return bump(scope, conn)
+    upsert = (
+        "ON CONFLICT(scope) DO UPDATE SET version = version + 1" if conn.dialect.name == "sqlite"
+        else "ON DUPLICATE KEY UPDATE version = version + 1"
+    )
+    conn.execute(text(f"INSERT INTO cache_versions (scope, version) VALUES (:s, 1) {upsert}"), {"s": scope})
+    return read(scope, conn)
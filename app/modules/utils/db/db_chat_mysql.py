@@ -1,32 +1,147 @@
 # modules/utils/db/db_chat_mysql.py
 
-import toml
+import threading
 import pandas as pd
+from datetime import datetime
+from functools import lru_cache
 from sqlalchemy import create_engine, text
+from typing import Callable, Dict, List, NamedTuple, Optional
 from urllib.parse import quote_plus
 
-# Load credentials
-cfg = toml.load('secrets.toml')['mysql']
-password_encoded = quote_plus(cfg['password'])
-DB_URL = (
-    f"mysql+pymysql://{cfg['user']}:{password_encoded}"
-    f"@{cfg['host']}:{cfg['port']}/{cfg['database']}"
-)
+from modules.utils.db import cache_versions
+from modules.utils.observability.metrics import counter, register_engine
+from modules.utils.observability.tracing import traced
+from modules.utils.settings import get_section
 
+# Load credentials; [mysql] url = "sqlite:///..." replaces them for local runs
+cfg = get_section('mysql')
+if cfg.get('url'):
+    DB_URL = cfg['url']
+elif not cfg:
+    DB_URL = None   # set by the caller (e.g. backend.local) before first use
+else:
+    password_encoded = quote_plus(cfg['password'])
+    DB_URL = (
+        f"mysql+pymysql://{cfg['user']}:{password_encoded}"
+        f"@{cfg['host']}:{cfg['port']}/{cfg['database']}"
+    )
+
+cache_cfg = get_section('chat_sessions', page_size=20)
+
+CHAT_MESSAGES = counter("chat_messages_total", "Chat messages saved", ("role",))
+
+@lru_cache(maxsize=1)
 def _get_engine():
-    return create_engine(DB_URL)
+    engine = create_engine(DB_URL, pool_pre_ping=True)
+    register_engine("chat", engine)
+    return engine
 
-# 1) List sessions newest first
-def get_sessions(user_id: int) -> pd.DataFrame:
-    engine = _get_engine()
+
+class ChatSession(NamedTuple):
+    session_id: int
+    name: str
+    created_at: datetime
+    updated_at: datetime
+
+
+# Per-user session lists (newest first), tagged with the cache_versions
+# counter `sessions:<user_id>` they were loaded at. Every write bumps the
+# counter in its transaction and updates the list in place when nothing else
+# wrote in between, so sidebar reruns only read the counter; a mismatch
+# (a write from another process) reloads the list.
+_cache_lock = threading.Lock()
+_sessions: Dict[int, List[ChatSession]] = {}
+_versions: Dict[int, int] = {}
+
+
+def _scope(user_id: int) -> str:
+    return f"sessions:{int(user_id)}"
+
+
+def _cached_sessions(user_id: int, version: int) -> Optional[List[ChatSession]]:
+    with _cache_lock:
+        if _versions.get(user_id) == version:
+            return _sessions[user_id]
+    return None
+
+
+def _store_sessions(user_id: int, sessions: List[ChatSession], version: int):
+    with _cache_lock:
+        _sessions[user_id] = sessions
+        _versions[user_id] = version
+
+
+def _write_through(user_id: Optional[int], version: int, change: Callable[[List[ChatSession]], None]):
+    """
+    Apply `change` to the cached list after a write that bumped the user's
+    counter to `version`; forget the list if another write came in between.
+    """
+    if user_id is None:
+        return
+    with _cache_lock:
+        if user_id in _sessions and _versions.get(user_id) == version - 1:
+            change(_sessions[user_id])
+            _versions[user_id] = version
+        else:
+            _sessions.pop(user_id, None)
+            _versions.pop(user_id, None)
+
+
+def _replace(session_id: int, **changes) -> Callable[[List[ChatSession]], None]:
+    def change(rows: List[ChatSession]):
+        for i, row in enumerate(rows):
+            if row.session_id == session_id:
+                rows[i] = row._replace(**changes)
+    return change
+
+
+def _session_owner(conn, session_id: int) -> Optional[int]:
+    return conn.execute(
+        text("SELECT user_id FROM chat_sessions WHERE session_id = :sid"), {"sid": session_id}
+    ).scalar()
+
+
+def invalidate_sessions(user_id: Optional[int] = None):
+    """
+    Forget cached session lists (one user's, or everyone's).
+    """
+    with _cache_lock:
+        for uid in ([user_id] if user_id is not None else list(_sessions)):
+            _sessions.pop(uid, None)
+            _versions.pop(uid, None)
+
+
+@traced("chat.load_sessions")
+def _load_sessions(conn, user_id: int) -> List[ChatSession]:
     query = text("""
         SELECT session_id, name, created_at, updated_at
         FROM chat_sessions
         WHERE user_id = :uid
-        ORDER BY created_at DESC
+        ORDER BY created_at DESC, session_id DESC
     """
     )
-    return pd.read_sql(query, engine, params={"uid": user_id})
+    return [ChatSession(*row) for row in conn.execute(query, {"uid": user_id})]
+
+
+# 1) List sessions newest first
+def list_sessions(user_id: int) -> List[ChatSession]:
+    """
+    The user's sessions, newest first, from the cache when no process has
+    changed them since it was loaded.
+    """
+    with _get_engine().connect() as conn:
+        # Counter first: a write during the load makes the next call reload
+        version = cache_versions.read(_scope(user_id), conn)
+        sessions = _cached_sessions(user_id, version)
+        if sessions is None:
+            sessions = _load_sessions(conn, user_id)
+            _store_sessions(user_id, sessions, version)
+    return list(sessions)
+
+
+@traced("chat.get_sessions")
+def get_sessions(user_id: int) -> pd.DataFrame:
+    return pd.DataFrame(list_sessions(user_id), columns=list(ChatSession._fields))
 
 # 2) Create a new session
 # def create_session(user_id: int, name: str = None) -> int:
@@ -39,22 +154,31 @@ def get_sessions(user_id: int) -> pd.DataFrame:
 #         )
 #         return conn.execute(text("SELECT LAST_INSERT_ID()"))
     
+@traced("chat.create_session")
 def create_session(user_id: int, name: str = "New chat") -> int:
     """
     Create a new chat session for the user and return its session_id as an integer.
     """
     engine = _get_engine()
     with engine.begin() as conn:
-        conn.execute(
+        result = conn.execute(
             text("INSERT INTO chat_sessions (user_id, name) VALUES (:uid, :name)"),
             {"uid": user_id, "name": name}
         )
         # Ambil ID terakhir sebagai scalar int
-        session_id = conn.execute(text("SELECT LAST_INSERT_ID()")).scalar_one()
+        session_id = int(result.lastrowid)
+        created_at, updated_at = conn.execute(
+            text("SELECT created_at, updated_at FROM chat_sessions WHERE session_id = :sid"),
+            {"sid": session_id}
+        ).one()
+        version = cache_versions.bump(_scope(user_id), conn)
+    _write_through(user_id, version,
+                   lambda rows: rows.insert(0, ChatSession(session_id, name, created_at, updated_at)))
     return session_id
 
 
 # 3) Rename session (auto-updates updated_at)
+@traced("chat.rename_session")
 def rename_session(session_id: int, new_name: str) -> None:
     engine = _get_engine()
     with engine.begin() as conn:
@@ -62,14 +186,25 @@ def rename_session(session_id: int, new_name: str) -> None:
             text("UPDATE chat_sessions SET name = :name WHERE session_id = :sid"),
             {"name": new_name, "sid": session_id}
         )
+        user_id = _session_owner(conn, session_id)
+        version = cache_versions.bump(_scope(user_id), conn) if user_id is not None else 0
+    _write_through(user_id, version, _replace(session_id, name=new_name, updated_at=datetime.now()))
 
 # 4) Delete session + its history
+@traced("chat.delete_session")
 def delete_session(session_id: int) -> None:
     engine = _get_engine()
     with engine.begin() as conn:
+        user_id = _session_owner(conn, session_id)
         conn.execute(text("DELETE FROM chat_sessions WHERE session_id = :sid"), {"sid": session_id})
+        version = cache_versions.bump(_scope(user_id), conn) if user_id is not None else 0
+
+    def drop(rows: List[ChatSession]):
+        rows[:] = [r for r in rows if r.session_id != session_id]
+    _write_through(user_id, version, drop)
 
 # 5) Fetch chat history (chronological)
+@traced("chat.get_chat_history")
 def get_chat_history(session_id: int) -> pd.DataFrame:
     engine = _get_engine()
     query = text("""
@@ -82,6 +217,7 @@ def get_chat_history(session_id: int) -> pd.DataFrame:
     return pd.read_sql(query, engine, params={"sid": session_id})
 
 # 6) Insert a chat message
+@traced("chat.push_chat_message")
 def push_chat_message(session_id: int, role: str, message: str) -> None:
     engine = _get_engine()
     with engine.begin() as conn:
@@ -92,6 +228,15 @@ def push_chat_message(session_id: int, role: str, message: str) -> None:
             """),
             {"sid": session_id, "role": role, "msg": message}
         )
+        # A new message counts as activity on the session
+        conn.execute(
+            text("UPDATE chat_sessions SET updated_at = CURRENT_TIMESTAMP WHERE session_id = :sid"),
+            {"sid": session_id}
+        )
+        user_id = _session_owner(conn, session_id)
+        version = cache_versions.bump(_scope(user_id), conn) if user_id is not None else 0
+    CHAT_MESSAGES.inc(role=role)
+    _write_through(user_id, version, _replace(session_id, updated_at=datetime.now()))
 
 
 # # Load MySQL connection parameters
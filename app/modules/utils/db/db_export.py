@@ -0,0 +1,242 @@
+# modules/utils/db/db_export.py
+"""
+Streaming columnar export of health tables and chat history.
+
+Rows are read through a server-side cursor (stream_results, an unbuffered
+SSCursor on pymysql) in batches of `batch_rows`, and each batch is written as
+one Parquet row group or Arrow IPC record batch. At most one batch is held in
+memory at a time, however large the tenant. Rows come out in primary-key
+order with fixed Arrow schemas, so exports of different dialects or runs
+line up.
+
+Date filters are inclusive and apply to event_time (food, water), date
+(sleep, steps) and created_at (chat messages); users and chat sessions are
+exported whole.
+"""
+import json
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+from sqlalchemy import text
+
+from modules.utils.db.db_utils_mysql import get_engine
+from modules.utils.settings import get_section
+
+cfg = get_section(
+    'export',
+    batch_rows=50_000,          # rows per cursor fetch and per row group
+    compression='zstd',
+)
+
+
+class ExportTable(NamedTuple):
+    sql: str                    # SELECT ... FROM ... without WHERE / ORDER BY
+    user_col: str
+    date_col: Optional[str]     # column the date filter applies to
+    date_is_day: bool           # DATE column (vs DATETIME)
+    order_by: str
+    schema: pa.Schema
+
+
+TABLES: Dict[str, ExportTable] = {
+    'users': ExportTable(
+        "SELECT user_id, username FROM users", 'user_id', None, False, 'user_id',
+        pa.schema([('user_id', pa.int64()), ('username', pa.string())])),
+    'food_intake': ExportTable(
+        "SELECT id, user_id, event_time, food_name, amount, calories, items FROM food_intake",
+        'user_id', 'event_time', False, 'id',
+        pa.schema([('id', pa.int64()), ('user_id', pa.int64()), ('event_time', pa.timestamp('s')),
+                   ('food_name', pa.string()), ('amount', pa.float64()), ('calories', pa.float64()),
+                   ('items', pa.int64())])),
+    'water_intake': ExportTable(
+        "SELECT id, user_id, event_time, amount FROM water_intake",
+        'user_id', 'event_time', False, 'id',
+        pa.schema([('id', pa.int64()), ('user_id', pa.int64()), ('event_time', pa.timestamp('s')),
+                   ('amount', pa.float64())])),
+    'sleep_hours': ExportTable(
+        "SELECT id, user_id, date, total_sleep_h FROM sleep_hours",
+        'user_id', 'date', True, 'id',
+        pa.schema([('id', pa.int64()), ('user_id', pa.int64()), ('date', pa.date32()),
+                   ('total_sleep_h', pa.float64())])),
+    'step_count': ExportTable(
+        "SELECT id, user_id, date, total_steps FROM step_count",
+        'user_id', 'date', True, 'id',
+        pa.schema([('id', pa.int64()), ('user_id', pa.int64()), ('date', pa.date32()),
+                   ('total_steps', pa.int64())])),
+    'chat_sessions': ExportTable(
+        "SELECT session_id, user_id, name, created_at, updated_at FROM chat_sessions",
+        'user_id', None, False, 'session_id',
+        pa.schema([('session_id', pa.int64()), ('user_id', pa.int64()), ('name', pa.string()),
+                   ('created_at', pa.timestamp('s')), ('updated_at', pa.timestamp('s'))])),
+    'chat_history': ExportTable(
+        "SELECT h.history_id, h.session_id, s.user_id, h.role, h.message, h.created_at "
+        "FROM chat_history h JOIN chat_sessions s ON s.session_id = h.session_id",
+        's.user_id', 'h.created_at', False, 'h.history_id',
+        pa.schema([('history_id', pa.int64()), ('session_id', pa.int64()), ('user_id', pa.int64()),
+                   ('role', pa.string()), ('message', pa.string()), ('created_at', pa.timestamp('s'))])),
+}
+
+FORMATS = {'parquet': '.parquet', 'arrow': '.arrow'}
+
+
+def _query(table: str, user_id: Optional[int], start: Optional[date], end: Optional[date]):
+    spec = TABLES[table]
+    where, params = [], {}
+    if user_id is not None:
+        where.append(f"{spec.user_col} = :uid")
+        params['uid'] = user_id
+    if spec.date_col and start:
+        where.append(f"{spec.date_col} >= :start")
+        params['start'] = start
+    if spec.date_col and end:
+        # Inclusive end day; DATETIME columns compare against the next midnight
+        where.append(f"{spec.date_col} {'<=' if spec.date_is_day else '<'} :end")
+        params['end'] = end if spec.date_is_day else end + timedelta(days=1)
+    sql = spec.sql + (" WHERE " + " AND ".join(where) if where else "") + f" ORDER BY {spec.order_by}"
+    return text(sql), params
+
+
+def _to_batch(rows: List[tuple], schema: pa.Schema) -> pa.RecordBatch:
+    df = pd.DataFrame(rows, columns=schema.names)
+    # Dialects differ (SQLite returns strings): coerce to the schema's types
+    for field in schema:
+        if pa.types.is_timestamp(field.type):
+            df[field.name] = pd.to_datetime(df[field.name])
+        elif pa.types.is_date(field.type):
+            df[field.name] = pd.to_datetime(df[field.name]).dt.date
+    return pa.RecordBatch.from_pandas(df, schema=schema, preserve_index=False)
+
+
+def iter_batches(
+    db_url: str,
+    table: str,
+    user_id: Optional[int] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    batch_rows: Optional[int] = None,
+) -> Iterator[pa.RecordBatch]:
+    """
+    Record batches of `table` (optionally one user's rows in a date range),
+    read through a server-side cursor.
+    """
+    if table not in TABLES:
+        raise ValueError(f"unknown table {table!r}; expected one of {', '.join(TABLES)}")
+    size = int(batch_rows or cfg['batch_rows'])
+    sql, params = _query(table, user_id, start, end)
+    with get_engine(db_url).connect() as conn:
+        result = conn.execution_options(stream_results=True, max_row_buffer=size).execute(sql, params)
+        for rows in result.partitions(size):
+            yield _to_batch(rows, TABLES[table].schema)
+
+
+def _open_writer(sink, schema: pa.Schema, fmt: str):
+    if fmt == 'parquet':
+        return pq.ParquetWriter(sink, schema, compression=cfg['compression'])
+    if fmt == 'arrow':
+        return ipc.new_stream(sink, schema, options=ipc.IpcWriteOptions(compression=cfg['compression']))
+    raise ValueError(f"unknown format {fmt!r}; expected one of {', '.join(FORMATS)}")
+
+
+def _write(writer, batch: pa.RecordBatch):
+    # One row group per batch for Parquet, one IPC message for Arrow
+    if isinstance(writer, pq.ParquetWriter):
+        writer.write_batch(batch, row_group_size=batch.num_rows)
+    else:
+        writer.write_batch(batch)
+
+
+def write_batches(batches: Iterable[pa.RecordBatch], schema: pa.Schema, sink, fmt: str = 'parquet') -> int:
+    """
+    Write batches to a path or binary file object. Returns the number of rows.
+    """
+    n = 0
+    with _open_writer(sink, schema, fmt) as writer:
+        for batch in batches:
+            _write(writer, batch)
+            n += batch.num_rows
+    return n
+
+
+class _Chunks:
+    # Write-only file object whose bytes are handed on after every batch
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self.closed = False
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        out, self._parts = b"".join(self._parts), []
+        return out
+
+
+def stream_table(
+    db_url: str,
+    table: str,
+    user_id: Optional[int] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    fmt: str = 'parquet',
+) -> Iterator[bytes]:
+    """
+    The file bytes of one exported table, yielded batch by batch (for HTTP
+    streaming); the Parquet footer comes last.
+    """
+    batches = iter_batches(db_url, table, user_id, start, end)
+    sink = _Chunks()
+    with _open_writer(sink, TABLES[table].schema, fmt) as writer:
+        for batch in batches:
+            _write(writer, batch)
+            data = sink.drain()
+            if data:
+                yield data
+    tail = sink.drain()
+    if tail:
+        yield tail
+
+
+def export_tables(
+    db_url: str,
+    out_dir: Path,
+    tables: Optional[Iterable[str]] = None,
+    user_id: Optional[int] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    fmt: str = 'parquet',
+) -> Dict[str, int]:
+    """
+    Export tables to out_dir/<table>.parquet|.arrow plus a manifest.json.
+    Returns the row count per table.
+    """
+    tables = list(tables or TABLES)
+    unknown = [t for t in tables if t not in TABLES]
+    if unknown or fmt not in FORMATS:
+        raise ValueError(f"unknown table(s) {unknown} or format {fmt!r}")
+    out_dir.mkdir(parents=True, exist_ok=True)
+    counts = {}
+    for table in tables:
+        path = out_dir / f"{table}{FORMATS[fmt]}"
+        tmp = path.with_name(path.name + ".part")
+        counts[table] = write_batches(iter_batches(db_url, table, user_id, start, end),
+                                      TABLES[table].schema, str(tmp), fmt)
+        tmp.replace(path)
+    manifest = {
+        'format': fmt, 'user_id': user_id,
+        'start': start.isoformat() if start else None, 'end': end.isoformat() if end else None,
+        'rows': counts,
+    }
+    (out_dir / "manifest.json").write_text(json.dumps(manifest, indent=2), encoding='utf-8')
+    return counts
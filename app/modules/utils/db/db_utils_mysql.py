@@ -1,11 +1,23 @@
 # db_utils_mysql.py
 
 import pandas as pd
+from datetime import date, timedelta
+from functools import lru_cache
 from sqlalchemy import create_engine, text
-from typing import Dict
+from typing import Callable, Dict, Optional, Tuple
 
+from modules.utils.analytics import trends
+from modules.utils.cache.answer_cache import bump_data_version
+from modules.utils.db.user_directory import invalidate_users
+from modules.utils.observability.metrics import INGEST_ROWS, register_engine
+from modules.utils.observability.tracing import traced
+
+@lru_cache(maxsize=None)
 def get_engine(db_url: str):
-    return create_engine(db_url)
+    # One pooled engine per URL instead of a new one (and new connections) per call
+    engine = create_engine(db_url, pool_pre_ping=True)
+    register_engine("data", engine)
+    return engine
 
 
 def get_existing_users(db_url: str) -> pd.DataFrame:
@@ -38,26 +50,49 @@ def get_user_data_from_mysql(user_id: int, db_url: str) -> Dict[str, pd.DataFram
     return data
 
 
+def day_span(df: pd.DataFrame) -> Optional[Tuple[date, date]]:
+    """
+    (first day, day after the last) of a cleaned frame's 'date' column.
+    """
+    if df is None or df.empty or 'date' not in df:
+        return None
+    days = pd.to_datetime(df['date']).dropna()
+    if days.empty:
+        return None
+    return days.min().date(), days.max().date() + timedelta(days=1)
+
+
+@traced("mysql.push_user_data")
 def push_user_data_mysql(
     username: str,
     df_food: pd.DataFrame,
     df_water: pd.DataFrame,
     df_sleep: pd.DataFrame,
     df_steps: pd.DataFrame,
-    db_url: str
+    db_url: str,
+    checkpoint: Optional[Callable] = None
 ) -> int:
     """
     Insert user and associated health data into MySQL.
     Returns the assigned user_id.
+    Each table's rows for the days an uploaded frame covers are replaced, in
+    the same transaction, so pushing the same export again (a retry, a rerun,
+    or a newer export overlapping an older one) leaves a single copy.
+    `checkpoint(conn, user_id)`, if given, runs inside the same transaction
+    (background ingest jobs record their progress with it).
     """
     engine = get_engine(db_url)
 
     with engine.begin() as conn:
         # 1) Upsert user
-        conn.execute(
-            text("INSERT IGNORE INTO users (username) VALUES (:u)"),
+        # SQLite (local backend runs) spells INSERT IGNORE differently
+        insert_ignore = "INSERT OR IGNORE" if conn.dialect.name == "sqlite" else "INSERT IGNORE"
+        created = conn.execute(
+            text(f"{insert_ignore} INTO users (username) VALUES (:u)"),
             {"u": username}
-        )
+        ).rowcount == 1
+        if created:
+            invalidate_users(conn)
 
         # 2) Retrieve user_id
         result = conn.execute(
@@ -66,7 +101,17 @@ def push_user_data_mysql(
         )
         user_id = result.scalar_one()
 
-        # 3) Insert food_intake
+        # 3) Drop stored rows of the uploaded days
+        for tbl, col, df in (('food_intake', 'event_time', df_food), ('water_intake', 'event_time', df_water),
+                             ('sleep_hours', 'date', df_sleep), ('step_count', 'date', df_steps)):
+            span = day_span(df)
+            if span is not None:
+                conn.execute(
+                    text(f"DELETE FROM {tbl} WHERE user_id = :uid AND {col} >= :start AND {col} < :end"),
+                    {"uid": user_id, "start": span[0], "end": span[1]}
+                )
+
+        # 4) Insert food_intake
         for _, row in df_food.iterrows():
             conn.execute(
                 text(
@@ -81,7 +126,7 @@ def push_user_data_mysql(
                 }
             )
 
-        # 4) Insert water_intake
+        # 5) Insert water_intake
         for _, row in df_water.iterrows():
             conn.execute(
                 text(
@@ -94,7 +139,7 @@ def push_user_data_mysql(
                 }
             )
 
-        # 5) Insert sleep_hours
+        # 6) Insert sleep_hours
         for _, row in df_sleep.iterrows():
             conn.execute(
                 text(
@@ -107,7 +152,7 @@ def push_user_data_mysql(
                 }
             )
 
-        # 6) Insert step_count
+        # 7) Insert step_count
         for _, row in df_steps.iterrows():
             conn.execute(
                 text(
@@ -120,9 +165,24 @@ def push_user_data_mysql(
                 }
             )
 
+        if checkpoint is not None:
+            checkpoint(conn, user_id)
+
+    for kind, df in (('food', df_food), ('water', df_water), ('sleep', df_sleep), ('steps', df_steps)):
+        INGEST_ROWS.inc(len(df), store="mysql", kind=kind)
+
+    # Precomputed trends for the assistant, from the first day this upload touched
+    try:
+        trends.refresh(engine, user_id, trends.first_day(df_food, df_water, df_sleep, df_steps))
+    except Exception as e:
+        print(f"[Trends] Refresh failed for user_id={user_id}: {e}")
+
+    # New data invalidates cached assistant answers for this user
+    bump_data_version(user_id)
     return user_id
 
 
+@traced("mysql.delete_user")
 def delete_user_data_mysql(user_id: int, db_url: str):
     """
     Delete a user and all associated records by user_id.
@@ -139,3 +199,5 @@ def delete_user_data_mysql(user_id: int, db_url: str):
             text("DELETE FROM users WHERE user_id = :uid"),
             {"uid": user_id}
         )
+        invalidate_users(conn)
+    bump_data_version(user_id)
@@ -3,6 +3,12 @@ import toml
 from neo4j import GraphDatabase
 import pandas as pd
 
+from modules.utils.cache.answer_cache import bump_data_version
+from modules.utils.db.db_utils_mysql import day_span
+from modules.utils.observability.metrics import INGEST_ROWS, counter, gauge
+from modules.utils.observability.tracing import traced
+from modules.utils.retrieval.vector_index import index_user_data, delete_user_vectors
+
 # Load Neo4j credentials from secrets.toml
 cfg = toml.load('secrets.toml').get('neo4j', {})
 URI = cfg.get('uri') or cfg.get('NEO4J_URI')
@@ -14,6 +20,32 @@ if not all([URI, USER, PASS]):
 # Initialize driver
 driver = GraphDatabase.driver(URI, auth=(USER, PASS))
 
+NEO4J_TX = counter("neo4j_transactions_total", "Neo4j write transactions", ("op", "status"))
+NEO4J_SESSIONS = gauge("neo4j_sessions_in_use", "Open Neo4j driver sessions from ingestion")
+
+
+def _execute_write(session, op: str, fn, *args):
+    try:
+        result = session.execute_write(fn, *args)
+    except Exception:
+        NEO4J_TX.inc(op=op, status="error")
+        raise
+    NEO4J_TX.inc(op=op, status="ok")
+    return result
+
+# Indexes that let assistant queries anchor on a user instead of scanning
+# labels (the Cypher cost guard rejects label scans on measurement nodes)
+INDEXES = [
+    "CREATE INDEX user_user_id IF NOT EXISTS FOR (u:User) ON (u.user_id)",
+    "CREATE INDEX user_username IF NOT EXISTS FOR (u:User) ON (u.username)",
+]
+
+
+def ensure_indexes(session):
+    for statement in INDEXES:
+        session.run(statement)
+
+
 # Transaction functions
 
 def create_user_node(tx, user_id: int, username: str):
@@ -26,7 +58,8 @@ def create_user_node(tx, user_id: int, username: str):
     )
 
 
-def ingest_food_tx(tx, user_id: int, date: str, food_name: str, amount, calories):
+def ingest_food_tx(tx, user_id: int, date: str, food_name: str, amount, calories, items=None):
+    # `items` is only set on compacted rows (see backend/retention.py)
     tx.run(
         """
         MATCH (u:User {user_id: $uid})
@@ -34,7 +67,8 @@ def ingest_food_tx(tx, user_id: int, date: str, food_name: str, amount, calories
             name: $food_name,
             amount: toInteger($amount),
             calories: toFloat($calories),
-            recordedOn: date($date)
+            recordedOn: date($date),
+            items: toInteger($items)
         })
         CREATE (u)-[:HAS_ATE]->(f)
         """,
@@ -42,7 +76,59 @@ def ingest_food_tx(tx, user_id: int, date: str, food_name: str, amount, calories
         food_name=food_name,
         amount=amount,
         calories=calories,
-        date=date
+        date=date,
+        items=items
+    )
+
+
+def replace_food_days_tx(tx, user_id: int, days: list, rows: list):
+    tx.run(
+        """
+        MATCH (u:User {user_id: $uid})-[:HAS_ATE]->(f:Food)
+        WHERE f.recordedOn IN [d IN $days | date(d)]
+        DETACH DELETE f
+        """,
+        uid=user_id,
+        days=days
+    )
+    tx.run(
+        """
+        MATCH (u:User {user_id: $uid})
+        UNWIND $rows AS row
+        CREATE (f:Food:HealthData {
+            name: row.food_name,
+            amount: toInteger(row.amount),
+            calories: toFloat(row.calories),
+            recordedOn: date(row.date),
+            items: toInteger(row.items)
+        })
+        CREATE (u)-[:HAS_ATE]->(f)
+        """,
+        uid=user_id,
+        rows=rows
+    )
+
+
+# frame -> (relationship, label) of its measurement nodes
+NODE_KINDS = {
+    'food': ('HAS_ATE', 'Food'),
+    'water': ('HAS_DRUNK', 'Water'),
+    'steps': ('HAS_WALKED', 'Step'),
+    'sleep': ('HAS_SLEPT', 'Sleep'),
+}
+
+
+def delete_days_tx(tx, user_id: int, rel: str, label: str, start: str, end: str):
+    # A user's `label` nodes recorded on days start <= day < end
+    tx.run(
+        f"""
+        MATCH (u:User {{user_id: $uid}})-[:{rel}]->(n:{label})
+        WHERE n.recordedOn >= date($start) AND n.recordedOn < date($end)
+        DETACH DELETE n
+        """,
+        uid=user_id,
+        start=start,
+        end=end
     )
 
 
@@ -97,6 +183,13 @@ def ingest_sleep_tx(tx, user_id: int, date: str, total_sleep_h):
     )
 
 
+def _items(row: dict):
+    # Raw rows (items == 1 or no column) get no `items` property
+    items = row.get('items')
+    return int(items) if items is not None and not pd.isna(items) and items > 1 else None
+
+
+@traced("neo4j.ingest")
 def ingest_user_data_to_neo4j(
     user_id: int,
     username: str,
@@ -107,7 +200,9 @@ def ingest_user_data_to_neo4j(
 ):
     """
     Ingest a user's data frames into Neo4j.
-    User node is merged or created.
+    User node is merged or created. Like push_user_data_mysql, each frame
+    replaces the user's nodes on the days it spans, so re-uploading an
+    overlapping export does not duplicate them.
     """
     # Ensure date columns are strings in 'YYYY-MM-DD'
     dfs = {'food': df_food, 'water': df_water, 'steps': df_steps, 'sleep': df_sleep}
@@ -116,52 +211,101 @@ def ingest_user_data_to_neo4j(
             raise KeyError(f"DataFrame for {name} missing 'date' column")
         df['date'] = pd.to_datetime(df['date']).dt.strftime('%Y-%m-%d')
 
-    with driver.session() as session:
+    with NEO4J_SESSIONS.track(), driver.session() as session:
+        ensure_indexes(session)
+
         # Create/merge user node
-        session.execute_write(create_user_node, user_id, username)
+        _execute_write(session, "user", create_user_node, user_id, username)
+
+        # Drop the nodes the upload replaces
+        for name, df in dfs.items():
+            span = day_span(df)
+            if span is not None:
+                rel, label = NODE_KINDS[name]
+                _execute_write(session, "replace_days", delete_days_tx,
+                               user_id, rel, label, span[0].isoformat(), span[1].isoformat())
 
         # Ingest each category
         for row in df_food.to_dict('records'):
-            session.execute_write(
-                ingest_food_tx,
+            _execute_write(
+                session, "food", ingest_food_tx,
                 user_id,
                 row['date'],
                 row.get('food_name'),
                 row.get('amount'),
-                row.get('calories')
+                row.get('calories'),
+                _items(row)
             )
         for row in df_water.to_dict('records'):
-            session.execute_write(
-                ingest_water_tx,
+            _execute_write(
+                session, "water", ingest_water_tx,
                 user_id,
                 row['date'],
                 row.get('total_water_ml')
             )
         for row in df_steps.to_dict('records'):
-            session.execute_write(
-                ingest_steps_tx,
+            _execute_write(
+                session, "steps", ingest_steps_tx,
                 user_id,
                 row['date'],
                 row.get('total_steps')
             )
         for row in df_sleep.to_dict('records'):
-            session.execute_write(
-                ingest_sleep_tx,
+            _execute_write(
+                session, "sleep", ingest_sleep_tx,
                 user_id,
                 row['date'],
                 row.get('total_sleep_h')
             )
 
+    for kind, df in dfs.items():
+        INGEST_ROWS.inc(len(df), store="neo4j", kind=kind)
+
+    # Per-day / per-food documents for the vector retrieval path
+    try:
+        n_docs = index_user_data(user_id, username, df_food, df_water, df_steps, df_sleep)
+        print(f"[Vector] Indexed {n_docs} documents for user_id={user_id}")
+    except Exception as e:
+        print(f"[Vector] Indexing failed for user_id={user_id}: {e}")
 
+    # Graph changed: cached assistant answers for this user are stale
+    bump_data_version(user_id)
+
+
+@traced("neo4j.delete_user")
 def delete_user_data_neo4j(user_id: int):
     """
-    Delete a user node and all its HealthData relationships in Neo4j.
+    Delete a user node and all its HealthData nodes in Neo4j.
     """
-    with driver.session() as session:
-        # Detach delete removes node and its relationships
+    rels = "|".join(rel for rel, _ in NODE_KINDS.values())
+    with NEO4J_SESSIONS.track(), driver.session() as session:
+        # Measurement nodes first, in batches: deleting only the User node
+        # would leave them behind without a relationship
+        session.run(
+            f"""
+            MATCH (u:User {{user_id: $uid}})-[:{rels}]->(n:HealthData)
+            CALL {{ WITH n DETACH DELETE n }} IN TRANSACTIONS OF 10000 ROWS
+            """,
+            uid=user_id
+        )
         session.run(
             "MATCH (u:User {user_id: $uid}) DETACH DELETE u",
             uid=user_id
         )
+    delete_user_vectors(user_id)
+    bump_data_version(user_id)
 
     print(f"[Neo4j] Deleted user and related data for user_id={user_id}")
+
+
+@traced("neo4j.replace_food_days")
+def replace_food_days(user_id: int, days: list, df_food: pd.DataFrame):
+    """
+    Replace a user's Food nodes on `days` ('YYYY-MM-DD') with the rows of
+    df_food (date, food_name, amount, calories, items) in one transaction.
+    """
+    df = df_food.assign(date=pd.to_datetime(df_food['date']).dt.strftime('%Y-%m-%d'))
+    rows = df.astype(object).where(df.notna(), None).to_dict('records')
+    with NEO4J_SESSIONS.track(), driver.session() as session:
+        _execute_write(session, "food_compaction", replace_food_days_tx, user_id, list(days), rows)
+    bump_data_version(user_id)
@@ -0,0 +1,209 @@
+# modules/utils/db/retention.py
+"""
+Retention for food_intake: raw rows older than `keep_months` are compacted
+into per-day aggregates. For every compacted day each of the `top_k` foods
+with the most calories keeps one row (summed amount and calories, `items` =
+number of logged rows it stands for) and the rest are folded into a single
+OTHER_FOODS row, so daily and monthly totals are unchanged while the row
+count per day is bounded.
+
+Aggregate rows are marked `compacted = 1`. A day is pending while it has
+unmarked (raw) rows before the cutoff, so rows stored for an already
+compacted day later on (a re-upload, a late sync) are merged into its
+aggregates on the next run; OTHER_FOODS is never ranked as a food, which
+makes re-aggregating aggregates a no-op.
+
+Days are compacted `days_per_tx` at a time, one transaction each, and
+recorded in `food_compaction` together with whether the graph copy has been
+replaced as well (graph_done). The graph side lives in backend/retention.py.
+"""
+from datetime import date, datetime, timedelta, timezone
+from typing import List, NamedTuple
+
+import pandas as pd
+from sqlalchemy import inspect, text
+
+from modules.utils.db.db_utils_mysql import get_engine
+from modules.utils.settings import get_section
+
+cfg = get_section(
+    'retention',
+    keep_months=6,          # raw food rows newer than this are never touched
+    top_k=5,                # foods kept by name per compacted day
+    days_per_tx=31,         # days compacted per MySQL transaction / graph write
+)
+
+OTHER_FOODS = "(other foods)"
+
+FOOD_COLUMNS = ['date', 'food_name', 'amount', 'calories', 'items']
+
+
+class PendingDay(NamedTuple):
+    day: date
+    rows: int               # all stored rows, aggregates of an earlier run included
+    raw_rows: int           # rows not compacted yet
+    foods: int              # distinct food names
+
+
+def cutoff(keep_months: int, today: date = None) -> date:
+    """
+    First day that is kept raw.
+    """
+    return (pd.Timestamp(today or date.today()) - pd.DateOffset(months=int(keep_months))).date()
+
+
+def ensure_schema(db_url: str):
+    """
+    Add food_intake.items and .compacted, the (user_id, event_time) index
+    and the food_compaction table to databases created before retention
+    existed. Aggregates written before `compacted` existed count as raw and
+    are re-aggregated once, to the same rows.
+    """
+    engine = get_engine(db_url)
+    insp = inspect(engine)
+    columns = {c['name'] for c in insp.get_columns('food_intake')}
+    indexes = {i['name'] for i in insp.get_indexes('food_intake')}
+    with engine.begin() as conn:
+        if 'items' not in columns:
+            conn.execute(text("ALTER TABLE food_intake ADD COLUMN items INT NOT NULL DEFAULT 1"))
+        if 'compacted' not in columns:
+            conn.execute(text("ALTER TABLE food_intake ADD COLUMN compacted TINYINT NOT NULL DEFAULT 0"))
+        if 'idx_user_time' not in indexes:
+            conn.execute(text("CREATE INDEX idx_user_time ON food_intake (user_id, event_time)"))
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS food_compaction ("
+            " user_id INT NOT NULL, day DATE NOT NULL, raw_rows INT NOT NULL, kept_rows INT NOT NULL,"
+            " graph_done INT NOT NULL DEFAULT 0, compacted_at DATETIME NOT NULL,"
+            " PRIMARY KEY (user_id, day))"
+        ))
+
+
+def _day(value) -> date:
+    # DATE() is a date on MySQL and a string on SQLite
+    return pd.Timestamp(value).date()
+
+
+def pending_days(db_url: str, user_id: int, before: date) -> List[PendingDay]:
+    """
+    Days before `before` with raw food rows, whether or not the day was
+    compacted before (food_compaction is not consulted).
+    """
+    with get_engine(db_url).connect() as conn:
+        rows = conn.execute(text(
+            "SELECT DATE(event_time) AS day, COUNT(*), SUM(1 - compacted), COUNT(DISTINCT food_name) "
+            "FROM food_intake WHERE user_id = :uid AND event_time < :before "
+            "GROUP BY DATE(event_time) HAVING SUM(1 - compacted) > 0 ORDER BY day"
+        ), {"uid": user_id, "before": before}).all()
+    return [PendingDay(_day(d), int(n), int(r), int(k)) for d, n, r, k in rows]
+
+
+def kept_rows(day: PendingDay, top_k: int) -> int:
+    # Rows a day has after compaction (an existing OTHER_FOODS row counts as a food)
+    return min(day.foods, top_k) + (day.foods > top_k)
+
+
+def aggregate(food: pd.DataFrame, top_k: int) -> pd.DataFrame:
+    """
+    Per-day aggregates of raw food rows (date, food_name, amount, calories,
+    items): the top_k foods by calories (then items), plus OTHER_FOODS.
+    Existing OTHER_FOODS rows (earlier aggregates) always go to OTHER_FOODS.
+    """
+    grouped = food.groupby(['date', 'food_name'], as_index=False).agg(
+        amount=('amount', lambda s: s.sum(min_count=1)),
+        calories=('calories', lambda s: s.sum(min_count=1)),
+        items=('items', 'sum'),
+    )
+    grouped = grouped.sort_values(['date', 'calories', 'items', 'food_name'],
+                                  ascending=[True, False, False, True], na_position='last')
+    named = grouped[grouped['food_name'] != OTHER_FOODS]
+    rank = named.groupby('date').cumcount()
+    kept = named[rank < top_k]
+    rest = pd.concat([named[rank >= top_k], grouped[grouped['food_name'] == OTHER_FOODS]])
+    other = rest.groupby('date', as_index=False).agg(
+        amount=('amount', lambda s: s.sum(min_count=1)),
+        calories=('calories', lambda s: s.sum(min_count=1)),
+        items=('items', 'sum'),
+    ).assign(food_name=OTHER_FOODS)
+    out = pd.concat([kept, other], ignore_index=True)[FOOD_COLUMNS]
+    return out.sort_values(['date', 'food_name'], ignore_index=True)
+
+
+def compact_days(db_url: str, user_id: int, days: List[date], top_k: int) -> pd.DataFrame:
+    """
+    Replace the food rows of `days` (raw rows and any earlier aggregates)
+    with their aggregates in one transaction and record the days in
+    food_compaction. Returns the new rows.
+    """
+    start, end = min(days), max(days) + timedelta(days=1)
+    wanted = set(days)
+    now = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+    with get_engine(db_url).begin() as conn:
+        raw = pd.DataFrame(conn.execute(text(
+            "SELECT event_time, food_name, amount, calories, items FROM food_intake "
+            "WHERE user_id = :uid AND event_time >= :start AND event_time < :end"
+        ), {"uid": user_id, "start": start, "end": end}).all(),
+            columns=['event_time', 'food_name', 'amount', 'calories', 'items'])
+        raw['date'] = pd.to_datetime(raw['event_time']).dt.date
+        raw = raw[raw['date'].isin(wanted)]
+        compacted = aggregate(raw, top_k)
+
+        conn.execute(
+            text("DELETE FROM food_intake WHERE user_id = :uid AND event_time >= :d AND event_time < :next"),
+            [{"uid": user_id, "d": d, "next": d + timedelta(days=1)} for d in sorted(wanted)]
+        )
+        if not compacted.empty:
+            conn.execute(
+                text("INSERT INTO food_intake (user_id, event_time, food_name, amount, calories, items, compacted) "
+                     "VALUES (:uid, :t, :f, :a, :c, :n, 1)"),
+                [{"uid": user_id, "t": r.date, "f": r.food_name,
+                  "a": None if pd.isna(r.amount) else float(r.amount),
+                  "c": None if pd.isna(r.calories) else float(r.calories),
+                  "n": int(r.items)} for r in compacted.itertuples()]
+            )
+        # raw_rows: logged rows the day's aggregates stand for, over all runs
+        raw_counts = raw.groupby('date')['items'].sum()
+        kept_counts = compacted.groupby('date').size()
+        conn.execute(
+            text("DELETE FROM food_compaction WHERE user_id = :uid AND day = :d"),
+            [{"uid": user_id, "d": d} for d in sorted(wanted)]
+        )
+        conn.execute(
+            text("INSERT INTO food_compaction (user_id, day, raw_rows, kept_rows, graph_done, compacted_at) "
+                 "VALUES (:uid, :d, :raw, :kept, 0, :now)"),
+            [{"uid": user_id, "d": d, "raw": int(raw_counts.get(d, 0)), "kept": int(kept_counts.get(d, 0)),
+              "now": now} for d in sorted(wanted)]
+        )
+    return compacted
+
+
+def graph_pending(db_url: str, user_id: int) -> List[date]:
+    """
+    Compacted days whose graph copy still holds the raw rows.
+    """
+    with get_engine(db_url).connect() as conn:
+        rows = conn.execute(text(
+            "SELECT day FROM food_compaction WHERE user_id = :uid AND graph_done = 0 ORDER BY day"
+        ), {"uid": user_id}).scalars().all()
+    return [_day(d) for d in rows]
+
+
+def compacted_rows(db_url: str, user_id: int, days: List[date]) -> pd.DataFrame:
+    """
+    The stored (compacted) food rows of `days`, for redoing their graph copy.
+    """
+    with get_engine(db_url).connect() as conn:
+        rows = conn.execute(text(
+            "SELECT event_time, food_name, amount, calories, items FROM food_intake "
+            "WHERE user_id = :uid AND event_time >= :start AND event_time < :end"
+        ), {"uid": user_id, "start": min(days), "end": max(days) + timedelta(days=1)}).all()
+    df = pd.DataFrame(rows, columns=['event_time', 'food_name', 'amount', 'calories', 'items'])
+    df['date'] = pd.to_datetime(df['event_time']).dt.date
+    return df[df['date'].isin(set(days))][FOOD_COLUMNS].reset_index(drop=True)
+
+
+def mark_graph_done(db_url: str, user_id: int, days: List[date]):
+    with get_engine(db_url).begin() as conn:
+        conn.execute(
+            text("UPDATE food_compaction SET graph_done = 1 WHERE user_id = :uid AND day = :d"),
+            [{"uid": user_id, "d": d} for d in days]
+        )
@@ -0,0 +1,113 @@
+# modules/utils/db/user_directory.py
+"""
+Cached, searchable user directory for the sidebar.
+
+The users table is read once into a process-wide snapshot sorted by
+lowercased username, so prefix search is two binary searches and a page is a
+list slice, whatever the number of users. Creating or deleting a user
+(push_user_data_mysql / delete_user_data_mysql) bumps the `users` counter in
+cache_versions within the same transaction; every read compares the counter
+with the snapshot's, so all backend workers see the change on their next
+read.
+"""
+import threading
+from bisect import bisect_left
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from modules.utils.db import cache_versions
+from modules.utils.settings import get_section
+
+cfg = get_section(
+    'user_directory',
+    page_size=50,
+)
+
+
+class UserPage(NamedTuple):
+    users: List[Tuple[int, str]]   # (user_id, username) on this page
+    total: int                     # matches across all pages
+    page: int
+    pages: int
+
+
+class UserDirectory:
+    """
+    Immutable snapshot of (user_id, username) pairs with a prefix index.
+    """
+
+    def __init__(self, rows: List[Tuple[int, str]]):
+        rows = sorted(rows, key=lambda r: (r[1].lower(), r[1]))
+        self._keys = [name.lower() for _, name in rows]
+        self._rows = [(int(uid), name) for uid, name in rows]
+        self._by_id: Dict[int, str] = dict(self._rows)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def username(self, user_id: int) -> Optional[str]:
+        return self._by_id.get(int(user_id))
+
+    def search(self, prefix: str = "", page: int = 0, page_size: Optional[int] = None) -> UserPage:
+        """
+        Users whose name starts with `prefix` (case-insensitive), one page at a time.
+        """
+        size = max(1, int(page_size or cfg['page_size']))
+        p = prefix.strip().lower()
+        lo = bisect_left(self._keys, p)
+        hi = bisect_left(self._keys, p + "\U0010ffff") if p else len(self._keys)
+        total = hi - lo
+        pages = max(1, -(-total // size))
+        page = min(max(0, page), pages - 1)
+        start = lo + page * size
+        return UserPage(self._rows[start:min(start + size, hi)], total, page, pages)
+
+
+_lock = threading.Lock()
+_directory: Optional[UserDirectory] = None
+_version = -1           # cache_versions 'users' the snapshot was loaded at
+_generation = 0
+
+
+def _load(db_url: str) -> UserDirectory:
+    # Lazy import: db_utils_mysql imports this module to invalidate it
+    from sqlalchemy import text
+    from modules.utils.db.db_utils_mysql import get_engine
+    with get_engine(db_url).connect() as conn:
+        rows = conn.execute(text("SELECT user_id, username FROM users")).all()
+    return UserDirectory([(uid, name) for uid, name in rows])
+
+
+def get_directory(db_url: str) -> UserDirectory:
+    """
+    The shared snapshot, reloaded when any process created or deleted a user.
+    """
+    global _directory, _version
+    # Read before loading: a bump during the load makes the next read reload
+    version = cache_versions.read('users', db_url=db_url)
+    with _lock:
+        if _directory is not None and _version == version:
+            return _directory
+        generation = _generation
+    directory = _load(db_url)
+    with _lock:
+        # Don't install a snapshot that a concurrent invalidation made stale
+        if generation == _generation:
+            _directory, _version = directory, version
+    return directory
+
+
+def invalidate_users(conn=None):
+    """
+    Drop the snapshot after a user is created or deleted. Pass the writing
+    transaction's `conn` so other processes drop theirs once it commits.
+    """
+    global _directory, _generation
+    if conn is not None:
+        cache_versions.bump('users', conn)
+    with _lock:
+        _directory = None
+        _generation += 1
+
+
+def search_users(db_url: str, prefix: str = "", page: int = 0, page_size: Optional[int] = None) -> UserPage:
+    return get_directory(db_url).search(prefix, page, page_size)
@@ -0,0 +1,289 @@
+# modules/utils/observability/metrics.py
+"""
+In-process metrics in the Prometheus text format (0.0.4).
+
+    ROWS = counter("ingest_rows_total", "Rows written by ingestion", ("store", "kind"))
+    ROWS.inc(len(df), store="mysql", kind="food")
+
+Every span from tracing.span / @traced also lands in the
+graphrag_span_duration_seconds histogram (by span name and status), so the
+traced MySQL, Neo4j, chat and assistant functions get latency and error
+rates without extra code. SQLAlchemy engines registered with
+register_engine() report pool size, checked-out and overflow connections at
+scrape time.
+
+The backend serves render() at GET /metrics; CLIs can expose the same text
+with serve(port). Values are per process: with several uvicorn workers,
+scrape each one or run a single worker for capacity tests.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from modules.utils.settings import get_section
+
+cfg = get_section(
+    'metrics',
+    prefix='graphrag_',
+    buckets=[0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300],
+    profile_cleaners=False,     # time the Samsung Health cleaners (see profiled())
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], object] = {}
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def _labels(self, key: Tuple[str, ...], extra: str = "") -> str:
+        parts = [f'{n}="{_escape(v)}"' for n, v in zip(self.labelnames, key)]
+        if extra:
+            parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        with self._lock:
+            samples = self._samples()
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"] + samples
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self):
+        return [f"{self.name}{self._labels(k)} {_fmt(v)}" for k, v in sorted(self._values.items())]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track(self, **labels):
+        """
+        +1 while the block runs (in-flight work).
+        """
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def _samples(self):
+        return [f"{self.name}{self._labels(k)} {_fmt(v)}" for k, v in sorted(self._values.items())]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets=None):
+        super().__init__(name, help, labelnames)
+        self.buckets = sorted(float(b) for b in (buckets or cfg['buckets'])) + [float("inf")]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def _samples(self):
+        out = []
+        for key, (counts, total) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                le = 'le="%s"' % _fmt(bound)
+                out.append(f"{self.name}_bucket{self._labels(key, le)} {cumulative}")
+            out.append(f"{self.name}_sum{self._labels(key)} {_fmt(total)}")
+            out.append(f"{self.name}_count{self._labels(key)} {cumulative}")
+        return out
+
+
+_registry: Dict[str, _Metric] = {}
+_registry_lock = threading.Lock()
+_collectors: List[Callable[[], None]] = []
+
+
+def _get(cls, name: str, help: str, labelnames: Sequence[str], **kwargs):
+    # Get-or-create, so modules can declare the same metric independently
+    full = cfg['prefix'] + name
+    with _registry_lock:
+        metric = _registry.get(full)
+        if metric is None:
+            metric = _registry[full] = cls(full, help, labelnames, **kwargs)
+    return metric
+
+
+def counter(name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+    return _get(Counter, name, help, labelnames)
+
+
+def gauge(name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+    return _get(Gauge, name, help, labelnames)
+
+
+def histogram(name: str, help: str, labelnames: Sequence[str] = (), buckets=None) -> Histogram:
+    return _get(Histogram, name, help, labelnames, buckets=buckets)
+
+
+def add_collector(fn: Callable[[], None]):
+    """
+    Run `fn` before every render (for gauges read from elsewhere).
+    """
+    _collectors.append(fn)
+
+
+def render() -> str:
+    for collect in list(_collectors):
+        try:
+            collect()
+        except Exception:
+            pass    # a broken collector must not break the scrape
+    with _registry_lock:
+        metrics = sorted(_registry.values(), key=lambda m: m.name)
+    return "\n".join(line for m in metrics for line in m.render()) + "\n"
+
+
+# ─── SHARED METRICS ───────────────────────────────────────────────────────────
+
+SPAN_SECONDS = histogram("span_duration_seconds", "Duration of traced operations", ("span", "status"))
+INGEST_ROWS = counter("ingest_rows_total", "Health rows written by ingestion", ("store", "kind"))
+RETRIES = counter("retries_total", "Retried operations", ("operation",))
+
+POOL_CONNECTIONS = gauge("db_pool_connections", "SQLAlchemy pool connections by state", ("pool", "state"))
+POOL_SIZE = gauge("db_pool_size", "Configured SQLAlchemy pool size (without overflow)", ("pool",))
+POOL_CHECKOUTS = counter("db_pool_checkouts_total", "Connections handed out by SQLAlchemy pools", ("pool",))
+
+
+def observe_span(name: str, seconds: float, status: str):
+    SPAN_SECONDS.observe(seconds, span=name, status=status)
+
+
+_engines: Dict[str, object] = {}
+
+
+def register_engine(name: str, engine):
+    """
+    Report a SQLAlchemy engine's pool under `name` (e.g. "mysql").
+    """
+    from sqlalchemy import event
+
+    if name in _engines:
+        name = f"{name}-{len(_engines)}"
+    _engines[name] = engine
+    event.listen(engine, "checkout", lambda *_: POOL_CHECKOUTS.inc(pool=name))
+
+
+def _collect_pools():
+    for name, engine in list(_engines.items()):
+        pool = engine.pool
+        for state, getter in (("checked_out", "checkedout"), ("idle", "checkedin"), ("overflow", "overflow")):
+            if hasattr(pool, getter):
+                # QueuePool.overflow() counts up from -pool_size
+                POOL_CONNECTIONS.set(max(0, getattr(pool, getter)()), pool=name, state=state)
+        if hasattr(pool, "size"):
+            POOL_SIZE.set(pool.size(), pool=name)
+
+
+add_collector(_collect_pools)
+
+
+# ─── CLEANER PROFILING ────────────────────────────────────────────────────────
+
+CLEANER_SECONDS = histogram("cleaner_duration_seconds", "Samsung Health cleaner run time", ("cleaner",))
+CLEANER_ROWS = counter("cleaner_rows_total", "Rows into and out of the cleaners", ("cleaner", "direction"))
+
+
+def profiled(name: str, fn: Callable) -> Callable:
+    """
+    Wrap a cleaner to record its run time and rows in/out when
+    [metrics] profile_cleaners is on; otherwise return it unchanged.
+    """
+    if not cfg['profile_cleaners']:
+        return fn
+
+    def wrapper(df, *args, **kwargs):
+        t0 = time.perf_counter()
+        out = fn(df, *args, **kwargs)
+        CLEANER_SECONDS.observe(time.perf_counter() - t0, cleaner=name)
+        CLEANER_ROWS.inc(len(df), cleaner=name, direction="in")
+        CLEANER_ROWS.inc(len(out), cleaner=name, direction="out")
+        return out
+    wrapper.__wrapped__ = fn
+    return wrapper
+
+
+# ─── STANDALONE EXPOSITION ────────────────────────────────────────────────────
+
+def serve(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """
+    Serve /metrics from a daemon thread (for CLIs without the backend API).
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
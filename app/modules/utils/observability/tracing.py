@@ -0,0 +1,392 @@
+# modules/utils/observability/tracing.py
+"""
+Lightweight span tracing for the assistant pipeline.
+
+    with span("graph.query", cypher=cypher) as s:
+        rows = ...
+        s.set("rows", len(rows))
+
+Spans nest through a ContextVar (so they follow copy_context() into worker
+threads), carry latency plus arbitrary attributes (tokens, rows, cache hits),
+and are exported in batches by a background thread to either
+- a local JSON-lines file (default, .cache/traces.jsonl), rotated at
+  max_file_mb with `backups` older files kept, or
+- an OTLP/HTTP collector (JSON encoding, e.g. http://localhost:4318/v1/traces).
+
+TracingHandler turns LangChain LLM and tool runs into child spans with token
+usage. Per-stage p50/p95 from the local file:
+
+    python -m modules.utils.observability.tracing [path]
+"""
+import atexit
+import functools
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from modules.utils.observability.metrics import observe_span
+from modules.utils.settings import CACHE_DIR, get_section
+
+logger = logging.getLogger(__name__)
+
+cfg = get_section(
+    'tracing',
+    enabled=True,
+    exporter='file',                     # 'file' | 'otlp'
+    path=str(CACHE_DIR / "traces.jsonl"),
+    max_file_mb=50.0,                    # rotate the file past this size...
+    backups=2,                           # ...keeping traces.jsonl.1 .. .N
+    otlp_endpoint='http://localhost:4318/v1/traces',
+    service_name='samsung-health-graphrag',
+    batch_size=64,
+    flush_interval_s=2.0,
+)
+
+
+def _new_id(nbytes: int) -> str:
+    return os.urandom(nbytes).hex()
+
+
+class Span:
+    """
+    One timed operation. `set()` attributes while it is open; `end()` exports it.
+    """
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns",
+                 "attributes", "status", "_t0")
+
+    def __init__(self, name: str, parent: Optional["Span"] = None, **attributes):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else _new_id(16)
+        self.span_id = _new_id(8)
+        self.parent_id = parent.span_id if parent else None
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = {k: v for k, v in attributes.items() if v is not None}
+        self.status = "ok"
+        self._t0 = time.perf_counter()
+
+    def set(self, key: str, value: Any) -> "Span":
+        if value is not None:
+            self.attributes[key] = value
+        return self
+
+    def add(self, key: str, value: float) -> "Span":
+        self.attributes[key] = self.attributes.get(key, 0) + value
+        return self
+
+    @property
+    def duration_ms(self) -> float:
+        return (time.perf_counter() - self._t0) * 1000.0
+
+    def end(self, error: Optional[BaseException] = None):
+        if self.end_ns is not None:
+            return
+        self.end_ns = self.start_ns + int(self.duration_ms * 1e6)
+        if error is not None:
+            self.status = "error"
+            self.attributes["error"] = f"{type(error).__name__}: {error}"[:500]
+        observe_span(self.name, (self.end_ns - self.start_ns) / 1e9, self.status)
+        _export(self)
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def start_span(name: str, parent: Optional[Span] = None, **attributes) -> Span:
+    """
+    Open a span without making it current (for spans that outlive a block,
+    e.g. across generator yields). Call `.end()` when done.
+    """
+    return Span(name, parent or current_span.get(), **attributes)
+
+
+@contextmanager
+def span(name: str, parent: Optional[Span] = None, **attributes):
+    """
+    Time a block as a child of the current (or given) span.
+    """
+    s = start_span(name, parent, **attributes)
+    token = current_span.set(s)
+    try:
+        yield s
+    except BaseException as exc:
+        s.end(exc)
+        raise
+    finally:
+        current_span.reset(token)
+        s.end()
+
+
+def traced(name: str):
+    """
+    Decorator form of `span`.
+    """
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class TracingHandler(BaseCallbackHandler):
+    """
+    Records LangChain LLM calls and tool runs as spans under the span that was
+    current when the handler was created, with prompt/completion token counts.
+    """
+
+    def __init__(self, parent: Optional[Span] = None):
+        self.parent = parent or current_span.get()
+        self._runs: Dict[UUID, Span] = {}
+
+    def _parent_for(self, parent_run_id: Optional[UUID]) -> Optional[Span]:
+        return self._runs.get(parent_run_id) if parent_run_id else None
+
+    def _start(self, name, run_id, parent_run_id, **attrs):
+        parent = self._parent_for(parent_run_id) or current_span.get() or self.parent
+        self._runs[run_id] = Span(name, parent, **attrs)
+
+    def _end(self, run_id, error=None) -> Optional[Span]:
+        s = self._runs.pop(run_id, None)
+        if s is not None:
+            s.end(error)
+        return s
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID,
+                            parent_run_id: Optional[UUID] = None, **kwargs: Any) -> None:
+        model = ((kwargs.get("invocation_params") or {}).get("model_name")
+                 or (kwargs.get("metadata") or {}).get("ls_model_name"))
+        self._start("llm", run_id, parent_run_id, model=model)
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID,
+                     parent_run_id: Optional[UUID] = None, **kwargs: Any) -> None:
+        self._start("llm", run_id, parent_run_id)
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs: Any) -> None:
+        s = self._runs.get(run_id)
+        if s is not None:
+            usage = token_usage(response)
+            s.set("prompt_tokens", usage.get("prompt_tokens"))
+            s.set("completion_tokens", usage.get("completion_tokens"))
+        self._end(run_id)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, error)
+
+    def on_tool_start(self, serialized, input_str, *, run_id: UUID,
+                      parent_run_id: Optional[UUID] = None, **kwargs: Any) -> None:
+        self._start(f"tool.{(serialized or {}).get('name', 'unknown')}", run_id, parent_run_id)
+
+    def on_tool_end(self, output, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, error)
+
+
+def token_usage(response) -> dict:
+    usage = dict((response.llm_output or {}).get("token_usage") or {})
+    if usage:
+        return usage
+    # Streaming chat models report usage on the message instead
+    for gens in response.generations or []:
+        for gen in gens:
+            meta = getattr(getattr(gen, "message", None), "usage_metadata", None)
+            if meta:
+                return {"prompt_tokens": meta.get("input_tokens"),
+                        "completion_tokens": meta.get("output_tokens")}
+    return {}
+
+
+# ---------------------------------------------------------------------------
+# Export
+# ---------------------------------------------------------------------------
+
+_queue: "queue.Queue[Span]" = queue.Queue(maxsize=10000)
+_worker: Optional[threading.Thread] = None
+_worker_lock = threading.Lock()
+
+
+def _export(s: Span):
+    if not cfg['enabled']:
+        return
+    _ensure_worker()
+    try:
+        _queue.put_nowait(s)
+    except queue.Full:
+        pass  # never block the request path on telemetry
+
+
+def _ensure_worker():
+    global _worker
+    if _worker is None:
+        with _worker_lock:
+            if _worker is None:
+                _worker = threading.Thread(target=_run_exporter, name="trace-exporter", daemon=True)
+                _worker.start()
+                atexit.register(flush)
+
+
+def _drain(limit: int) -> List[Span]:
+    batch = []
+    while len(batch) < limit:
+        try:
+            batch.append(_queue.get_nowait())
+        except queue.Empty:
+            break
+    return batch
+
+
+def _run_exporter():
+    while True:
+        try:
+            first = _queue.get(timeout=float(cfg['flush_interval_s']))
+        except queue.Empty:
+            continue
+        _write([first] + _drain(int(cfg['batch_size']) - 1))
+
+
+def flush():
+    """
+    Export everything queued so far (called at interpreter exit).
+    """
+    while True:
+        batch = _drain(int(cfg['batch_size']))
+        if not batch:
+            return
+        _write(batch)
+
+
+def _write(batch: List[Span]):
+    try:
+        if cfg['exporter'] == 'otlp':
+            _write_otlp(batch)
+        else:
+            _write_file(batch)
+    except Exception as exc:
+        logger.warning("trace export failed (%d spans dropped): %s", len(batch), exc)
+
+
+_file_lock = threading.Lock()
+
+
+def _rotate(path: str, backups: int):
+    # traces.jsonl -> .1 -> .2 ...; the oldest is dropped
+    for i in range(backups, 0, -1):
+        src = f"{path}.{i - 1}" if i > 1 else path
+        if os.path.exists(src):
+            os.replace(src, f"{path}.{i}")
+    if backups <= 0 and os.path.exists(path):
+        os.remove(path)
+
+
+def _write_file(batch: List[Span]):
+    path = cfg['path']
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    lines = "".join(json.dumps(s.to_dict(), default=str) + "\n" for s in batch)
+    limit = float(cfg['max_file_mb']) * 1024 * 1024
+    with _file_lock:
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = 0
+        if limit > 0 and size and size + len(lines) > limit:
+            _rotate(path, int(cfg['backups']))
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+
+def _otlp_value(v) -> dict:
+    if isinstance(v, bool):
+        return {"boolValue": v}
+    if isinstance(v, int):
+        return {"intValue": str(v)}
+    if isinstance(v, float):
+        return {"doubleValue": v}
+    return {"stringValue": str(v)}
+
+
+def _write_otlp(batch: List[Span]):
+    from modules.utils.retrieval.resources import get_http_client
+    spans = [{
+        "traceId": s.trace_id,
+        "spanId": s.span_id,
+        **({"parentSpanId": s.parent_id} if s.parent_id else {}),
+        "name": s.name,
+        "kind": 1,
+        "startTimeUnixNano": str(s.start_ns),
+        "endTimeUnixNano": str(s.end_ns),
+        "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in s.attributes.items()],
+        "status": {"code": 2 if s.status == "error" else 1},
+    } for s in batch]
+    payload = {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": cfg['service_name']}}]},
+        "scopeSpans": [{"scope": {"name": "graphrag"}, "spans": spans}],
+    }]}
+    get_http_client().post(cfg['otlp_endpoint'], json=payload).raise_for_status()
+
+
+# ---------------------------------------------------------------------------
+# Summary
+# ---------------------------------------------------------------------------
+
+def summarize(path: Optional[str] = None):
+    """
+    Per-span-name count, p50/p95/max latency (ms), error count and mean
+    tokens/rows, slowest p95 first. Without `path`, the rotated files of the
+    file exporter are read too.
+    """
+    import pandas as pd
+
+    paths = [path] if path else [cfg['path']] + [f"{cfg['path']}.{i}" for i in range(1, int(cfg['backups']) + 1)]
+    frames = [pd.read_json(p, lines=True) for p in paths if os.path.exists(p) and os.path.getsize(p)]
+    if not frames:
+        return pd.DataFrame()
+    df = pd.concat(frames, ignore_index=True)
+    if df.empty:
+        return df
+    attrs = pd.json_normalize(df['attributes'].tolist())
+    for col in ('prompt_tokens', 'completion_tokens', 'rows'):
+        df[col] = pd.to_numeric(attrs[col], errors='coerce') if col in attrs else float('nan')
+    grouped = df.groupby('name')
+    out = pd.DataFrame({
+        'count': grouped.size(),
+        'p50_ms': grouped['duration_ms'].quantile(0.50),
+        'p95_ms': grouped['duration_ms'].quantile(0.95),
+        'max_ms': grouped['duration_ms'].max(),
+        'errors': grouped['status'].apply(lambda s: int((s == 'error').sum())),
+        'prompt_tokens': grouped['prompt_tokens'].mean(),
+        'completion_tokens': grouped['completion_tokens'].mean(),
+        'rows': grouped['rows'].mean(),
+    })
+    return out.sort_values('p95_ms', ascending=False).round(1)
+
+
+if __name__ == "__main__":
+    import pandas as pd
+    with pd.option_context('display.width', 200, 'display.max_columns', 20):
+        print(summarize(sys.argv[1] if len(sys.argv) > 1 else None).to_string())
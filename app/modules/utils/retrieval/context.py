@@ -0,0 +1,12 @@
+# modules/utils/retrieval/context.py
+"""
+Per-request context for tools that must be scoped to the asking user.
+
+The pipeline sets these before running the agent; tools read them instead of
+trusting a user name the LLM wrote into the tool input.
+"""
+from contextvars import ContextVar
+from typing import Optional
+
+current_user_id: ContextVar[Optional[int]] = ContextVar("current_user_id", default=None)
+current_username: ContextVar[Optional[str]] = ContextVar("current_username", default=None)
@@ -0,0 +1,137 @@
+# modules/utils/retrieval/cypher_guard.py
+"""
+Pre-execution cost guard for LLM-generated Cypher.
+
+Before a freshly generated query runs, it is checked statically (read-only
+clauses only) and with `EXPLAIN`, which plans the query without executing
+it. Plans with whole-graph scans, cartesian products, label scans over
+measurement nodes, or too many estimated rows are rejected with a reason the
+caller can feed back to the model. Queries that pass are executed in a
+READ-access session with the server-side transaction timeout.
+"""
+import re
+from typing import Any, Dict, List, Optional
+
+from neo4j import READ_ACCESS, Query
+
+from modules.utils.settings import get_section
+
+cfg = get_section(
+    'cypher_guard',
+    enabled=True,
+    max_estimated_rows=200000,
+    max_retries=2,                     # regenerations with feedback after a rejection
+    scan_ok_labels=['User'],           # small labels that may be label-scanned
+)
+
+WRITE_RE = re.compile(
+    r"\b(CREATE|MERGE|DELETE|DETACH|SET|REMOVE|DROP|LOAD\s+CSV|FOREACH)\b|\bCALL\s+(?:dbms|db\.create|apoc\.(?:create|merge|refactor|periodic))",
+    re.IGNORECASE
+)
+STRING_RE = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+BANNED_OPERATORS = {
+    'AllNodesScan': "scans every node in the database; anchor the pattern on (u:User {...})",
+    'CartesianProduct': "builds a cartesian product of disconnected patterns; connect them through the user",
+}
+
+
+class CypherRejected(ValueError):
+    """Generated Cypher failed the cost guard."""
+
+    def __init__(self, reasons: List[str], cypher: str):
+        super().__init__("; ".join(reasons))
+        self.reasons = reasons
+        self.cypher = cypher
+
+
+def _operator(name: str) -> str:
+    # Neo4j 5 reports e.g. "NodeByLabelScan@neo4j"
+    return name.split('@', 1)[0]
+
+
+def _walk(plan: Dict[str, Any]):
+    yield plan
+    for child in plan.get('children') or []:
+        yield from _walk(child)
+
+
+def plan_violations(plan: Dict[str, Any]) -> List[str]:
+    """
+    Reasons (empty when fine) why an EXPLAIN plan is too expensive to run.
+    """
+    reasons = []
+    max_rows = 0.0
+    for op in _walk(plan):
+        name = _operator(op.get('operatorType', ''))
+        args = op.get('args') or {}
+        max_rows = max(max_rows, float(args.get('EstimatedRows') or 0))
+        if name in BANNED_OPERATORS:
+            reasons.append(f"{name}: {BANNED_OPERATORS[name]}")
+        elif name == 'NodeByLabelScan':
+            details = str(args.get('Details', ''))
+            label = details.split(':', 1)[-1].strip()
+            if label not in cfg['scan_ok_labels']:
+                reasons.append(f"NodeByLabelScan on {details or 'a label'}: reach measurement nodes through the user's relationships")
+    if max_rows > float(cfg['max_estimated_rows']):
+        reasons.append(f"estimated {int(max_rows):,} rows (limit {int(cfg['max_estimated_rows']):,}): "
+                       f"filter by date range or aggregate")
+    return list(dict.fromkeys(reasons))
+
+
+def static_violations(cypher: str) -> List[str]:
+    # Ignore keywords inside string literals (e.g. a food called 'set meal')
+    if WRITE_RE.search(STRING_RE.sub("''", cypher)):
+        return ["query modifies the graph; only read queries (MATCH ... RETURN) are allowed"]
+    return []
+
+
+def explain(graph, cypher: str, params: Optional[dict] = None) -> Optional[Dict[str, Any]]:
+    """
+    EXPLAIN plan for `cypher`, or None when the graph has no Bolt driver
+    (e.g. the in-memory benchmark graph).
+    """
+    driver = getattr(graph, '_driver', None)
+    if driver is None:
+        return None
+    with driver.session(database=graph._database, default_access_mode=READ_ACCESS) as session:
+        summary = session.run(Query(f"EXPLAIN {cypher}", timeout=graph.timeout), params or {}).consume()
+    return summary.plan
+
+
+def check(graph, cypher: str, params: Optional[dict] = None):
+    """
+    Raise CypherRejected if `cypher` is not read-only or its plan is too expensive.
+    """
+    if not cfg['enabled']:
+        return
+    reasons = static_violations(cypher)
+    if not reasons:
+        plan = explain(graph, cypher, params)
+        if plan is not None:
+            reasons = plan_violations(plan)
+    if reasons:
+        raise CypherRejected(reasons, cypher)
+
+
+def read_only_query(graph, cypher: str, params: Optional[dict] = None) -> List[dict]:
+    """
+    Execute in a READ-access session (writes fail server-side) under the
+    graph's transaction timeout.
+    """
+    if getattr(graph, '_driver', None) is None:
+        return graph.query(cypher, params or {})
+    return graph.query(cypher, params or {}, session_params={"default_access_mode": READ_ACCESS})
+
+
+def feedback(question: str, rejected: CypherRejected) -> str:
+    """
+    The question re-posed to the Cypher generator with the rejection reasons.
+    """
+    reasons = "\n".join(f"- {r}" for r in rejected.reasons)
+    return (
+        f"{question}\n\n"
+        f"A previous Cypher query for this question was rejected before running:\n{rejected.cypher}\n"
+        f"Reasons:\n{reasons}\n"
+        f"Write a cheaper read-only query: start from the User node, follow its relationships, "
+        f"filter on recordedOn and aggregate instead of returning every node."
+    )
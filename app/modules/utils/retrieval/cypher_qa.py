@@ -0,0 +1,191 @@
+# modules/utils/retrieval/cypher_qa.py
+"""
+NL -> Cypher -> answer flow behind `health-cypher-tool`.
+
+Mirrors GraphCypherQAChain (and reuses its prompts/sub-chains), but splits the
+steps so they can be cached and reused:
+1. generate_cypher: translation cache hit, or LLM Cypher generation checked by
+                    the EXPLAIN cost guard (regenerated with feedback if rejected)
+2. query_graph:     execute against Neo4j with parameters, read-only
+   (retrieve escalates 1-2 to the strong model tier when the fast tier's
+   Cypher is rejected, fails to run or returns nothing)
+3. build_context:   pass small results through, compact large ones locally
+4. synthesize:      LLM answer from question + context
+"""
+import hashlib
+import logging
+import threading
+import time
+from typing import List, NamedTuple, Optional, Tuple
+
+from langchain_neo4j.chains.graph_qa.cypher import extract_cypher
+
+from modules.utils.cache import translation_cache
+from modules.utils.retrieval import cypher_guard, model_router
+from modules.utils.retrieval.cypher_guard import CypherRejected
+from modules.utils.observability.metrics import RETRIES
+from modules.utils.observability.tracing import span
+from modules.utils.retrieval.executor import stage
+from modules.utils.retrieval.result_guard import compact_rows, limit_cypher
+from modules.utils.retrieval.resources import get_cypher_chain, get_graph
+
+logger = logging.getLogger(__name__)
+
+VOCAB_TTL_SECONDS = 300
+
+REJECTED_ANSWER = (
+    "I couldn't find an efficient way to look that up. "
+    "Try narrowing the question to a date range or a single metric."
+)
+MAX_VOCAB_FOODS = 20000
+
+
+class Translation(NamedTuple):
+    cypher: str
+    params: dict
+    shape: str
+    cached: bool                  # served from the translation cache
+    template: Optional[str]       # storable template for a fresh generation
+    spec: Optional[dict]
+
+
+_vocab = {"loaded_at": 0.0, "users": [], "foods": []}
+_vocab_lock = threading.Lock()
+
+
+def _vocabulary() -> Tuple[List[str], List[str]]:
+    """
+    Known usernames and food names, refreshed every few minutes.
+    """
+    if time.time() - _vocab["loaded_at"] > VOCAB_TTL_SECONDS:
+        with _vocab_lock:
+            if time.time() - _vocab["loaded_at"] > VOCAB_TTL_SECONDS:
+                graph = get_graph()
+                users = graph.query("MATCH (u:User) RETURN DISTINCT u.username AS name")
+                foods = graph.query(
+                    "MATCH (f:Food) RETURN DISTINCT f.name AS name LIMIT $n",
+                    {"n": MAX_VOCAB_FOODS}
+                )
+                _vocab["users"] = [r["name"] for r in users if r["name"]]
+                _vocab["foods"] = [r["name"] for r in foods if r["name"]]
+                _vocab["loaded_at"] = time.time()
+    return _vocab["users"], _vocab["foods"]
+
+
+def _schema_hash() -> str:
+    return hashlib.sha1(get_cypher_chain().graph_schema.encode('utf-8')).hexdigest()[:12]
+
+
+def generate_cypher(question: str, callbacks=None, tier: Optional[str] = None) -> Translation:
+    """
+    Translate `question` to Cypher, reusing a cached template when a question
+    of the same shape has been translated before (no LLM call on a hit).
+    Fresh translations must pass the cost guard; rejected ones are regenerated
+    with the reasons, and CypherRejected is raised when retries run out.
+    Cached templates already passed the guard when they were stored.
+    """
+    users, foods = _vocabulary()
+    shape, entities = translation_cache.parameterize_question(question, users, foods)
+
+    with span("translation_cache.lookup") as s:
+        hit = translation_cache.lookup(shape, entities, _schema_hash())
+        s.set("hit", hit is not None)
+    if hit is not None:
+        cypher, params = hit
+        return Translation(cypher, params, shape, True, None, None)
+
+    schema = get_cypher_chain().graph_schema
+    generator = model_router.get_cypher_generator(tier)
+    prompt_question = question
+    retries = int(cypher_guard.cfg['max_retries'])
+    for attempt in range(retries + 1):
+        with stage("cypher_generation"):
+            generated = generator.invoke(
+                {"question": prompt_question, "schema": schema},
+                config={"callbacks": callbacks}
+            )
+        cypher = extract_cypher(generated)
+        try:
+            with stage("cypher_guard"):
+                cypher_guard.check(get_graph(), limit_cypher(cypher))
+            break
+        except CypherRejected as exc:
+            logger.warning("cypher rejected (attempt %d/%d): %s", attempt + 1, retries + 1, exc)
+            if attempt == retries:
+                raise
+            RETRIES.inc(operation="cypher_generation")
+            prompt_question = cypher_guard.feedback(question, exc)
+    templated = translation_cache.templatize(cypher, entities, shape)
+    template, spec = templated if templated else (None, None)
+    return Translation(cypher, {}, shape, False, template, spec)
+
+
+def query_graph(cypher: str, params: dict) -> List[dict]:
+    """
+    Execute `cypher`, bounded by the result guard's fetch limit. All fetched
+    rows are returned; build_context decides what reaches the LLM.
+    """
+    if not cypher:
+        return []
+    with stage("graph_query"):
+        return cypher_guard.read_only_query(get_graph(), limit_cypher(cypher), params)
+
+
+def build_context(rows: List[dict]):
+    with span("result_guard", rows=len(rows)) as s:
+        context = compact_rows(rows)
+        s.set("compacted", isinstance(context, str))
+    return context
+
+
+def synthesize(question: str, context, callbacks=None, tier: Optional[str] = None) -> str:
+    with stage("synthesis"):
+        return model_router.get_qa_chain(tier).invoke(
+            {"question": question, "context": context},
+            config={"callbacks": callbacks}
+        )
+
+
+def retrieve(question: str, callbacks=None) -> Tuple[str, List[dict]]:
+    """
+    Generate (or reuse) Cypher for `question` and run it. Returns (cypher, rows).
+
+    Tries the stage's tiers in order (fast, then strong): a fresh translation
+    that is rejected, fails to execute or returns no rows is retried on the
+    next tier while the run can afford it. A fresh translation is stored as a
+    template only after it ran cleanly.
+    """
+    tiers = model_router.escalation_path('cypher_generation')
+    for i, tier in enumerate(tiers):
+        last = i == len(tiers) - 1 or not model_router.can_escalate()
+        try:
+            tr = generate_cypher(question, callbacks, tier)
+        except CypherRejected:
+            if last:
+                raise
+            logger.info("escalating cypher generation from %s: rejected by cost guard", tier)
+            continue
+        try:
+            rows = query_graph(tr.cypher, tr.params)
+        except Exception as exc:
+            if tr.cached:
+                # A cached template stopped working (schema drift): forget it
+                translation_cache.invalidate(tr.shape, _schema_hash())
+            if last:
+                raise
+            logger.info("escalating cypher generation from %s: %s", tier, exc)
+            continue
+        if not rows and not tr.cached and not last:
+            logger.info("escalating cypher generation from %s: empty result", tier)
+            continue
+        if tr.template is not None:
+            translation_cache.store(tr.shape, tr.template, tr.spec, _schema_hash())
+        return tr.cypher, rows
+
+
+def answer(question: str, callbacks=None) -> str:
+    try:
+        _, rows = retrieve(question, callbacks)
+    except CypherRejected:
+        return REJECTED_ANSWER
+    return synthesize(question, build_context(rows), callbacks)
@@ -0,0 +1,120 @@
+# modules/utils/retrieval/dates.py
+"""
+Date expression parsing for health questions.
+
+Resolves absolute ("2025-05-10", "April 2025", "in 2024") and relative
+("yesterday", "last 7 days", "this month") expressions into an inclusive
+(start, end) date range.
+"""
+import calendar
+import re
+from datetime import date, timedelta
+from typing import Optional, Tuple
+
+DateRange = Tuple[date, date]
+
+MONTHS = {name.lower(): idx for idx, name in enumerate(calendar.month_name) if name}
+MONTHS.update({name.lower(): idx for idx, name in enumerate(calendar.month_abbr) if name})
+
+ISO_DATE_RE = re.compile(r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b")
+MONTH_RE = re.compile(
+    r"\b(" + "|".join(sorted(MONTHS, key=len, reverse=True)) + r")\.?(?:\s+(\d{4}))?\b",
+    re.IGNORECASE
+)
+YEAR_RE = re.compile(r"\b(?:in|during|for|of)\s+(\d{4})\b", re.IGNORECASE)
+LAST_N_RE = re.compile(r"\b(?:last|past|previous)\s+(\d+)\s+(day|week|month)s?\b", re.IGNORECASE)
+N_AGO_RE = re.compile(r"\b(\d+)\s+(day|week)s?\s+ago\b", re.IGNORECASE)
+
+
+def month_range(year: int, month: int) -> DateRange:
+    last_day = calendar.monthrange(year, month)[1]
+    return date(year, month, 1), date(year, month, last_day)
+
+
+def _shift_month(year: int, month: int, delta: int) -> Tuple[int, int]:
+    idx = year * 12 + (month - 1) + delta
+    return idx // 12, idx % 12 + 1
+
+
+def resolve_date_range(text: str, today: Optional[date] = None) -> Optional[DateRange]:
+    """
+    Return the inclusive date range referred to by `text`, or None when the
+    text contains no recognizable date expression.
+    """
+    today = today or date.today()
+    t = text.lower()
+
+    # 1) Explicit ISO dates: one date is a single day, two are a range
+    iso = []
+    for y, m, d in ISO_DATE_RE.findall(t):
+        try:
+            iso.append(date(int(y), int(m), int(d)))
+        except ValueError:
+            continue
+    if iso:
+        return min(iso), max(iso)
+
+    # 2) Relative day expressions
+    if re.search(r"\btoday\b|\btonight\b", t):
+        return today, today
+    if "yesterday" in t:
+        day = today - timedelta(days=1)
+        return day, day
+    m = N_AGO_RE.search(t)
+    if m:
+        n = int(m.group(1)) * (7 if m.group(2).lower() == 'week' else 1)
+        day = today - timedelta(days=n)
+        return day, day
+    m = LAST_N_RE.search(t)
+    if m:
+        n, unit = int(m.group(1)), m.group(2).lower()
+        if unit == 'month':
+            y, mo = _shift_month(today.year, today.month, -n)
+            start = date(y, mo, min(today.day, calendar.monthrange(y, mo)[1])) + timedelta(days=1)
+        else:
+            start = today - timedelta(days=n * (7 if unit == 'week' else 1) - 1)
+        return start, today
+
+    # 3) Calendar weeks / months / years relative to today
+    week_start = today - timedelta(days=today.weekday())
+    if "this week" in t:
+        return week_start, today
+    if "last week" in t or "previous week" in t:
+        return week_start - timedelta(days=7), week_start - timedelta(days=1)
+    if "this month" in t:
+        return date(today.year, today.month, 1), today
+    if "last month" in t or "previous month" in t:
+        y, mo = _shift_month(today.year, today.month, -1)
+        return month_range(y, mo)
+    if "this year" in t:
+        return date(today.year, 1, 1), today
+    if "last year" in t:
+        return date(today.year - 1, 1, 1), date(today.year - 1, 12, 31)
+
+    # 4) Named month, optionally with a year ("April 2025", "in may")
+    for m in MONTH_RE.finditer(t):
+        # "may" is also a verb; only trust it with a year or a preposition
+        if m.group(1) == 'may' and not m.group(2) and not re.search(r"(?:in|of|during)\s+$", t[:m.start()]):
+            continue
+        mo = MONTHS[m.group(1)]
+        if m.group(2):
+            year = int(m.group(2))
+        else:
+            # Without a year, use the most recent occurrence of that month
+            year = today.year if mo <= today.month else today.year - 1
+        return month_range(year, mo)
+
+    # 5) Bare year ("in 2024")
+    m = YEAR_RE.search(t)
+    if m:
+        year = int(m.group(1))
+        return date(year, 1, 1), date(year, 12, 31)
+
+    return None
+
+
+def format_range(rng: Optional[DateRange]) -> str:
+    if rng is None:
+        return "all-time"
+    start, end = rng
+    return start.isoformat() if start == end else f"{start.isoformat()}..{end.isoformat()}"
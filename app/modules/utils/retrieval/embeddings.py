@@ -0,0 +1,200 @@
+# modules/utils/retrieval/embeddings.py
+"""
+Embedding backends for the vector retrieval path.
+
+- HashingEmbeddings: deterministic, offline stand-in (feature hashing over
+  word and character n-grams). Same text -> same vector, no network.
+- OpenAI embeddings for production, selected via [vector] in secrets.toml.
+- CachedEmbeddings: service layer in front of either backend. Texts are
+  deduplicated per batch, looked up by content hash in a persistent store,
+  and only misses are sent to the backend, in large concurrent batches.
+  Embedding cost therefore scales with unique vocabulary, not row count.
+"""
+import hashlib
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from modules.utils.cache.store import connect
+from modules.utils.retrieval.resources import shared, get_secrets, get_http_client
+from modules.utils.settings import CACHE_DIR, get_section
+
+cfg = get_section(
+    'vector',
+    embedder='hashing',                  # 'hashing' | 'openai'
+    openai_model='text-embedding-3-small',
+    hashing_dim=384,
+    embedding_cache=str(CACHE_DIR / "embeddings.sqlite3"),
+    embedding_dtype='float16',           # storage precision: 'float16' | 'float32'
+    embedding_batch_size=256,
+    embedding_workers=4,
+)
+
+CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    content_hash TEXT PRIMARY KEY,
+    dim          INTEGER NOT NULL,
+    dtype        TEXT NOT NULL,
+    vector       BLOB NOT NULL
+);
+"""
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Signed feature hashing of word unigrams/bigrams and character trigrams,
+    L2-normalized. Similar strings share features, so cosine similarity is
+    meaningful enough for offline development and tests.
+    """
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def _features(self, text: str) -> List[str]:
+        words = TOKEN_RE.findall(text.lower())
+        feats = [f"w:{w}" for w in words]
+        feats += [f"b:{a}_{b}" for a, b in zip(words, words[1:])]
+        for w in words:
+            padded = f"#{w}#"
+            feats += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+        return feats
+
+    def _embed(self, text: str) -> List[float]:
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for feat in self._features(text):
+            h = int.from_bytes(hashlib.blake2b(feat.encode('utf-8'), digest_size=8).digest(), 'little')
+            vec[h % self.dim] += 1.0 if (h >> 63) & 1 else -1.0
+        norm = np.linalg.norm(vec)
+        if norm > 0:
+            vec /= norm
+        return vec.tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Content-hash cache + batching in front of an embedding backend.
+    `model_id` is part of the hash so switching models never mixes vectors.
+    """
+
+    def __init__(self, backend: Embeddings, model_id: str, cache_path: str,
+                 dtype: str = 'float16', batch_size: int = 256, max_workers: int = 4):
+        self.backend = backend
+        self.model_id = model_id
+        self.cache_path = cache_path
+        self.dtype = np.dtype(dtype)
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+
+    def _hash(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_id}\x00{text}".encode('utf-8')).hexdigest()
+
+    def _load(self, hashes: List[str]) -> Dict[str, np.ndarray]:
+        found = {}
+        conn = connect(self.cache_path, CACHE_SCHEMA)
+        try:
+            for start in range(0, len(hashes), 500):
+                chunk = hashes[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT content_hash, dtype, vector FROM embeddings "
+                    f"WHERE content_hash IN ({','.join('?' * len(chunk))})",
+                    chunk
+                ).fetchall()
+                for h, dt, blob in rows:
+                    found[h] = np.frombuffer(blob, dtype=dt).astype(np.float32)
+        finally:
+            conn.close()
+        return found
+
+    def _save(self, items: Dict[str, np.ndarray]):
+        if not items:
+            return
+        conn = connect(self.cache_path, CACHE_SCHEMA)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (content_hash, dim, dtype, vector) VALUES (?, ?, ?, ?)",
+                [(h, len(v), self.dtype.name, v.astype(self.dtype).tobytes()) for h, v in items.items()]
+            )
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    def embed_array(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed `texts` and return a float32 matrix (len(texts), dim).
+        """
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        # 1) Deduplicate within the batch
+        unique = {}
+        for t in texts:
+            unique.setdefault(self._hash(t), t)
+        # 2) Persistent content-hash lookup
+        vectors = self._load(list(unique))
+        misses = [(h, t) for h, t in unique.items() if h not in vectors]
+        # 3) Embed misses in concurrent batches
+        if misses:
+            batches = [misses[i:i + self.batch_size] for i in range(0, len(misses), self.batch_size)]
+
+            def _run(batch):
+                return batch, self.backend.embed_documents([t for _, t in batch])
+
+            fresh = {}
+            if len(batches) == 1:
+                results = [_run(batches[0])]
+            else:
+                with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as pool:
+                    results = list(pool.map(_run, batches))
+            for batch, embedded in results:
+                for (h, _), vec in zip(batch, embedded):
+                    fresh[h] = np.asarray(vec, dtype=np.float32)
+            self._save(fresh)
+            # Return what was stored, so hits and misses have identical precision
+            vectors.update({h: v.astype(self.dtype).astype(np.float32) for h, v in fresh.items()})
+        return np.stack([vectors[self._hash(t)] for t in texts])
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_array(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_array([text])[0].tolist()
+
+
+def _build_embedder() -> Embeddings:
+    if cfg['embedder'] == 'openai':
+        from langchain_openai import OpenAIEmbeddings
+        backend = OpenAIEmbeddings(
+            model=cfg['openai_model'],
+            api_key=get_secrets()['openai']['OPENAI_API_KEY'],
+            http_client=get_http_client(),
+        )
+        model_id = f"openai:{cfg['openai_model']}"
+    else:
+        backend = HashingEmbeddings(dim=int(cfg['hashing_dim']))
+        model_id = f"hashing:{cfg['hashing_dim']}"
+    return CachedEmbeddings(
+        backend,
+        model_id,
+        cfg['embedding_cache'],
+        dtype=cfg['embedding_dtype'],
+        batch_size=int(cfg['embedding_batch_size']),
+        max_workers=int(cfg['embedding_workers']),
+    )
+
+
+def get_embedder() -> CachedEmbeddings:
+    """
+    Shared, cached embedding service configured under [vector].
+    """
+    return shared("embedder", _build_embedder)
@@ -0,0 +1,197 @@
+# modules/utils/retrieval/executor.py
+"""
+Bounded, cancellable execution of assistant runs.
+
+Agent runs execute on a process-wide worker pool instead of the Streamlit
+script thread. Each run carries a RunControl with an overall deadline and
+per-stage budgets; a callback handler checks it on every LLM/tool/chain event
+and aborts the run once it is cancelled or out of time. Starting a new run for
+the same chat session cancels the previous one.
+"""
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from typing import Any, Callable, Dict, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from modules.utils.observability.tracing import span
+from modules.utils.settings import get_section
+
+cfg = get_section(
+    'assistant',
+    workers=8,
+    overall_timeout_s=45.0,
+    stage_timeouts_s={
+        'cypher_generation': 15.0,
+        'graph_query': 10.0,
+        'sql_generation': 15.0,
+        'sql_query': 10.0,
+        'vector_search': 10.0,
+        'synthesis': 20.0,
+    },
+)
+
+
+class RunCancelled(Exception):
+    """The run was cancelled (new question or user left the page)."""
+
+
+class DeadlineExceeded(Exception):
+    """The run or one of its stages ran out of time."""
+
+    def __init__(self, stage: Optional[str]):
+        super().__init__(f"Deadline exceeded during {stage or 'run'}")
+        self.stage = stage
+
+
+class RunControl:
+    """
+    Cancellation flag + overall deadline + current stage budget for one run.
+    Stage state is per thread, so parallel branches of a run (see hybrid.py)
+    each keep their own budget.
+    """
+
+    def __init__(self, overall_s: float = None, stage_budgets: Dict[str, float] = None):
+        self.cancelled = threading.Event()
+        self.started = time.monotonic()
+        self.deadline = self.started + float(overall_s or cfg['overall_timeout_s'])
+        self.stage_budgets = dict(stage_budgets or cfg['stage_timeouts_s'])
+        self._local = threading.local()
+
+    @property
+    def stage_name(self) -> Optional[str]:
+        return getattr(self._local, 'name', None)
+
+    @property
+    def stage_deadline(self) -> float:
+        return getattr(self._local, 'deadline', self.deadline)
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def remaining(self) -> float:
+        return max(0.0, min(self.deadline, self.stage_deadline) - time.monotonic())
+
+    def check(self):
+        if self.cancelled.is_set():
+            raise RunCancelled()
+        now = time.monotonic()
+        if now >= self.deadline:
+            raise DeadlineExceeded(None)
+        if now >= self.stage_deadline:
+            raise DeadlineExceeded(self.stage_name)
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Run a block under the budget for `name` (bounded by the overall deadline).
+        """
+        self.check()
+        prev = (self.stage_name, self.stage_deadline)
+        budget = self.stage_budgets.get(name)
+        self._local.name = name
+        if budget is not None:
+            self._local.deadline = min(prev[1], time.monotonic() + float(budget))
+        try:
+            yield self
+        finally:
+            self._local.name, self._local.deadline = prev
+
+
+current_run: ContextVar[Optional[RunControl]] = ContextVar("current_run", default=None)
+
+
+@contextmanager
+def stage(name: str):
+    """
+    Stage guard usable anywhere in the pipeline: traced as a `stage.<name>`
+    span, and budgeted when running inside a managed run.
+    """
+    control = current_run.get()
+    with span(f"stage.{name}"):
+        if control is None:
+            yield None
+            return
+        with control.stage(name):
+            yield control
+
+
+class DeadlineHandler(BaseCallbackHandler):
+    """
+    Aborts a LangChain run as soon as its RunControl is cancelled or late.
+    """
+    raise_error = True
+
+    def __init__(self, control: RunControl):
+        self.control = control
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs: Any) -> None:
+        self.control.check()
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs: Any) -> None:
+        self.control.check()
+
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        self.control.check()
+
+    def on_tool_start(self, serialized, input_str, **kwargs: Any) -> None:
+        self.control.check()
+
+    def on_chain_start(self, serialized, inputs, **kwargs: Any) -> None:
+        self.control.check()
+
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+_active: Dict[Any, RunControl] = {}
+_active_lock = threading.Lock()
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=int(cfg['workers']), thread_name_prefix="graphrag")
+    return _pool
+
+
+def submit_run(fn: Callable[[RunControl], Any], session_key: Any = None,
+               overall_s: float = None) -> "tuple[Future, RunControl]":
+    """
+    Run `fn(control)` on the shared pool. Any previous run registered under the
+    same `session_key` is cancelled first. Time spent queued for a worker
+    counts against the deadline.
+    """
+    control = RunControl(overall_s)
+    if session_key is not None:
+        with _active_lock:
+            previous = _active.get(session_key)
+            _active[session_key] = control
+        if previous is not None:
+            previous.cancel()
+
+    def _run():
+        current_run.set(control)
+        try:
+            control.check()
+            return fn(control)
+        finally:
+            if session_key is not None:
+                with _active_lock:
+                    if _active.get(session_key) is control:
+                        del _active[session_key]
+
+    ctx = copy_context()
+    return _get_pool().submit(ctx.run, _run), control
+
+
+def cancel_session(session_key: Any):
+    with _active_lock:
+        control = _active.pop(session_key, None)
+    if control is not None:
+        control.cancel()
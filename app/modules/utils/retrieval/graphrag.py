@@ -1,73 +1,90 @@
 # modules/utils/retrieval/graphrag.py
 """
 GraphRAG module: builds a GraphRAG QA Agent over the Neo4j health graph.
-"""
-import os
-from pathlib import Path
-import toml
 
-from langchain_community.chat_models import ChatOpenAI
+LLM clients, chains and the agent executor come from the process-wide
+resource layer (see resources.py), so a question only pays for model calls.
+Models are chosen per stage by model_router.py.
+"""
 from langchain.tools import tool
-from langchain.chains import RetrievalQA
 from langchain.agents import initialize_agent, AgentType
-from langchain_neo4j import Neo4jGraph, GraphCypherQAChain
+from langchain_core.callbacks import Callbacks
 
-# Load secrets from project root
-BASE_DIR = Path(__file__).parents[3]
-secrets = toml.load(BASE_DIR / "secrets.toml")
+from modules.utils.analytics import trends
+from modules.utils.observability.tracing import span
+from modules.utils.retrieval import query_router, sql_qa
+from modules.utils.retrieval.context import current_user_id
+from modules.utils.retrieval.model_router import get_stage_llm
+from modules.utils.retrieval.resources import shared, get_vector_chain
 
-# Set OpenAI API key
-os.environ["OPENAI_API_KEY"] = secrets['openai']['OPENAI_API_KEY']
-
-# Initialize Neo4jGraph
-neo4j_cfg = secrets['neo4j']
-graph = Neo4jGraph(
-    url=neo4j_cfg['NEO4J_URI'],
-    username=neo4j_cfg['NEO4J_USERNAME'],
-    password=neo4j_cfg['NEO4J_PASSWORD']
-)
 
 # Tool: Cypher-based health QA
 @tool("health-cypher-tool", return_direct=True)
-def health_cypher_tool(query: str) -> str:
+def health_cypher_tool(query: str, callbacks: Callbacks = None) -> str:
     """
     Answer health-graph queries by translating NL to Cypher and returning a natural response.
     """
-    chain = GraphCypherQAChain.from_llm(
-        llm=ChatOpenAI(temperature=0, model_name="gpt-4-0613"),
-        graph=graph,
-        verbose=False,
-        allow_dangerous_requests=True
-    )
-    return chain.run(query)
+    return query_router.answer(query, callbacks)
 
-# Tool: Vector + graph hybrid QA (if Neo4j vector index available)
+# Tool: read-only SQL over the user's MySQL tables for aggregates
+@tool("health-sql-tool", return_direct=True)
+def health_sql_tool(query: str, callbacks: Callbacks = None) -> str:
+    """
+    Answer aggregate questions (totals, averages, counts, minimum or maximum per
+    day, week or month) about the user's food, calories, water, sleep and steps
+    with a read-only SQL query over their records.
+    """
+    user_id = current_user_id.get()
+    if user_id is None:
+        return query_router.answer(query, callbacks)
+    return sql_qa.answer(query, user_id, callbacks)
+
+# Tool: Vector QA over per-user daily summaries and food documents
 @tool("health-vector-tool", return_direct=True)
-def health_vector_tool(query: str) -> str:
+def health_vector_tool(query: str, callbacks: Callbacks = None) -> str:
+    """
+    Answer fuzzy or descriptive health questions using semantic search over the
+    user's daily health summaries and food history.
     """
-    Answer health-graph questions using hybrid vector retrieval over graph embeddings.
+    return get_vector_chain().run(query, callbacks=callbacks)
+
+# Tool: precomputed trends, correlations and anomalies (no LLM, one row read)
+@tool("health-trends-tool")
+def health_trends_tool(query: str) -> str:
+    """
+    Precomputed facts about the user's calories, water, steps and sleep: recent
+    vs previous averages, week-over-week changes, long-term trends, correlations
+    between metrics (same day and next day) and unusual days. Use it for
+    questions about trends, changes, getting better or worse, comparisons,
+    correlations or anomalies.
     """
-    retriever = graph.as_retriever()  # requires Neo4j vector index
-    qa_chain = RetrievalQA.from_chain_type(
-        llm=ChatOpenAI(temperature=0, model_name="gpt-4-0613"),
-        retriever=retriever,
-        chain_type="stuff"
-    )
-    return qa_chain.run(query)
+    user_id = current_user_id.get()
+    if user_id is None:
+        return trends.describe(None)
+    with span("trends.lookup"):
+        return trends.describe_user(user_id)
+
+
+def _build_agent():
+    # Planner text (when it answers without a tool) is streamed to the user
+    with span("agent.build"):
+        llm = get_stage_llm('planning')
+        tools = [health_cypher_tool, health_sql_tool, health_vector_tool, health_trends_tool]
+
+        return initialize_agent(
+            tools,
+            llm,
+            agent=AgentType.OPENAI_FUNCTIONS,
+            verbose=True
+        )
+
 
 # Build the agent executor
 def get_graphrag_agent():
     """
-    Construct and return an AgentExecutor with health-cypher and health-vector tools.
-    Uses OpenAI_Functions agent type for function calling.
+    Return the process-wide AgentExecutor with health-cypher, health-sql,
+    health-vector and health-trends tools.
+    Uses OpenAI_Functions agent type for function calling. The executor holds no
+    per-conversation memory, so one instance is shared by every session.
     """
-    llm = ChatOpenAI(temperature=0, model_name="gpt-4-0613")
-    tools = [health_cypher_tool, health_vector_tool]
-
-    agent_executor = initialize_agent(
-        tools,
-        llm,
-        agent=AgentType.OPENAI_FUNCTIONS,
-        verbose=True
-    )
-    return agent_executor
+    return shared("graphrag_agent", _build_agent)
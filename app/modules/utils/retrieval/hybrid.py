@@ -0,0 +1,120 @@
+# modules/utils/retrieval/hybrid.py
+"""
+Parallel retrieval mode: Cypher and vector retrieval run at the same time and
+their contexts are merged into a single synthesis call.
+
+With the function-calling agent, an empty answer from one tool costs another
+planning round-trip before the other tool is tried. Here both paths are
+speculative: whichever produces usable context is used, a failing or slow
+Cypher translation falls back to the vector hits, and the user pays for at
+most one Cypher generation and one synthesis. Trend-style questions also get
+the user's precomputed trend facts (analytics/trends.py).
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from typing import List, Optional, Union
+
+from modules.utils.analytics import trends
+from modules.utils.retrieval import cypher_qa, query_router
+from modules.utils.retrieval.executor import RunCancelled, current_run
+from modules.utils.retrieval.vector_index import search_user
+from modules.utils.settings import get_section
+
+logger = logging.getLogger(__name__)
+
+cfg = get_section(
+    'hybrid',
+    workers=8,
+    vector_k=6,
+    min_vector_score=0.2,     # drop weak semantic matches
+)
+
+NO_CONTEXT_ANSWER = "I’m sorry, I don’t have the information to answer that."
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    # Separate from the run pool: a run waiting on its own branches must never
+    # starve them of workers
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=int(cfg['workers']), thread_name_prefix="retrieval")
+    return _pool
+
+
+def _cypher_branch(user_id: int, username: str, question: str, callbacks=None):
+    # Aggregates may be answered from MySQL instead (query_router.py)
+    _, rows = query_router.retrieve(question, user_id, callbacks, cypher_question=f"For user {username}, {question}")
+    return cypher_qa.build_context(rows) if rows else []
+
+
+def _vector_branch(user_id: int, question: str) -> List[dict]:
+    hits = search_user(user_id, question, int(cfg['vector_k']))
+    return [h for h in hits if h['score'] >= float(cfg['min_vector_score'])]
+
+
+def _settle(future, name: str) -> list:
+    """
+    Result of a retrieval branch; a failed branch contributes no context.
+    Cancellation still propagates.
+    """
+    try:
+        return future.result()
+    except RunCancelled:
+        raise
+    except Exception as exc:
+        logger.warning("hybrid %s branch failed: %s", name, exc)
+        return []
+
+
+def merge_contexts(graph: Union[List[dict], str], hits: List[dict], facts: Optional[str] = None) -> Optional[str]:
+    """
+    One context for synthesis. Precomputed trend facts and graph results (rows,
+    or a compacted summary) are exact and go first; semantic hits add
+    descriptive context, highest score first. None when all are empty.
+    """
+    parts = [facts] if facts else []
+    if isinstance(graph, str):
+        parts.append("Graph query results:\n" + graph)
+    elif graph:
+        parts.append("Graph query results:\n" + "\n".join(str(r) for r in graph))
+    if hits:
+        hits = sorted(hits, key=lambda h: h['score'], reverse=True)
+        parts.append("Related health records:\n" + "\n".join(f"- {h['text']}" for h in hits))
+    return "\n\n".join(parts) if parts else None
+
+
+def answer(user_id: int, username: str, question: str, callbacks=None) -> str:
+    """
+    Run both retrieval paths concurrently, then synthesize once.
+    """
+    pool = _get_pool()
+    # Each branch gets its own copy of the request context (run control, user)
+    cypher_future = pool.submit(copy_context().run, _cypher_branch, user_id, username, question, callbacks)
+    vector_future = pool.submit(copy_context().run, _vector_branch, user_id, question)
+
+    facts = None
+    if trends.TREND_RE.search(question):
+        try:
+            facts = trends.describe_user(user_id)
+        except Exception as exc:
+            logger.warning("hybrid trends lookup failed: %s", exc)
+    graph = _settle(cypher_future, "cypher")
+    hits = _settle(vector_future, "vector")
+    logger.info("hybrid context graph=%s hits=%d",
+                "summary" if isinstance(graph, str) else f"{len(graph)} rows", len(hits))
+
+    control = current_run.get()
+    if control is not None:
+        control.check()
+
+    context = merge_contexts(graph, hits, facts)
+    if context is None:
+        return NO_CONTEXT_ANSWER
+    return cypher_qa.synthesize(question, context, callbacks)
@@ -0,0 +1,219 @@
+# modules/utils/retrieval/intent_router.py
+"""
+Deterministic fast path for the AI Assistant.
+
+Common question shapes (foods on a date, totals/averages of a metric over a
+period, top-N foods) are recognized locally, answered with prepared,
+parameterized Cypher and formatted without any LLM call. Anything else returns
+None so the caller can fall back to the GraphRAG agent.
+"""
+import re
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date
+from typing import Optional
+
+from modules.utils.retrieval.dates import DateRange, resolve_date_range
+from modules.utils.retrieval.resources import get_graph
+
+ALL_TIME = (date(1, 1, 1), date(9999, 12, 31))
+
+# metric -> (relationship, label, property, unit)
+METRICS = {
+    'calories': ('HAS_ATE', 'Food', 'calories', 'kcal'),
+    'sleep':    ('HAS_SLEPT', 'Sleep', 'duration_h', 'hours'),
+    'steps':    ('HAS_WALKED', 'Step', 'count', 'steps'),
+    'water':    ('HAS_DRUNK', 'Water', 'amount_ml', 'ml'),
+}
+
+METRIC_PATTERNS = {
+    'calories': r"\bcalori\w*|\bkcal\b",
+    'sleep':    r"\bsle(?:ep|pt)\w*",
+    'steps':    r"\bsteps?\b|\bwalk\w*",
+    'water':    r"\bwater\b|\bdr[ai]nk\w*|\bhydrat\w*",
+}
+FOOD_RE = re.compile(r"\b(?:eat|ate|eaten|eating|food|foods|meal|meals)\b")
+TOP_RE = re.compile(r"\btop\s*(\d+)?\b|\bmost\b|\bfavou?rite\b|\bfrequent\w*")
+AVG_RE = re.compile(r"\baverage\b|\bavg\b|\bmean\b|\bper day\b|\bdaily\b|\ba day\b")
+TOTAL_RE = re.compile(r"\btotal\b|\bsum\b|\bhow (?:much|many|long)\b|\boverall\b|\bin total\b")
+# Questions the templates cannot answer faithfully
+UNSUPPORTED_RE = re.compile(
+    r"\bcompar\w*|\bvs\.?\b|\bversus\b|\bwhy\b|\bcorrelat\w*|\btrend\w*|\bbetter\b|\bworse\b"
+    r"|\bafter\b|\bbefore\b|\bshould\b|\brecommend\w*|\bhealthy\b|\bbest\b|\bworst\b|\bburn\w*"
+    # Conditions on values ("days I slept less than 6 hours"): the templates
+    # would answer with an unconditional total. "over the last week" is a period.
+    r"|\bthan\b|\bat (?:least|most)\b|\bexceed\w*|\bonly\b|[<>]"
+    r"|\b(?:over|under|above|below)\b(?!\s+(?:the|a|an|my|this|that|last|past|previous|next)\b)"
+)
+
+# ─── CYPHER TEMPLATES ─────────────────────────────────────────────────────────
+
+FOODS_IN_RANGE = """
+MATCH (u:User {user_id: $uid})-[:HAS_ATE]->(f:Food)
+WHERE f.recordedOn >= date($start) AND f.recordedOn <= date($end)
+RETURN toString(f.recordedOn) AS day, f.name AS food, f.amount AS amount, f.calories AS calories
+ORDER BY day, food
+"""
+
+METRIC_IN_RANGE = """
+MATCH (u:User {{user_id: $uid}})-[:{rel}]->(n:{label})
+WHERE n.recordedOn >= date($start) AND n.recordedOn <= date($end)
+WITH n.recordedOn AS day, sum(n.{prop}) AS daily
+RETURN count(day) AS days, sum(daily) AS total, avg(daily) AS average
+"""
+
+# Compacted days (backend/retention.py) keep one Food node per food with an
+# `items` count, and fold the remaining foods into '(other foods)'
+TOP_FOODS = """
+MATCH (u:User {{user_id: $uid}})-[:HAS_ATE]->(f:Food)
+WHERE f.recordedOn >= date($start) AND f.recordedOn <= date($end) AND f.name <> '(other foods)'
+RETURN f.name AS food, sum(coalesce(f.items, 1)) AS times, sum(f.calories) AS calories
+ORDER BY {order} DESC, food
+LIMIT $n
+"""
+
+
+@dataclass
+class Intent:
+    name: str                      # 'foods_on_date' | 'metric' | 'top_foods'
+    date_range: Optional[DateRange]
+    metric: Optional[str] = None
+    agg: str = 'total'             # 'total' | 'average'
+    top_n: int = 5
+    order_by: str = 'times'        # 'times' | 'calories'
+
+
+# ─── SLOT EXTRACTION ──────────────────────────────────────────────────────────
+
+def extract_intent(question: str, today: Optional[date] = None) -> Optional[Intent]:
+    """
+    Map a question onto one of the supported shapes, or return None.
+    """
+    q = question.lower()
+    if UNSUPPORTED_RE.search(q):
+        return None
+    rng = resolve_date_range(q, today)
+    metrics = [m for m, pat in METRIC_PATTERNS.items() if re.search(pat, q)]
+    asks_food = bool(FOOD_RE.search(q))
+
+    # Top-N foods ("top 3 foods", "what do I eat most")
+    top = TOP_RE.search(q)
+    if top and asks_food and metrics in ([], ['calories']):
+        n = int(top.group(1)) if top.group(1) else 5
+        order = 'calories' if metrics == ['calories'] else 'times'
+        return Intent('top_foods', rng, top_n=max(1, min(n, 50)), order_by=order)
+
+    # Single metric total / average
+    if len(metrics) == 1:
+        agg = 'average' if AVG_RE.search(q) else 'total'
+        if agg == 'total' and not (TOTAL_RE.search(q) or rng):
+            return None
+        return Intent('metric', rng, metric=metrics[0], agg=agg)
+
+    # Foods eaten on a day / in a short period
+    if asks_food and not metrics and rng and (rng[1] - rng[0]).days <= 31:
+        return Intent('foods_on_date', rng)
+
+    return None
+
+
+# ─── ANSWER FORMATTING ────────────────────────────────────────────────────────
+
+def _period(rng: Optional[DateRange]) -> str:
+    if rng is None:
+        return "across all your records"
+    start, end = rng
+    if start == end:
+        return f"on {start.isoformat()}"
+    return f"between {start.isoformat()} and {end.isoformat()}"
+
+
+def _num(value, unit: str) -> str:
+    if value is None:
+        return f"0 {unit}"
+    if unit == 'hours':
+        return f"{value:.2f} {unit}"
+    return f"{int(round(value)):,} {unit}"
+
+
+def _format_foods(rows, rng) -> str:
+    if not rows:
+        return f"I found no food records for you {_period(rng)}."
+    by_day = OrderedDict()
+    for r in rows:
+        by_day.setdefault(r['day'], []).append(r)
+    lines = []
+    grand_total = 0.0
+    for day, items in by_day.items():
+        day_total = sum(i['calories'] or 0 for i in items)
+        grand_total += day_total
+        foods = ", ".join(
+            f"{i['food']} ({_num(i['calories'], 'kcal')})" for i in items
+        )
+        lines.append(f"- {day}: {foods} — {_num(day_total, 'kcal')}")
+    header = f"Here is what you ate {_period(rng)}:"
+    footer = f"Total: {_num(grand_total, 'kcal')}." if len(by_day) > 1 else ""
+    return "\n".join([header, *lines, footer]).strip()
+
+
+def _format_metric(intent: Intent, row) -> str:
+    unit = METRICS[intent.metric][3]
+    if not row or not row.get('days'):
+        return f"I found no {intent.metric} records for you {_period(intent.date_range)}."
+    days = row['days']
+    if intent.agg == 'average':
+        return (
+            f"Your average daily {intent.metric} {_period(intent.date_range)} was "
+            f"{_num(row['average'], unit)} (over {days} recorded day{'s' if days != 1 else ''})."
+        )
+    return (
+        f"Your total {intent.metric} {_period(intent.date_range)} was "
+        f"{_num(row['total'], unit)} (over {days} recorded day{'s' if days != 1 else ''})."
+    )
+
+
+def _format_top(intent: Intent, rows) -> str:
+    if not rows:
+        return f"I found no food records for you {_period(intent.date_range)}."
+    basis = "total calories" if intent.order_by == 'calories' else "how often you ate them"
+    lines = [
+        f"{i}. {r['food']} — {r['times']}x, {_num(r['calories'], 'kcal')}"
+        for i, r in enumerate(rows, start=1)
+    ]
+    return "\n".join([f"Your top {len(rows)} foods {_period(intent.date_range)} by {basis}:", *lines])
+
+
+# ─── ROUTER ───────────────────────────────────────────────────────────────────
+
+def run_intent(user_id: int, intent: Intent) -> str:
+    """
+    Execute the prepared template for `intent` and format the answer.
+    """
+    start, end = intent.date_range or ALL_TIME
+    params = {"uid": int(user_id), "start": start.isoformat(), "end": end.isoformat()}
+    graph = get_graph()
+
+    if intent.name == 'foods_on_date':
+        return _format_foods(graph.query(FOODS_IN_RANGE, params), intent.date_range)
+
+    if intent.name == 'metric':
+        rel, label, prop, _ = METRICS[intent.metric]
+        rows = graph.query(METRIC_IN_RANGE.format(rel=rel, label=label, prop=prop), params)
+        return _format_metric(intent, rows[0] if rows else None)
+
+    if intent.name == 'top_foods':
+        params["n"] = intent.top_n
+        rows = graph.query(TOP_FOODS.format(order=intent.order_by), params)
+        return _format_top(intent, rows)
+
+    raise ValueError(f"Unknown intent: {intent.name}")
+
+
+def route_question(user_id: int, question: str, today: Optional[date] = None) -> Optional[str]:
+    """
+    Answer `question` through the fast path, or return None to fall back.
+    """
+    intent = extract_intent(question, today)
+    if intent is None:
+        return None
+    return run_intent(user_id, intent)
@@ -0,0 +1,88 @@
+# modules/utils/retrieval/model_router.py
+"""
+Per-stage model selection with fast -> strong escalation.
+
+Every LLM stage (agent planning, Cypher generation, answer synthesis) gets a
+model tier from [models] in secrets.toml instead of one hard-coded model.
+Routine work runs on the fast tier; callers escalate a stage to the strong
+tier only when its output fails validation (e.g. Cypher that does not parse,
+is rejected by the cost guard, or returns nothing), and only while the run
+still has enough time left to afford a slower model.
+"""
+import time
+from typing import List, Optional
+
+from langchain_core.output_parsers import StrOutputParser
+from langchain_neo4j.chains.graph_qa.prompts import CYPHER_GENERATION_PROMPT, CYPHER_QA_PROMPT
+from langchain_openai import ChatOpenAI
+
+from modules.utils.retrieval.executor import current_run
+from modules.utils.retrieval.resources import get_answer_llm, get_llm, shared
+from modules.utils.settings import get_section
+
+cfg = get_section(
+    'models',
+    tiers={'fast': 'gpt-4o-mini', 'strong': 'gpt-4o'},
+    stages={'planning': 'fast', 'cypher_generation': 'fast', 'sql_generation': 'fast', 'synthesis': 'fast'},
+    escalate_to='strong',
+    min_escalation_budget_s=8.0,   # don't escalate with less run time left than this
+)
+
+# Stages whose output is shown to the user (streamed, tagged as answers)
+ANSWER_STAGES = {'planning', 'synthesis'}
+
+
+def tier_for(stage: str) -> str:
+    return cfg['stages'].get(stage, 'fast')
+
+
+def model_for(stage: str, tier: Optional[str] = None) -> str:
+    return cfg['tiers'][tier or tier_for(stage)]
+
+
+def get_stage_llm(stage: str, tier: Optional[str] = None) -> ChatOpenAI:
+    """
+    Shared client for `stage` on `tier` (the stage's configured tier by default).
+    """
+    model = model_for(stage, tier)
+    return get_answer_llm(model) if stage in ANSWER_STAGES else get_llm(model)
+
+
+def escalation_path(stage: str) -> List[str]:
+    """
+    Tiers to try for `stage`, in order: its own tier, then the escalation tier.
+    """
+    first, strong = tier_for(stage), cfg['escalate_to']
+    return [first] if first == strong else [first, strong]
+
+
+def can_escalate() -> bool:
+    """
+    True when the current run (if any) has time left for a strong-tier retry.
+    """
+    control = current_run.get()
+    if control is None:
+        return True
+    return control.deadline - time.monotonic() >= float(cfg['min_escalation_budget_s'])
+
+
+def get_cypher_generator(tier: Optional[str] = None):
+    """
+    question + schema -> Cypher text, on the given tier.
+    """
+    model = model_for('cypher_generation', tier)
+    return shared(
+        ("cypher_generator", model),
+        lambda: CYPHER_GENERATION_PROMPT | get_stage_llm('cypher_generation', tier) | StrOutputParser()
+    )
+
+
+def get_qa_chain(tier: Optional[str] = None):
+    """
+    question + context -> answer, on the given tier.
+    """
+    model = model_for('synthesis', tier)
+    return shared(
+        ("qa_chain", model),
+        lambda: CYPHER_QA_PROMPT | get_stage_llm('synthesis', tier) | StrOutputParser()
+    )
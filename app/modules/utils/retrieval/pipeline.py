@@ -0,0 +1,170 @@
+# modules/utils/retrieval/pipeline.py
+"""
+Question answering pipeline used by the AI Assistant page.
+
+Order of resolution:
+1. Answer cache (same user, same question, same dates, same data version)
+2. Intent router (recognized shapes -> parameterized Cypher, no LLM)
+3. GraphRAG agent (LLM planning + Cypher/vector tools), streamed token by token,
+   or, with [assistant] retrieval_mode = "parallel", both retrieval paths at
+   once and a single synthesis call (see hybrid.py)
+"""
+import logging
+import queue
+import time
+from typing import Any, Iterator, List, Optional, Tuple
+
+from modules.utils.cache.answer_cache import get_cached_answer, get_data_version, put_cached_answer
+from modules.utils.observability.tracing import TracingHandler, span, start_span
+from modules.utils.retrieval import hybrid
+from modules.utils.retrieval.context import current_user_id, current_username
+from modules.utils.retrieval.executor import (
+    DeadlineExceeded, DeadlineHandler, RunCancelled, submit_run
+)
+from modules.utils.retrieval.graphrag import get_graphrag_agent
+from modules.utils.retrieval.intent_router import route_question
+from modules.utils.retrieval.streaming import StreamHandler
+from modules.utils.settings import get_section
+
+logger = logging.getLogger(__name__)
+
+Event = Tuple[str, object]
+
+cfg = get_section('assistant', retrieval_mode='agent')   # 'agent' | 'parallel'
+
+TIMEOUT_FALLBACK = (
+    "Sorry, that question took too long to answer. "
+    "Try asking about a shorter period or a single metric."
+)
+
+
+def _timeout_answer(partial: List[str]) -> str:
+    text = "".join(partial).strip()
+    if not text:
+        return TIMEOUT_FALLBACK
+    return text + " …\n\n(The answer was cut short because it took too long.)"
+
+
+def run_agent(username: str, question: str, callbacks=None) -> str:
+    prompt = f"For user {username}, {question}"
+    with span("agent.run"):
+        res = get_graphrag_agent().invoke({"input": prompt}, config={"callbacks": callbacks})
+    return res.get("output", "").strip() if res else ""
+
+
+def stream_answer(user_id: int, username: str, question: str, session_key: Any = None,
+                  callbacks: Optional[list] = None) -> Iterator[Event]:
+    """
+    Yield ("status", text) and ("token", text) events while the answer is being
+    produced, then exactly one ("final", answer).
+
+    The agent runs on the shared worker pool under an overall deadline and
+    per-stage budgets. On timeout the caller gets the partial answer (or a
+    fallback message); a newer run for the same `session_key`, or closing this
+    generator (e.g. the user navigated away), cancels the run. Other agent
+    errors are re-raised. Only complete answers are cached. Extra LangChain
+    `callbacks` (e.g. a token meter) are attached to the agent run.
+    """
+    t0 = time.perf_counter()
+    # Not made current: this generator yields to the UI between events
+    root = start_span("assistant.answer", user_id=user_id)
+    try:
+        yield from _stream(root, t0, user_id, username, question, session_key, callbacks or [])
+    except Exception as exc:
+        root.end(exc)
+        raise
+    finally:
+        root.end()
+
+
+def _stream(root, t0, user_id, username, question, session_key, extra_callbacks) -> Iterator[Event]:
+    # The data version the answer is computed from; an ingest finishing
+    # mid-run makes it stale, and it is then not cached
+    version = get_data_version(user_id)
+    with span("answer_cache.lookup", parent=root) as s:
+        cached = get_cached_answer(user_id, question, version=version)
+        s.set("hit", cached is not None)
+    if cached is not None:
+        root.set("source", "cache")
+        logger.info("answer source=cache ttft=%.3fs", time.perf_counter() - t0)
+        yield "final", cached
+        return
+
+    with span("intent_router", parent=root) as s:
+        fast = route_question(user_id, question)
+        s.set("hit", fast is not None)
+    if fast is not None:
+        root.set("source", "router")
+        logger.info("answer source=router ttft=%.3fs", time.perf_counter() - t0)
+        yield "final", fast
+        return
+
+    root.set("source", cfg['retrieval_mode'])
+    handler = StreamHandler()
+    events = handler.events
+
+    def _job(control):
+        # Scope user-aware tools (vector retrieval) to the asking user
+        current_user_id.set(user_id)
+        current_username.set(username)
+        try:
+            with span("assistant.run", parent=root):
+                callbacks = [handler, DeadlineHandler(control), TracingHandler(), *extra_callbacks]
+                if cfg['retrieval_mode'] == 'parallel':
+                    events.put(("status", "Searching your health data..."))
+                    result = hybrid.answer(user_id, username, question, callbacks=callbacks)
+                else:
+                    result = run_agent(username, question, callbacks=callbacks)
+            events.put(("final", result))
+        except BaseException as exc:
+            events.put(("error", exc))
+
+    _, control = submit_run(_job, session_key)
+
+    partial: List[str] = []
+    first_token = None
+    try:
+        while True:
+            try:
+                kind, payload = events.get(timeout=max(0.05, control.deadline - time.monotonic()))
+            except queue.Empty:
+                root.set("timed_out", True)
+                logger.warning("answer source=agent timed out after %.3fs", time.perf_counter() - t0)
+                yield "final", _timeout_answer(partial)
+                return
+            if kind == "error":
+                if isinstance(payload, DeadlineExceeded):
+                    root.set("timed_out", True)
+                    logger.warning("answer source=agent %s", payload)
+                    yield "final", _timeout_answer(partial)
+                    return
+                if isinstance(payload, RunCancelled):
+                    root.set("cancelled", True)
+                    return
+                raise payload
+            if kind == "token":
+                partial.append(payload)
+                if first_token is None:
+                    first_token = time.perf_counter() - t0
+                    root.set("ttft_ms", round(first_token * 1000, 1))
+                    logger.info("answer source=agent ttft=%.3fs", first_token)
+            if kind == "final":
+                logger.info("answer source=agent total=%.3fs", time.perf_counter() - t0)
+                if payload:
+                    put_cached_answer(user_id, question, payload, version=version)
+                yield kind, payload
+                return
+            yield kind, payload
+    finally:
+        # No-op for finished runs; stops abandoned or timed-out ones
+        control.cancel()
+
+
+def answer_question(user_id: int, username: str, question: str) -> str:
+    """
+    Blocking variant of stream_answer: returns only the final answer.
+    """
+    for kind, payload in stream_answer(user_id, username, question):
+        if kind == "final":
+            return payload
+    return ""
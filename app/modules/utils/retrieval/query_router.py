@@ -0,0 +1,148 @@
+# modules/utils/retrieval/query_router.py
+"""
+Cost-based choice between the SQL (sql_qa.py) and Cypher (cypher_qa.py) paths.
+
+Only aggregate questions (totals, averages, counts, top-N) are candidates
+for SQL; everything else, like listing meals, goes to the graph. For an
+aggregate the router counts the rows the question touches with one indexed
+COUNT(*) per table in MySQL, over the question's metrics and date range, and
+prices both engines with [query_router]:
+
+    cost = overhead_ms + rows * row_cost_us / 1000
+
+SQL pays more up front (sandbox EXPLAIN, no translation cache) but
+aggregates in the index; Cypher has to visit and return every node in range.
+So short ranges stay on the graph and long ones move to MySQL. A failing or
+rejected SQL attempt falls back to Cypher.
+"""
+import logging
+import re
+from datetime import timedelta
+from typing import List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import text
+
+from modules.utils.db import db_chat_mysql
+from modules.utils.db.db_utils_mysql import get_engine
+from modules.utils.observability.metrics import counter
+from modules.utils.observability.tracing import span
+from modules.utils.retrieval import cypher_qa, sql_qa
+from modules.utils.retrieval.context import current_user_id
+from modules.utils.retrieval.cypher_guard import CypherRejected
+from modules.utils.retrieval.dates import resolve_date_range
+from modules.utils.retrieval.executor import DeadlineExceeded, RunCancelled
+from modules.utils.retrieval.intent_router import AVG_RE, FOOD_RE, METRIC_PATTERNS, TOP_RE, TOTAL_RE
+from modules.utils.settings import get_section
+
+logger = logging.getLogger(__name__)
+
+cfg = get_section(
+    'query_router',
+    enabled=True,
+    sql_overhead_ms=40.0,       # sandbox EXPLAIN + round trip
+    sql_row_cost_us=2.0,        # indexed range scan, aggregated in MySQL
+    cypher_overhead_ms=15.0,
+    cypher_row_cost_us=25.0,    # node visit + row returned to the client
+)
+
+ROUTES = counter("query_routes_total", "Questions routed to each query engine", ("engine", "reason"))
+
+AGGREGATE_RE = re.compile(
+    r"\b(?:count|number of|how often|times|per (?:week|month)|each (?:day|week|month)|by (?:day|week|month)"
+    r"|weekly|monthly|min(?:imum)?|max(?:imum)?|highest|lowest)\b"
+)
+
+# metric -> (table, indexed time column)
+TABLES = {
+    'calories': ('food_intake', 'event_time'),
+    'water':    ('water_intake', 'event_time'),
+    'sleep':    ('sleep_hours', 'date'),
+    'steps':    ('step_count', 'date'),
+}
+
+
+class Route(NamedTuple):
+    engine: str             # 'sql' or 'cypher'
+    reason: str
+    rows: int               # estimated rows touched (0 when not estimated)
+    sql_ms: float
+    cypher_ms: float
+
+
+def is_aggregate(question: str) -> bool:
+    q = question.lower()
+    return any(p.search(q) for p in (TOTAL_RE, AVG_RE, TOP_RE, AGGREGATE_RE))
+
+
+def estimate_rows(user_id: int, question: str) -> int:
+    """
+    Rows of the user's tables that `question` touches: the tables of the
+    metrics it names (all of them when none) within its date range.
+    """
+    q = question.lower()
+    metrics = [m for m, pat in METRIC_PATTERNS.items() if re.search(pat, q)]
+    if FOOD_RE.search(q) and 'calories' not in metrics:
+        metrics.append('calories')
+    rng = resolve_date_range(q)
+    params = {"uid": int(user_id)}
+    if rng:
+        params.update(start=rng[0], end=rng[1] + timedelta(days=1))
+    total = 0
+    with get_engine(db_chat_mysql.DB_URL).connect() as conn:
+        for table, col in (TABLES[m] for m in metrics or TABLES):
+            where = "user_id = :uid" + (f" AND {col} >= :start AND {col} < :end" if rng else "")
+            total += int(conn.execute(text(f"SELECT COUNT(*) FROM {table} WHERE {where}"), params).scalar() or 0)
+    return total
+
+
+def route(question: str, user_id: Optional[int]) -> Route:
+    """
+    The engine to answer `question` with, and why.
+    """
+    if not cfg['enabled'] or user_id is None or db_chat_mysql.DB_URL is None:
+        return Route('cypher', 'disabled', 0, 0.0, 0.0)
+    if not is_aggregate(question):
+        return Route('cypher', 'not_aggregate', 0, 0.0, 0.0)
+    with span("query_router.estimate") as s:
+        rows = estimate_rows(user_id, question)
+        s.set("rows", rows)
+    sql_ms = float(cfg['sql_overhead_ms']) + rows * float(cfg['sql_row_cost_us']) / 1000
+    cypher_ms = float(cfg['cypher_overhead_ms']) + rows * float(cfg['cypher_row_cost_us']) / 1000
+    engine = 'sql' if sql_ms < cypher_ms else 'cypher'
+    return Route(engine, 'cost', rows, sql_ms, cypher_ms)
+
+
+def retrieve(question: str, user_id: Optional[int], callbacks=None,
+             cypher_question: Optional[str] = None) -> Tuple[str, List[dict]]:
+    """
+    Rows for `question` from the cheaper engine. Returns (engine, rows).
+    `cypher_question` is what the Cypher path sees (e.g. prefixed with the
+    user name); SQL is scoped by `user_id` instead.
+    """
+    r = route(question, user_id)
+    logger.info("query route=%s reason=%s rows=%d sql=%.1fms cypher=%.1fms",
+                r.engine, r.reason, r.rows, r.sql_ms, r.cypher_ms)
+    if r.engine == 'sql':
+        try:
+            _, rows = sql_qa.retrieve(question, user_id, callbacks)
+            ROUTES.inc(engine='sql', reason=r.reason)
+            return 'sql', rows
+        except (RunCancelled, DeadlineExceeded):
+            raise
+        except Exception as exc:
+            logger.warning("sql path failed, falling back to cypher: %s", exc)
+            r = r._replace(reason='fallback')
+    ROUTES.inc(engine='cypher', reason=r.reason)
+    _, rows = cypher_qa.retrieve(cypher_question or question, callbacks)
+    return 'cypher', rows
+
+
+def answer(question: str, callbacks=None) -> str:
+    """
+    cypher_qa.answer, but aggregate questions may be answered from MySQL.
+    """
+    try:
+        _, rows = retrieve(question, current_user_id.get(), callbacks)
+    except CypherRejected:
+        return cypher_qa.REJECTED_ANSWER
+    return cypher_qa.synthesize(question, cypher_qa.build_context(rows), callbacks)
@@ -0,0 +1,183 @@
+# modules/utils/retrieval/resources.py
+"""
+Process-wide resource layer for the GraphRAG pipeline.
+
+LLM clients, the Neo4j graph wrapper, QA chains and the agent executor are
+expensive to construct, so they are built once per process and shared by every
+Streamlit session and worker thread. All objects handed out here are stateless
+between calls and therefore safe to use concurrently.
+"""
+import os
+import threading
+from pathlib import Path
+
+import httpx
+import toml
+from langchain_openai import ChatOpenAI
+from langchain.chains import RetrievalQA
+from langchain_neo4j import Neo4jGraph, GraphCypherQAChain
+
+from modules.utils.observability.tracing import span
+from modules.utils.settings import get_section
+
+# Project root (the `app/` directory, where secrets.toml lives)
+BASE_DIR = Path(__file__).parents[3]
+
+DEFAULT_MODEL = "gpt-4-0613"
+
+# Tag for LLM runs whose output is shown to the user (streamed token by token)
+ANSWER_TAG = "final_answer"
+
+# HTTP connection pool shared by every OpenAI client in this process
+HTTP_POOL_LIMITS = httpx.Limits(max_connections=32, max_keepalive_connections=16)
+HTTP_TIMEOUT = httpx.Timeout(60.0, connect=10.0)
+
+limits = get_section('assistant', llm_timeout_s=30.0, graph_timeout_s=10.0)
+
+class TracedNeo4jGraph(Neo4jGraph):
+    """
+    Neo4jGraph whose queries are recorded as `neo4j.query` spans with row counts.
+    """
+
+    def query(self, query: str, params: dict = {}, session_params: dict = {}):
+        with span("neo4j.query") as s:
+            rows = super().query(query, params, session_params)
+            s.set("rows", len(rows))
+            return rows
+
+
+_resources = {}
+_lock = threading.RLock()
+
+
+def shared(key, builder):
+    """
+    Return the process-wide resource stored under `key`, building it with
+    `builder()` on first use. Double-checked locking keeps concurrent first
+    calls from building the same resource twice.
+    """
+    res = _resources.get(key)
+    if res is not None:
+        return res
+    with _lock:
+        res = _resources.get(key)
+        if res is None:
+            res = builder()
+            _resources[key] = res
+    return res
+
+
+def install(key, value):
+    """
+    Pre-seed the resource stored under `key`. The offline benchmark uses this
+    to swap in stand-ins: "graph" for the Neo4j wrapper, and "llm_factory"
+    (called with get_llm's arguments) for every chat model.
+    """
+    with _lock:
+        _resources[key] = value
+
+
+def reset_resources():
+    """
+    Drop every cached resource (e.g. after rotating credentials).
+    """
+    with _lock:
+        client = _resources.pop("http_client", None)
+        _resources.clear()
+    if client is not None:
+        client.close()
+
+
+def get_secrets() -> dict:
+    def _load():
+        secrets = toml.load(BASE_DIR / "secrets.toml")
+        os.environ.setdefault("OPENAI_API_KEY", secrets['openai']['OPENAI_API_KEY'])
+        return secrets
+    return shared("secrets", _load)
+
+
+def get_http_client() -> httpx.Client:
+    """
+    Pooled, keep-alive HTTP client reused by all LLM clients.
+    """
+    return shared(
+        "http_client",
+        lambda: httpx.Client(limits=HTTP_POOL_LIMITS, timeout=HTTP_TIMEOUT)
+    )
+
+
+def get_llm(model_name: str = DEFAULT_MODEL, temperature: float = 0,
+            streaming: bool = False, tags: tuple = ()) -> ChatOpenAI:
+    """
+    Shared chat model client for the given model/temperature combination.
+    """
+    def _build():
+        factory = _resources.get("llm_factory")
+        if factory is not None:
+            return factory(model_name=model_name, temperature=temperature, streaming=streaming, tags=tuple(tags))
+        secrets = get_secrets()
+        return ChatOpenAI(
+            model=model_name,
+            temperature=temperature,
+            streaming=streaming,
+            stream_usage=streaming,  # token counts for tracing when streaming
+            tags=list(tags) or None,
+            timeout=float(limits['llm_timeout_s']),
+            api_key=secrets['openai']['OPENAI_API_KEY'],
+            http_client=get_http_client(),
+        )
+    return shared(("llm", model_name, temperature, streaming, tuple(tags)), _build)
+
+
+def get_answer_llm(model_name: str = DEFAULT_MODEL) -> ChatOpenAI:
+    """
+    Streaming client for user-facing answers (agent replies, QA synthesis).
+    """
+    return get_llm(model_name, streaming=True, tags=(ANSWER_TAG,))
+
+
+def get_graph() -> Neo4jGraph:
+    """
+    Shared Neo4jGraph wrapper (holds its own pooled Bolt driver).
+    """
+    def _build():
+        neo4j_cfg = get_secrets()['neo4j']
+        return TracedNeo4jGraph(
+            url=neo4j_cfg['NEO4J_URI'],
+            username=neo4j_cfg['NEO4J_USERNAME'],
+            password=neo4j_cfg['NEO4J_PASSWORD'],
+            timeout=float(limits['graph_timeout_s'])  # server-side, per transaction
+        )
+    return shared("graph", _build)
+
+
+def get_cypher_chain() -> GraphCypherQAChain:
+    """
+    Shared NL -> Cypher -> answer chain (default-tier models per stage; see
+    model_router.py for tier-specific generators).
+    """
+    def _build():
+        from modules.utils.retrieval.model_router import get_stage_llm
+        return GraphCypherQAChain.from_llm(
+            cypher_llm=get_stage_llm('cypher_generation'),
+            qa_llm=get_stage_llm('synthesis'),
+            graph=get_graph(),
+            verbose=False,
+            allow_dangerous_requests=True
+        )
+    return shared("cypher_chain", _build)
+
+
+def get_vector_chain() -> RetrievalQA:
+    """
+    Shared retrieval QA chain over the per-user health document index.
+    """
+    def _build():
+        from modules.utils.retrieval.model_router import get_stage_llm
+        from modules.utils.retrieval.vector_index import UserScopedRetriever
+        return RetrievalQA.from_chain_type(
+            llm=get_stage_llm('synthesis'),
+            retriever=UserScopedRetriever(),
+            chain_type="stuff"
+        )
+    return shared("vector_chain", _build)
@@ -0,0 +1,151 @@
+# modules/utils/retrieval/result_guard.py
+"""
+Result-size guard between Cypher execution and answer synthesis.
+
+Generated Cypher can return thousands of rows ("what did I eat in 2024").
+Small results are passed to the LLM as-is; anything over the row or token
+budget is compacted locally with pandas into a short summary: row count, date
+span, numeric totals, top-N values and per-day (or per-week/month) totals.
+The LLM then phrases the numbers instead of counting them.
+"""
+import re
+from typing import List, Optional, Union
+
+import pandas as pd
+
+from modules.utils.settings import get_section
+
+cfg = get_section(
+    'result_guard',
+    max_rows=50,               # pass rows through untouched up to this many...
+    max_context_tokens=2000,   # ...and this many (estimated) tokens
+    max_fetch_rows=20000,      # LIMIT appended to unbounded generated queries
+    top_n=10,
+    max_periods=62,            # per-day totals beyond this roll up to weeks, then months
+    sample_rows=5,
+)
+
+LIMIT_RE = re.compile(r"\bLIMIT\b", re.IGNORECASE)
+UNION_RE = re.compile(r"\bUNION\b", re.IGNORECASE)
+ISO_DATE_RE = r"^\d{4}-\d{2}-\d{2}"
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English/JSON-ish text; good enough for a budget
+    return len(text) // 4 + 1
+
+
+def limit_cypher(cypher: str, n: Optional[int] = None) -> str:
+    """
+    Append a LIMIT to a read query that has none, so the driver never pulls an
+    unbounded result. Queries with their own LIMIT, or UNIONs, are left alone.
+    """
+    n = int(n or cfg['max_fetch_rows'])
+    text = cypher.rstrip().rstrip(';')
+    if LIMIT_RE.search(text) or UNION_RE.search(text):
+        return text
+    return f"{text}\nLIMIT {n + 1}"
+
+
+def _classify(df: pd.DataFrame):
+    """
+    Split columns into date, numeric and categorical.
+    """
+    dates, numeric, categorical = [], [], []
+    for col in df.columns:
+        s = df[col].dropna()
+        if s.empty:
+            continue
+        as_text = s.astype(str)
+        if as_text.str.match(ISO_DATE_RE).mean() >= 0.9:
+            dates.append(col)
+            continue
+        if pd.to_numeric(s, errors='coerce').notna().mean() >= 0.9 and not s.map(lambda v: isinstance(v, bool)).any():
+            numeric.append(col)
+            continue
+        categorical.append(col)
+    return dates, numeric, categorical
+
+
+def _fmt(value) -> str:
+    if isinstance(value, float):
+        return f"{value:,.2f}".rstrip('0').rstrip('.')
+    return f"{value:,}" if isinstance(value, int) else str(value)
+
+
+def _period_totals(df: pd.DataFrame, date_col: str, numeric: List[str]) -> List[str]:
+    days = pd.to_datetime(df[date_col].astype(str).str[:10], errors='coerce')
+    values = df[numeric].apply(pd.to_numeric, errors='coerce')
+    values['__rows'] = 1
+    grouped = values.groupby(days.dt.to_period('D')).sum()
+    label = "Per-day"
+    for freq, name in (('W', "Per-week"), ('M', "Per-month")):
+        if len(grouped) <= int(cfg['max_periods']):
+            break
+        grouped = values.groupby(days.dt.to_period(freq)).sum()
+        label = name
+    cols = ", ".join(numeric) if numeric else "rows"
+    lines = [f"{label} totals ({cols}; rows):"]
+    for period, row in grouped.iterrows():
+        nums = ", ".join(_fmt(row[c]) for c in numeric)
+        lines.append(f"- {period}: {nums + '; ' if nums else ''}{int(row['__rows'])}")
+    return lines
+
+
+def summarize_rows(rows: List[dict], truncated: bool = False) -> str:
+    """
+    Compact, LLM-ready summary of a large result set.
+    """
+    df = pd.json_normalize(rows)
+    # Nodes/lists/temporal values become plain text for grouping
+    df = df.apply(lambda s: s.map(lambda v: v if isinstance(v, (int, float, str, bool)) or v is None else str(v)))
+    dates, numeric, categorical = _classify(df)
+    top_n = int(cfg['top_n'])
+
+    lines = [f"Result summary ({len(df):,} rows{', more rows exist beyond the fetch limit' if truncated else ''}):"]
+    for col in dates:
+        days = pd.to_datetime(df[col].astype(str).str[:10], errors='coerce').dropna()
+        if not days.empty:
+            lines.append(f"{col}: {days.min().date()} to {days.max().date()} ({days.dt.normalize().nunique()} distinct days)")
+    for col in numeric:
+        s = pd.to_numeric(df[col], errors='coerce')
+        lines.append(f"{col}: total {_fmt(s.sum())}, mean {_fmt(s.mean())}, min {_fmt(s.min())}, max {_fmt(s.max())}")
+    for col in categorical:
+        counts = df[col].value_counts()
+        lines.append(f"{col}: {len(counts):,} distinct values")
+        if len(counts) > 1:
+            top = ", ".join(f"{k} ({v})" for k, v in counts.head(top_n).items())
+            lines.append(f"Top {min(top_n, len(counts))} {col} by count: {top}")
+            for num in numeric[:1]:
+                sums = pd.to_numeric(df[num], errors='coerce').groupby(df[col]).sum().nlargest(top_n)
+                lines.append(f"Top {len(sums)} {col} by total {num}: " +
+                             ", ".join(f"{k} ({_fmt(v)})" for k, v in sums.items()))
+    if dates:
+        lines += _period_totals(df, dates[0], numeric)
+
+    sample = df.head(int(cfg['sample_rows'])).to_dict('records')
+    lines.append("Sample rows: " + str(sample))
+
+    # Final safety net: keep the head of the summary within the token budget
+    budget = int(cfg['max_context_tokens'])
+    out, used = [], 0
+    for line in lines:
+        used += estimate_tokens(line)
+        if used > budget:
+            out.append("(summary truncated)")
+            break
+        out.append(line)
+    return "\n".join(out)
+
+
+def compact_rows(rows: List[dict]) -> Union[List[dict], str]:
+    """
+    Rows unchanged when within budget, otherwise a local summary. Expects rows
+    fetched with limit_cypher(); one extra row means the result was cut off.
+    """
+    truncated = len(rows) > int(cfg['max_fetch_rows'])
+    if truncated:
+        rows = rows[: int(cfg['max_fetch_rows'])]
+    if len(rows) <= int(cfg['max_rows']) and estimate_tokens(str(rows)) <= int(cfg['max_context_tokens']):
+        return rows
+    return summarize_rows(rows, truncated)
@@ -0,0 +1,438 @@
+# modules/utils/retrieval/sql_guard.py
+"""
+Sandbox for LLM-generated SQL over the health tables (see sql_qa.py).
+
+The model never sees the real tables. It writes a single SELECT against four
+per-user views (food_log, water_log, sleep_log, step_log); scope() prepends
+them as CTEs filtered on the asking user's id, which comes from the request
+context, never from the model. Before running, a query is tokenized and
+checked statically: one read-only SELECT, no TABLE statement, no system
+functions or variables, and every table reference (after FROM, JOIN or a
+comma, quoted or in parentheses) must be a view or one of its own CTEs; no
+identifier may name a real table or a system schema. Then EXPLAIN: MySQL
+plans with a full scan of a health table or too many estimated rows are
+rejected, and on SQLite the plan at least proves the query compiles.
+Rejections carry reasons the caller can feed back to the model.
+
+The static checks are not the only boundary. Queries run on a separate engine
+whose sessions are read-only and capped by a statement timeout, and which can
+only read the four health tables: on MySQL it logs in as the [sql_guard] user,
+which setup/database_setup.py grants SELECT on those tables alone; on SQLite
+an authorizer denies reads of any other table, pragmas and banned functions.
+"""
+import logging
+import re
+import sqlite3
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.engine import make_url
+
+from modules.utils.db.db_utils_mysql import get_engine
+from modules.utils.observability.metrics import register_engine
+from modules.utils.retrieval.result_guard import cfg as result_cfg
+from modules.utils.settings import get_section
+
+cfg = get_section(
+    'sql_guard',
+    enabled=True,
+    max_estimated_rows=200000,
+    max_retries=2,                  # regenerations with feedback after a rejection
+    statement_timeout_ms=5000,
+    pool_size=4,
+    user="",                        # MySQL account with SELECT on the health tables only
+    password="",
+)
+
+logger = logging.getLogger(__name__)
+
+# view -> (SELECT over the real table, with {uid}; columns described to the model)
+VIEWS: Dict[str, Tuple[str, str]] = {
+    'food_log': (
+        "SELECT DATE(event_time) AS day, event_time, food_name, amount, calories, items "
+        "FROM food_intake WHERE user_id = {uid}",
+        "day DATE, event_time DATETIME, food_name TEXT, amount FLOAT, calories FLOAT, items INT"
+        " -- one row per logged food; on days compacted by retention a row stands for `items`"
+        " servings and food_name '(other foods)' groups the day's remaining foods",
+    ),
+    'water_log': (
+        "SELECT DATE(event_time) AS day, event_time, amount AS amount_ml FROM water_intake WHERE user_id = {uid}",
+        "day DATE, event_time DATETIME, amount_ml FLOAT",
+    ),
+    'sleep_log': (
+        "SELECT date AS day, total_sleep_h AS hours FROM sleep_hours WHERE user_id = {uid}",
+        "day DATE, hours FLOAT -- one row per night",
+    ),
+    'step_log': (
+        "SELECT date AS day, total_steps AS steps FROM step_count WHERE user_id = {uid}",
+        "day DATE, steps INT -- one row per day",
+    ),
+}
+BASE_TABLES = {'food_intake', 'water_intake', 'sleep_hours', 'step_count'}
+# Everything else the app stores, plus system schemas and catalogs; the tables
+# of the actual database are added by check()
+APP_TABLES = {'users', 'chat_sessions', 'chat_history', 'ingest_jobs', 'food_compaction',
+              'daily_metrics', 'trend_facts', 'cache_versions'}
+SYSTEM_NAMES = {'information_schema', 'mysql', 'performance_schema', 'sys', 'main', 'temp',
+                'sqlite_master', 'sqlite_schema', 'sqlite_temp_master', 'sqlite_temp_schema',
+                'sqlite_sequence', 'sqlite_stat1', 'sqlite_stat4'}
+
+# One SQL token: strings, quoted identifiers (`x`, "x", [x]), words, numbers or
+# a single other character. A quote without its closing pair is left as `bad`.
+TOKEN_RE = re.compile(r"""
+    (?P<string>'(?:[^'\\]|\\.|'')*')
+  | (?P<quoted>`(?:[^`]|``)*`|"(?:[^"\\]|\\.|"")*"|\[[^\]]*\])
+  | (?P<number>\d+(?:\.\d*)?(?:[eE][-+]?\d+)?|\.\d+)
+  | (?P<word>[A-Za-z_$][\w$]*)
+  | (?P<bad>['`"\[])
+  | (?P<op>\S)
+""", re.VERBOSE | re.DOTALL)
+
+WRITE_WORDS = {
+    'INSERT', 'UPDATE', 'DELETE', 'MERGE', 'CREATE', 'DROP', 'ALTER', 'TRUNCATE', 'RENAME', 'GRANT', 'REVOKE',
+    'LOCK', 'UNLOCK', 'CALL', 'HANDLER', 'LOAD', 'ATTACH', 'DETACH', 'PRAGMA', 'VACUUM', 'INTO', 'OUTFILE',
+    'DUMPFILE', 'SET', 'DO', 'EXECUTE', 'PREPARE', 'SHOW', 'DESCRIBE', 'EXPLAIN',
+}
+BANNED_FUNCTIONS = {
+    'SLEEP', 'BENCHMARK', 'LOAD_FILE', 'GET_LOCK', 'RELEASE_LOCK', 'USER', 'CURRENT_USER', 'SESSION_USER',
+    'SYSTEM_USER', 'DATABASE', 'SCHEMA', 'VERSION', 'CONNECTION_ID', 'LOAD_EXTENSION', 'RANDOMBLOB',
+    'ZEROBLOB', 'SQLITE_VERSION', 'SQLITE_SOURCE_ID', 'SQLITE_COMPILEOPTION_USED', 'SQLITE_COMPILEOPTION_GET',
+}
+# Functions whose arguments use FROM ("EXTRACT(YEAR FROM day)")
+FROM_FUNCTIONS = {'EXTRACT', 'TRIM', 'SUBSTRING', 'SUBSTR', 'POSITION', 'OVERLAY'}
+JOIN_WORDS = {'JOIN', 'STRAIGHT_JOIN'}
+# Clauses that end a FROM list
+CLAUSE_WORDS = {'WHERE', 'GROUP', 'HAVING', 'ORDER', 'LIMIT', 'UNION', 'EXCEPT', 'INTERSECT', 'WINDOW',
+                'QUALIFY', 'FOR', 'OFFSET'}
+
+
+class Token(NamedTuple):
+    kind: str               # string | quoted | number | word | bad | op
+    text: str
+
+    @property
+    def name(self) -> str:
+        # Identifier as the database resolves it (unquoted, lowercase)
+        if self.kind == 'quoted':
+            return self.text[1:-1].replace(self.text[0] * 2, self.text[0]).lower()
+        return self.text.lower()
+
+    def is_word(self, *words: str) -> bool:
+        return self.kind == 'word' and self.text.upper() in words
+
+    @property
+    def is_identifier(self) -> bool:
+        return self.kind in ('word', 'quoted')
+
+
+def tokenize(sql: str) -> List[Token]:
+    return [Token(m.lastgroup, m.group()) for m in TOKEN_RE.finditer(sql)]
+
+
+class SqlRejected(ValueError):
+    """Generated SQL failed the sandbox checks."""
+
+    def __init__(self, reasons: List[str], sql: str):
+        super().__init__("; ".join(reasons))
+        self.reasons = reasons
+        self.sql = sql
+
+
+def _clean(sql: str) -> str:
+    return sql.strip().rstrip(';').strip()
+
+
+def cte_names(tokens: List[Token]) -> Set[str]:
+    """
+    Names defined by WITH: `name [(columns)] AS (`.
+    """
+    names = set()
+    for i, tok in enumerate(tokens):
+        if not tok.is_identifier:
+            continue
+        j = i + 1
+        if j < len(tokens) and tokens[j].text == '(':
+            depth = 0
+            while j < len(tokens):
+                depth += {'(': 1, ')': -1}.get(tokens[j].text, 0)
+                j += 1
+                if depth == 0:
+                    break
+        if j + 1 < len(tokens) and tokens[j].is_word('AS') and tokens[j + 1].text == '(':
+            names.add(tok.name)
+    return names
+
+
+def table_refs(tokens: List[Token]) -> List[Tuple[str, str]]:
+    """
+    Every table reference as (name, form): what follows FROM, JOIN,
+    STRAIGHT_JOIN or a comma in a FROM list, looking through grouping
+    parentheses. form is 'name', 'qualified' (`db.table`), 'function'
+    (`name(...)`) or 'other' (not an identifier).
+    """
+    refs = []
+    parens: List[str] = []          # kind of each open parenthesis
+    in_from = {0: False}            # FROM list open at this depth
+    expect = False                  # next token is a table position
+    for i, tok in enumerate(tokens):
+        nxt = tokens[i + 1] if i + 1 < len(tokens) else None
+        depth = len(parens)
+        if tok.text == '(' and tok.kind == 'op':
+            prev = tokens[i - 1] if i else None
+            if expect and not (nxt and nxt.is_word('SELECT', 'WITH', 'VALUES')):
+                kind = 'group'      # (t1 JOIN t2 ...) or (t)
+            elif prev is not None and prev.kind == 'word' and prev.text.upper() in FROM_FUNCTIONS:
+                kind = 'fromfunc'
+                expect = False
+            else:
+                kind = 'other'
+                expect = False
+            parens.append(kind)
+            in_from[len(parens)] = kind == 'group'
+            continue
+        if tok.text == ')' and tok.kind == 'op':
+            if parens:
+                in_from.pop(len(parens), None)
+                parens.pop()
+            expect = False
+            continue
+        if tok.is_word('FROM') and not (parens and parens[-1] == 'fromfunc'):
+            in_from[depth], expect = True, True
+            continue
+        if tok.kind == 'word' and tok.text.upper() in JOIN_WORDS:
+            in_from[depth], expect = True, True
+            continue
+        if tok.text == ',' and in_from.get(depth):
+            expect = True
+            continue
+        if tok.kind == 'word' and tok.text.upper() in CLAUSE_WORDS:
+            in_from[depth], expect = False, False
+            continue
+        if expect:
+            if tok.is_word('LATERAL', 'ONLY'):
+                continue
+            if tok.is_identifier:
+                form = {'.': 'qualified', '(': 'function'}.get(nxt.text if nxt else '', 'name')
+                refs.append((tok.name, form))
+            else:
+                refs.append((tok.text, 'other'))
+            expect = False
+    return refs
+
+
+def static_violations(sql: str, tables: Iterable[str] = ()) -> List[str]:
+    """
+    Reasons (empty when fine) why `sql` is not a single read-only SELECT
+    over the per-user views. `tables` are the database's own table names,
+    which may not appear anywhere in the query.
+    """
+    tokens = tokenize(_clean(sql))
+    words = [t for t in tokens if t.kind == 'word']
+    reasons = []
+    if not words or not tokens[0].is_word('SELECT', 'WITH') or (len(tokens) > 1 and tokens[1].is_word('RECURSIVE')):
+        reasons.append("only a single SELECT (optionally with non-recursive WITH) is allowed")
+    if any(t.kind == 'bad' for t in tokens):
+        reasons.append("unterminated quote")
+    # Punctuation outside strings and identifiers, spacing kept ("a - -1" is no comment)
+    ops = TOKEN_RE.sub(lambda m: m.group() if m.lastgroup == 'op' else " ", _clean(sql))
+    if ';' in ops:
+        reasons.append("only one statement is allowed")
+    if '--' in ops or '/*' in ops or '#' in ops:
+        reasons.append("comments are not allowed")
+    if '@' in ops:
+        reasons.append("variables are not allowed")
+    if any(t.text.upper() in WRITE_WORDS for t in words):
+        reasons.append("query modifies data or session state; only read queries are allowed")
+    if any(t.is_word('TABLE') for t in words):
+        reasons.append("TABLE statements are not allowed; use SELECT")
+    if any(t.text.upper() in BANNED_FUNCTIONS and n.text == '(' for t, n in zip(tokens, tokens[1:]) if t.kind == 'word'):
+        reasons.append("system functions (SLEEP, USER, DATABASE, ...) are not allowed")
+    denied = BASE_TABLES | APP_TABLES | SYSTEM_NAMES | {t.lower() for t in tables}
+    named = sorted({t.name for t in tokens if t.is_identifier and t.name in denied})
+    if named:
+        reasons.append(f"{', '.join(named)} cannot be referenced: only {', '.join(VIEWS)} can be queried")
+    ctes = cte_names(tokens)
+    if ctes & set(VIEWS):
+        reasons.append(f"WITH names {', '.join(sorted(ctes & set(VIEWS)))} are reserved")
+    allowed = set(VIEWS) | ctes | {'dual'}
+    refs = table_refs(tokens)
+    indirect = sorted({name for name, form in refs if form in ('qualified', 'function')})
+    if indirect:
+        reasons.append(f"{', '.join(indirect)}: schema-qualified tables and table functions are not allowed")
+    unknown = sorted({name for name, form in refs if form in ('name', 'other')} - allowed - denied)
+    if unknown:
+        reasons.append(f"unknown table(s) {', '.join(unknown)}: only {', '.join(VIEWS)} can be queried")
+    return list(dict.fromkeys(reasons))
+
+
+def scope(sql: str, user_id: int) -> str:
+    """
+    `sql` with the per-user views prepended as CTEs for `user_id`.
+    """
+    uid = int(user_id)      # inlined: generated SQL is run without bind parameters
+    views = ", ".join(f"{name} AS ({select.format(uid=uid)})" for name, (select, _) in VIEWS.items())
+    body = _clean(sql)
+    if re.match(r"^WITH\b", body, re.IGNORECASE):
+        return f"WITH {views}, {body[4:].lstrip()}"
+    return f"WITH {views} {body}"
+
+
+def schema_text() -> str:
+    return "\n".join(f"- {name}({columns})" for name, (_, columns) in VIEWS.items())
+
+
+# ─── SANDBOXED ENGINE ─────────────────────────────────────────────────────────
+
+# sqlite3 authorizer actions the sandbox allows (see _authorize)
+_SQLITE_READ, _SQLITE_SELECT, _SQLITE_FUNCTION = 20, 21, 31
+
+
+def _authorize(action, arg1, arg2, db_name, trigger):
+    # Plain SELECTs reading the health tables; everything else (other tables,
+    # the schema catalog, pragmas, recursive CTEs, banned functions) is denied
+    if action == _SQLITE_SELECT:
+        return sqlite3.SQLITE_OK
+    if action == _SQLITE_READ and arg1 in BASE_TABLES and db_name == 'main':
+        return sqlite3.SQLITE_OK
+    if action == _SQLITE_FUNCTION and str(arg2).upper() not in BANNED_FUNCTIONS:
+        return sqlite3.SQLITE_OK
+    return sqlite3.SQLITE_DENY
+
+
+def _sandbox_url(db_url: str):
+    url = make_url(db_url)
+    if url.get_backend_name() != "mysql":
+        return url
+    if cfg['user']:
+        return url.set(username=cfg['user'], password=cfg['password'])
+    logger.warning("[sql_guard] user is not set: generated SQL runs as the application's MySQL user, "
+                   "limited only by the static checks. Create the sandbox account with setup/database_setup.py.")
+    return url
+
+
+@lru_cache(maxsize=None)
+def get_sql_engine(db_url: str):
+    """
+    Pooled engine for generated SQL: read-only sessions with a statement
+    timeout that can only read the health tables.
+    """
+    engine = create_engine(_sandbox_url(db_url), pool_pre_ping=True,
+                           **({} if db_url.startswith("sqlite") else {"pool_size": int(cfg['pool_size'])}))
+
+    @event.listens_for(engine, "connect")
+    def _sandbox(dbapi_conn, _):
+        cursor = dbapi_conn.cursor()
+        if engine.dialect.name == "mysql":
+            cursor.execute(f"SET SESSION MAX_EXECUTION_TIME = {int(cfg['statement_timeout_ms'])}")
+            cursor.execute("SET SESSION TRANSACTION READ ONLY")
+        elif engine.dialect.name == "sqlite":
+            cursor.execute("PRAGMA query_only = ON")
+        cursor.close()
+        if engine.dialect.name == "sqlite":
+            dbapi_conn.set_authorizer(_authorize)
+
+    register_engine("sql_tool", engine)
+    return engine
+
+
+@contextmanager
+def _deadline(conn):
+    # MySQL enforces MAX_EXECUTION_TIME itself; SQLite aborts from a progress handler
+    if conn.dialect.name != "sqlite":
+        yield
+        return
+    raw = conn.connection.dbapi_connection
+    deadline = time.monotonic() + float(cfg['statement_timeout_ms']) / 1000
+    raw.set_progress_handler(lambda: int(time.monotonic() > deadline), 10000)
+    try:
+        yield
+    finally:
+        raw.set_progress_handler(None, 0)
+
+
+def _run(conn, sql: str):
+    # No bind parameters: '%' and ':' in generated SQL stay literal
+    return conn.execution_options(no_parameters=True).exec_driver_sql(sql)
+
+
+# ─── CHECKS ───────────────────────────────────────────────────────────────────
+
+@lru_cache(maxsize=None)
+def _db_tables(db_url: str) -> Tuple[str, ...]:
+    # Tables and views of the data database (read with the application's
+    # account, which the sandbox account cannot do)
+    try:
+        insp = inspect(get_engine(db_url))
+        return tuple(insp.get_table_names() + insp.get_view_names())
+    except Exception as exc:
+        logger.warning("sql_guard could not list the database tables: %s", exc)
+        return ()
+
+
+def plan_violations(rows: List[dict], denied: Iterable[str] = ()) -> List[str]:
+    """
+    Reasons (empty when fine) why a MySQL EXPLAIN reads a table outside the
+    health tables (`denied`) or is too expensive to run.
+    """
+    denied = {t.lower() for t in denied}
+    reasons = []
+    for r in rows:
+        table = str(r.get('table') or '')
+        if table.lower() in denied:
+            reasons.append(f"reads {table}: only {', '.join(VIEWS)} can be queried")
+        elif r.get('type') == 'ALL' and table in BASE_TABLES:
+            reasons.append(f"full scan of {table}: the user filter is not used; avoid functions over whole views")
+    max_rows = max((float(r.get('rows') or 0) for r in rows), default=0.0)
+    if max_rows > float(cfg['max_estimated_rows']):
+        reasons.append(f"estimated {int(max_rows):,} rows (limit {int(cfg['max_estimated_rows']):,}): "
+                       f"filter by day or aggregate")
+    return list(dict.fromkeys(reasons))
+
+
+def check(db_url: str, sql: str, user_id: int):
+    """
+    Raise SqlRejected if `sql` is not a read-only query over the views, does
+    not compile, or (MySQL) plans too expensively.
+    """
+    tables = _db_tables(db_url)
+    reasons = static_violations(sql, tables)
+    if not reasons and cfg['enabled']:
+        full = scope(sql, user_id)
+        with get_sql_engine(db_url).connect() as conn:
+            try:
+                if conn.dialect.name == "sqlite":
+                    _run(conn, f"EXPLAIN QUERY PLAN {full}").fetchall()
+                else:
+                    rows = [dict(r._mapping) for r in _run(conn, f"EXPLAIN {full}")]
+                    reasons = plan_violations(rows, (APP_TABLES | set(tables)) - BASE_TABLES)
+            except Exception as exc:
+                reasons = [f"query does not compile: {getattr(exc, 'orig', exc)}"]
+    if reasons:
+        raise SqlRejected(reasons, sql)
+
+
+def read_only_query(db_url: str, sql: str, user_id: int, max_rows: Optional[int] = None) -> List[dict]:
+    """
+    Run checked SQL for `user_id` in the sandbox, fetching at most
+    max_rows + 1 rows (the result guard's fetch limit by default).
+    """
+    n = int(max_rows or result_cfg['max_fetch_rows']) + 1
+    with get_sql_engine(db_url).connect() as conn, _deadline(conn):
+        result = _run(conn, scope(sql, user_id))
+        return [dict(r._mapping) for r in result.fetchmany(n)]
+
+
+def feedback(question: str, rejected: SqlRejected) -> str:
+    """
+    The question re-posed to the SQL generator with the rejection reasons.
+    """
+    reasons = "\n".join(f"- {r}" for r in rejected.reasons)
+    return (
+        f"{question}\n\n"
+        f"A previous SQL query for this question was rejected before running:\n{rejected.sql}\n"
+        f"Reasons:\n{reasons}\n"
+        f"Write one read-only SELECT over {', '.join(VIEWS)} that filters on day and aggregates."
+    )
@@ -0,0 +1,139 @@
+# modules/utils/retrieval/sql_qa.py
+"""
+NL -> SQL -> answer flow behind `health-sql-tool`.
+
+Totals, averages and counts over a date range are one indexed aggregate in
+MySQL, where the graph has to walk every node of the range. The steps mirror
+cypher_qa.py:
+1. generate_sql: LLM SQL over the per-user views of sql_guard.py, checked by
+                 the sandbox (regenerated with feedback if rejected)
+2. query_sql:    run it in the sandbox, scoped to the asking user
+   (retrieve escalates 1-2 to the strong tier like cypher_qa.retrieve)
+3. build_context / synthesize: shared with the Cypher path
+"""
+import logging
+import re
+from datetime import date
+from typing import List, Optional, Tuple
+
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import PromptTemplate
+
+from modules.utils.db import db_chat_mysql
+from modules.utils.observability.metrics import RETRIES
+from modules.utils.retrieval import model_router, sql_guard
+from modules.utils.retrieval.cypher_qa import REJECTED_ANSWER, build_context, synthesize
+from modules.utils.retrieval.executor import stage
+from modules.utils.retrieval.resources import shared
+from modules.utils.retrieval.sql_guard import SqlRejected
+
+logger = logging.getLogger(__name__)
+
+SQL_GENERATION_TEMPLATE = """Task: Write one read-only SQL query ({dialect}) that answers the question.
+The data belongs to the person asking; it is already filtered to them, so never filter by user.
+Views:
+{schema}
+Rules:
+- Only SELECT (a WITH clause is fine) over the views above; no other tables, no comments.
+- Aggregate in SQL (SUM, AVG, COUNT, MIN, MAX with GROUP BY) instead of returning raw rows.
+- Compare dates as ISO strings, e.g. day >= '2024-03-01'. Today is {today}.
+- Do not include any text except the SQL query.
+
+The question is:
+{question}"""
+
+SQL_GENERATION_PROMPT = PromptTemplate(
+    input_variables=["question", "schema", "dialect", "today"],
+    template=SQL_GENERATION_TEMPLATE,
+)
+
+FENCE_RE = re.compile(r"```(?:sql)?\s*(.*?)```", re.DOTALL | re.IGNORECASE)
+
+
+def extract_sql(text: str) -> str:
+    m = FENCE_RE.search(text)
+    return (m.group(1) if m else text).strip()
+
+
+def get_sql_generator(tier: Optional[str] = None):
+    """
+    question + schema -> SQL text, on the given tier.
+    """
+    model = model_router.model_for('sql_generation', tier)
+    return shared(
+        ("sql_generator", model),
+        lambda: SQL_GENERATION_PROMPT | model_router.get_stage_llm('sql_generation', tier) | StrOutputParser()
+    )
+
+
+def _dialect(db_url: str) -> str:
+    return "SQLite" if db_url.startswith("sqlite") else "MySQL 8"
+
+
+def generate_sql(question: str, user_id: int, callbacks=None, tier: Optional[str] = None) -> str:
+    """
+    Translate `question` to SQL over the per-user views. Rejected SQL is
+    regenerated with the reasons; SqlRejected is raised when retries run out.
+    """
+    db_url = db_chat_mysql.DB_URL
+    generator = get_sql_generator(tier)
+    inputs = {"schema": sql_guard.schema_text(), "dialect": _dialect(db_url), "today": date.today().isoformat()}
+    prompt_question = question
+    retries = int(sql_guard.cfg['max_retries'])
+    for attempt in range(retries + 1):
+        with stage("sql_generation"):
+            generated = generator.invoke({**inputs, "question": prompt_question},
+                                         config={"callbacks": callbacks})
+        sql = extract_sql(generated)
+        try:
+            with stage("sql_guard"):
+                sql_guard.check(db_url, sql, user_id)
+            return sql
+        except SqlRejected as exc:
+            logger.warning("sql rejected (attempt %d/%d): %s", attempt + 1, retries + 1, exc)
+            if attempt == retries:
+                raise
+            RETRIES.inc(operation="sql_generation")
+            prompt_question = sql_guard.feedback(question, exc)
+
+
+def query_sql(sql: str, user_id: int) -> List[dict]:
+    with stage("sql_query"):
+        return sql_guard.read_only_query(db_chat_mysql.DB_URL, sql, user_id)
+
+
+def retrieve(question: str, user_id: int, callbacks=None) -> Tuple[str, List[dict]]:
+    """
+    Generate SQL for `question` and run it for `user_id`. Returns (sql, rows).
+    A rejected, failing or empty translation is retried on the next tier
+    while the run can afford it.
+    """
+    tiers = model_router.escalation_path('sql_generation')
+    for i, tier in enumerate(tiers):
+        last = i == len(tiers) - 1 or not model_router.can_escalate()
+        try:
+            sql = generate_sql(question, user_id, callbacks, tier)
+        except SqlRejected:
+            if last:
+                raise
+            logger.info("escalating sql generation from %s: rejected by sandbox", tier)
+            continue
+        try:
+            rows = query_sql(sql, user_id)
+        except Exception as exc:
+            if last:
+                raise
+            logger.info("escalating sql generation from %s: %s", tier, exc)
+            continue
+        if not rows and not last:
+            logger.info("escalating sql generation from %s: empty result", tier)
+            continue
+        return sql, rows
+
+
+def answer(question: str, user_id: int, callbacks=None) -> str:
+    try:
+        _, rows = retrieve(question, user_id, callbacks)
+    except SqlRejected:
+        return REJECTED_ANSWER
+    return synthesize(question, build_context(rows), callbacks)
@@ -0,0 +1,55 @@
+# modules/utils/retrieval/streaming.py
+"""
+Callback handler that turns a running agent into a stream of UI events.
+
+Events are (kind, payload) tuples pushed onto a queue:
+- ("status", text): tool progress ("Querying your health graph...")
+- ("token", text):  final-answer tokens as the model produces them
+"""
+import queue
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from modules.utils.retrieval.resources import ANSWER_TAG
+
+TOOL_STATUS = {
+    "health-cypher-tool": "Querying your health graph...",
+    "health-vector-tool": "Searching your health records...",
+}
+
+
+class StreamHandler(BaseCallbackHandler):
+    """
+    Pushes tool progress and answer tokens onto `events`.
+    """
+
+    def __init__(self, events: Optional[queue.Queue] = None):
+        self.events = events if events is not None else queue.Queue()
+        self._answer_runs = set()
+
+    def _track(self, run_id: UUID, tags: Optional[List[str]]):
+        if tags and ANSWER_TAG in tags:
+            self._answer_runs.add(run_id)
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages, *, run_id: UUID,
+                            tags: Optional[List[str]] = None, **kwargs: Any) -> None:
+        self._track(run_id, tags)
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID,
+                     tags: Optional[List[str]] = None, **kwargs: Any) -> None:
+        self._track(run_id, tags)
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        # Planner tokens are empty while it emits a function call, so any text
+        # from an answer-tagged run is user-facing
+        if token and run_id in self._answer_runs:
+            self.events.put(("token", token))
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs: Any) -> None:
+        self._answer_runs.discard(run_id)
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, **kwargs: Any) -> None:
+        name = (serialized or {}).get("name", "")
+        self.events.put(("status", TOOL_STATUS.get(name, f"Running {name}...")))
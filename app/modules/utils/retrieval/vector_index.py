@@ -0,0 +1,489 @@
+# modules/utils/retrieval/vector_index.py
+"""
+Vector retrieval over per-user health documents.
+
+Documents are built at ingest time: one summary per user per day (foods,
+calories, sleep, steps, water) plus one per distinct food name. Two
+interchangeable backends implement the same add / search / delete_user API:
+
+- LocalIVFIndex: in-process IVF (inverted file) index. Vectors live in a
+  memory-mapped float32 matrix, metadata and inverted-list assignments in
+  SQLite. Incremental adds are assigned to the nearest centroid; centroids are
+  retrained with k-means whenever the index has doubled since the last
+  training. Every search is filtered by user_id.
+- Neo4jVectorIndex: :HealthDoc nodes in Neo4j, looked up through an index on
+  user_id and ranked exactly with vector.similarity.cosine.
+
+The backend is chosen by [vector] backend = "local" | "neo4j".
+"""
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from modules.utils.cache.store import connect
+from modules.utils.retrieval.context import current_user_id
+from modules.utils.retrieval.embeddings import get_embedder
+from modules.utils.retrieval.executor import stage
+from modules.utils.retrieval.resources import shared, get_graph
+from modules.utils.settings import CACHE_DIR, get_section
+
+cfg = get_section(
+    'vector',
+    backend='local',                     # 'local' | 'neo4j'
+    index_dir=str(CACHE_DIR / "vector_index"),
+    top_k=6,
+    nprobe=4,
+    min_train_size=512,
+)
+
+META_SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    row_id  INTEGER PRIMARY KEY,
+    doc_key TEXT NOT NULL UNIQUE,
+    user_id INTEGER NOT NULL,
+    kind    TEXT NOT NULL,
+    day     TEXT,
+    text    TEXT NOT NULL,
+    list_id INTEGER NOT NULL DEFAULT 0,
+    deleted INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_docs_user_list ON docs (user_id, list_id);
+CREATE TABLE IF NOT EXISTS index_meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+# ─── DOCUMENTS ────────────────────────────────────────────────────────────────
+
+def build_user_documents(
+    user_id: int,
+    username: str,
+    df_food: pd.DataFrame,
+    df_water: pd.DataFrame,
+    df_steps: pd.DataFrame,
+    df_sleep: pd.DataFrame
+) -> List[dict]:
+    """
+    Turn cleaned frames into indexable documents:
+    one per (user, day) and one per (user, distinct food name).
+    """
+    days: Dict[str, List[str]] = {}
+
+    def _day(d):
+        return pd.to_datetime(d).strftime('%Y-%m-%d')
+
+    if not df_food.empty:
+        food = df_food.assign(day=df_food['date'].map(_day))
+        for day, grp in food.groupby('day'):
+            items = ", ".join(
+                f"{r.food_name} ({r.calories:.0f} kcal)" if pd.notna(r.calories) else str(r.food_name)
+                for r in grp.itertuples()
+            )
+            days.setdefault(day, []).append(
+                f"ate {items}; total {grp['calories'].sum():.0f} kcal"
+            )
+    for df, col, fmt in (
+        (df_sleep, 'total_sleep_h', "slept {:.1f} hours"),
+        (df_steps, 'total_steps', "walked {:.0f} steps"),
+        (df_water, 'total_water_ml', "drank {:.0f} ml of water"),
+    ):
+        if df.empty:
+            continue
+        for d, v in zip(df['date'], df[col]):
+            if pd.notna(v):
+                days.setdefault(_day(d), []).append(fmt.format(v))
+
+    docs = [
+        {
+            "doc_key": f"{user_id}:day:{day}",
+            "user_id": user_id,
+            "kind": "day",
+            "day": day,
+            "text": f"{username} on {day}: " + "; ".join(parts) + ".",
+        }
+        for day, parts in sorted(days.items())
+    ]
+
+    if not df_food.empty:
+        stats = (
+            df_food.groupby('food_name')
+                   .agg(times=('food_name', 'size'), calories=('calories', 'sum'),
+                        first=('date', 'min'), last=('date', 'max'))
+                   .reset_index()
+        )
+        for r in stats.itertuples():
+            docs.append({
+                "doc_key": f"{user_id}:food:{str(r.food_name).lower()}",
+                "user_id": user_id,
+                "kind": "food",
+                "day": None,
+                "text": (
+                    f"{username} ate {r.food_name} {r.times} times "
+                    f"({r.calories:.0f} kcal in total) between {_day(r.first)} and {_day(r.last)}."
+                ),
+            })
+    return docs
+
+
+# ─── LOCAL IVF BACKEND ────────────────────────────────────────────────────────
+
+class LocalIVFIndex:
+    """
+    IVF index over a memory-mapped float32 matrix, filtered by user_id.
+    Vectors are L2-normalized, so inner product == cosine similarity.
+
+    Several processes (API and job workers) may share one index directory.
+    The SQLite write lock (BEGIN IMMEDIATE) is the index-wide lock: row ids
+    are allocated, the matrix file grown and centroids retrained only while
+    holding it. Centroids are saved per training generation (index_meta), and
+    every search reloads them when another process has retrained.
+    """
+
+    def __init__(self, index_dir: str, dim: int, nprobe: int = 4, min_train_size: int = 512):
+        self.dir = Path(index_dir)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.dim = dim
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self._lock = threading.RLock()
+        self._meta_path = str(self.dir / "meta.sqlite3")
+        self._vec_path = self.dir / "vectors.f32"
+
+        conn = self._conn()
+        try:
+            stored = dict(conn.execute("SELECT key, value FROM index_meta").fetchall())
+            if 'dim' in stored and int(stored['dim']) != dim:
+                raise ValueError(
+                    f"Vector index at {index_dir} has dim={stored['dim']}, embedder has dim={dim}; "
+                    "rebuild the index after changing the embedder."
+                )
+            conn.execute("INSERT OR IGNORE INTO index_meta VALUES ('dim', ?)", (str(dim),))
+            conn.execute("INSERT OR IGNORE INTO index_meta VALUES ('trained_at', '0')", ())
+            conn.execute("INSERT OR IGNORE INTO index_meta VALUES ('generation', '0')", ())
+        finally:
+            conn.close()
+
+        self._capacity = 0
+        self._mm = None
+        self._generation = None
+        self._centroids = None
+        conn = self._conn()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            size = conn.execute("SELECT COALESCE(MAX(row_id) + 1, 0) FROM docs").fetchone()[0]
+            self._grow(max(size, 1024))
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    def _conn(self):
+        return connect(self._meta_path, META_SCHEMA)
+
+    def _meta(self, conn, key: str) -> int:
+        return int(conn.execute("SELECT value FROM index_meta WHERE key = ?", (key,)).fetchone()[0])
+
+    # Matrix storage
+    def _map(self, capacity: int):
+        self._mm = np.memmap(self._vec_path, dtype=np.float32, mode='r+', shape=(capacity, self.dim))
+        self._capacity = capacity
+
+    def _on_disk(self) -> int:
+        return self._vec_path.stat().st_size // (4 * self.dim) if self._vec_path.exists() else 0
+
+    def _grow(self, n: int):
+        """
+        Make the file hold at least `n` rows. Only under the write lock:
+        files are only ever extended, never truncated to a shorter length.
+        """
+        on_disk = self._on_disk()
+        if n > on_disk:
+            if self._mm is not None:
+                self._mm.flush()
+                self._mm = None
+            with open(self._vec_path, 'ab') as f:
+                f.truncate(max(n, on_disk * 2) * self.dim * 4)
+        self._remap()
+
+    def _remap(self):
+        # Follow a file grown by this or another process (no write lock needed)
+        on_disk = self._on_disk()
+        if on_disk > self._capacity:
+            self._map(on_disk)
+
+    # IVF centroids, one file per training generation
+    def _centroids_path(self, generation: int) -> Path:
+        return self.dir / ("centroids.npy" if generation == 0 else f"centroids-{generation}.npy")
+
+    def _load_centroids(self, conn):
+        generation = self._meta(conn, 'generation')
+        if generation != self._generation:
+            path = self._centroids_path(generation)
+            try:
+                self._centroids, self._generation = np.load(path), generation
+            except FileNotFoundError:
+                # Untrained, or superseded while loading: scan until the next call
+                self._centroids, self._generation = None, None
+
+    def _assign(self, vecs: np.ndarray) -> np.ndarray:
+        if self._centroids is None:
+            return np.zeros(len(vecs), dtype=np.int64)
+        return np.argmax(vecs @ self._centroids.T, axis=1)
+
+    def _train(self):
+        """
+        Spherical k-means over (a sample of) live vectors, then reassign all
+        rows. Skipped when another process already trained at this size.
+        """
+        conn = self._conn()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            size = conn.execute("SELECT COALESCE(MAX(row_id) + 1, 0) FROM docs").fetchone()[0]
+            if size < self.min_train_size or size < 2 * max(self._meta(conn, 'trained_at'), 1):
+                conn.execute("ROLLBACK")
+                return
+            row_ids = np.array([r[0] for r in conn.execute("SELECT row_id FROM docs WHERE deleted = 0")], dtype=np.int64)
+            if len(row_ids) < self.min_train_size:
+                conn.execute("ROLLBACK")
+                return
+            self._remap()
+            nlist = int(max(8, min(1024, np.sqrt(len(row_ids)))))
+            rng = np.random.default_rng(0)
+            sample = np.asarray(self._mm[np.sort(rng.choice(row_ids, size=min(len(row_ids), 50 * nlist), replace=False))])
+            centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+            for _ in range(10):
+                labels = np.argmax(sample @ centroids.T, axis=1)
+                for c in range(nlist):
+                    members = sample[labels == c]
+                    if len(members):
+                        centroid = members.sum(axis=0)
+                        norm = np.linalg.norm(centroid)
+                        centroids[c] = centroid / norm if norm > 0 else centroid
+            previous = self._meta(conn, 'generation')
+            generation = previous + 1
+            np.save(self._centroids_path(generation), centroids.astype(np.float32))
+            self._centroids, self._generation = centroids.astype(np.float32), generation
+
+            for start in range(0, len(row_ids), 10000):
+                chunk = row_ids[start:start + 10000]
+                lists = self._assign(np.asarray(self._mm[chunk]))
+                conn.executemany(
+                    "UPDATE docs SET list_id = ? WHERE row_id = ?",
+                    [(int(l), int(r)) for l, r in zip(lists, chunk)]
+                )
+            conn.execute("UPDATE index_meta SET value = ? WHERE key = 'trained_at'", (str(size),))
+            conn.execute("UPDATE index_meta SET value = ? WHERE key = 'generation'", (str(generation),))
+            conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            self._generation = None     # reload whatever generation is committed
+            raise
+        finally:
+            conn.close()
+        # Searches that loaded the old generation reload on their next call
+        self._centroids_path(previous).unlink(missing_ok=True)
+
+    # Public API
+    def add(self, docs: List[dict], vectors: np.ndarray):
+        """
+        Upsert documents (by doc_key) with their embedding vectors.
+        """
+        if not docs:
+            return
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms > 0, norms, 1.0)
+        with self._lock:
+            conn = self._conn()
+            try:
+                # Row ids come from MAX(row_id) read under the write lock
+                conn.execute("BEGIN IMMEDIATE")
+                self._load_centroids(conn)
+                keys = [d['doc_key'] for d in docs]
+                existing = {}
+                for start in range(0, len(keys), 500):
+                    chunk = keys[start:start + 500]
+                    existing.update(conn.execute(
+                        f"SELECT doc_key, row_id FROM docs WHERE doc_key IN ({','.join('?' * len(chunk))})",
+                        chunk
+                    ).fetchall())
+                size = conn.execute("SELECT COALESCE(MAX(row_id) + 1, 0) FROM docs").fetchone()[0]
+                row_ids = []
+                for key in keys:
+                    if key in existing:
+                        row_ids.append(existing[key])
+                    else:
+                        row_ids.append(size)
+                        size += 1
+                self._grow(size)
+                self._mm[np.array(row_ids)] = vectors
+                self._mm.flush()
+                lists = self._assign(vectors)
+                conn.executemany(
+                    "INSERT OR REPLACE INTO docs (row_id, doc_key, user_id, kind, day, text, list_id, deleted) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, 0)",
+                    [
+                        (int(r), d['doc_key'], int(d['user_id']), d['kind'], d.get('day'), d['text'], int(l))
+                        for r, d, l in zip(row_ids, docs, lists)
+                    ]
+                )
+                trained_at = self._meta(conn, 'trained_at')
+                conn.execute("COMMIT")
+            except BaseException:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+            finally:
+                conn.close()
+            if size >= self.min_train_size and size >= 2 * max(trained_at, 1):
+                self._train()
+
+    def search(self, user_id: int, query_vec, k: int = 6) -> List[dict]:
+        q = np.asarray(query_vec, dtype=np.float32)
+        q = q / (np.linalg.norm(q) or 1.0)
+        with self._lock:
+            conn = self._conn()
+            try:
+                self._load_centroids(conn)
+                rows = []
+                if self._centroids is not None:
+                    probe = np.argsort(-(self._centroids @ q))[: self.nprobe]
+                    rows = conn.execute(
+                        f"SELECT row_id, kind, day, text FROM docs "
+                        f"WHERE user_id = ? AND deleted = 0 AND list_id IN ({','.join('?' * len(probe))})",
+                        [int(user_id), *[int(p) for p in probe]]
+                    ).fetchall()
+                if len(rows) < k:
+                    # Untrained index, or probed lists too sparse for this user
+                    rows = conn.execute(
+                        "SELECT row_id, kind, day, text FROM docs WHERE user_id = ? AND deleted = 0",
+                        (int(user_id),)
+                    ).fetchall()
+            finally:
+                conn.close()
+            if not rows:
+                return []
+            row_ids = np.array([r[0] for r in rows], dtype=np.int64)
+            self._remap()
+            matrix = self._mm
+        scores = np.asarray(matrix[row_ids]) @ q
+        top = np.argsort(-scores)[:k]
+        return [
+            {"kind": rows[i][1], "day": rows[i][2], "text": rows[i][3], "score": float(scores[i])}
+            for i in top
+        ]
+
+    def delete_user(self, user_id: int):
+        with self._lock:
+            conn = self._conn()
+            try:
+                conn.execute("UPDATE docs SET deleted = 1 WHERE user_id = ?", (int(user_id),))
+            finally:
+                conn.close()
+
+
+# ─── NEO4J BACKEND ────────────────────────────────────────────────────────────
+
+class Neo4jVectorIndex:
+    """
+    Same API backed by :HealthDoc nodes in Neo4j.
+
+    Searches are filtered by user before ranking: the user's documents are
+    found through an index on user_id and scored exactly. A global vector
+    index query ranks every user's documents first, so once other users are
+    stored a user's own documents can fall outside its candidates. One user
+    has a few documents per day of history, which exact scoring handles.
+    """
+    INDEX_NAME = "health_doc_user_id"
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        get_graph().query(f"CREATE INDEX {self.INDEX_NAME} IF NOT EXISTS FOR (d:HealthDoc) ON (d.user_id)")
+
+    def add(self, docs: List[dict], vectors: np.ndarray):
+        rows = [dict(d, embedding=[float(x) for x in v]) for d, v in zip(docs, vectors)]
+        for start in range(0, len(rows), 500):
+            get_graph().query(
+                """
+                UNWIND $rows AS row
+                MERGE (d:HealthDoc {doc_key: row.doc_key})
+                SET d.user_id = row.user_id, d.kind = row.kind, d.day = row.day, d.text = row.text
+                WITH d, row
+                CALL db.create.setNodeVectorProperty(d, 'embedding', row.embedding)
+                """,
+                {"rows": rows[start:start + 500]}
+            )
+
+    def search(self, user_id: int, query_vec, k: int = 6) -> List[dict]:
+        return get_graph().query(
+            """
+            MATCH (d:HealthDoc {user_id: $uid})
+            WITH d, vector.similarity.cosine(d.embedding, $vec) AS score
+            RETURN d.kind AS kind, d.day AS day, d.text AS text, score
+            ORDER BY score DESC LIMIT $k
+            """,
+            {"vec": [float(x) for x in query_vec], "uid": int(user_id), "k": k}
+        )
+
+    def delete_user(self, user_id: int):
+        get_graph().query("MATCH (d:HealthDoc {user_id: $uid}) DETACH DELETE d", {"uid": int(user_id)})
+
+
+# ─── SHARED INDEX + INGEST HOOKS ──────────────────────────────────────────────
+
+def _build_index():
+    dim = len(get_embedder().embed_query("dimension probe"))
+    if cfg['backend'] == 'neo4j':
+        return Neo4jVectorIndex(dim)
+    return LocalIVFIndex(cfg['index_dir'], dim, int(cfg['nprobe']), int(cfg['min_train_size']))
+
+
+def get_vector_index():
+    return shared("vector_index", _build_index)
+
+
+def index_user_data(user_id: int, username: str, df_food, df_water, df_steps, df_sleep) -> int:
+    """
+    Embed and upsert a user's documents. Returns the number of documents.
+    """
+    docs = build_user_documents(user_id, username, df_food, df_water, df_steps, df_sleep)
+    if not docs:
+        return 0
+    vectors = get_embedder().embed_array([d['text'] for d in docs])
+    get_vector_index().add(docs, vectors)
+    return len(docs)
+
+
+def delete_user_vectors(user_id: int):
+    get_vector_index().delete_user(user_id)
+
+
+def search_user(user_id: int, query: str, k: Optional[int] = None) -> List[dict]:
+    return get_vector_index().search(user_id, get_embedder().embed_query(query), k or int(cfg['top_k']))
+
+
+class UserScopedRetriever(BaseRetriever):
+    """
+    LangChain retriever over the vector index for the user in the request
+    context (see context.py). Returns nothing when no user is set.
+    """
+    k: int = 6
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        user_id = current_user_id.get()
+        if user_id is None:
+            return []
+        with stage("vector_search"):
+            hits = search_user(user_id, query, self.k)
+        return [
+            Document(page_content=hit['text'], metadata={"kind": hit['kind'], "day": hit['day'], "score": hit['score']})
+            for hit in hits
+        ]
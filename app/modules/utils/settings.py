@@ -0,0 +1,32 @@
+# modules/utils/settings.py
+"""
+Optional tuning sections of secrets.toml (e.g. [cache]).
+
+Credentials stay where each module already reads them; this helper only serves
+settings that have sensible defaults, so a missing file or section is fine.
+"""
+from functools import lru_cache
+from pathlib import Path
+
+import toml
+
+# Project root (the `app/` directory, where secrets.toml lives)
+BASE_DIR = Path(__file__).parents[2]
+CACHE_DIR = BASE_DIR / ".cache"
+
+
+@lru_cache(maxsize=1)
+def _load() -> dict:
+    try:
+        return toml.load(BASE_DIR / "secrets.toml")
+    except FileNotFoundError:
+        return {}
+
+
+def get_section(name: str, **defaults) -> dict:
+    """
+    Return the [name] section of secrets.toml merged over `defaults`.
+    """
+    merged = dict(defaults)
+    merged.update(_load().get(name, {}))
+    return merged
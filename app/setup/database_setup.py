@@ -27,6 +27,9 @@ CREATE TABLE IF NOT EXISTS food_intake (
   food_name VARCHAR(255),
   amount FLOAT,
   calories FLOAT,
+  items INT NOT NULL DEFAULT 1,
+  compacted TINYINT NOT NULL DEFAULT 0,
+  INDEX idx_user_time (user_id, event_time),
   FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
 ) ENGINE=InnoDB;
 
@@ -36,6 +39,7 @@ CREATE TABLE IF NOT EXISTS water_intake (
   user_id INT NOT NULL,
   event_time DATETIME,
   amount FLOAT,
+  INDEX idx_water_user_time (user_id, event_time),
   FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
 ) ENGINE=InnoDB;
 
@@ -45,6 +49,7 @@ CREATE TABLE IF NOT EXISTS sleep_hours (
   user_id INT NOT NULL,
   date DATE,
   total_sleep_h FLOAT,
+  INDEX idx_sleep_user_date (user_id, date),
   FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
 ) ENGINE=InnoDB;
 
@@ -54,6 +59,7 @@ CREATE TABLE IF NOT EXISTS step_count (
   user_id INT NOT NULL,
   date DATE,
   total_steps INT,
+  INDEX idx_step_user_date (user_id, date),
   FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
 ) ENGINE=InnoDB;
 
@@ -80,8 +86,78 @@ CREATE TABLE IF NOT EXISTS chat_history (
   FOREIGN KEY (session_id) REFERENCES chat_sessions(session_id) ON DELETE CASCADE,
   INDEX idx_session_created_at (session_id, created_at)
 ) ENGINE=InnoDB;
+
+-- Background ingestion jobs (backend/jobs.py); times are UTC set by the backend
+CREATE TABLE IF NOT EXISTS ingest_jobs (
+  job_id INT AUTO_INCREMENT PRIMARY KEY,
+  username VARCHAR(50) NOT NULL,
+  status ENUM('queued','running','done','failed') NOT NULL,
+  stage VARCHAR(16),
+  checkpoint VARCHAR(16),
+  user_id INT,
+  row_counts TEXT,
+  error TEXT,
+  attempts INT NOT NULL DEFAULT 0,
+  host VARCHAR(128),
+  worker VARCHAR(128),
+  created_at DATETIME NOT NULL,
+  updated_at DATETIME NOT NULL,
+  heartbeat_at DATETIME,
+  INDEX idx_status_job (status, job_id)
+) ENGINE=InnoDB;
+
+-- Food days compacted into daily aggregates by backend/retention.py
+CREATE TABLE IF NOT EXISTS food_compaction (
+  user_id INT NOT NULL,
+  day DATE NOT NULL,
+  raw_rows INT NOT NULL,
+  kept_rows INT NOT NULL,
+  graph_done TINYINT NOT NULL DEFAULT 0,
+  compacted_at DATETIME NOT NULL,
+  PRIMARY KEY (user_id, day),
+  FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+) ENGINE=InnoDB;
+
+-- Precomputed daily stats and trend facts (modules/utils/analytics/trends.py)
+CREATE TABLE IF NOT EXISTS daily_metrics (
+  user_id INT NOT NULL,
+  day DATE NOT NULL,
+  metric VARCHAR(16) NOT NULL,
+  value DOUBLE NOT NULL,
+  mean_short DOUBLE,
+  mean_long DOUBLE,
+  zscore DOUBLE,
+  PRIMARY KEY (user_id, metric, day),
+  FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS trend_facts (
+  user_id INT NOT NULL PRIMARY KEY,
+  through DATE,
+  computed_at DATETIME NOT NULL,
+  facts MEDIUMTEXT NOT NULL,
+  FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+) ENGINE=InnoDB;
+
+-- Version counters that keep the caches of all backend workers in step
+-- (modules/utils/db/cache_versions.py)
+CREATE TABLE IF NOT EXISTS cache_versions (
+  scope VARCHAR(64) NOT NULL PRIMARY KEY,
+  version BIGINT NOT NULL
+) ENGINE=InnoDB;
 """
 
+# Columns and indexes added after the first release, for existing databases
+migrations = [
+    ("food_intake", "items", "ALTER TABLE food_intake ADD COLUMN items INT NOT NULL DEFAULT 1"),
+    ("food_intake", "compacted", "ALTER TABLE food_intake ADD COLUMN compacted TINYINT NOT NULL DEFAULT 0"),
+    ("food_intake", "idx_user_time", "CREATE INDEX idx_user_time ON food_intake (user_id, event_time)"),
+    ("water_intake", "idx_water_user_time", "CREATE INDEX idx_water_user_time ON water_intake (user_id, event_time)"),
+    ("sleep_hours", "idx_sleep_user_date", "CREATE INDEX idx_sleep_user_date ON sleep_hours (user_id, date)"),
+    ("step_count", "idx_step_user_date", "CREATE INDEX idx_step_user_date ON step_count (user_id, date)"),
+    ("ingest_jobs", "host", "ALTER TABLE ingest_jobs ADD COLUMN host VARCHAR(128)"),
+]
+
 # Execute the schema creation queries
 with engine.begin() as conn:
     try:
@@ -89,6 +165,33 @@ with engine.begin() as conn:
             stmt = statement.strip()
             if stmt:
                 conn.execute(text(stmt))
-        print("All tables (including chat sessions and history) created or already exist.")
+        print("All tables (including chat sessions, history and ingest jobs) created or already exist.")
+        for table, name, ddl in migrations:
+            exists = conn.execute(text(
+                "SELECT COUNT(*) FROM information_schema.columns "
+                "WHERE table_schema = DATABASE() AND table_name = :t AND column_name = :n "
+                "UNION ALL "
+                "SELECT COUNT(*) FROM information_schema.statistics "
+                "WHERE table_schema = DATABASE() AND table_name = :t AND index_name = :n"
+            ), {"t": table, "n": name}).scalars().all()
+            if not any(exists):
+                conn.execute(text(ddl))
+                print(f"Migrated: {ddl}")
     except Exception as e:
         print(f"An error occurred during schema creation: {e}")
+
+# Account for generated SQL (modules/utils/retrieval/sql_guard.py): it may only
+# read the four health tables, never users, chat history or the other tables
+sandbox = toml.load('secrets.toml').get('sql_guard', {})
+if sandbox.get('user'):
+    with engine.begin() as conn:
+        try:
+            account = {"u": sandbox['user'], "p": sandbox.get('password', '')}
+            conn.execute(text("CREATE USER IF NOT EXISTS :u@'%' IDENTIFIED BY :p"), account)
+            conn.execute(text("ALTER USER :u@'%' IDENTIFIED BY :p"), account)
+            conn.execute(text("REVOKE ALL PRIVILEGES, GRANT OPTION FROM :u@'%'"), account)
+            for table in ("food_intake", "water_intake", "sleep_hours", "step_count"):
+                conn.execute(text(f"GRANT SELECT ON `{cfg['database']}`.`{table}` TO :u@'%'"), account)
+            print(f"SQL sandbox account {sandbox['user']} can read the health tables only.")
+        except Exception as e:
+            print(f"An error occurred while creating the SQL sandbox account: {e}")
@@ -0,0 +1,58 @@
+# tests/conftest.py
+"""
+Shared fixtures. Tests import the app the way the backend does, from app/:
+
+    cd app && python -m pytest -q
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+APP_DIR = Path(__file__).resolve().parent.parent
+if str(APP_DIR) not in sys.path:
+    sys.path.insert(0, str(APP_DIR))
+
+
+@pytest.fixture
+def sqlite_url(tmp_path):
+    """
+    URL of a fresh SQLite database with backend.local's schema.
+    """
+    from sqlalchemy import create_engine
+
+    from backend.local import SQLITE_SCHEMA
+
+    url = f"sqlite:///{tmp_path / 'graphrag.sqlite3'}"
+    engine = create_engine(url)
+    with engine.begin() as conn:
+        for statement in filter(str.strip, SQLITE_SCHEMA.split(";")):
+            conn.exec_driver_sql(statement)
+    engine.dispose()
+    return url
+
+
+@pytest.fixture
+def local_backend(tmp_path, monkeypatch):
+    """
+    backend.local configured in tmp_path (SQLite, in-memory graph, scripted
+    LLM); the settings it changes are restored afterwards. Yields the graph.
+    """
+    from backend import jobs, local
+    from modules.utils.cache import answer_cache, translation_cache
+    from modules.utils.db import db_chat_mysql, user_directory
+    from modules.utils.retrieval import embeddings, resources, vector_index
+
+    monkeypatch.setattr(db_chat_mysql, 'DB_URL', db_chat_mysql.DB_URL)
+    for cfg, keys in ((answer_cache.cfg, ['path']), (translation_cache.cfg, ['path']),
+                      (embeddings.cfg, ['embedder', 'embedding_cache']),
+                      (vector_index.cfg, ['backend', 'index_dir']), (jobs.cfg, ['spool_dir'])):
+        for key in keys:
+            monkeypatch.setitem(cfg, key, cfg[key])
+    db_chat_mysql._get_engine.cache_clear()
+    user_directory.invalidate_users()
+    yield local.configure(tmp_path / "local")
+    resources.reset_resources()
+    db_chat_mysql._get_engine.cache_clear()
+    db_chat_mysql.invalidate_sessions()
+    user_directory.invalidate_users()
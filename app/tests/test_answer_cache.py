@@ -0,0 +1,42 @@
+from datetime import date
+
+import pytest
+
+from modules.utils.cache import answer_cache
+
+TODAY = date(2025, 5, 20)
+
+
+@pytest.fixture(autouse=True)
+def cache_path(tmp_path, monkeypatch):
+    monkeypatch.setitem(answer_cache.cfg, 'path', str(tmp_path / "answers.sqlite3"))
+
+
+def test_round_trip():
+    answer_cache.put_cached_answer(1, "How much did I sleep yesterday?", "7h", TODAY)
+    assert answer_cache.get_cached_answer(1, "how much did I sleep yesterday", TODAY) == "7h"
+    assert answer_cache.get_cached_answer(2, "How much did I sleep yesterday?", TODAY) is None
+
+
+def test_key_depends_on_resolved_dates_and_version():
+    q = "steps yesterday"
+    assert answer_cache.cache_key(1, q, TODAY, 0) != answer_cache.cache_key(1, q, date(2025, 5, 21), 0)
+    assert answer_cache.cache_key(1, q, TODAY, 0) != answer_cache.cache_key(1, q, TODAY, 1)
+
+
+def test_bump_invalidates():
+    answer_cache.put_cached_answer(1, "q", "old", TODAY)
+    answer_cache.bump_data_version(1)
+    assert answer_cache.get_cached_answer(1, "q", TODAY) is None
+    assert answer_cache.get_data_version(1) == 1
+
+
+def test_answer_from_before_an_ingest_is_not_stored():
+    version = answer_cache.get_data_version(1)
+    assert answer_cache.get_cached_answer(1, "q", TODAY, version=version) is None
+    answer_cache.bump_data_version(1)          # ingest finishes while the agent runs
+    assert answer_cache.put_cached_answer(1, "q", "stale", TODAY, version=version) is False
+    assert answer_cache.get_cached_answer(1, "q", TODAY) is None
+    fresh = answer_cache.get_data_version(1)
+    assert answer_cache.put_cached_answer(1, "q", "fresh", TODAY, version=fresh) is True
+    assert answer_cache.get_cached_answer(1, "q", TODAY, version=fresh) == "fresh"
@@ -0,0 +1,68 @@
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+from sqlalchemy import text
+
+from backend import bulk_import, service
+from benchmarks.synthetic import make_user
+from modules.utils.db import db_utils_mysql
+from modules.utils.db.db_utils_mysql import get_engine, push_user_data_mysql
+
+END = date(2025, 5, 20)
+
+
+def _counts(user_id: int) -> dict:
+    with get_engine(service.db_url()).connect() as conn:
+        return {t: conn.execute(text(f"SELECT COUNT(*) FROM {t} WHERE user_id = :u"), {"u": user_id}).scalar()
+                for t in ('food_intake', 'water_intake', 'sleep_hours', 'step_count')}
+
+
+def _frames(u) -> dict:
+    return {'food': u.food, 'water': u.water, 'sleep': u.sleep, 'steps': u.steps}
+
+
+def _expected(u) -> dict:
+    return {'food_intake': len(u.food), 'water_intake': len(u.water),
+            'sleep_hours': len(u.sleep), 'step_count': len(u.steps)}
+
+
+def test_push_twice_keeps_one_copy(local_backend):
+    u = make_user(1, 20, END)
+    for _ in range(2):
+        user_id = push_user_data_mysql(u.username, u.food, u.water, u.sleep, u.steps, service.db_url())
+    assert _counts(user_id) == _expected(u)
+
+
+def test_push_replaces_only_uploaded_days(local_backend):
+    old, new = make_user(1, 30, date(2025, 5, 1)), make_user(1, 10, END, seed=1)
+    push_user_data_mysql(old.username, old.food, old.water, old.sleep, old.steps, service.db_url())
+    user_id = push_user_data_mysql(new.username, new.food, new.water, new.sleep, new.steps, service.db_url())
+    # old covers Apr 2 - May 1, new May 11 - 20: nothing overlaps
+    assert _counts(user_id)['food_intake'] == len(old.food) + len(new.food)
+    overlap = make_user(1, 5, date(2025, 5, 1), seed=2)     # Apr 27 - May 1
+    push_user_data_mysql(overlap.username, overlap.food, overlap.water, overlap.sleep, overlap.steps,
+                         service.db_url())
+    kept = old.food[pd.to_datetime(old.food['date']).dt.date < date(2025, 4, 27)]
+    assert _counts(user_id)['food_intake'] == len(kept) + len(overlap.food) + len(new.food)
+
+
+def test_retried_push_after_commit_does_not_duplicate(local_backend, tmp_path, monkeypatch):
+    u = make_user(2, 20, END)
+    monkeypatch.setattr(bulk_import, '_clean_file', lambda path: _frames(u))
+    # The push commits, then a post-commit step fails once: the stage is retried
+    real_bump, failures = db_utils_mysql.bump_data_version, []
+
+    def flaky_bump(user_id):
+        if not failures:
+            failures.append(user_id)
+            raise ConnectionError("cache store unavailable")
+        real_bump(user_id)
+
+    monkeypatch.setattr(db_utils_mysql, 'bump_data_version', flaky_bump)
+    state = bulk_import.StateFile(tmp_path / "state.jsonl")
+    importer = bulk_import.Importer(state, None, 1, 1, retries=2, backoff_s=0.0)
+    result = importer.run(bulk_import.Export(Path("u.zip"), u.username, "sha"))
+
+    assert result.status == 'imported' and failures
+    assert _counts(result.user_id) == _expected(u)
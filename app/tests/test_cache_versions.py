@@ -0,0 +1,76 @@
+"""
+Each test changes the shared database the way another backend worker would
+(write + cache_versions bump, bypassing this process's caches) and checks
+that the next read here sees it.
+"""
+from datetime import date
+
+import pytest
+from sqlalchemy import text
+
+from modules.utils.cache import answer_cache
+from modules.utils.db import cache_versions, db_chat_mysql, user_directory
+from modules.utils.db.db_utils_mysql import get_engine
+
+
+@pytest.fixture(autouse=True)
+def shared_db(sqlite_url, tmp_path, monkeypatch):
+    monkeypatch.setattr(db_chat_mysql, 'DB_URL', sqlite_url)
+    monkeypatch.setitem(answer_cache.cfg, 'path', str(tmp_path / "answers.sqlite3"))
+    db_chat_mysql._get_engine.cache_clear()
+    db_chat_mysql.invalidate_sessions()
+    user_directory.invalidate_users()
+    yield sqlite_url
+    db_chat_mysql._get_engine.cache_clear()
+    db_chat_mysql.invalidate_sessions()
+    user_directory.invalidate_users()
+
+
+def _other_worker(url, sql, params, scope):
+    with get_engine(url).begin() as conn:
+        result = conn.execute(text(sql), params)
+        cache_versions.bump(scope, conn)
+    return result.lastrowid
+
+
+def test_bump_counts_per_scope(shared_db):
+    assert cache_versions.read('users', db_url=shared_db) == 0
+    assert cache_versions.bump('users', db_url=shared_db) == 1
+    assert cache_versions.bump('users', db_url=shared_db) == 2
+    assert cache_versions.read('sessions:1', db_url=shared_db) == 0
+
+
+def test_user_created_elsewhere_is_found(shared_db):
+    assert len(user_directory.get_directory(shared_db)) == 0
+    uid = _other_worker(shared_db, "INSERT INTO users (username) VALUES ('alice')", {}, 'users')
+    assert user_directory.get_directory(shared_db).username(uid) == 'alice'
+
+
+def test_session_created_elsewhere_is_listed(shared_db):
+    uid = _other_worker(shared_db, "INSERT INTO users (username) VALUES ('alice')", {}, 'users')
+    mine = db_chat_mysql.create_session(uid, "mine")
+    assert [s.session_id for s in db_chat_mysql.list_sessions(uid)] == [mine]
+    theirs = _other_worker(shared_db, "INSERT INTO chat_sessions (user_id, name) VALUES (:u, 'theirs')",
+                           {"u": uid}, f"sessions:{uid}")
+    assert {s.session_id for s in db_chat_mysql.list_sessions(uid)} == {mine, theirs}
+
+
+def test_own_writes_are_cached_without_reload(shared_db, monkeypatch):
+    uid = _other_worker(shared_db, "INSERT INTO users (username) VALUES ('alice')", {}, 'users')
+    sid = db_chat_mysql.create_session(uid, "first")
+    db_chat_mysql.list_sessions(uid)
+    loads = []
+    original = db_chat_mysql._load_sessions
+    monkeypatch.setattr(db_chat_mysql, '_load_sessions', lambda *a: loads.append(a) or original(*a))
+    db_chat_mysql.rename_session(sid, "renamed")
+    db_chat_mysql.push_chat_message(sid, "user", "hi")
+    assert [s.name for s in db_chat_mysql.list_sessions(uid)] == ["renamed"]
+    assert loads == []
+
+
+def test_answers_retired_by_bump_elsewhere(shared_db):
+    today = date(2025, 5, 20)
+    answer_cache.put_cached_answer(1, "steps yesterday", "9000", today, answer_cache.get_data_version(1))
+    assert answer_cache.get_cached_answer(1, "steps yesterday", today) == "9000"
+    cache_versions.bump('data:1', db_url=shared_db)
+    assert answer_cache.get_cached_answer(1, "steps yesterday", today) is None
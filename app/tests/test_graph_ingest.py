@@ -0,0 +1,124 @@
+"""
+Re-uploading an overlapping export must replace the graph nodes of the days
+it covers, not add a second copy, and deleting a user must not leave their
+nodes behind. Neo4j's CREATE appends, so the Neo4j
+ingest is run against a driver that keeps nodes with those semantics; the
+local backend's in-memory graph is checked through the service as well.
+"""
+import importlib
+import re
+from collections import Counter
+from datetime import date
+
+import pytest
+
+from backend import service
+from benchmarks.synthetic import make_user
+from modules.utils.db.db_utils_mysql import push_user_data_mysql
+
+END = date(2025, 3, 31)
+
+
+class _Tx:
+    # Runs the statements of db_utils_neo4j on a list of nodes: CREATE appends,
+    # a day-range DETACH DELETE removes
+    def __init__(self, nodes):
+        self.nodes = nodes
+
+    def run(self, query, **params):
+        if "DETACH DELETE n" in query and "recordedOn" in query:
+            label = re.search(r"->\(n:(\w+)\)", query).group(1)
+            self.nodes[:] = [n for n in self.nodes if not (
+                n['user_id'] == params['uid'] and n['label'] == label
+                and params['start'] <= n['day'] < params['end'])]
+        elif "DETACH DELETE n" in query:
+            self.nodes[:] = [n for n in self.nodes if n['user_id'] != params['uid']]
+        elif "DETACH DELETE u" in query:
+            # The user's remaining nodes lose their relationship, not their existence
+            for n in self.nodes:
+                if n['user_id'] == params['uid']:
+                    n['user_id'] = None
+        elif "HealthData" in query:
+            label = re.search(r"CREATE \(\w+:(\w+):HealthData", query).group(1)
+            self.nodes.append({'user_id': params['uid'], 'label': label, 'day': params['date']})
+
+
+class _Session:
+    def __init__(self, nodes):
+        self.nodes = nodes
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, **params):
+        return _Tx(self.nodes).run(query, **params)
+
+    def execute_write(self, fn, *args):
+        return fn(_Tx(self.nodes), *args)
+
+
+class _Driver:
+    def __init__(self):
+        self.nodes = []
+
+    def session(self):
+        return _Session(self.nodes)
+
+
+@pytest.fixture
+def neo4j(tmp_path, monkeypatch):
+    # db_utils_neo4j reads its credentials from secrets.toml on import
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "secrets.toml").write_text(
+        '[neo4j]\nNEO4J_URI = "bolt://localhost:7687"\nNEO4J_USERNAME = "neo4j"\nNEO4J_PASSWORD = "x"\n'
+    )
+    module = importlib.import_module("modules.utils.db.db_utils_neo4j")
+    module.driver.close()       # never connected
+    driver = _Driver()
+    monkeypatch.setattr(module, "driver", driver)
+    monkeypatch.setattr(module, "index_user_data", lambda *args: 0)
+    monkeypatch.setattr(module, "bump_data_version", lambda user_id: None)
+    monkeypatch.setattr(module, "delete_user_vectors", lambda user_id: None)
+    return module, driver
+
+
+def _ingest(module, u):
+    module.ingest_user_data_to_neo4j(u.user_id, u.username, u.food.copy(), u.water.copy(),
+                                     u.steps.copy(), u.sleep.copy())
+
+
+def test_neo4j_reupload_replaces_overlapping_days(neo4j):
+    module, driver = neo4j
+    first, second = make_user(1, 40, date(2025, 3, 10)), make_user(1, 40, END, seed=1)
+    _ingest(module, first)
+    _ingest(module, second)
+
+    per_day = Counter((n['label'], n['day']) for n in driver.nodes if n['label'] != 'Food')
+    assert set(per_day.values()) == {1}
+    first_days = sorted({n[1] for n in per_day if n[0] == 'Step'})
+    assert first_days[0] == "2025-01-30" and first_days[-1] == END.isoformat()
+    kept = first.food[first.food['date'] < second.food['date'].min()]
+    assert Counter(n['label'] for n in driver.nodes)['Food'] == len(kept) + len(second.food)
+
+
+def test_neo4j_delete_removes_the_users_nodes(neo4j):
+    # The ingest job's graph rebuild deletes the user first; nothing may be left behind
+    module, driver = neo4j
+    _ingest(module, make_user(1, 10, END))
+    _ingest(module, make_user(2, 10, END))
+    module.delete_user_data_neo4j(1)
+    assert driver.nodes and {n['user_id'] for n in driver.nodes} == {2}
+
+
+def test_local_reupload_keeps_one_copy_per_day(local_backend):
+    first, second = make_user(1, 40, date(2025, 3, 10)), make_user(1, 40, END, seed=1)
+    ingest_graph, _ = service.graph_store()
+    for u in (first, second):
+        user_id = push_user_data_mysql(u.username, u.food, u.water, u.sleep, u.steps, service.db_url())
+        ingest_graph(user_id, u.username, u.food, u.water, u.steps, u.sleep)
+    steps = local_backend.tables['Step']
+    assert steps['recordedOn'].str[:10].value_counts().max() == 1
+    assert len(steps) == 61     # 2025-01-30 .. 2025-03-31
@@ -0,0 +1,41 @@
+from datetime import date
+
+import pytest
+
+from modules.utils.retrieval.intent_router import extract_intent
+
+TODAY = date(2025, 5, 20)
+
+
+@pytest.mark.parametrize("question", [
+    "How many days did I sleep less than 6 hours last month?",
+    "How many days did I walk more than 10000 steps in April 2025?",
+    "total steps on days over 8000",
+    "average water on days under 2000 ml",
+    "how often did I eat at least 2000 calories this month",
+    "days I drank below 1500 ml of water in 2025",
+    "days with steps above 12000 last week",
+    "days my sleep was > 8 hours",
+    "total calories only on weekends this month",
+    "compare my sleep this week vs last week",
+])
+def test_conditional_questions_fall_back_to_the_agent(question):
+    assert extract_intent(question, TODAY) is None
+
+
+@pytest.mark.parametrize("question, name, metric, agg", [
+    ("What was my total steps over the last month?", 'metric', 'steps', 'total'),
+    ("Show my average sleep in April 2025", 'metric', 'sleep', 'average'),
+    ("How much water did I drink yesterday?", 'metric', 'water', 'total'),
+    ("What are my top 3 foods this year?", 'top_foods', None, 'total'),
+    ("What did I eat on 2025-05-10?", 'foods_on_date', None, 'total'),
+])
+def test_supported_shapes(question, name, metric, agg):
+    intent = extract_intent(question, TODAY)
+    assert (intent.name, intent.metric, intent.agg) == (name, metric, agg)
+
+
+def test_top_n_and_dates():
+    intent = extract_intent("top 3 foods by calories in April 2025", TODAY)
+    assert intent.top_n == 3 and intent.order_by == 'calories'
+    assert intent.date_range == (date(2025, 4, 1), date(2025, 4, 30))
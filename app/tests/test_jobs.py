@@ -0,0 +1,97 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import text
+
+from backend import jobs, service
+from benchmarks.synthetic import make_user
+from modules.utils.db.db_utils_mysql import get_engine, push_user_data_mysql
+from modules.utils.retrieval import resources
+
+END = date(2025, 5, 20)
+
+
+def _count(table: str, user_id: int) -> int:
+    with get_engine(service.db_url()).connect() as conn:
+        return conn.execute(text(f"SELECT COUNT(*) FROM {table} WHERE user_id = :u"), {"u": user_id}).scalar()
+
+
+def _queue(username: str, frames: dict, host: str = None) -> int:
+    """A job whose parse and clean stages already ran."""
+    now = jobs._now()
+    with get_engine(service.db_url()).begin() as conn:
+        job_id = conn.execute(
+            text("INSERT INTO ingest_jobs (username, status, checkpoint, attempts, host, created_at, updated_at) "
+                 "VALUES (:u, 'queued', 'clean', 0, :h, :now, :now)"),
+            {"u": username, "h": host or jobs._host(), "now": now}
+        ).lastrowid
+    jobs._spool(job_id).mkdir(parents=True)
+    jobs._save(job_id, "clean", frames)
+    return job_id
+
+
+def _run_until_settled(worker="test:0"):
+    while (job := jobs._claim(worker)) is not None:
+        jobs.run_job(job)
+
+
+@pytest.fixture
+def graph_failing(local_backend):
+    """The graph store raises while `fail` is set; `calls` counts ingests."""
+    ingest_graph, delete_graph = service.graph_store()
+    state = {'fail': True, 'calls': 0}
+
+    def ingest(*args):
+        state['calls'] += 1
+        if state['fail']:
+            raise ConnectionError("graph down")
+        ingest_graph(*args)
+
+    resources.install("graph_store", (ingest, delete_graph))
+    return state
+
+
+def test_final_failure_keeps_existing_history(local_backend, graph_failing):
+    old = make_user(1, 30, date(2025, 4, 1))
+    user_id = push_user_data_mysql(old.username, old.food, old.water, old.sleep, old.steps, service.db_url())
+    before = _count('food_intake', user_id)
+    new = make_user(1, 10, END, seed=1)
+    job_id = _queue(old.username, {'food': new.food, 'water': new.water, 'sleep': new.sleep, 'steps': new.steps})
+
+    _run_until_settled()
+
+    job = jobs.get_job(job_id)
+    assert job['status'] == 'failed' and job['attempts'] == int(jobs.cfg['max_attempts'])
+    assert job['checkpoint'] == 'mysql' and "graph down" in job['error']
+    assert graph_failing['calls'] == int(jobs.cfg['max_attempts'])
+    assert _count('food_intake', user_id) == before + len(new.food)
+    assert service.get_username(user_id) == old.username
+    assert jobs._spool(job_id).exists()
+
+
+def test_retry_redoes_graph_stage_from_mysql(local_backend, graph_failing):
+    u = make_user(2, 10, END)
+    job_id = _queue(u.username, {'food': u.food, 'water': u.water, 'sleep': u.sleep, 'steps': u.steps})
+    _run_until_settled()
+    assert jobs.get_job(job_id)['status'] == 'failed'
+
+    graph_failing['fail'] = False
+    job = jobs.retry_job(job_id)
+    assert job['status'] == 'queued' and job['attempts'] == 0
+    _run_until_settled()
+
+    job = jobs.get_job(job_id)
+    assert job['status'] == 'done'
+    assert _count('food_intake', job['user_id']) == len(u.food)     # MySQL stage not redone
+    assert not jobs._spool(job_id).exists()
+    with pytest.raises(ValueError):
+        jobs.retry_job(job_id)
+
+
+def test_jobs_stay_on_their_host_unless_spool_is_shared(local_backend, monkeypatch):
+    u = make_user(3, 5, END)
+    job_id = _queue(u.username, {'food': u.food, 'water': u.water, 'sleep': u.sleep, 'steps': u.steps},
+                    host="elsewhere")
+    assert jobs._claim("test:0") is None
+    monkeypatch.setitem(jobs.cfg, 'shared_spool', True)
+    assert jobs._claim("test:0")['job_id'] == job_id
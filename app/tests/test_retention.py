@@ -0,0 +1,78 @@
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+from sqlalchemy import text
+
+from backend import service
+from benchmarks.synthetic import make_user
+from modules.utils.db import retention
+from modules.utils.db.db_utils_mysql import get_engine, push_user_data_mysql
+
+END = date(2025, 3, 31)
+BEFORE = date(2025, 3, 1)       # March stays raw
+TOP_K = 3
+
+
+@pytest.fixture
+def user_id(local_backend):
+    u = make_user(1, 60, END)
+    return push_user_data_mysql(u.username, u.food, u.water, u.sleep, u.steps, service.db_url())
+
+
+def _food(user_id: int, day: date) -> pd.DataFrame:
+    with get_engine(service.db_url()).connect() as conn:
+        rows = conn.execute(text(
+            "SELECT food_name, amount, calories, items, compacted FROM food_intake "
+            "WHERE user_id = :u AND event_time >= :d AND event_time < :n ORDER BY food_name"
+        ), {"u": user_id, "d": day, "n": day + timedelta(days=1)}).all()
+    return pd.DataFrame(rows, columns=['food_name', 'amount', 'calories', 'items', 'compacted'])
+
+
+def _add_raw(user_id: int, day: date, food_name: str, calories: float):
+    with get_engine(service.db_url()).begin() as conn:
+        conn.execute(text(
+            "INSERT INTO food_intake (user_id, event_time, food_name, amount, calories) VALUES (:u, :t, :f, 1, :c)"
+        ), {"u": user_id, "t": day, "f": food_name, "c": calories})
+
+
+def test_pending_days_are_the_old_raw_days(user_id):
+    pending = retention.pending_days(service.db_url(), user_id, BEFORE)
+    assert [d.day for d in pending] == [date(2025, 1, 31) + timedelta(days=i) for i in range(29)]
+    assert all(d.rows == d.raw_rows > 0 for d in pending)
+
+
+def test_compacted_days_are_no_longer_pending(user_id):
+    days = [d.day for d in retention.pending_days(service.db_url(), user_id, BEFORE)]
+    retention.compact_days(service.db_url(), user_id, days, TOP_K)
+    assert retention.pending_days(service.db_url(), user_id, BEFORE) == []
+    assert all(len(_food(user_id, d)) <= TOP_K + 1 for d in days)
+
+
+def test_rows_added_to_a_compacted_day_are_merged(user_id):
+    day = date(2025, 2, 10)
+    retention.compact_days(service.db_url(), user_id, [day], TOP_K)
+    before = _food(user_id, day)
+    _add_raw(user_id, day, "durian", 9999.0)
+    _add_raw(user_id, day, "late snack", 1.0)
+
+    pending = {d.day: d for d in retention.pending_days(service.db_url(), user_id, BEFORE)}
+    assert (pending[day].rows, pending[day].raw_rows) == (len(before) + 2, 2)
+    retention.compact_days(service.db_url(), user_id, [day], TOP_K)
+
+    after = _food(user_id, day)
+    assert after['compacted'].eq(1).all() and len(after) <= TOP_K + 1
+    assert (after['food_name'] == retention.OTHER_FOODS).sum() <= 1
+    assert after['calories'].sum() == pytest.approx(before['calories'].sum() + 10000.0)
+    assert after['items'].sum() == before['items'].sum() + 2
+    assert "durian" in set(after['food_name'])
+    assert day not in {d.day for d in retention.pending_days(service.db_url(), user_id, BEFORE)}
+
+
+def test_recompacting_aggregates_is_a_no_op(user_id):
+    day = date(2025, 2, 10)
+    first = retention.compact_days(service.db_url(), user_id, [day], TOP_K)
+    with get_engine(service.db_url()).begin() as conn:     # as if written before `compacted` existed
+        conn.execute(text("UPDATE food_intake SET compacted = 0 WHERE user_id = :u"), {"u": user_id})
+    second = retention.compact_days(service.db_url(), user_id, [day], TOP_K)
+    pd.testing.assert_frame_equal(first.reset_index(drop=True), second.reset_index(drop=True))
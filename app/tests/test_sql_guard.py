@@ -0,0 +1,121 @@
+"""
+The SQL sandbox: static checks on generated SQL, MySQL plan checks, and the
+sandboxed SQLite engine, which must refuse anything but the health tables
+even for queries the static checks would let through.
+"""
+import pytest
+from sqlalchemy import create_engine
+
+from modules.utils.retrieval import sql_guard
+from modules.utils.retrieval.sql_guard import SqlRejected, plan_violations, static_violations
+
+REJECTED = [
+    "SELECT day FROM food_log UNION TABLE food_intake",
+    "SELECT * FROM`food_intake`",
+    "SELECT * FROM food_log, (users)",
+    "SELECT * FROM food_log f JOIN (users) u ON 1 = 1",
+    "SELECT * FROM food_log STRAIGHT_JOIN users",
+    "SELECT * FROM (food_log f JOIN chat_sessions s ON 1 = 1)",
+    "SELECT * FROM food_log f JOIN step_log s ON f.day = s.day, chat_history",
+    "SELECT * FROM main.food_intake",
+    "SELECT * FROM information_schema.tables",
+    "SELECT * FROM pragma_table_info('users')",
+    "SELECT * FROM food_log WHERE day IN (SELECT DATE(created_at) FROM chat_history)",
+    "SELECT * FROM (SELECT * FROM users) x",
+    'SELECT * FROM "users"',
+    "SELECT * FROM [users]",
+    "SELECT * FROM food_log, other_db_table",
+    "WITH food_log AS (SELECT 1) SELECT * FROM food_log",
+    "WITH RECURSIVE r(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM r) SELECT * FROM r",
+    "SELECT * FROM food_log WHERE food_name = 'x",
+    "SELECT * FROM food_log -- trailing",
+    "SELECT * FROM food_log /* c */",
+    "SELECT * FROM food_log; DELETE FROM food_intake",
+    "SELECT @@version",
+    "SELECT SLEEP (5)",
+    "SELECT * FROM food_log INTO OUTFILE '/tmp/x'",
+    "DELETE FROM food_log",
+]
+
+ALLOWED = [
+    "SELECT day, SUM(calories) AS kcal FROM food_log WHERE day >= '2024-01-01' GROUP BY day ORDER BY day",
+    "SELECT EXTRACT(YEAR FROM day) AS y, AVG(hours) FROM sleep_log GROUP BY EXTRACT(YEAR FROM day)",
+    "WITH d AS (SELECT day, SUM(calories) AS c FROM food_log GROUP BY day) SELECT AVG(c) FROM d",
+    "SELECT f.day, s.steps FROM food_log f, step_log s WHERE f.day = s.day",
+    "SELECT f.day FROM food_log f JOIN step_log s ON f.day = s.day JOIN sleep_log z USING (day)",
+    "SELECT * FROM food_log WHERE food_name = 'FROM users; -- x'",
+    "SELECT calories - -1 FROM food_log",
+    "SELECT REPLACE(food_name, 'a', 'b') FROM food_log",
+    "SELECT TRIM(BOTH ' ' FROM food_name) FROM food_log",
+    "SELECT day, COUNT(*) OVER (PARTITION BY day ORDER BY event_time) FROM food_log;",
+]
+
+
+@pytest.mark.parametrize("sql", REJECTED)
+def test_static_checks_reject(sql):
+    assert static_violations(sql)
+
+
+@pytest.mark.parametrize("sql", ALLOWED)
+def test_static_checks_allow(sql):
+    assert static_violations(sql) == []
+
+
+def test_database_tables_are_denied():
+    assert static_violations("SELECT * FROM food_log, audit_log") != []
+    reasons = static_violations("SELECT * FROM food_log, audit_log", tables=["audit_log"])
+    assert any("audit_log cannot be referenced" in r for r in reasons)
+
+
+def test_plan_violations():
+    assert plan_violations([{"table": "food_intake", "type": "ref", "rows": 40}]) == []
+    assert plan_violations([{"table": "food_intake", "type": "ALL", "rows": 40}])
+    assert plan_violations([{"table": "food_intake", "type": "ref", "rows": 10 ** 9}])
+    assert plan_violations([{"table": "users", "type": "ref", "rows": 1}], denied={"users"})
+
+
+@pytest.fixture
+def health_db(sqlite_url):
+    engine = create_engine(sqlite_url)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("INSERT INTO users (user_id, username) VALUES (1, 'alice'), (2, 'bob')")
+        conn.exec_driver_sql(
+            "INSERT INTO food_intake (user_id, event_time, food_name, amount, calories) VALUES "
+            "(1, '2024-01-01 08:00:00', 'rice', 1, 200), (2, '2024-01-01 08:00:00', 'egg', 1, 70)"
+        )
+    engine.dispose()
+    yield sqlite_url
+    sql_guard.get_sql_engine.cache_clear()
+    sql_guard._db_tables.cache_clear()
+
+
+def test_query_sees_only_the_users_rows(health_db):
+    sql = "SELECT food_name, SUM(calories) AS kcal FROM food_log GROUP BY food_name"
+    sql_guard.check(health_db, sql, 1)
+    assert sql_guard.read_only_query(health_db, sql, 1) == [{"food_name": "rice", "kcal": 200.0}]
+
+
+def test_check_rejects_bypass(health_db):
+    with pytest.raises(SqlRejected):
+        sql_guard.check(health_db, "SELECT * FROM food_log, (users)", 1)
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT * FROM users",
+    "SELECT name FROM sqlite_master",
+    "SELECT * FROM pragma_table_info('users')",
+    "SELECT sqlite_version()",
+])
+def test_sandbox_engine_refuses_other_tables(health_db, sql):
+    # Past the static checks (read_only_query does not repeat them), the
+    # engine itself must refuse
+    with pytest.raises(Exception, match="prohibited|not authorized"):
+        sql_guard.read_only_query(health_db, sql, 1)
+
+
+def test_mysql_runs_as_sandbox_account(monkeypatch):
+    url = "mysql+pymysql://app:secret@db:3306/health"
+    monkeypatch.setitem(sql_guard.cfg, 'user', "sql_sandbox")
+    monkeypatch.setitem(sql_guard.cfg, 'password', "pw")
+    sandbox = sql_guard._sandbox_url(url)
+    assert (sandbox.username, sandbox.password, sandbox.database) == ("sql_sandbox", "pw", "health")
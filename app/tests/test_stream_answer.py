@@ -0,0 +1,48 @@
+"""
+Only answers the pipeline actually produced are saved to a chat session.
+"""
+from datetime import date
+
+import pytest
+
+from backend import service
+from benchmarks.synthetic import make_user
+from modules.utils.db.db_utils_mysql import push_user_data_mysql
+
+
+@pytest.fixture
+def session(local_backend):
+    u = make_user(1, 5, date(2025, 3, 31))
+    user_id = push_user_data_mysql(u.username, u.food, u.water, u.sleep, u.steps, service.db_url())
+    return user_id, service.create_session(user_id)["session_id"]
+
+
+def _pipeline(*events, error=None):
+    def stream_answer(user_id, username, question, session_key=None):
+        yield from events
+        if error is not None:
+            raise error
+    return stream_answer
+
+
+def _saved(session_id):
+    return [(m['role'], m['message']) for m in service.get_history(session_id)]
+
+
+def test_final_answer_is_saved(session, monkeypatch):
+    user_id, sid = session
+    monkeypatch.setattr(service.pipeline, "stream_answer", _pipeline(("token", "4"), ("final", "4 meals")))
+    events = list(service.stream_answer(user_id, "how many meals?", sid))
+    assert events[-1] == {"event": "final", "data": "4 meals"}
+    assert _saved(sid) == [("user", "how many meals?"), ("assistant", "4 meals")]
+
+
+@pytest.mark.parametrize("error", [None, ValueError("boom")])
+def test_run_without_final_saves_no_reply(session, monkeypatch, error):
+    # None: the pipeline ends without a final event, as a cancelled run does
+    user_id, sid = session
+    monkeypatch.setattr(service.pipeline, "stream_answer", _pipeline(("status", "Thinking"), error=error))
+    events = list(service.stream_answer(user_id, "how many meals?", sid))
+    assert events[-1]["event"] == "error"
+    assert all(e["event"] != "final" for e in events)
+    assert _saved(sid) == [("user", "how many meals?")]
@@ -0,0 +1,41 @@
+import os
+
+import pytest
+
+from modules.utils.observability import tracing
+
+
+@pytest.fixture
+def trace_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "traces.jsonl")
+    monkeypatch.setitem(tracing.cfg, 'path', path)
+    monkeypatch.setitem(tracing.cfg, 'max_file_mb', 2048 / (1024 * 1024))     # 2 KB
+    monkeypatch.setitem(tracing.cfg, 'backups', 2)
+    return path
+
+
+def _spans(n):
+    out = []
+    for i in range(n):
+        s = tracing.Span(f"stage.{i % 3}", rows=i)
+        s.end_ns = s.start_ns + 1000000      # not end(): that would export it
+        out.append(s)
+    return out
+
+
+def test_file_is_rotated_and_capped(trace_path):
+    for _ in range(60):
+        tracing._write_file(_spans(4))
+    limit = tracing.cfg['max_file_mb'] * 1024 * 1024
+    assert os.path.getsize(trace_path) <= limit
+    assert os.path.exists(trace_path + ".1") and os.path.exists(trace_path + ".2")
+    assert not os.path.exists(trace_path + ".3")
+
+
+def test_summary_reads_rotated_files(trace_path):
+    for _ in range(20):
+        tracing._write_file(_spans(3))
+    assert os.path.exists(trace_path + ".1")
+    lines = sum(sum(1 for _ in open(p)) for p in (trace_path, trace_path + ".1", trace_path + ".2")
+                if os.path.exists(p))
+    assert int(tracing.summarize()['count'].sum()) == lines
@@ -0,0 +1,69 @@
+from datetime import date, timedelta
+
+import pytest
+
+from modules.utils.cache import translation_cache as tc
+
+RANGE_CYPHER = ("MATCH (u:User {username: 'alice'})-[:HAS_WALKED]->(n:Step)\n"
+                "WHERE n.recordedOn >= date('{start}') AND n.recordedOn <= date('{end}')\n"
+                "RETURN sum(n.count) AS total")
+
+
+@pytest.fixture(autouse=True)
+def cache_path(tmp_path, monkeypatch):
+    monkeypatch.setitem(tc.cfg, 'path', str(tmp_path / "translations.sqlite3"))
+
+
+def _cypher(start, end):
+    return RANGE_CYPHER.replace('{start}', start).replace('{end}', end)
+
+
+def test_relative_period_is_parameterized():
+    shape, entities = tc.parameterize_question("For user alice, how many steps yesterday?", ["alice"])
+    assert shape == "for user <user_1> how many steps yesterday"
+    day = (date.today() - timedelta(days=1)).isoformat()
+    assert entities == {'user_1': 'alice', 'range_start': day, 'range_end': day}
+    template, spec = tc.templatize(_cypher(day, day), entities, shape)
+    # start == end: both literals become the one parameter
+    assert template.count("$range_start") == 2 and day not in template
+    tc.store(shape, template, spec)
+
+    # The same shape asked on another day gets that day's dates
+    later = {**entities, 'range_start': '2030-01-01', 'range_end': '2030-01-01'}
+    cypher, params = tc.lookup(shape, later)
+    assert cypher == template
+    assert params['range_start'] == '2030-01-01'
+
+
+def test_leftover_date_literal_is_not_cached():
+    shape, entities = tc.parameterize_question("For user alice, how many steps this week?", ["alice"])
+    # The model picked a different week start than resolve_date_range
+    assert tc.templatize(_cypher('1999-01-01', '1999-01-07'), entities, shape) is None
+
+
+def test_numbers_must_be_pinned_by_the_shape():
+    shape, entities = tc.parameterize_question("For user alice, days with more than 8000 steps", ["alice"])
+    pinned = "MATCH (u:User {username: 'alice'})-[:HAS_WALKED]->(n:Step) WHERE n.count > 8000 RETURN count(n) LIMIT 50"
+    assert tc.templatize(pinned, entities, shape) is not None
+    unpinned = pinned.replace("8000", "7000")
+    assert tc.templatize(unpinned, entities, shape) is None
+
+
+def test_dynamic_dates_need_no_range_parameters():
+    shape, entities = tc.parameterize_question("For user alice, how many steps this week?", ["alice"])
+    cypher = ("MATCH (u:User {username: 'alice'})-[:HAS_WALKED]->(n:Step) "
+              "WHERE n.recordedOn >= date() - duration({days: 6}) RETURN sum(n.count)")
+    assert tc.templatize(cypher, entities, shape) is None          # 6 is not in the shape
+    cypher = cypher.replace("duration({days: 6})", "duration('P1W')")
+    template, spec = tc.templatize(cypher, entities, shape)
+    assert spec == {'user_1': 'exact'}
+
+
+def test_explicit_dates_and_unknown_entities():
+    shape, entities = tc.parameterize_question("What did alice eat on 2025-05-10?", ["alice"])
+    assert 'range_start' not in entities
+    cypher = "MATCH (u:User {username: 'alice'})-[:HAS_ATE]->(f:Food) WHERE f.recordedOn = date('2025-05-10') RETURN f.name"
+    template, spec = tc.templatize(cypher, entities, shape)
+    assert set(spec) == {'user_1', 'date_1'}
+    # An entity the Cypher does not contain as a literal: refuse
+    assert tc.templatize("MATCH (f:Food) RETURN f.name", entities, shape) is None
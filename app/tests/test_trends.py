@@ -0,0 +1,34 @@
+from datetime import date
+
+import pytest
+
+from backend import service
+from benchmarks.synthetic import make_user
+from modules.utils.analytics import trends
+from modules.utils.db.db_utils_mysql import get_engine, push_user_data_mysql
+
+END = date(2025, 3, 31)
+
+
+def _push(days: int) -> int:
+    u = make_user(1, days, END)
+    return push_user_data_mysql(u.username, u.food, u.water, u.sleep, u.steps, service.db_url())
+
+
+@pytest.mark.parametrize("days", [10, 40])
+def test_push_stores_facts(local_backend, days):
+    # Under min_days of history every z-score is NULL; the facts must still be stored
+    facts = trends.load_facts(get_engine(service.db_url()), _push(days))
+    assert facts is not None
+    assert facts['through'] == END.isoformat()
+    assert {m: v['days'] for m, v in facts['metrics'].items()} == dict.fromkeys(trends.SOURCES, days)
+    if days < int(trends.cfg['min_days']):
+        assert facts['anomalies'] == [] and facts['correlations'] == []
+        assert all(v['slope_per_week'] is None for v in facts['metrics'].values())
+
+
+def test_refresh_short_history(local_backend):
+    user_id = _push(10)
+    facts = trends.refresh(get_engine(service.db_url()), user_id)
+    assert facts['metrics']['steps']['short_avg'] is not None
+    assert "No trend data" not in trends.describe(facts)
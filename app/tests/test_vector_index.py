@@ -0,0 +1,119 @@
+import multiprocessing
+
+import numpy as np
+import pytest
+
+from modules.utils.retrieval.vector_index import LocalIVFIndex
+
+DIM = 16
+
+
+def _docs(user_id, n, prefix):
+    return [{"doc_key": f"{user_id}:{prefix}:{i}", "user_id": user_id, "kind": "day", "day": None,
+             "text": f"{prefix} {i}"} for i in range(n)]
+
+
+def _vectors(seed, n):
+    return np.random.default_rng(seed).normal(size=(n, DIM)).astype(np.float32)
+
+
+def _unit(v):
+    return v / np.linalg.norm(v, axis=1, keepdims=True)
+
+
+def _worker(index_dir, seed):
+    index = LocalIVFIndex(index_dir, DIM, min_train_size=10**9)
+    for batch in range(10):
+        index.add(_docs(seed, 20, f"w{seed}b{batch}"), _vectors(seed * 100 + batch, 20))
+
+
+def test_two_workers_do_not_overwrite_each_other(tmp_path):
+    a = LocalIVFIndex(str(tmp_path), DIM, min_train_size=10**9)
+    b = LocalIVFIndex(str(tmp_path), DIM, min_train_size=10**9)
+    a.add(_docs(1, 5, "a"), _vectors(1, 5))
+    b.add(_docs(2, 5, "b"), _vectors(2, 5))      # b's cached size would have reused a's rows
+    a.add(_docs(1, 5, "a2"), _vectors(3, 5))
+
+    hits = a.search(1, _vectors(1, 1)[0], k=20)
+    assert {h['text'] for h in hits} == {f"a {i}" for i in range(5)} | {f"a2 {i}" for i in range(5)}
+    top = b.search(2, _vectors(2, 5)[3], k=1)[0]
+    assert top['text'] == "b 3" and top['score'] == pytest.approx(1.0, abs=1e-5)
+
+
+def test_concurrent_processes(tmp_path):
+    ctx = multiprocessing.get_context("fork")
+    procs = [ctx.Process(target=_worker, args=(str(tmp_path), seed)) for seed in (1, 2, 3)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(60)
+        assert p.exitcode == 0
+
+    index = LocalIVFIndex(str(tmp_path), DIM, min_train_size=10**9)
+    for seed in (1, 2, 3):
+        hits = index.search(seed, _vectors(seed * 100 + 7, 20)[4], k=300)
+        assert len(hits) == 200
+        assert hits[0]['text'] == f"w{seed}b7 4"
+        assert hits[0]['score'] == pytest.approx(1.0, abs=1e-5)
+
+
+def test_search_follows_training_in_another_process(tmp_path):
+    writer = LocalIVFIndex(str(tmp_path), DIM, nprobe=2, min_train_size=64)
+    reader = LocalIVFIndex(str(tmp_path), DIM, nprobe=2, min_train_size=64)
+    vecs = _unit(_vectors(5, 100))
+    writer.add(_docs(1, 40, "x"), vecs[:40])
+    assert reader.search(1, vecs[0], k=1)[0]['text'] == "x 0"
+    assert reader._centroids is None
+
+    writer.add(_docs(1, 60, "y"), vecs[40:])       # 100 rows >= 64: trains
+    assert writer._generation == 1
+    assert reader.search(1, vecs[70], k=1)[0]['text'] == "y 30"
+    assert reader._generation == 1 and reader._centroids.shape[1] == DIM
+
+
+def test_matrix_grows_past_initial_capacity(tmp_path):
+    a = LocalIVFIndex(str(tmp_path), DIM, min_train_size=10**9)
+    b = LocalIVFIndex(str(tmp_path), DIM, min_train_size=10**9)
+    vecs = _unit(_vectors(9, 3000))
+    a.add(_docs(1, 3000, "big"), vecs)               # grows the file under a
+    assert b.search(1, vecs[2999], k=1)[0]['text'] == "big 2999"
+
+
+class _DocGraph:
+    # :HealthDoc nodes for Neo4jVectorIndex: the MERGE of add() and the
+    # per-user MATCH of search(); any other statement is refused
+    def __init__(self):
+        self.docs = {}
+
+    def query(self, query, params=None):
+        params = params or {}
+        if query.startswith("CREATE INDEX"):
+            return []
+        if "MERGE (d:HealthDoc" in query:
+            for row in params['rows']:
+                self.docs[row['doc_key']] = row
+            return []
+        if "MATCH (d:HealthDoc {user_id: $uid})" in query and "vector.similarity.cosine" in query:
+            vec = np.array(params['vec'])
+            hits = []
+            for d in self.docs.values():
+                if d['user_id'] == params['uid']:
+                    e = np.array(d['embedding'])
+                    score = float(e @ vec / (np.linalg.norm(e) * np.linalg.norm(vec)))
+                    hits.append({"kind": d['kind'], "day": d['day'], "text": d['text'], "score": score})
+            return sorted(hits, key=lambda h: -h['score'])[:params['k']]
+        raise AssertionError(f"unexpected query: {query}")
+
+
+def test_neo4j_search_ranks_within_the_user(monkeypatch):
+    from modules.utils.retrieval import vector_index
+    monkeypatch.setattr(vector_index, "get_graph", lambda graph=_DocGraph(): graph)
+    index = vector_index.Neo4jVectorIndex(DIM)
+    query = _unit(_vectors(7, 1))[0]
+    # 1000 documents of other users sit closer to the query than any of user 1's
+    others = _unit(query + 0.01 * _vectors(8, 1000))
+    index.add([dict(d, user_id=2) for d in _docs(2, 1000, "other")], others)
+    index.add(_docs(1, 10, "mine"), _unit(_vectors(9, 10)))
+
+    hits = index.search(1, query, k=6)
+    assert len(hits) == 6 and all(h['text'].startswith("mine") for h in hits)